@@ -1,5 +1,35 @@
-from fastapi import FastAPI
+import json
+import time
+from dataclasses import asdict
+from typing import AsyncIterator, Optional
+
+from fastapi import FastAPI, File, Header, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
+from models.schemas import SubsidyMatch, SubsidyMatchRequest, SubsidyMatchResponse
+from models.subsidy_schemas import (
+    Equipment,
+    ISDECategory,
+    Quote,
+    QuoteAnalysis,
+    QuoteAnalysisResponse,
+    ScenarioComparisonResponse,
+    ScenarioRequest
+)
+from services.arbitrage_engine import get_arbitrage_engine
+from services.catalog_views import bucket_label
+from services.document_processor import get_document_processor
+from services.llm_client import get_llm_client
+from services.match_reasons import MESSAGES
+from services.matching_cascade import get_matching_cascade
+from services.pdf_extraction import get_pdf_extractor
+from services.quote_sessions import get_quote_sessions
+from services.scenario_evaluator import get_scenario_evaluator
+from services.subsidy_database import get_database
+from services.subsidy_matcher import get_subsidy_matcher
+from services.threshold_detector import get_threshold_detector
 
 app = FastAPI(
     title="Subsidie Matcher API",
@@ -28,6 +58,259 @@ async def health_check():
     return {"status": "healthy"}
 
 
+# Matching endpoints are sync: FastAPI runs them in its threadpool, so
+# matching does not block the event loop.
+
+@app.post("/api/subsidies/match", response_model=SubsidyMatchResponse)
+def match_subsidies(
+    request: SubsidyMatchRequest,
+    limit: Optional[int] = None,
+    near_misses: bool = False,
+    language: Optional[str] = "en"
+):
+    """Match a company/project; language=none returns reason codes only"""
+    if language == "none":
+        language = None
+    try:
+        return get_subsidy_matcher().match_subsidies_sync(
+            request, limit=limit, include_near_misses=near_misses, language=language
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/subsidies/match/stream")
+async def stream_subsidy_matches(
+    request: SubsidyMatchRequest,
+    limit: Optional[int] = None,
+    near_misses: bool = False,
+    language: Optional[str] = "en",
+    stream_format: str = Query("ndjson", alias="format")
+):
+    """
+    Stream matches best first as NDJSON (default) or server-sent events.
+
+    Each match is sent as {"type": "match", "match": {...}} as soon as it is
+    ready, followed by one {"type": "summary", "total_matches": n} record.
+    """
+    if stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    if language == "none":
+        language = None
+    # Validate up front: errors cannot be reported once streaming started
+    if language is not None and language not in MESSAGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported language: {language}")
+
+    matcher = get_subsidy_matcher()
+    # Score off the event loop; the scores also give the summary's total
+    scored = await run_in_threadpool(matcher.score_request, request, near_misses)
+    total_matches = len(scored[1].positions)
+    matches = matcher.stream_matches(
+        request, limit=limit, include_near_misses=near_misses, language=language, scored=scored
+    )
+
+    def encode(record: dict) -> str:
+        data = json.dumps(record, ensure_ascii=False)
+        if stream_format == "sse":
+            return f"event: {record['type']}\ndata: {data}\n\n"
+        return data + "\n"
+
+    async def events() -> AsyncIterator[str]:
+        async for match in matches:
+            yield encode({"type": "match", "match": match.model_dump(mode="json")})
+        yield encode({"type": "summary", "total_matches": total_matches})
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+@app.post("/api/subsidies/{subsidy_id}/explain", response_model=SubsidyMatch)
+def explain_subsidy(subsidy_id: str, request: SubsidyMatchRequest, language: str = "en"):
+    """Explain how one subsidy scores for a company/project, in en or nl"""
+    try:
+        match = get_subsidy_matcher().explain(request, subsidy_id, language=language)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if match is None:
+        raise HTTPException(status_code=404, detail="Subsidy not found")
+    return match
+
+
+def _post_process(
+    analysis: QuoteAnalysis,
+    include_arbitrage: bool,
+    max_arbitrage_options: int,
+    include_thresholds: bool
+) -> QuoteAnalysis:
+    """Arbitrage opportunities and threshold alerts, as requested, on top of an analysis"""
+    if include_arbitrage:
+        analysis = get_arbitrage_engine().apply(analysis, max_arbitrage_options)
+    if include_thresholds:
+        analysis = get_threshold_detector().apply(analysis)
+    return analysis
+
+
+@app.post("/api/quotes/analysis", response_model=QuoteAnalysisResponse)
+def analyze_quote(
+    quote: Quote,
+    include_arbitrage: bool = True,
+    max_arbitrage_options: int = Query(5, ge=1, le=10),
+    include_thresholds: bool = True
+):
+    """Analyze an extracted quote; the returned analysis_id allows line edits"""
+    started = time.perf_counter()
+    session = get_quote_sessions().analyze(quote)
+    analysis = session.analysis
+    analysis = _post_process(analysis, include_arbitrage, max_arbitrage_options, include_thresholds)
+    return QuoteAnalysisResponse(
+        success=True,
+        analysis_id=session.session_id,
+        analysis=analysis,
+        processing_time_ms=(time.perf_counter() - started) * 1000,
+        api_calls_made=0
+    )
+
+
+@app.patch("/api/quotes/analysis/{analysis_id}/lines/{line}", response_model=QuoteAnalysisResponse)
+def update_quote_line(
+    analysis_id: str,
+    line: int,
+    equipment: Equipment,
+    include_arbitrage: bool = True,
+    max_arbitrage_options: int = Query(5, ge=1, le=10),
+    include_thresholds: bool = True
+):
+    """Replace one quote line and return the incrementally updated analysis"""
+    started = time.perf_counter()
+    try:
+        analysis = get_quote_sessions().update_line(analysis_id, line, equipment)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    except IndexError:
+        raise HTTPException(status_code=404, detail=f"Line {line} not found")
+    analysis = _post_process(analysis, include_arbitrage, max_arbitrage_options, include_thresholds)
+    return QuoteAnalysisResponse(
+        success=True,
+        analysis_id=analysis_id,
+        analysis=analysis,
+        processing_time_ms=(time.perf_counter() - started) * 1000,
+        api_calls_made=0
+    )
+
+
+@app.post("/api/quotes/analysis/verified", response_model=QuoteAnalysisResponse)
+async def analyze_quote_verified(
+    quote: Quote,
+    include_arbitrage: bool = True,
+    max_arbitrage_options: int = Query(5, ge=1, le=10),
+    include_thresholds: bool = True
+):
+    """Analyze a quote through the matching cascade (LLM only for ambiguous lines)"""
+    started = time.perf_counter()
+    result = await get_matching_cascade().analyze_quote(quote)
+    analysis = result.analysis
+    analysis = _post_process(analysis, include_arbitrage, max_arbitrage_options, include_thresholds)
+    return QuoteAnalysisResponse(
+        success=True,
+        analysis=analysis,
+        processing_time_ms=(time.perf_counter() - started) * 1000,
+        api_calls_made=result.llm_calls
+    )
+
+
+@app.post("/api/quotes/upload", response_model=QuoteAnalysisResponse)
+async def analyze_quote_upload(
+    file: UploadFile = File(...),
+    include_arbitrage: bool = True,
+    max_arbitrage_options: int = Query(5, ge=1, le=10),
+    include_thresholds: bool = True,
+    x_tenant_id: Optional[str] = Header(None)
+):
+    """Extract a quote PDF (cached by content) and analyze it; api_calls_made is 0 on a cache hit"""
+    started = time.perf_counter()
+    try:
+        # The upload is spooled and hashed in chunks, not read into memory
+        extraction = await get_document_processor().extract_quote(file, tenant=x_tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session = await run_in_threadpool(get_quote_sessions().analyze, extraction.quote)
+    analysis = session.analysis
+    analysis = _post_process(analysis, include_arbitrage, max_arbitrage_options, include_thresholds)
+    return QuoteAnalysisResponse(
+        success=True,
+        analysis_id=session.session_id,
+        analysis=analysis,
+        processing_time_ms=(time.perf_counter() - started) * 1000,
+        api_calls_made=extraction.api_calls_made
+    )
+
+
+@app.post("/api/quotes/scenarios", response_model=ScenarioComparisonResponse)
+def compare_quote_scenarios(request: ScenarioRequest):
+    """Compare what-if variants of a quote (totals and net cost per scenario)"""
+    try:
+        return get_scenario_evaluator().compare(request.quote, request.scenarios)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/documents/text")
+async def extract_document_text(file: UploadFile = File(...)):
+    """Extract text and tables per page from an uploaded PDF (page-parallel, with timings)"""
+    try:
+        extraction = await get_pdf_extractor().extract_async(file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**asdict(extraction), "failed_pages": extraction.failed_pages}
+
+
+@app.get("/api/quotes/cascade/metrics")
+async def cascade_metrics():
+    """Per-tier hit rates of the matching cascade and match cache counters"""
+    cascade = get_matching_cascade()
+    metrics = cascade.metrics.as_dict()
+    if cascade.cache is not None:
+        metrics["match_cache"] = cascade.cache.metrics.as_dict()
+    return metrics
+
+
+@app.get("/api/llm/metrics")
+async def llm_metrics():
+    """LLM calls, retries and token usage, including prompt-cache reads and writes"""
+    return get_llm_client().metrics.as_dict()
+
+
+@app.get("/api/isde/{meldcode}/frontier")
+def isde_frontier(meldcode: str, size: int = Query(5, ge=1, le=50)):
+    """Pareto-optimal products (subsidy vs. power/U/Rd and GWP) near an ISDE meldcode"""
+    db = get_database()
+    entry = db.get_isde_by_meldcode(meldcode.strip().upper())
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Meldcode not found")
+    frontiers = db.get_pareto_frontiers()
+    return {
+        "meldcode": entry.meldcode,
+        "is_optimal": frontiers.is_optimal(entry),
+        "frontier": frontiers.near(entry, size),
+    }
+
+
+@app.get("/api/isde/best")
+def isde_best(
+    category: ISDECategory,
+    type_: str = Query(..., alias="type"),
+    value: float = Query(...),
+    woning_type: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Highest ISDE amounts for a type and power/U/Rd/yield bucket (e.g. lucht-water 6-8 kW)"""
+    views = get_database().get_catalog_views()
+    return {
+        "bucket": bucket_label(category, value),
+        "meldcodes": views.best(category, type_, value, woning_type, limit),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
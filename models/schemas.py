@@ -66,6 +66,12 @@ class SubsidyRule(BaseModel):
     url: Optional[str] = Field(None, description="More information URL")
 
 
+class MatchReason(BaseModel):
+    """Machine-readable reason for a score or missing requirement"""
+    code: str = Field(..., description="Reason code, e.g. budget_below_min")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Reason parameters")
+
+
 class MatchScore(BaseModel):
     """Match score for a subsidy"""
     score: float = Field(..., ge=0, le=100, description="Match score (0-100)")
@@ -79,6 +85,7 @@ class SubsidyMatch(BaseModel):
     match_score: MatchScore
     eligible: bool = Field(..., description="Whether company is eligible")
     missing_requirements: List[str] = Field(default_factory=list, description="Missing requirements")
+    reason_codes: List[MatchReason] = Field(default_factory=list, description="Reasons and missing requirements as codes")
 
 
 class SubsidyMatchResponse(BaseModel):
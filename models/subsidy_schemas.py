@@ -295,6 +295,9 @@ class EquipmentMatch(BaseModel):
     # Match quality
     confidence: float = Field(..., ge=0, le=1, description="Match confidence (0-1)")
     match_notes: List[str] = Field(default_factory=list, description="Match notes and explanations")
+    resolved_by: Optional[str] = Field(
+        None, description="Cascade tier that resolved the line (exact, rules, llm, unmatched, unresolved)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -357,6 +360,45 @@ class ArbitrageOpportunity(BaseModel):
         }
 
 
+class ThresholdAlert(BaseModel):
+    """Quote line(s) close to an EIA/MIA investment limit"""
+
+    scheme: SubsidyScheme = Field(..., description="EIA or MIA (MIA includes Vamil)")
+    code: str = Field(..., description="Matched EIA or MIA/Vamil code")
+    kind: Literal["below_minimum", "near_minimum", "above_cap", "bundle"] = Field(
+        ..., description="Position relative to the threshold"
+    )
+    lines: List[int] = Field(..., description="Quote line indexes involved")
+    threshold: float = Field(..., ge=0, description="Threshold in EUR (per unit for per-unit caps)")
+    investment: float = Field(..., ge=0, description="Investment compared to the threshold")
+    distance: float = Field(..., description="Investment minus threshold in EUR")
+    subsidy_at_stake: float = Field(..., ge=0, description="Deduction gained or lost at the threshold")
+    suggestion: Literal["increase", "bundle", "keep", "split", "reduce"] = Field(
+        ..., description="Suggested quote change"
+    )
+    message: str = Field(..., description="Human-readable explanation")
+    alternative: bool = Field(
+        False, description="Code is a candidate the line's best combination does not use"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "scheme": "EIA",
+                "code": "210000",
+                "kind": "below_minimum",
+                "lines": [3],
+                "threshold": 2500.0,
+                "investment": 2350.0,
+                "distance": -150.0,
+                "subsidy_at_stake": 1000.0,
+                "suggestion": "increase",
+                "message": "€150 short of the EIA minimum of €2,500 for 210000",
+                "alternative": False
+            }
+        }
+
+
 class QuoteAnalysis(BaseModel):
     """Complete analysis of a quote with subsidy matching"""
 
@@ -384,6 +426,12 @@ class QuoteAnalysis(BaseModel):
         description="Alternative equipment suggestions"
     )
 
+    # Investment limits
+    threshold_alerts: List[ThresholdAlert] = Field(
+        default_factory=list,
+        description="Lines close to an EIA/MIA minimum or cap"
+    )
+
     # Metadata
     analysis_timestamp: datetime = Field(default_factory=datetime.now, description="Analysis timestamp")
     processing_time_seconds: Optional[float] = Field(None, description="Processing time")
@@ -429,6 +477,7 @@ class QuoteAnalysisResponse(BaseModel):
     """Response from quote analysis API"""
 
     success: bool = Field(..., description="Whether analysis succeeded")
+    analysis_id: Optional[str] = Field(None, description="Id for incremental line updates")
     analysis: Optional[QuoteAnalysis] = Field(None, description="Analysis results")
     error: Optional[str] = Field(None, description="Error message if failed")
 
@@ -438,6 +487,52 @@ class QuoteAnalysisResponse(BaseModel):
     cost_eur: Optional[float] = Field(None, description="Estimated cost in EUR")
 
 
+class LineDelta(BaseModel):
+    """Change to one line of a base quote"""
+
+    action: Literal["replace", "add", "remove"] = Field(..., description="What to do with the line")
+    line: Optional[int] = Field(None, ge=0, description="Base quote line index (replace, remove)")
+    equipment: Optional[Equipment] = Field(None, description="New line (replace, add)")
+
+
+class QuoteScenario(BaseModel):
+    """Named variant of a base quote"""
+
+    name: str = Field(..., description="Scenario name shown in the comparison")
+    deltas: List[LineDelta] = Field(default_factory=list, description="Line changes against the base quote")
+
+
+class ScenarioRequest(BaseModel):
+    """Base quote plus variants to compare"""
+
+    quote: Quote = Field(..., description="Base quote")
+    scenarios: List[QuoteScenario] = Field(..., max_length=100, description="Variants (max 100)")
+
+
+class ScenarioResult(BaseModel):
+    """Totals of one scenario, one row of the comparison table"""
+
+    name: str = Field(..., description="Scenario name ('base' for the base quote)")
+    lines_changed: int = Field(0, ge=0, description="Lines matched for this scenario (not shared with the base)")
+    total_investment: float = Field(..., ge=0, description="Total investment amount")
+    total_subsidies: float = Field(..., ge=0, description="Total subsidy amount")
+    net_cost_after_subsidies: float = Field(..., ge=0, description="Net cost after subsidies")
+    eia_total: float = Field(0.0, ge=0, description="Total EIA subsidies")
+    isde_total: float = Field(0.0, ge=0, description="Total ISDE subsidies")
+    mia_total: float = Field(0.0, ge=0, description="Total MIA subsidies")
+    vamil_total: float = Field(0.0, ge=0, description="Total Vamil subsidies")
+    net_cost_delta: float = Field(0.0, description="Net cost difference with the base quote")
+    subsidy_delta: float = Field(0.0, description="Subsidy difference with the base quote")
+
+
+class ScenarioComparisonResponse(BaseModel):
+    """Side-by-side comparison of quote scenarios"""
+
+    base: ScenarioResult = Field(..., description="Base quote totals")
+    scenarios: List[ScenarioResult] = Field(..., description="Scenario totals, in request order")
+    processing_time_ms: float = Field(..., description="Processing time in milliseconds")
+
+
 class HealthCheckResponse(BaseModel):
     """Health check response"""
 
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Build the catalog snapshot with derived artefacts for fast matching.
+
+Reads the JSON files in data/subsidies and writes
+data/subsidies/catalog_snapshot.npz, tagged with the catalog version.
+Re-run after any change to the subsidy data; stale snapshots are ignored
+at runtime and rebuilt in memory.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Allow running from the scripts/ folder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.subsidy_database import SubsidyDatabase  # noqa: E402
+from services.semantic_index import SemanticIndex  # noqa: E402
+from services.pareto_frontier import ParetoFrontiers  # noqa: E402
+from services.catalog_views import CatalogViews  # noqa: E402
+
+
+def build_snapshot(db: SubsidyDatabase) -> Path:
+    """Build all snapshot artefacts and save the snapshot"""
+    snapshot = db.get_snapshot()
+
+    print("🧮 Building semantic index (TF-IDF + SVD)...")
+    start = time.time()
+    index = SemanticIndex.build_from_database(db)
+    index.to_snapshot(snapshot)
+    print(f"   {index.doc_vectors.shape[0]} codes, {index.components.shape[0]} terms, "
+          f"{index.doc_vectors.shape[1]} dimensions ({(time.time() - start) * 1000:.0f}ms)")
+
+    print("📐 Building ISDE Pareto frontiers...")
+    start = time.time()
+    frontiers = ParetoFrontiers.build_from_database(db)
+    frontiers.to_snapshot(snapshot)
+    print(f"   {len(frontiers)} of {db.get_stats()['isde_total']} meldcodes in "
+          f"{len(frontiers.frontiers)} frontiers ({(time.time() - start) * 1000:.0f}ms)")
+
+    print("🗂️  Building best-meldcode views...")
+    start = time.time()
+    views = CatalogViews.build_from_database(db)
+    views.to_snapshot(snapshot)
+    print(f"   {len(views)} views, top {views.top_n} per view ({(time.time() - start) * 1000:.0f}ms)")
+
+    return db.save_snapshot()
+
+
+def main():
+    """Main execution"""
+    db = SubsidyDatabase()
+    if not db.is_loaded():
+        print(f"❌ No subsidy data found in {db.data_dir}")
+        return 1
+
+    print(f"📦 Catalog version: {db.catalog_version}")
+    path = build_snapshot(db)
+    print(f"💾 Saved to: {path} ({path.stat().st_size / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
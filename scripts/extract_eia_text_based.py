@@ -4,15 +4,46 @@ Extract EIA data using text extraction from PDF first, then Claude for structuri
 This avoids the 200k token limit by extracting text first with pdfplumber.
 """
 
-import anthropic
+import asyncio
 import json
 import os
+import sys
 from pathlib import Path
 import pdfplumber
 from dotenv import load_dotenv
 
+# Allow running from the scripts/ folder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.llm_client import LLMClient, cacheable_text  # noqa: E402
+
 load_dotenv()
 
+# Same for every chunk, so it is sent as a cacheable prefix
+EXTRACTION_INSTRUCTIONS = """
+Je krijgt tekst uit de EIA Energielijst 2025 PDF.
+
+Extraheer ALLE EIA codes en return als VALID JSON array.
+
+Schema per code:
+{
+  "code": "211102",
+  "title": "Warmtepompboiler",
+  "description": "Bestemd voor...",
+  "category": "A",
+  "chapter": "Verwarmen",
+  "subsidy_percentage": 0.40,
+  "page": 20
+}
+
+BELANGRIJK:
+- Extraheer codes met CIJFERS (210000, 211102, etc.)
+- ALLE EIA codes hebben 40% investeringsaftrek (subsidy_percentage: 0.40)
+- Return ALLEEN valid JSON array, geen tekst eromheen
+- Gebruik double quotes, geen single quotes
+- Escape special characters in strings
+"""
+
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract text from PDF using pdfplumber"""
@@ -42,7 +73,8 @@ def extract_text_from_pdf(pdf_path: str) -> str:
 
 def structure_eia_data(text: str, output_path: str):
     """Use Claude to structure the extracted text into JSON"""
-    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    # Chunks are sent concurrently; the client limits requests in flight and retries 429/5xx
+    client = LLMClient(api_key=os.getenv("ANTHROPIC_API_KEY"), max_concurrency=4)
 
     # Always process in chunks for better reliability
     print(f"\n📦 Processing text in chunks...")
@@ -53,18 +85,21 @@ def structure_eia_data(text: str, output_path: str):
     all_codes = []
     chunk_size = 10  # Process 10 pages at a time for better JSON reliability
 
+    chunks = []
     for i in range(0, len(pages), chunk_size):
         chunk_pages = pages[i:i+chunk_size]
         chunk_text = "=== PAGE".join(chunk_pages)
 
         if len(chunk_text.strip()) < 100:  # Skip empty chunks
             continue
+        chunks.append((i, chunk_text))
+
+    total_chunks = (len(pages) + chunk_size - 1) // chunk_size
+    results = client.run_sync(process_chunks(client, chunks))
 
+    for (i, _), codes in zip(chunks, results):
         chunk_num = i//chunk_size + 1
-        total_chunks = (len(pages) + chunk_size - 1) // chunk_size
         print(f"\n📄 Chunk {chunk_num}/{total_chunks} (pages ~{i+18} to ~{min(i+chunk_size+17, len(pages)+17)})...")
-
-        codes = process_text_chunk(client, chunk_text, i+18)
         if codes:
             all_codes.extend(codes)
             print(f"   ✅ Found {len(codes)} codes")
@@ -72,6 +107,9 @@ def structure_eia_data(text: str, output_path: str):
             print(f"   ⚠️  No codes found in this chunk")
 
     print(f"\n✅ Total codes extracted: {len(all_codes)}")
+    usage = client.metrics.as_dict()
+    print(f"   Prompt tokens: {usage['input_tokens']} uncached, "
+          f"{usage['cache_read_input_tokens']} from cache, {usage['cache_creation_input_tokens']} cached")
 
     all_codes = all_codes
 
@@ -96,45 +134,32 @@ def structure_eia_data(text: str, output_path: str):
     return database
 
 
-def process_text_chunk(client, text_chunk: str, start_page: int):
-    """Process a chunk of text with Claude"""
-
-    prompt = f"""
-Je krijgt tekst uit de EIA Energielijst 2025 PDF.
-
-Extraheer ALLE EIA codes en return als VALID JSON array.
-
-Schema per code:
-{{
-  "code": "211102",
-  "title": "Warmtepompboiler",
-  "description": "Bestemd voor...",
-  "category": "A",
-  "chapter": "Verwarmen",
-  "subsidy_percentage": 0.40,
-  "page": 20
-}}
-
-BELANGRIJK:
-- Extraheer codes met CIJFERS (210000, 211102, etc.)
-- ALLE EIA codes hebben 40% investeringsaftrek (subsidy_percentage: 0.40)
-- Return ALLEEN valid JSON array, geen tekst eromheen
-- Gebruik double quotes, geen single quotes
-- Escape special characters in strings
+async def process_chunks(client: LLMClient, chunks):
+    """Process (offset, text) chunks concurrently, results in chunk order"""
+    if not chunks:
+        return []
+    # The first chunk alone writes the instructions to the prompt cache;
+    # the others start after it and read them from the cache
+    (i, chunk_text), rest = chunks[0], chunks[1:]
+    first = await process_text_chunk(client, chunk_text, i+18)
+    return [first] + list(await asyncio.gather(*(
+        process_text_chunk(client, chunk_text, i+18) for i, chunk_text in rest
+    )))
 
-TEKST:
-{text_chunk[:50000]}
-"""
 
+async def process_text_chunk(client: LLMClient, text_chunk: str, start_page: int):
+    """Process a chunk of text with Claude"""
     try:
-        message = client.messages.create(
+        message = await client.create(
             model="claude-sonnet-4-20250514",
             max_tokens=8000,
             temperature=0,
+            # Static instructions are a cached prefix; only the chunk text varies
+            system=[cacheable_text(EXTRACTION_INSTRUCTIONS)],
             messages=[
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": f"TEKST:\n{text_chunk[:50000]}"
                 }
             ]
         )
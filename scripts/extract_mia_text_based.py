@@ -4,15 +4,58 @@ Extract MIA/Vamil Milieulijst 2025 data using text extraction from PDF first.
 This avoids the 200k token limit by extracting text first with pdfplumber.
 """
 
-import anthropic
+import asyncio
 import json
 import os
+import sys
 from pathlib import Path
 import pdfplumber
 from dotenv import load_dotenv
 
+# Allow running from the scripts/ folder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.llm_client import LLMClient, cacheable_text  # noqa: E402
+
 load_dotenv()
 
+# Same for every chunk, so it is sent as a cacheable prefix
+EXTRACTION_INSTRUCTIONS = """
+Je krijgt tekst uit de MIA/Vamil Milieulijst 2025 PDF.
+
+Extraheer ALLE MIA/Vamil codes en return als VALID JSON array.
+
+Schema per code:
+{
+  "code": "A 1100",
+  "title": "Circulaire woning",
+  "description": "Bestemd voor...",
+  "category": "A",
+  "chapter": "1. Grondstoffen- en watergebruik",
+  "mia_percentage": 36,
+  "vamil_percentage": 75,
+  "page": 20
+}
+
+HOOFDSTUKKEN:
+1. Grondstoffen- en watergebruik
+2. Voedselvoorziening en landbouwproductie
+3. Mobiliteit
+4. Klimaat en lucht
+5. Gebouwde omgeving en klimaatadaptatie
+
+MIA percentages: 13, 27, 36, of 45
+Vamil percentage: meestal 75
+
+BELANGRIJK:
+- Extraheer codes met LETTER + SPATIE + NUMMER (A 1100, B 2220, E 5215, etc.)
+- Extraheer het JUISTE MIA percentage voor elke code (staat vaak als "MIA: 36%" of "13/27/36/45")
+- Vamil is meestal 75%, maar check of het expliciet vermeld staat
+- Return ALLEEN valid JSON array, geen tekst eromheen
+- Gebruik double quotes, geen single quotes
+- Escape special characters in strings
+"""
+
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract text from PDF using pdfplumber"""
@@ -42,7 +85,8 @@ def extract_text_from_pdf(pdf_path: str) -> str:
 
 def structure_mia_data(text: str, output_path: str):
     """Use Claude to structure the extracted text into JSON"""
-    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    # Chunks are sent concurrently; the client limits requests in flight and retries 429/5xx
+    client = LLMClient(api_key=os.getenv("ANTHROPIC_API_KEY"), max_concurrency=4)
 
     # Always process in chunks for better reliability
     print(f"\n📦 Processing text in chunks...")
@@ -53,18 +97,21 @@ def structure_mia_data(text: str, output_path: str):
     all_codes = []
     chunk_size = 10  # Process 10 pages at a time
 
+    chunks = []
     for i in range(0, len(pages), chunk_size):
         chunk_pages = pages[i:i+chunk_size]
         chunk_text = "=== PAGE".join(chunk_pages)
 
         if len(chunk_text.strip()) < 100:  # Skip empty chunks
             continue
+        chunks.append((i, chunk_text))
 
+    total_chunks = (len(pages) + chunk_size - 1) // chunk_size
+    results = client.run_sync(process_chunks(client, chunks))
+
+    for (i, _), codes in zip(chunks, results):
         chunk_num = i//chunk_size + 1
-        total_chunks = (len(pages) + chunk_size - 1) // chunk_size
         print(f"\n📄 Chunk {chunk_num}/{total_chunks} (pages ~{i+15} to ~{min(i+chunk_size+14, len(pages)+14)})...")
-
-        codes = process_text_chunk(client, chunk_text, i+15)
         if codes:
             all_codes.extend(codes)
             print(f"   ✅ Found {len(codes)} codes")
@@ -72,6 +119,9 @@ def structure_mia_data(text: str, output_path: str):
             print(f"   ⚠️  No codes found in this chunk")
 
     print(f"\n✅ Total codes extracted: {len(all_codes)}")
+    usage = client.metrics.as_dict()
+    print(f"   Prompt tokens: {usage['input_tokens']} uncached, "
+          f"{usage['cache_read_input_tokens']} from cache, {usage['cache_creation_input_tokens']} cached")
 
     # Save results
     database = {
@@ -107,57 +157,32 @@ def structure_mia_data(text: str, output_path: str):
     return database
 
 
-def process_text_chunk(client, text_chunk: str, start_page: int):
-    """Process a chunk of text with Claude"""
-
-    prompt = f"""
-Je krijgt tekst uit de MIA/Vamil Milieulijst 2025 PDF.
-
-Extraheer ALLE MIA/Vamil codes en return als VALID JSON array.
-
-Schema per code:
-{{
-  "code": "A 1100",
-  "title": "Circulaire woning",
-  "description": "Bestemd voor...",
-  "category": "A",
-  "chapter": "1. Grondstoffen- en watergebruik",
-  "mia_percentage": 36,
-  "vamil_percentage": 75,
-  "page": 20
-}}
-
-HOOFDSTUKKEN:
-1. Grondstoffen- en watergebruik
-2. Voedselvoorziening en landbouwproductie
-3. Mobiliteit
-4. Klimaat en lucht
-5. Gebouwde omgeving en klimaatadaptatie
-
-MIA percentages: 13, 27, 36, of 45
-Vamil percentage: meestal 75
-
-BELANGRIJK:
-- Extraheer codes met LETTER + SPATIE + NUMMER (A 1100, B 2220, E 5215, etc.)
-- Extraheer het JUISTE MIA percentage voor elke code (staat vaak als "MIA: 36%" of "13/27/36/45")
-- Vamil is meestal 75%, maar check of het expliciet vermeld staat
-- Return ALLEEN valid JSON array, geen tekst eromheen
-- Gebruik double quotes, geen single quotes
-- Escape special characters in strings
+async def process_chunks(client: LLMClient, chunks):
+    """Process (offset, text) chunks concurrently, results in chunk order"""
+    if not chunks:
+        return []
+    # The first chunk alone writes the instructions to the prompt cache;
+    # the others start after it and read them from the cache
+    (i, chunk_text), rest = chunks[0], chunks[1:]
+    first = await process_text_chunk(client, chunk_text, i+15)
+    return [first] + list(await asyncio.gather(*(
+        process_text_chunk(client, chunk_text, i+15) for i, chunk_text in rest
+    )))
 
-TEKST:
-{text_chunk[:50000]}
-"""
 
+async def process_text_chunk(client: LLMClient, text_chunk: str, start_page: int):
+    """Process a chunk of text with Claude"""
     try:
-        message = client.messages.create(
+        message = await client.create(
             model="claude-sonnet-4-20250514",
             max_tokens=8000,
             temperature=0,
+            # Static instructions are a cached prefix; only the chunk text varies
+            system=[cacheable_text(EXTRACTION_INSTRUCTIONS)],
             messages=[
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": f"TEKST:\n{text_chunk[:50000]}"
                 }
             ]
         )
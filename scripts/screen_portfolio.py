@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Screen a portfolio of subsidy match requests in bulk.
+
+Reads SubsidyMatchRequests from a JSONL or CSV file, matches them across a
+process pool and writes one JSON result per line.
+
+Usage:
+    python scripts/screen_portfolio.py requests.jsonl -o results.jsonl
+    python scripts/screen_portfolio.py customers.csv --workers 8 --limit 5
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Allow running from the scripts/ folder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from services.portfolio_screening import PortfolioScreener, ScreeningStats  # noqa: E402
+from services.subsidy_matcher import SubsidyMatcher  # noqa: E402
+
+load_dotenv()
+
+
+def report_progress(stats: ScreeningStats):
+    """Print progress to stderr so stdout can carry the results"""
+    print(
+        f"⏳ {stats.processed:,} screened ({stats.failed:,} failed) - "
+        f"{stats.requests_per_second:,.0f} req/s",
+        file=sys.stderr
+    )
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Bulk subsidy screening")
+    parser.add_argument("input", type=Path, help="Input file (.jsonl or .csv)")
+    parser.add_argument("-o", "--output", type=Path, help="Output JSONL file (default: stdout)")
+    parser.add_argument("--subsidies-path", default="data/subsidies", help="Subsidy rules directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Requests per worker task")
+    parser.add_argument("--limit", type=int, default=10, help="Matches per request (0 = all)")
+    parser.add_argument("--near-misses", action="store_true",
+                        help="Also list rules failing exactly one hard constraint")
+    parser.add_argument("--progress-every", type=int, default=1000, help="Progress interval")
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        print(f"❌ Input not found: {args.input}", file=sys.stderr)
+        return 1
+
+    api_key = os.getenv("ANTHROPIC_API_KEY", "")
+    matcher = SubsidyMatcher(api_key=api_key, subsidies_path=args.subsidies_path)
+    print(f"📋 Loaded {len(matcher.subsidies)} subsidy rules", file=sys.stderr)
+
+    screener = PortfolioScreener(
+        rules=matcher.subsidies,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        limit=args.limit or None,
+        include_near_misses=args.near_misses,
+        api_key=api_key,
+        progress_every=args.progress_every,
+        on_progress=report_progress
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            stats = screener.screen_file(args.input, f)
+    else:
+        stats = screener.screen_file(args.input, sys.stdout)
+
+    print(f"✅ Done: {stats.as_dict()}", file=sys.stderr)
+    return 0 if stats.failed == 0 else 2
+
+
+if __name__ == "__main__":
+    exit(main())
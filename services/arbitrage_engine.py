@@ -0,0 +1,241 @@
+"""
+ArbitrageEngine - Better ISDE heat pumps at about the same power.
+
+For a quote line matched to an ISDE warmtepomp meldcode, suggests
+same-type alternatives in a nearby power band that get a higher ISDE
+amount, or the same amount with a lower-GWP refrigerant.
+
+Per heat pump type the catalog is held as arrays sorted by power_kw; a
+power band is two binary searches and the candidates in it are filtered
+and ranked with vectorised comparisons, so a line costs microseconds
+instead of a scan over ~3,000 meldcodes.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.subsidy_schemas import (
+    ArbitrageOpportunity,
+    EquipmentMatch,
+    ISDECategory,
+    ISDEMeldcode,
+    QuoteAnalysis
+)
+from services.subsidy_calculator import calculate_isde
+from services.subsidy_database import SubsidyDatabase, get_database
+
+
+@dataclass
+class PowerBand:
+    """ISDE heat pumps of one type, sorted by power"""
+    entries: List[ISDEMeldcode]
+    power: np.ndarray
+    amount: np.ndarray
+    gwp: np.ndarray
+
+    @classmethod
+    def build(cls, entries: List[ISDEMeldcode]) -> "PowerBand":
+        # Missing or zero power means unknown; those entries have no band
+        entries = [e for e in entries if e.attributes.get("power_kw")]
+        power = np.array([e.attributes["power_kw"] for e in entries], dtype=np.float64)
+        order = np.argsort(power, kind="stable")
+        entries = [entries[i] for i in order]
+        return cls(
+            entries=entries,
+            power=power[order],
+            amount=np.array([e.amount_eur or 0.0 for e in entries], dtype=np.float64),
+            # Unknown GWP never counts as an improvement
+            gwp=np.array([
+                e.attributes["gwp"] if e.attributes.get("gwp") is not None else np.inf
+                for e in entries
+            ], dtype=np.float64)
+        )
+
+
+class ArbitrageEngine:
+    """Finds ISDE heat pump alternatives in a power band around a matched product"""
+
+    def __init__(
+        self,
+        db: Optional[SubsidyDatabase] = None,
+        band_fraction: float = 0.15,
+        min_band_kw: float = 1.0
+    ):
+        """
+        Initialize engine
+
+        Args:
+            db: Subsidy database (default: global instance)
+            band_fraction: Half-width of the power band as a fraction of the product's power
+            min_band_kw: Minimum half-width of the power band in kW
+        """
+        self.db = db or get_database()
+        self.band_fraction = band_fraction
+        self.min_band_kw = min_band_kw
+
+        by_type: Dict[str, List[ISDEMeldcode]] = {}
+        for entry in self.db.get_all_isde_warmtepompen():
+            by_type.setdefault(entry.attributes.get("type") or "", []).append(entry)
+        self.bands: Dict[str, PowerBand] = {
+            heat_pump_type: PowerBand.build(entries) for heat_pump_type, entries in by_type.items()
+        }
+
+    def alternatives(self, entry: ISDEMeldcode, limit: int = 5) -> List[ISDEMeldcode]:
+        """
+        Same-type heat pumps near the entry's power with a better ISDE outcome.
+
+        Better means a higher amount_eur, or the same amount with a lower
+        GWP. Ranked by amount gain, then GWP, then closeness in power.
+
+        Args:
+            entry: Matched ISDE warmtepomp
+            limit: Maximum alternatives
+
+        Returns:
+            Alternatives, best first
+        """
+        band = self.bands.get(entry.attributes.get("type") or "")
+        power = entry.attributes.get("power_kw")
+        if band is None or not power or limit <= 0:
+            return []
+
+        width = max(power * self.band_fraction, self.min_band_kw)
+        lo = int(np.searchsorted(band.power, power - width, side="left"))
+        hi = int(np.searchsorted(band.power, power + width, side="right"))
+
+        amount = band.amount[lo:hi]
+        gwp = band.gwp[lo:hi]
+        original_amount = entry.amount_eur or 0.0
+        original_gwp = entry.attributes.get("gwp")
+        original_gwp = np.inf if original_gwp is None else original_gwp
+
+        better = (amount > original_amount) | ((amount >= original_amount) & (gwp < original_gwp))
+        candidates = np.flatnonzero(better)
+        if candidates.size == 0:
+            return []
+
+        distance = np.abs(band.power[lo:hi][candidates] - power)
+        order = np.lexsort((distance, gwp[candidates], -amount[candidates]))
+        results = []
+        for i in candidates[order]:
+            alternative = band.entries[lo + i]
+            if alternative.meldcode != entry.meldcode:
+                results.append(alternative)
+                if len(results) == limit:
+                    break
+        return results
+
+    def opportunities(self, match: EquipmentMatch, limit: int = 5) -> List[ArbitrageOpportunity]:
+        """
+        Arbitrage opportunities for one quote line.
+
+        Prices of the alternatives are not known, so they are assumed to cost
+        the same as the quoted product; the subsidy difference is the benefit.
+
+        Args:
+            match: Line match with an ISDE warmtepomp candidate
+            limit: Maximum opportunities
+
+        Returns:
+            ArbitrageOpportunity list, best first (empty for other lines)
+        """
+        entry = self._isde_entry(match)
+        if entry is None:
+            return []
+
+        equipment = match.equipment
+        original = calculate_isde(entry, equipment)
+        original_subsidy = original.subsidy_amount if original else 0.0
+        cost = equipment.total_price
+
+        opportunities = []
+        for alternative in self.alternatives(entry, limit):
+            calculation = calculate_isde(alternative, equipment)
+            alternative_subsidy = calculation.subsidy_amount if calculation else 0.0
+            subsidy_delta = round(alternative_subsidy - original_subsidy, 2)
+            recommendation, details = _explain(entry, alternative, subsidy_delta)
+            opportunities.append(ArbitrageOpportunity(
+                original_equipment=equipment,
+                alternative_equipment=_describe(alternative),
+                original_cost=cost,
+                alternative_cost=cost,
+                cost_delta=0.0,
+                original_subsidy=original_subsidy,
+                alternative_subsidy=alternative_subsidy,
+                subsidy_delta=subsidy_delta,
+                net_benefit=subsidy_delta,
+                roi_improvement=round(subsidy_delta / cost * 100, 2) if cost > 0 else 0.0,
+                recommendation=recommendation,
+                details=details
+            ))
+        return opportunities
+
+    def apply(self, analysis: QuoteAnalysis, max_options: int = 5) -> QuoteAnalysis:
+        """QuoteAnalysis with arbitrage opportunities for its ISDE heat pump lines"""
+        opportunities = [
+            opportunity
+            for match in analysis.equipment_matches
+            for opportunity in self.opportunities(match, max_options)
+        ]
+        return analysis.model_copy(update={"arbitrage_opportunities": opportunities})
+
+    def _isde_entry(self, match: EquipmentMatch) -> Optional[ISDEMeldcode]:
+        for calculation in match.isde_matches:
+            entry = self.db.get_isde_by_meldcode(calculation.code)
+            if entry and entry.category == ISDECategory.WARMTEPOMP:
+                return entry
+        return None
+
+
+def _describe(entry: ISDEMeldcode) -> Dict[str, object]:
+    return {
+        "meldcode": entry.meldcode,
+        "brand": entry.manufacturer,
+        "model": entry.model,
+        "amount_eur": entry.amount_eur,
+        **{key: entry.attributes.get(key) for key in ("power_kw", "type", "refrigerant", "gwp")},
+    }
+
+
+def _explain(
+    original: ISDEMeldcode,
+    alternative: ISDEMeldcode,
+    subsidy_delta: float
+) -> Tuple[str, List[str]]:
+    name = f"{alternative.manufacturer} {alternative.model}"
+    power = alternative.attributes.get("power_kw")
+    details = [
+        f"Same type ({alternative.attributes.get('type')}), "
+        f"{power:g} kW vs {original.attributes.get('power_kw'):g} kW quoted",
+        "Price of the alternative is not known; assumed equal to the quoted price",
+    ]
+    gwp, original_gwp = alternative.attributes.get("gwp"), original.attributes.get("gwp")
+    if gwp is not None and original_gwp is not None and gwp < original_gwp:
+        details.append(
+            f"Refrigerant {alternative.attributes.get('refrigerant')} "
+            f"(GWP {gwp:g} vs {original_gwp:g})"
+        )
+
+    if subsidy_delta > 0:
+        return f"Consider {name}: €{subsidy_delta:,.0f} more ISDE at similar power", details
+    return f"Consider {name}: same ISDE with a lower-GWP refrigerant", details
+
+
+# Global instance (singleton pattern)
+_engine_instance: Optional[ArbitrageEngine] = None
+
+
+def get_arbitrage_engine() -> ArbitrageEngine:
+    """
+    Get the global ArbitrageEngine instance (singleton).
+
+    Builds the power-band arrays on first call, returns cached instance on subsequent calls.
+    """
+    global _engine_instance
+
+    if _engine_instance is None:
+        _engine_instance = ArbitrageEngine()
+
+    return _engine_instance
@@ -0,0 +1,278 @@
+"""
+Cache backends - Key/value stores with TTL shared by the persistent caches.
+
+Values are opaque bytes; callers own the serialisation. Three backends:
+
+- MemoryCacheBackend: per-process LRU, for tests and single-worker dev
+- SQLiteCacheBackend: local file shared by all workers on a host
+  (WAL mode, LRU eviction when over max_entries)
+- RedisCacheBackend: any Redis-compatible server, shared across pods;
+  size bounds come from the server's maxmemory/eviction policy
+
+create_cache_backend() picks one from a URL ("memory://",
+"sqlite:///path/to/file.sqlite3", "redis://host:6379/0").
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional, Protocol, Sequence, Tuple
+
+
+class CacheBackend(Protocol):
+    """Minimal key/value interface with per-entry TTL"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        ...
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        ...
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]], ttl_seconds: Optional[float] = None) -> None:
+        ...
+
+    def delete(self, key: str) -> None:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with TTL"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl_seconds if ttl_seconds else float("inf")
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]], ttl_seconds: Optional[float] = None) -> None:
+        for key, value in items:
+            self.set(key, value, ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    SQLite-backed cache shared by processes on one host.
+
+    Reads refresh the access time; when the table grows past max_entries
+    the expired entries and then the least recently used ones are deleted.
+    """
+
+    # Check the size bound every this many writes (COUNT(*) is not free)
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, path: Path, max_entries: int = 100000):
+        """
+        Open (and create) the cache file
+
+        Args:
+            path: SQLite file
+            max_entries: Entries kept before LRU eviction
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Values of several keys with one query and one access-time update"""
+        if not keys:
+            return []
+        now = time.time()
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expires_at > ?",
+                    (*chunk, now)
+                ).fetchall())
+            if found:
+                self._conn.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return [found.get(key) for key in keys]
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else float("inf")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), expires_at, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICTION_INTERVAL == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]], ttl_seconds: Optional[float] = None) -> None:
+        """Write several entries in one transaction"""
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else float("inf")
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, sqlite3.Binary(value), expires_at, now) for key, value in items]
+            )
+            writes = self._writes + len(items)
+            if writes // self.EVICTION_INTERVAL > self._writes // self.EVICTION_INTERVAL:
+                self._evict(now)
+            self._writes = writes
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self) -> None:
+        """Drop expired entries and enforce max_entries now"""
+        with self._lock:
+            self._evict(time.time())
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+            return count
+
+
+class RedisCacheBackend:
+    """Cache on a Redis-compatible server (redis-py style client)"""
+
+    def __init__(self, client: Any, prefix: str = "subsidie:"):
+        """
+        Args:
+            client: Client with get/mget/set(ex=)/pipeline/delete/scan_iter (e.g. redis.Redis)
+            prefix: Key prefix, so caches can share a database
+        """
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "subsidie:") -> "RedisCacheBackend":
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("Redis cache backend requires the 'redis' package") from e
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return list(self.client.mget([self.prefix + key for key in keys])) if keys else []
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, ex=int(ttl_seconds) if ttl_seconds else None)
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]], ttl_seconds: Optional[float] = None) -> None:
+        """Write several entries in one round trip (MULTI/EXEC pipeline)"""
+        if not items:
+            return
+        pipeline = self.client.pipeline()
+        for key, value in items:
+            pipeline.set(self.prefix + key, value, ex=int(ttl_seconds) if ttl_seconds else None)
+        pipeline.execute()
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+
+def create_cache_backend(url: str, max_entries: int = 100000) -> CacheBackend:
+    """
+    Create a backend from a URL.
+
+    Args:
+        url: "memory://", "sqlite:///relative/or/absolute/path", "redis://..."
+        max_entries: Size bound (memory and SQLite backends)
+
+    Raises:
+        ValueError: Unknown scheme
+    """
+    if url.startswith("memory://"):
+        return MemoryCacheBackend(max_entries)
+    if url.startswith("sqlite:///"):
+        return SQLiteCacheBackend(Path(url[len("sqlite:///"):]), max_entries)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend.from_url(url)
+    raise ValueError(f"Unknown cache backend URL: {url}")
@@ -0,0 +1,105 @@
+"""
+CatalogSnapshot - Versioned store for derived catalog artefacts.
+
+Derived data (embedding matrices, lookup tables, ...) is built offline from
+the JSON files in data/subsidies and written next to them as a single .npz
+file. Every snapshot is tagged with the catalog version it was built from,
+so a stale snapshot is ignored as soon as the source data changes.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+
+SNAPSHOT_FILENAME = "catalog_snapshot.npz"
+
+# Reserved key holding the catalog version inside the .npz file
+_VERSION_KEY = "__catalog_version__"
+
+
+class CatalogSnapshot:
+    """
+    Named NumPy arrays derived from one catalog version.
+
+    Artefact names are namespaced with a dot, e.g. "semantic.doc_vectors".
+    """
+
+    def __init__(self, catalog_version: str, arrays: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Create a snapshot.
+
+        Args:
+            catalog_version: Version of the catalog the arrays were built from
+            arrays: Initial artefacts
+        """
+        self.catalog_version = catalog_version
+        self.arrays: Dict[str, np.ndarray] = dict(arrays or {})
+
+    def has(self, name: str) -> bool:
+        """Check if an artefact is present"""
+        return name in self.arrays
+
+    def get(self, name: str) -> Optional[np.ndarray]:
+        """Get an artefact by name"""
+        return self.arrays.get(name)
+
+    def put(self, name: str, array: np.ndarray):
+        """Store an artefact"""
+        if name == _VERSION_KEY:
+            raise ValueError(f"'{name}' is a reserved snapshot key")
+        self.arrays[name] = np.asarray(array)
+
+    def has_prefix(self, prefix: str) -> bool:
+        """Check if any artefact exists under a namespace prefix (e.g. 'semantic.')"""
+        return any(name.startswith(prefix) for name in self.arrays)
+
+    def save(self, path: Path):
+        """
+        Write snapshot to disk.
+
+        Args:
+            path: Target .npz file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            **{_VERSION_KEY: np.array(self.catalog_version)},
+            **self.arrays
+        )
+
+    @classmethod
+    def load(cls, path: Path, catalog_version: str) -> Optional["CatalogSnapshot"]:
+        """
+        Load a snapshot from disk.
+
+        Args:
+            path: Snapshot .npz file
+            catalog_version: Version the caller expects
+
+        Returns:
+            CatalogSnapshot, or None if the file is missing or was built from
+            a different catalog version
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if _VERSION_KEY not in data.files:
+                    return None
+                if str(data[_VERSION_KEY]) != catalog_version:
+                    return None
+                arrays = {
+                    name: data[name]
+                    for name in data.files
+                    if name != _VERSION_KEY
+                }
+        except (OSError, ValueError) as e:
+            print(f"Error loading catalog snapshot {path}: {e}")
+            return None
+
+        return cls(catalog_version, arrays)
@@ -0,0 +1,243 @@
+"""
+CatalogViews - Materialized "best ISDE meldcodes per bucket" lookup tables.
+
+Questions like "which lucht-water heat pump of 6-8 kW gets the highest ISDE
+amount" or "best glass per m² for a monument" would otherwise scan a whole
+category. The views are built with the catalog snapshot, so they are only
+recomputed when the source data changes:
+
+- key: (category, type, bucket, woning_type)
+- type: heat pump type, insulation/glass category_detail or solar boiler
+  surface, matched case-insensitively
+- bucket: range of the main technical attribute (power_kw, max_u, min_rd,
+  jaarproductie_kwh), see BUCKETS
+- woning_type: "Alle woningen" (the default; also entries without one) or
+  "Alleen monumentale woningen", which holds every product a monument can
+  claim: the monument-only classes and the ones for all dwellings
+- value: top-N meldcodes by the ISDE amount paid (per unit, or per m² at
+  the "enkel" rate, or the monument rate where higher for monuments), ties
+  broken by the better technical value
+
+A query is a bucket computation plus a dict lookup.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from models.subsidy_schemas import ISDECategory, ISDEMeldcode
+from services.catalog_snapshot import CatalogSnapshot
+from services.pareto_frontier import objective_value
+from services.subsidy_calculator import ISDE_RATE_SINGLE, isde_rate
+
+if TYPE_CHECKING:
+    from services.subsidy_database import SubsidyDatabase
+
+
+# Bucketed attribute per category: (attribute, bucket width, lower is better)
+BUCKETS: Dict[ISDECategory, Tuple[str, float, bool]] = {
+    ISDECategory.WARMTEPOMP: ("power_kw", 2.0, False),
+    ISDECategory.HOOGRENDEMENTSGLAS: ("max_u", 0.2, True),
+    ISDECategory.ISOLATIE: ("min_rd", 0.5, False),
+    ISDECategory.ZONNEBOILER: ("jaarproductie_kwh", 500.0, False),
+}
+
+# Attribute that holds the "type" part of the key
+TYPE_ATTRIBUTES: Dict[ISDECategory, str] = {
+    ISDECategory.WARMTEPOMP: "type",
+    ISDECategory.HOOGRENDEMENTSGLAS: "category_detail",
+    ISDECategory.ISOLATIE: "category_detail",
+    ISDECategory.ZONNEBOILER: "oppervlakte",
+}
+
+# Alias categories share the views of their main category
+CATEGORY_ALIASES = {
+    ISDECategory.ISOLATIEMATERIALEN: ISDECategory.ISOLATIE,
+    ISDECategory.GLAS: ISDECategory.HOOGRENDEMENTSGLAS,
+}
+
+ALL_DWELLINGS = "Alle woningen"
+MONUMENTS = "Alleen monumentale woningen"
+
+# Short names accepted for woning_type
+WONING_TYPES = {
+    "alle": ALL_DWELLINGS,
+    "monument": MONUMENTS,
+}
+
+DEFAULT_TOP_N = 10
+
+# Snapshot artefact names (versioned with the view layout)
+_KEYS = "views.v2.keys"
+_MELDCODES = "views.v2.meldcodes"
+_TOP_N = "views.v2.top_n"
+
+ViewKey = Tuple[str, str, str, str]
+
+
+def bucket_label(category: ISDECategory, value: float) -> str:
+    """Bucket of an attribute value, e.g. "6-8" for 7.5 kW"""
+    _, width, _ = BUCKETS[CATEGORY_ALIASES.get(category, category)]
+    # Round first so 1.2 / 0.2 does not land in the bucket below
+    lower = math.floor(round(value / width, 6)) * width
+    return f"{round(lower, 6):g}-{round(lower + width, 6):g}"
+
+
+def normalize_woning_type(woning_type: Optional[str]) -> str:
+    """Catalog woning_type for a short or full name ("Alle woningen" for none)"""
+    if not woning_type or not woning_type.strip():
+        return ALL_DWELLINGS
+    woning_type = woning_type.strip()
+    return WONING_TYPES.get(woning_type.lower(), woning_type)
+
+
+def normalize_type(type_: str) -> str:
+    """Type part of a view key: case and spacing do not matter"""
+    return " ".join(type_.split()).lower()
+
+
+def view_keys(entry: ISDEMeldcode) -> List[ViewKey]:
+    """Views an entry belongs to (none if its bucket attribute is unknown)"""
+    attribute = BUCKETS[entry.category][0]
+    value = entry.attributes.get(attribute)
+    if value is None:
+        return []
+    key = (
+        entry.category.value,
+        normalize_type(str(entry.attributes.get(TYPE_ATTRIBUTES[entry.category]) or "")),
+        bucket_label(entry.category, float(value)),
+    )
+    woning_type = normalize_woning_type(entry.attributes.get("woning_type"))
+    keys = [(*key, woning_type)]
+    if woning_type == ALL_DWELLINGS and entry.attributes.get("woning_type"):
+        # Monuments can also claim the classes for all dwellings
+        keys.append((*key, MONUMENTS))
+    return keys
+
+
+def view_amount(entry: ISDEMeldcode, woning_type: str) -> float:
+    """ISDE amount an entry pays in a view (the monument rate where higher for monuments)"""
+    if entry.amount_eur is None and woning_type == MONUMENTS:
+        return (entry.amounts or {}).get(isde_rate(entry, ISDE_RATE_SINGLE, True)) or 0.0
+    return objective_value(entry, "amount")
+
+
+class CatalogViews:
+    """Top-N ISDE meldcodes per (category, type, bucket, woning_type)"""
+
+    def __init__(self, views: Dict[ViewKey, List[ISDEMeldcode]], top_n: int = DEFAULT_TOP_N):
+        """
+        Args:
+            views: View key -> entries, best first
+            top_n: Entries kept per view
+        """
+        self.views = views
+        self.top_n = top_n
+
+    @classmethod
+    def build(cls, entries: Sequence[ISDEMeldcode], top_n: int = DEFAULT_TOP_N) -> "CatalogViews":
+        """Materialize the views over ISDE entries"""
+        groups: Dict[ViewKey, List[ISDEMeldcode]] = {}
+        for entry in entries:
+            if entry.category in BUCKETS:
+                for key in view_keys(entry):
+                    groups.setdefault(key, []).append(entry)
+
+        views = {}
+        for key, members in groups.items():
+            attribute, _, lower_is_better = BUCKETS[members[0].category]
+            amount = np.array([view_amount(e, key[3]) for e in members], dtype=np.float64)
+            technical = np.array([objective_value(e, attribute) for e in members], dtype=np.float64)
+            if not lower_is_better:
+                technical = -technical
+            meldcodes = np.array([e.meldcode for e in members])
+            order = np.lexsort((meldcodes, technical, -amount))[:top_n]
+            views[key] = [members[i] for i in order]
+        return cls(views, top_n)
+
+    @classmethod
+    def build_from_database(cls, db: "SubsidyDatabase", top_n: int = DEFAULT_TOP_N) -> "CatalogViews":
+        entries = []
+        for category in BUCKETS:
+            entries.extend(db.get_isde_by_category(category))
+        return cls.build(entries, top_n)
+
+    # ========================================================================
+    # SNAPSHOT
+    # ========================================================================
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot, db: "SubsidyDatabase") -> Optional["CatalogViews"]:
+        """Load the views from a catalog snapshot, or None if not present"""
+        if not (snapshot.has(_KEYS) and snapshot.has(_MELDCODES) and snapshot.has(_TOP_N)):
+            return None
+        views: Dict[ViewKey, List[ISDEMeldcode]] = {}
+        for key, meldcode in zip(snapshot.get(_KEYS), snapshot.get(_MELDCODES)):
+            entry = db.get_isde_by_meldcode(str(meldcode))
+            if entry is None:
+                return None
+            views.setdefault(tuple(str(part) for part in key), []).append(entry)
+        return cls(views, int(snapshot.get(_TOP_N)[0]))
+
+    def to_snapshot(self, snapshot: CatalogSnapshot):
+        """Store the views in a catalog snapshot (key parts and meldcode per row, best first)"""
+        rows = [(key, e.meldcode) for key, entries in self.views.items() for e in entries]
+        snapshot.put(_KEYS, np.array([key for key, _ in rows], dtype=str).reshape(-1, 4))
+        snapshot.put(_MELDCODES, np.array([meldcode for _, meldcode in rows], dtype=str))
+        snapshot.put(_TOP_N, np.array([self.top_n]))
+
+    # ========================================================================
+    # QUERYING
+    # ========================================================================
+
+    def top(
+        self,
+        category: ISDECategory,
+        type_: str,
+        bucket: str,
+        woning_type: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[ISDEMeldcode]:
+        """
+        Best meldcodes of a view.
+
+        Args:
+            category: ISDE category
+            type_: Heat pump type, category_detail or surface class (any case)
+            bucket: Bucket label as returned by bucket_label()
+            woning_type: Catalog woning_type or short name ("alle", "monument");
+                default "Alle woningen"
+            limit: Maximum entries (at most top_n)
+
+        Returns:
+            Entries by ISDE amount, best first (empty for unknown views)
+        """
+        category = CATEGORY_ALIASES.get(category, category)
+        key = (category.value, normalize_type(type_), bucket)
+        woning_type = normalize_woning_type(woning_type)
+        entries = self.views.get((*key, woning_type))
+        if entries is None and woning_type == MONUMENTS:
+            # Categories without woning types (heat pumps) have one view for all
+            entries = self.views.get((*key, ALL_DWELLINGS))
+        entries = entries or []
+        return entries[:limit] if limit is not None else entries
+
+    def best(
+        self,
+        category: ISDECategory,
+        type_: str,
+        value: float,
+        woning_type: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[ISDEMeldcode]:
+        """Best meldcodes in the bucket of an attribute value (power, U, Rd, yield)"""
+        return self.top(category, type_, bucket_label(category, value), woning_type, limit)
+
+    def keys(self, category: Optional[ISDECategory] = None) -> List[ViewKey]:
+        """Available view keys, optionally for one category"""
+        category = CATEGORY_ALIASES.get(category, category)
+        return sorted(k for k in self.views if category is None or k[0] == category.value)
+
+    def __len__(self) -> int:
+        return len(self.views)
@@ -0,0 +1,311 @@
+"""
+CombinationOptimizer - Pick the best legal combination of subsidy schemes.
+
+Cumulation rules per asset (quote line):
+
+- EIA and MIA exclude each other
+- Vamil stacks with MIA (same code) and with EIA
+- ISDE excludes EIA, MIA and Vamil
+
+Across a quote, ISDE per-m² measures (insulation, glass) get the
+"meerdere maatregelen" rate when two or more distinct ISDE measures are
+taken. Whether claiming ISDE on a line pays off can therefore depend on
+the other lines. The quote-level choice is solved exactly with a small
+dynamic program over measure groups (state: number of ISDE measures
+taken, capped at 2), which is linear in the number of lines.
+
+Per-line option tables depend only on the line's candidate calculations
+and whether it is for a monumental building, so they are memoized on a line signature; quotes with many repeated items
+reuse the same table instead of re-enumerating combinations.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.subsidy_schemas import EquipmentMatch, SubsidyCalculation, SubsidyScheme
+from services.subsidy_calculator import (
+    ISDE_RATE_MULTIPLE,
+    ISDE_RATE_SINGLE,
+    PER_M2_CATEGORIES,
+    calculate_isde,
+    is_monument,
+    isde_measure,
+    isde_rate
+)
+from services.subsidy_database import SubsidyDatabase, get_database
+
+
+# Monument flag, then (scheme, code, amount, investment) per candidate in
+# eia/isde/mia/vamil order; the investment caps the multi-measure ISDE amount
+LineSignature = Tuple[bool, Tuple[Tuple[str, str, float, float], ...]]
+
+MAX_CACHED_SIGNATURES = 10000
+
+
+@dataclass(frozen=True)
+class LineOptions:
+    """Best choices for one line, independent of the rest of the quote"""
+    other_value: float                  # Best EIA/MIA/Vamil combination
+    other_picks: Tuple[int, ...]        # Candidate indices of that combination
+    isde_pick: Optional[int] = None     # Best ISDE candidate index
+    isde_single: float = 0.0            # Its amount at the single-measure rate
+    isde_multiple: float = 0.0          # Its amount at the multi-measure rate
+    measure: Optional[str] = None       # ISDE measure it counts as
+
+
+@dataclass
+class LineChoice:
+    """Chosen combination for one line"""
+    picks: Tuple[int, ...]
+    isde_rate_multiple: bool = False
+
+
+class CombinationOptimizer:
+    """Maximum-value legal scheme combination per line and per quote"""
+
+    def __init__(self, db: Optional[SubsidyDatabase] = None):
+        """
+        Initialize optimizer
+
+        Args:
+            db: Subsidy database, used for ISDE meldcode details (default: global instance)
+        """
+        self.db = db or get_database()
+        self._options: Dict[LineSignature, LineOptions] = {}
+
+    # ========================================================================
+    # PER LINE
+    # ========================================================================
+
+    def optimize_line(self, match: EquipmentMatch) -> List[SubsidyCalculation]:
+        """
+        Best combination for a line on its own (single-measure ISDE rate).
+
+        Args:
+            match: Line match with candidate calculations
+
+        Returns:
+            Calculations of the best legal combination
+        """
+        candidates = _candidates(match)
+        options = self._line_options(candidates, is_monument(match.equipment))
+        if options.isde_pick is not None and options.isde_single > options.other_value:
+            return [candidates[options.isde_pick]]
+        return [candidates[i] for i in options.other_picks]
+
+    def _line_options(self, candidates: Sequence[SubsidyCalculation], monument: bool) -> LineOptions:
+        """Memoized option table for a line's candidates"""
+        signature = (monument, tuple(
+            (c.scheme.value, c.code, c.subsidy_amount, c.investment_amount) for c in candidates
+        ))
+        options = self._options.get(signature)
+        if options is None:
+            if len(self._options) >= MAX_CACHED_SIGNATURES:
+                self._options.clear()
+            options = self._build_line_options(candidates, monument)
+            self._options[signature] = options
+        return options
+
+    def _build_line_options(self, candidates: Sequence[SubsidyCalculation], monument: bool) -> LineOptions:
+        by_scheme: Dict[SubsidyScheme, List[int]] = {scheme: [] for scheme in SubsidyScheme}
+        for i, calculation in enumerate(candidates):
+            by_scheme[calculation.scheme].append(i)
+
+        def best(indices: List[int]) -> Optional[int]:
+            return max(indices, key=lambda i: candidates[i].subsidy_amount, default=None)
+
+        def value(picks: Tuple[int, ...]) -> float:
+            return sum(candidates[i].subsidy_amount for i in picks)
+
+        # EIA (+ best Vamil) versus MIA + Vamil of the same code
+        best_vamil = best(by_scheme[SubsidyScheme.VAMIL])
+        combos: List[Tuple[int, ...]] = [()]
+        best_eia = best(by_scheme[SubsidyScheme.EIA])
+        if best_eia is not None:
+            combos.append((best_eia,) if best_vamil is None else (best_eia, best_vamil))
+        elif best_vamil is not None:
+            combos.append((best_vamil,))
+        vamil_by_code = {candidates[i].code: i for i in by_scheme[SubsidyScheme.VAMIL]}
+        for i in by_scheme[SubsidyScheme.MIA]:
+            vamil = vamil_by_code.get(candidates[i].code)
+            combos.append((i,) if vamil is None else (i, vamil))
+        other_picks = max(combos, key=value)
+
+        options = LineOptions(other_value=value(other_picks), other_picks=other_picks)
+
+        isde_pick = best(by_scheme[SubsidyScheme.ISDE])
+        if isde_pick is None:
+            return options
+
+        calculation = candidates[isde_pick]
+        entry = self.db.get_isde_by_meldcode(calculation.code)
+        multiple = calculation.subsidy_amount
+        if entry is not None and entry.category in PER_M2_CATEGORIES:
+            # Rates calculate_isde pays; a higher monument rate replaces both
+            amounts = entry.amounts or {}
+            single_per_m2 = amounts.get(isde_rate(entry, ISDE_RATE_SINGLE, monument))
+            multiple_per_m2 = amounts.get(isde_rate(entry, ISDE_RATE_MULTIPLE, monument))
+            if single_per_m2 and multiple_per_m2:
+                # Same surface at the higher rate, capped at the line price like calculate_isde
+                multiple = min(
+                    calculation.subsidy_amount * multiple_per_m2 / single_per_m2,
+                    calculation.investment_amount
+                )
+
+        return LineOptions(
+            other_value=options.other_value,
+            other_picks=options.other_picks,
+            isde_pick=isde_pick,
+            isde_single=calculation.subsidy_amount,
+            isde_multiple=multiple,
+            measure=isde_measure(entry) if entry is not None else calculation.code
+        )
+
+    # ========================================================================
+    # PER QUOTE
+    # ========================================================================
+
+    def optimize_quote(self, matches: Sequence[EquipmentMatch]) -> List[List[SubsidyCalculation]]:
+        """
+        Best combination for every line of a quote, including the
+        multi-measure ISDE rate.
+
+        Args:
+            matches: Line matches in quote order
+
+        Returns:
+            Best combination per line, in the same order
+        """
+        options = [self.line_options(match) for match in matches]
+        choices = self.solve(options)
+        return [self.combination(match, choice) for match, choice in zip(matches, choices)]
+
+    def line_options(self, match: EquipmentMatch) -> LineOptions:
+        """Option table for a line (memoized on its candidate signature)"""
+        return self._line_options(_candidates(match), is_monument(match.equipment))
+
+    def combination(self, match: EquipmentMatch, choice: LineChoice) -> List[SubsidyCalculation]:
+        """Calculations for a line choice, at the multi-measure rate where chosen"""
+        candidates = _candidates(match)
+        combination = []
+        for i in choice.picks:
+            calculation = candidates[i]
+            if calculation.scheme == SubsidyScheme.ISDE and choice.isde_rate_multiple:
+                calculation = self._multiple_rate(calculation, match) or calculation
+            combination.append(calculation)
+        return combination
+
+    @staticmethod
+    def solve(options: Sequence[LineOptions]) -> List[LineChoice]:
+        """
+        Choose per line between ISDE and the other schemes.
+
+        Lines are grouped by ISDE measure. A group is "on" when at least
+        one of its lines claims ISDE. With two or more groups on, all ISDE
+        lines get the multi-measure rate.
+
+        Args:
+            options: Option table per line
+
+        Returns:
+            LineChoice per line
+        """
+        groups: Dict[str, List[int]] = {}
+        for line, option in enumerate(options):
+            if option.isde_pick is not None:
+                groups.setdefault(option.measure, []).append(line)
+
+        # Per group: value when off, and value + ISDE lines when on at each rate
+        group_off: List[float] = []
+        group_on: List[Tuple[Tuple[float, List[int]], Tuple[float, List[int]]]] = []
+        for lines in groups.values():
+            group_off.append(sum(options[line].other_value for line in lines))
+            group_on.append((
+                _group_on(options, lines, multiple=False),
+                _group_on(options, lines, multiple=True)
+            ))
+
+        # Single rate: groups are independent
+        single_value = 0.0
+        single_on: List[bool] = []
+        for off, (on, _) in zip(group_off, group_on):
+            single_on.append(on[0] > off)
+            single_value += max(on[0], off)
+
+        # Multiple rate: needs >= 2 groups on. DP over groups, state = groups on (capped at 2)
+        neg = float("-inf")
+        dp = [(0.0, []), (neg, []), (neg, [])]
+        for g, (off, (_, on)) in enumerate(zip(group_off, group_on)):
+            next_dp = [(neg, []), (neg, []), (neg, [])]
+            for count, (value, chosen) in enumerate(dp):
+                if value == neg:
+                    continue
+                if value + off > next_dp[count][0]:
+                    next_dp[count] = (value + off, chosen)
+                target = min(count + 1, 2)
+                if value + on[0] > next_dp[target][0]:
+                    next_dp[target] = (value + on[0], chosen + [g])
+            dp = next_dp
+
+        multiple_value, multiple_groups = dp[2]
+        use_multiple = multiple_value > single_value
+        if use_multiple:
+            on_groups = set(multiple_groups)
+        else:
+            on_groups = {g for g, on in enumerate(single_on) if on}
+            # Two or more measures taken anyway: the multiple rate applies
+            use_multiple = len(on_groups) >= 2
+
+        isde_lines = set()
+        for g in on_groups:
+            isde_lines.update(group_on[g][1 if use_multiple else 0][1])
+
+        choices = []
+        for line, option in enumerate(options):
+            if line in isde_lines:
+                choices.append(LineChoice(picks=(option.isde_pick,), isde_rate_multiple=use_multiple))
+            else:
+                choices.append(LineChoice(picks=option.other_picks))
+        return choices
+
+    def _multiple_rate(
+        self,
+        calculation: SubsidyCalculation,
+        match: EquipmentMatch
+    ) -> Optional[SubsidyCalculation]:
+        """Recalculate an ISDE calculation at the multi-measure rate"""
+        entry = self.db.get_isde_by_meldcode(calculation.code)
+        if entry is None or entry.category not in PER_M2_CATEGORIES:
+            return None
+        return calculate_isde(entry, match.equipment, rate=ISDE_RATE_MULTIPLE)
+
+
+def _candidates(match: EquipmentMatch) -> List[SubsidyCalculation]:
+    return match.eia_matches + match.isde_matches + match.mia_matches + match.vamil_matches
+
+
+def _group_on(
+    options: Sequence[LineOptions],
+    lines: List[int],
+    multiple: bool
+) -> Tuple[float, List[int]]:
+    """Value of a measure group with ISDE claimed on at least one line"""
+    value = 0.0
+    isde_lines = []
+    least_loss_line, least_loss = None, float("inf")
+    for line in lines:
+        option = options[line]
+        isde = option.isde_multiple if multiple else option.isde_single
+        # Ties go to the other schemes, as in optimize_line and solve
+        if isde > option.other_value:
+            value += isde
+            isde_lines.append(line)
+        else:
+            value += option.other_value
+            if option.other_value - isde < least_loss:
+                least_loss_line, least_loss = line, option.other_value - isde
+
+    if not isde_lines:
+        value -= least_loss
+        isde_lines.append(least_loss_line)
+    return value, isde_lines
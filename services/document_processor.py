@@ -1,40 +1,283 @@
-from typing import Dict, Any, Optional
-from anthropic import Anthropic
-import instructor
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Union
+from pydantic import BaseModel, Field
 from models.schemas import (
     DocumentAnalysisRequest,
     DocumentAnalysisResponse,
     CompanyInfo,
     ProjectInfo
 )
+from models.subsidy_schemas import Equipment, ISDECategory, Quote
+from services.extraction_cache import (
+    ExtractionCache,
+    content_hash,
+    content_hasher,
+    get_extraction_cache,
+    normalize_text,
+    text_hash
+)
+from services.llm_client import LLMClient, cacheable_text, get_llm_client
+from services.pdf_extraction import PdfExtraction, PdfExtractor, PdfSource, get_pdf_extractor, spooled_upload
+from services.quote_parser import (
+    MIN_LINE_CONFIDENCE,
+    PARSER_VERSION,
+    ParsedLine,
+    ParsedQuote,
+    QuoteParser,
+    amounts_match,
+    get_quote_parser
+)
+from services.subsidy_database import SubsidyDatabase, get_database
+from services.supplier_templates import SupplierTemplates, get_supplier_templates
+
+
+# Bump when the quote extraction prompt changes: cached extractions of the
+# previous prompt are then no longer served
+PROMPT_VERSION = "quote-v2"
+
+# Cached extractions depend on both the prompt and the rule-based parser
+EXTRACTION_VERSION = f"{PROMPT_VERSION}/parser-{PARSER_VERSION}"
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+
+
+@dataclass
+class QuoteExtraction:
+    """Quote extracted from a PDF, and what it cost"""
+    quote: Quote
+    api_calls_made: int              # 0 when served from the cache or fully parsed by rules
+    cache_hit: Optional[str]         # "pdf" (same bytes), "text" (same content) or None
+    seconds: float
+    parsed_lines: int = 0            # Equipment lines taken from the rule-based parser
+    llm_lines: int = 0               # Equipment lines extracted by the LLM
+    template: Optional[str] = None   # Supplier whose learned template parsed the quote
+
+
+class QuoteLines(BaseModel):
+    """LLM response for quote rows the rule-based parser was not sure about"""
+
+    equipment: List[Equipment] = Field(
+        default_factory=list,
+        description="Equipment items; line_number is the number of the row they come from"
+    )
 
 
 class DocumentProcessor:
     """Service for processing and analyzing PDF investment quotes using Claude"""
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        extractor: Optional[PdfExtractor] = None,
+        cache: Optional[ExtractionCache] = None,
+        model: str = DEFAULT_MODEL,
+        llm: Optional[LLMClient] = None,
+        catalog_context: bool = True,
+        parser: Optional[QuoteParser] = None,
+        min_line_confidence: float = MIN_LINE_CONFIDENCE,
+        templates: Optional[SupplierTemplates] = None
+    ):
         """
         Initialize document processor with Anthropic API key
 
         Args:
             api_key: Anthropic API key
+            extractor: PDF extractor (default: global process-pool extractor)
+            cache: Extraction cache (default: global cache for EXTRACTION_VERSION and model)
+            model: Claude model for quote extraction
+            llm: Shared async LLM client (default: a client of its own for api_key)
+            catalog_context: Add the condensed subsidy catalog to the cached prompt prefix
+            parser: Rule-based line-item parser tried before the LLM
+            min_line_confidence: Parsed lines below this confidence go to the LLM
+            templates: Supplier templates learned from LLM extractions (default: global store)
         """
-        self.client = Anthropic(api_key=api_key)
-        self.instructor_client = instructor.from_anthropic(self.client)
+        self.llm = llm or LLMClient(api_key)
+        self.catalog_context = catalog_context
+        self._catalog: Optional[str] = None
+        self.extractor = extractor or get_pdf_extractor()
+        self.model = model
+        self.cache = cache or get_extraction_cache(EXTRACTION_VERSION, model)
+        self.parser = parser or get_quote_parser()
+        self.min_line_confidence = min_line_confidence
+        self.templates = templates or get_supplier_templates()
 
     async def extract_pdf_text(self, pdf_file: bytes) -> str:
         """
         Extract text content from PDF file
 
+        Pages are extracted in parallel on the extractor's process pool;
+        the event loop is not blocked.
+
         Args:
-            pdf_file: PDF file as bytes
+            pdf_file: PDF file as bytes (or a file object / upload, read in chunks)
 
         Returns:
-            Extracted text content
+            Extracted text content, with a marker per page
+
+        Raises:
+            ValueError: The file is not a readable PDF
         """
-        # Placeholder for PDF extraction
-        # Would use libraries like PyPDF2, pdfplumber, or Claude PDF vision
-        return ""
+        extraction = await self.extractor.extract_async(pdf_file)
+        return extraction.text
+
+    async def extract_quote(self, pdf_file: Union[bytes, Any], tenant: Optional[str] = None) -> QuoteExtraction:
+        """
+        Extract a Quote from a PDF, reusing earlier extractions of the same content
+
+        The bytes are hashed first: an identical upload skips PDF parsing
+        and the LLM. Otherwise the text is extracted and its normalised
+        hash looked up, so a re-saved copy of a known quote skips the LLM.
+        New content from a supplier with a learned template is parsed
+        with it; otherwise the rule-based parser runs first and only the
+        rows it is not confident about are sent to Claude (or the whole
+        document when no line items or totals were recognised, which
+        also teaches the supplier's template). The result is stored
+        under both hashes; documents without text are stored by their
+        bytes only, and incomplete extractions (failed or skipped
+        pages) are not stored. Cache IO runs in a worker thread.
+
+        Args:
+            pdf_file: PDF file as bytes, or an upload with an async
+                read(size) such as FastAPI's UploadFile (spooled to disk in
+                chunks and hashed on the way)
+            tenant: Tenant the LLM call is made for (per-tenant concurrency limit)
+
+        Returns:
+            QuoteExtraction with the quote and the number of API calls made
+
+        Raises:
+            ValueError: The file is not a readable PDF
+        """
+        started = time.perf_counter()
+        if isinstance(pdf_file, (bytes, bytearray)):
+            return await self._extract_quote(pdf_file, content_hash(pdf_file), tenant, started)
+        digest = content_hasher()
+        async with spooled_upload(pdf_file, digest) as path:
+            return await self._extract_quote(path, digest.hexdigest(), tenant, started)
+
+    async def _extract_quote(
+        self,
+        source: PdfSource,
+        pdf_digest: str,
+        tenant: Optional[str],
+        started: float
+    ) -> QuoteExtraction:
+        quote = await asyncio.to_thread(self.cache.get, "pdf", pdf_digest)
+        if quote is not None:
+            return QuoteExtraction(quote, 0, "pdf", time.perf_counter() - started)
+
+        extraction = await self.extractor.extract_async(source)
+        document_text = extraction.text
+        # Incomplete extractions are not cached: a later upload may get every page
+        complete = not extraction.failed_pages and not extraction.truncated
+        # Documents without a text layer (scans) would all share one text hash
+        text_digest = text_hash(document_text) if complete and normalize_text(document_text) else None
+        if text_digest is not None:
+            quote = await asyncio.to_thread(self.cache.get, "text", text_digest)
+            if quote is not None:
+                await asyncio.to_thread(self.cache.put, quote, pdf_digest=pdf_digest)
+                return QuoteExtraction(quote, 0, "text", time.perf_counter() - started)
+
+        # Template lookup and bookkeeping hit the backend: keep them off the event loop
+        result = await asyncio.to_thread(self._extract_with_template, extraction)
+        if result is None:
+            result = await self._extract_parsed(self.parser.parse(extraction), extraction, tenant)
+        if complete:
+            await asyncio.to_thread(self.cache.put, result.quote, pdf_digest=pdf_digest, text_digest=text_digest)
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _extract_with_template(self, extraction: PdfExtraction) -> Optional[QuoteExtraction]:
+        """Quote parsed with the supplier's learned template, or None (no template, or totals mismatch)"""
+        template = self.templates.match(extraction)
+        if template is None:
+            return None
+        parsed = template.parse(extraction)
+        success = parsed.usable and parsed.totals_consistent
+        self.templates.record_parse(template, success)
+        if not success:
+            return None
+        quote = parsed.to_quote().model_copy(update={"supplier_name": template.supplier_name})
+        return QuoteExtraction(
+            quote, 0, None, 0.0, parsed_lines=len(quote.equipment), template=template.supplier_name
+        )
+
+    async def _extract_parsed(
+        self,
+        parsed: ParsedQuote,
+        extraction: PdfExtraction,
+        tenant: Optional[str]
+    ) -> QuoteExtraction:
+        """Quote from a rule-based parse, with the LLM for what the rules could not read"""
+        low = {id(line) for line in parsed.low_confidence(self.min_line_confidence)}
+        # Rows that look right but do not add up: a row was missed, read it all again
+        if not parsed.usable or (not low and not parsed.totals_consistent):
+            return await self._extract_full(extraction, tenant, 1)
+
+        numbered = list(enumerate(parsed.equipment_lines, start=1))
+        if not low:
+            return QuoteExtraction(parsed.to_quote(), 0, None, 0.0, parsed_lines=len(numbered))
+
+        uncertain = {number: line for number, line in numbered if id(line) in low}
+        extracted = await self._extract_lines_with_llm(uncertain, tenant)
+        equipment: List[Equipment] = []
+        for number, line in numbered:
+            if number in uncertain:
+                # Rows the LLM returns nothing for are not equipment
+                equipment.extend(extracted.get(number, []))
+            else:
+                equipment.append(line.to_equipment(number))
+
+        if not parsed.totals_consistent:
+            # Only close the gap if the re-read rows account for it; otherwise rows were missed
+            rows = [line.total for line in parsed.lines if id(line) not in low]
+            rows += [item.total_price for items in extracted.values() for item in items]
+            if not amounts_match(sum(rows), parsed.subtotal) or not parsed.vat_consistent:
+                return await self._extract_full(extraction, tenant, 2)
+
+        return QuoteExtraction(
+            parsed.to_quote(equipment), 1, None, 0.0,
+            parsed_lines=len(numbered) - len(uncertain),
+            llm_lines=sum(len(items) for items in extracted.values())
+        )
+
+    async def _extract_full(self, extraction: PdfExtraction, tenant: Optional[str], api_calls: int) -> QuoteExtraction:
+        """Whole quote with the LLM, which also teaches the supplier's template"""
+        quote = await self._extract_quote_with_llm(extraction.text, tenant)
+        await asyncio.to_thread(self.templates.learn, quote, extraction)
+        return QuoteExtraction(quote, api_calls, None, 0.0, llm_lines=len(quote.equipment))
+
+    async def _extract_quote_with_llm(self, document_text: str, tenant: Optional[str] = None) -> Quote:
+        """Structured quote extraction with Claude (one API call)"""
+        quote = await self.llm.create_structured(
+            Quote,
+            tenant=tenant,
+            model=self.model,
+            max_tokens=4096,
+            **self._build_extraction_prompt(document_text, "offerte")
+        )
+        return quote.model_copy(update={"processed_at": datetime.now()})
+
+    async def _extract_lines_with_llm(
+        self,
+        lines: Dict[int, ParsedLine],
+        tenant: Optional[str] = None
+    ) -> Dict[int, List[Equipment]]:
+        """Equipment per row number for rows the parser was not sure about (one API call)"""
+        rows = "\n".join(f"{number}: {line.text}" for number, line in lines.items())
+        request = self._build_extraction_prompt(rows, "offerte_regels")
+        result = await self.llm.create_structured(
+            QuoteLines, tenant=tenant, model=self.model, max_tokens=2048, **request
+        )
+        extracted: Dict[int, List[Equipment]] = {}
+        for item in result.equipment:
+            if item.line_number in lines:
+                extracted.setdefault(item.line_number, []).append(item)
+        return extracted
 
     async def analyze_document(
         self,
@@ -100,39 +343,94 @@ class DocumentProcessor:
         self,
         document_text: str,
         extraction_type: str
-    ) -> str:
+    ) -> Dict[str, Any]:
         """
-        Build prompt for information extraction from investment quotes
+        Build the request for information extraction from investment quotes
+
+        The instructions (and the condensed catalog) form a byte-stable
+        system prefix that ends with a cache marker; only the document
+        varies per request. Repeated extractions read the prefix from the
+        prompt cache instead of paying for it again.
 
         Args:
             document_text: Text to analyze
             extraction_type: Type of information to extract
 
         Returns:
-            Formatted prompt string
+            system and messages arguments for messages.create
         """
-        prompts = {
-            "company": """
-                Extract company information from this investment quote.
-                Focus on: company name, KVK number, size, industry, employee count, revenue, and location.
-
-                Document:
-                {document_text}
-            """,
-            "project": """
-                Extract investment/project information from this quote.
-                Focus on: investment type, description, category, total costs, budget breakdown, and timeline.
-
-                Document:
-                {document_text}
-            """,
-            "quote": """
-                Extract all relevant information from this investment quote for subsidy matching.
-                Focus on: company details, investment details, costs, timeline, and technical specifications.
-
-                Document:
-                {document_text}
-            """
+        system = [{"type": "text", "text": EXTRACTION_INSTRUCTIONS.get(extraction_type, "")}]
+        if self.catalog_context:
+            system.append({"type": "text", "text": self._catalog_text()})
+        # The marker goes on the last static block: it caches everything before it
+        system[-1] = cacheable_text(system[-1]["text"])
+
+        return {
+            "system": system,
+            "messages": [{"role": "user", "content": f"Document:\n{document_text}"}],
         }
 
-        return prompts.get(extraction_type, "").format(document_text=document_text)
+    def _catalog_text(self) -> str:
+        if self._catalog is None:
+            self._catalog = condensed_catalog(get_database())
+        return self._catalog
+
+
+# Static instructions per extraction type; the document follows in the user message
+EXTRACTION_INSTRUCTIONS = {
+    "company": """Extract company information from the investment quote in the user message.
+Focus on: company name, KVK number, size, industry, employee count, revenue, and location.""",
+    "project": """Extract investment/project information from the quote in the user message.
+Focus on: investment type, description, category, total costs, budget breakdown, and timeline.""",
+    "quote": """Extract all relevant information from the investment quote in the user message for subsidy matching.
+Focus on: company details, investment details, costs, timeline, and technical specifications.""",
+    "offerte": """Extract the quote (offerte) in the user message as structured data.
+One equipment item per quote line: description, brand, model, quantity, unit and total
+price excluding VAT, and technical specs (power_kw, scop, cop, u_value, rd, area_m2,
+meldcode) when stated. Labour and other non-equipment lines are not equipment items.
+Use the catalog below to recognise measures and to set the ISDE category; do not
+invent meldcodes that are not on the quote.
+Totals: subtotal excluding VAT, VAT amount (BTW) and total including VAT.""",
+    "offerte_regels": """The user message holds numbered rows of a quote (offerte) that could not be read
+automatically, as "<number>: <row text>". Return one equipment item per row that is equipment:
+description, brand, model, quantity, unit and total price excluding VAT, and technical specs
+(power_kw, scop, cop, u_value, rd, area_m2, meldcode) when stated; set line_number to the
+row number. Skip rows that are labour, transport, discounts or other non-equipment.
+Use the catalog below to recognise measures and to set the ISDE category.""",
+}
+
+
+def condensed_catalog(db: SubsidyDatabase) -> str:
+    """
+    Compact, deterministic listing of the subsidy catalog for prompts.
+
+    ISDE categories plus code and title of every EIA and MIA/Vamil entry,
+    sorted by code so the text (and so the prompt cache key) only changes
+    with the catalog itself.
+    """
+    lines = ["ISDE categories: " + ", ".join(category.value for category in ISDECategory), "", "EIA codes:"]
+    lines += [f"{code} {title}" for code, title in sorted({(c.code, c.title) for c in db.eia_codes})]
+    lines += ["", "MIA/Vamil codes:"]
+    lines += [f"{code} {title}" for code, title in sorted({(c.code, c.title) for c in db.mia_vamil_codes})]
+    return "\n".join(lines)
+
+
+# Global instance (singleton pattern)
+_processor_instance: Optional[DocumentProcessor] = None
+
+
+def get_document_processor() -> DocumentProcessor:
+    """
+    Get the global DocumentProcessor instance (singleton).
+
+    Uses ANTHROPIC_API_KEY and the global LLM client, PDF extractor and
+    extraction cache.
+    """
+    global _processor_instance
+
+    if _processor_instance is None:
+        _processor_instance = DocumentProcessor(
+            api_key=os.getenv("ANTHROPIC_API_KEY", ""), llm=get_llm_client()
+        )
+
+    return _processor_instance
@@ -0,0 +1,463 @@
+"""
+EquipmentMatcher - Match quote equipment lines to EIA, ISDE and MIA/Vamil.
+
+Produces the QuoteAnalysis models from models/subsidy_schemas.py for an
+extracted Quote. Every line is resolved against SubsidyDatabase:
+
+- ISDE: meldcode from the specs, otherwise brand + model lookup; insulation
+  and glass without a product fall back to their Rd/U-value
+- EIA and MIA/Vamil: hybrid keyword + semantic search over the code texts
+
+Matched codes are turned into SubsidyCalculations (see subsidy_calculator)
+and rolled up into quote totals. Lines are independent, so they are
+evaluated concurrently on a thread pool; the database and semantic index
+are read-only after load.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from models.subsidy_schemas import (
+    Equipment,
+    EquipmentMatch,
+    ISDEMeldcode,
+    Quote,
+    QuoteAnalysis,
+    SubsidyCalculation,
+    SubsidyScheme
+)
+from services.combination_optimizer import CombinationOptimizer
+from services.requirement_predicates import RequirementCheck, check_requirements
+from services.semantic_index import FusionWeights, hybrid_search
+from services.subsidy_calculator import (
+    EQUIPMENT_TO_ISDE,
+    calculate_eia,
+    calculate_isde,
+    calculate_mia,
+    calculate_vamil
+)
+from services.subsidy_database import SubsidyDatabase, get_database
+from services.surface_calculator import SurfaceCalculator
+
+
+# Confidence for an ISDE hit on meldcode or brand + model
+ISDE_MODEL_CONFIDENCE = 0.95
+# Confidence for an ISDE insulation/glass class resolved from the U/Rd-value
+ISDE_SPEC_CONFIDENCE = 0.85
+# Confidence when nothing matched
+NO_MATCH_CONFIDENCE = 0.2
+# Confidence added when specs satisfy all technical requirements of a code
+VERIFIED_REQUIREMENTS_BONUS = 0.1
+# Upper bound for matches on code descriptions
+MAX_CODE_CONFIDENCE = 0.9
+
+# match_equipment() without a surface resolved by the caller
+_UNRESOLVED = object()
+
+
+class EquipmentMatcher:
+    """Matches Quote equipment lines against the subsidy database"""
+
+    def __init__(
+        self,
+        db: Optional[SubsidyDatabase] = None,
+        max_candidates: int = 3,
+        min_code_score: float = 0.35,
+        relative_cutoff: float = 0.85,
+        weights: Optional[FusionWeights] = None,
+        max_workers: int = 8
+    ):
+        """
+        Initialize matcher
+
+        Args:
+            db: Subsidy database (default: global instance)
+            max_candidates: EIA and MIA codes to keep per line
+            min_code_score: Minimum hybrid search score for an EIA/MIA code
+            relative_cutoff: Keep only codes scoring at least this fraction of the best hit
+            weights: Keyword/semantic fusion weights
+            max_workers: Threads used to evaluate quote lines (capped at CPU count)
+        """
+        self.db = db or get_database()
+        self.max_candidates = max_candidates
+        self.min_code_score = min_code_score
+        self.relative_cutoff = relative_cutoff
+        self.weights = weights or FusionWeights()
+        self.optimizer = CombinationOptimizer(self.db)
+        self.surfaces = SurfaceCalculator(self.db)
+        self.max_workers = max(1, min(max_workers, os.cpu_count() or 1))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        # Load the semantic index up front so the first quote does not pay for it
+        self.db.get_semantic_index()
+
+    # ========================================================================
+    # LINE MATCHING
+    # ========================================================================
+
+    def match_equipment(
+        self,
+        equipment: Equipment,
+        surface: Union[ISDEMeldcode, None, object] = _UNRESOLVED
+    ) -> EquipmentMatch:
+        """
+        Match a single equipment line.
+
+        Args:
+            equipment: Quote line
+            surface: The line's SurfaceCalculator.resolve() result, when the
+                caller resolved all lines of the quote in one call
+
+        Returns:
+            EquipmentMatch with all candidate calculations and the best combination
+        """
+        notes: List[str] = []
+
+        isde_entry, isde_basis = self._find_isde(equipment, surface)
+        isde_matches = []
+        if isde_entry:
+            calculation = calculate_isde(isde_entry, equipment)
+            if calculation:
+                isde_matches.append(calculation)
+                notes.append(f"ISDE meldcode {isde_entry.meldcode} matched on {isde_basis}")
+
+        eia_matches: List[SubsidyCalculation] = []
+        mia_matches: List[SubsidyCalculation] = []
+        vamil_matches: List[SubsidyCalculation] = []
+        best_code_score = 0.0
+
+        for hit in self._search_codes(equipment):
+            if hit.scheme == SubsidyScheme.EIA and len(eia_matches) < self.max_candidates:
+                code = self.db.get_eia_by_code(hit.code)
+                if code:
+                    check = check_requirements(self.db.get_eia_requirements(code.code), equipment.specs)
+                    if check.status == "fail":
+                        notes.append(_rejection_note(hit.scheme, code.code, check))
+                        continue
+                    eia_matches.append(_flag_unverified(calculate_eia(code, equipment), check))
+                    best_code_score = max(best_code_score, _verified_score(hit.score, check))
+            elif hit.scheme == SubsidyScheme.MIA and len(mia_matches) < self.max_candidates:
+                code = self.db.get_mia_by_code(hit.code)
+                if code:
+                    check = check_requirements(self.db.get_mia_requirements(code.code), equipment.specs)
+                    if check.status == "fail":
+                        notes.append(_rejection_note(hit.scheme, code.code, check))
+                        continue
+                    mia = calculate_mia(code, equipment)
+                    vamil = calculate_vamil(code, equipment)
+                    if mia:
+                        mia_matches.append(_flag_unverified(mia, check))
+                    if vamil:
+                        vamil_matches.append(_flag_unverified(vamil, check))
+                    best_code_score = max(best_code_score, _verified_score(hit.score, check))
+
+        if eia_matches:
+            notes.append(f"EIA code {eia_matches[0].code} matches description")
+        if mia_matches or vamil_matches:
+            notes.append(f"MIA/Vamil code {(mia_matches or vamil_matches)[0].code} matches description")
+
+        if isde_matches:
+            confidence = ISDE_MODEL_CONFIDENCE if isde_basis == "model" else ISDE_SPEC_CONFIDENCE
+        elif best_code_score > 0:
+            confidence = min(best_code_score, MAX_CODE_CONFIDENCE)
+        else:
+            confidence = NO_MATCH_CONFIDENCE
+            notes.append("No matching subsidy code found")
+
+        match = EquipmentMatch(
+            equipment=equipment,
+            eia_matches=eia_matches,
+            isde_matches=isde_matches,
+            mia_matches=mia_matches,
+            vamil_matches=vamil_matches,
+            confidence=confidence,
+            match_notes=notes
+        )
+        return with_combination(match, self.optimizer.optimize_line(match))
+
+    def match_codes(
+        self,
+        equipment: Equipment,
+        isde_meldcode: Optional[str],
+        eia_codes: List[str],
+        mia_codes: List[str],
+        confidence: float,
+        notes: List[str]
+    ) -> EquipmentMatch:
+        """
+        Line match for codes resolved earlier (e.g. from the match cache).
+
+        Amounts depend on the line's price and quantity, so the codes are
+        priced again for this line; no search is done.
+
+        Args:
+            equipment: Quote line
+            isde_meldcode: Resolved ISDE meldcode, if any
+            eia_codes: Resolved EIA codes
+            mia_codes: Resolved MIA/Vamil codes
+            confidence: Confidence of the earlier resolution
+            notes: Match notes of the earlier resolution
+
+        Returns:
+            EquipmentMatch with candidate calculations and the best combination
+        """
+        isde_matches: List[SubsidyCalculation] = []
+        entry = self.db.get_isde_by_meldcode(isde_meldcode) if isde_meldcode else None
+        if entry:
+            calculation = calculate_isde(entry, equipment)
+            if calculation:
+                isde_matches.append(calculation)
+
+        eia_matches: List[SubsidyCalculation] = []
+        for eia_code in eia_codes:
+            code = self.db.get_eia_by_code(eia_code)
+            if code:
+                check = check_requirements(self.db.get_eia_requirements(code.code), equipment.specs)
+                eia_matches.append(_flag_unverified(calculate_eia(code, equipment), check))
+
+        mia_matches: List[SubsidyCalculation] = []
+        vamil_matches: List[SubsidyCalculation] = []
+        for mia_code in mia_codes:
+            code = self.db.get_mia_by_code(mia_code)
+            if code:
+                check = check_requirements(self.db.get_mia_requirements(code.code), equipment.specs)
+                mia = calculate_mia(code, equipment)
+                vamil = calculate_vamil(code, equipment)
+                if mia:
+                    mia_matches.append(_flag_unverified(mia, check))
+                if vamil:
+                    vamil_matches.append(_flag_unverified(vamil, check))
+
+        match = EquipmentMatch(
+            equipment=equipment,
+            eia_matches=eia_matches,
+            isde_matches=isde_matches,
+            mia_matches=mia_matches,
+            vamil_matches=vamil_matches,
+            confidence=confidence,
+            match_notes=list(notes)
+        )
+        return with_combination(match, self.optimizer.optimize_line(match))
+
+    def _find_isde(
+        self,
+        equipment: Equipment,
+        surface: Union[ISDEMeldcode, None, object] = _UNRESOLVED
+    ) -> Tuple[Optional[ISDEMeldcode], str]:
+        """
+        Find the ISDE meldcode for a line: explicit meldcode first, then
+        brand + model, then the U/Rd-value of insulation and glass.
+
+        Returns:
+            (meldcode or None, what it was matched on)
+        """
+        meldcode = equipment.specs.get("meldcode")
+        if meldcode:
+            entry = self.db.get_isde_by_meldcode(str(meldcode).strip().upper())
+            if entry:
+                return entry, "model"
+
+        if equipment.brand and equipment.model:
+            category = EQUIPMENT_TO_ISDE.get(equipment.category) if equipment.category else None
+            entry = self.db.search_isde_by_model(equipment.brand, equipment.model, category)
+            if entry:
+                return entry, "model"
+
+        entry = self.surfaces.resolve([equipment])[0] if surface is _UNRESOLVED else surface
+        if entry:
+            return entry, "U/Rd-value"
+        return None, "model"
+
+    def _search_codes(self, equipment: Equipment):
+        """EIA/MIA candidates for a line via hybrid search, best first"""
+        parts = [equipment.description, equipment.brand, equipment.model]
+        if equipment.category:
+            parts.append(equipment.category.value)
+        parts.extend(equipment.keywords)
+        text = " ".join(p for p in parts if p)
+
+        hits = hybrid_search(
+            self.db,
+            text,
+            top_k=self.max_candidates * 2,
+            weights=self.weights
+        )
+        if not hits:
+            return []
+        cutoff = max(self.min_code_score, hits[0].score * self.relative_cutoff)
+        return [hit for hit in hits if hit.score >= cutoff]
+
+    # ========================================================================
+    # QUOTE ANALYSIS
+    # ========================================================================
+
+    async def analyze_quote(self, quote: Quote) -> QuoteAnalysis:
+        """
+        Analyze a quote without blocking the event loop.
+
+        Args:
+            quote: Extracted quote
+
+        Returns:
+            QuoteAnalysis with per-line matches and totals
+        """
+        started = time.perf_counter()
+        matches = await self.match_lines(quote.equipment)
+        return self.build_analysis(quote, matches, started)
+
+    async def match_lines(self, lines: List[Equipment]) -> List[EquipmentMatch]:
+        """Line-level matches for quote lines on the thread pool, in line order"""
+        loop = asyncio.get_running_loop()
+        # All surface lines (insulation, glass) resolve in one vectorised call
+        surfaces = await loop.run_in_executor(self._executor, self.surfaces.resolve, lines)
+        batches = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._match_lines, batch)
+            for batch in self._batches(list(zip(lines, surfaces)))
+        ))
+        return [match for batch in batches for match in batch]
+
+    def analyze_quote_sync(self, quote: Quote) -> QuoteAnalysis:
+        """Synchronous variant of analyze_quote (scripts, process pools)"""
+        started = time.perf_counter()
+        surfaces = self.surfaces.resolve(quote.equipment)
+        batches = self._executor.map(self._match_lines, self._batches(list(zip(quote.equipment, surfaces))))
+        matches = [match for batch in batches for match in batch]
+        return self.build_analysis(quote, matches, started)
+
+    def _match_lines(self, lines: List[Tuple[Equipment, Optional[ISDEMeldcode]]]) -> List[EquipmentMatch]:
+        return [self.match_equipment(equipment, surface) for equipment, surface in lines]
+
+    def _batches(self, lines: List) -> List[List]:
+        """Split lines into one contiguous batch per worker (one task per line costs more than it saves)"""
+        if not lines:
+            return []
+        size = -(-len(lines) // self.max_workers)
+        return [lines[i:i + size] for i in range(0, len(lines), size)]
+
+    def build_analysis(
+        self,
+        quote: Quote,
+        matches: List[EquipmentMatch],
+        started: float
+    ) -> QuoteAnalysis:
+        """
+        Roll line matches up into a QuoteAnalysis.
+
+        Args:
+            quote: Analyzed quote
+            matches: One EquipmentMatch per quote line, in line order
+            started: time.perf_counter() at the start of the analysis
+
+        Returns:
+            QuoteAnalysis
+        """
+        # Line combinations can change at quote level (multi-measure ISDE rate)
+        matches = [
+            with_combination(match, combination)
+            for match, combination in zip(matches, self.optimizer.optimize_quote(matches))
+        ]
+        return self.summarize(quote, matches, scheme_totals(matches), started)
+
+    def summarize(
+        self,
+        quote: Quote,
+        matches: List[EquipmentMatch],
+        totals: Dict[SubsidyScheme, float],
+        started: float
+    ) -> QuoteAnalysis:
+        """
+        Build the QuoteAnalysis from final line matches and per-scheme totals.
+
+        Args:
+            quote: Analyzed quote
+            matches: Line matches with their final best combination
+            totals: Subsidy total per scheme over all lines
+            started: time.perf_counter() at the start of the analysis
+
+        Returns:
+            QuoteAnalysis
+        """
+        # Subtotal includes labour and other non-equipment lines when present
+        total_investment = quote.subtotal or sum(e.total_price for e in quote.equipment)
+        total_subsidies = round(sum(totals.values()), 2)
+        coverage = _percentage(total_subsidies, total_investment)
+
+        return QuoteAnalysis(
+            quote=quote,
+            equipment_matches=matches,
+            total_investment=total_investment,
+            total_subsidies=total_subsidies,
+            net_cost_after_subsidies=round(max(total_investment - total_subsidies, 0.0), 2),
+            subsidy_coverage_percentage=coverage,
+            eia_total=round(totals[SubsidyScheme.EIA], 2),
+            isde_total=round(totals[SubsidyScheme.ISDE], 2),
+            mia_total=round(totals[SubsidyScheme.MIA], 2),
+            vamil_total=round(totals[SubsidyScheme.VAMIL], 2),
+            summary=f"Found subsidies covering {coverage:.1f}% of investment cost",
+            recommendations=_recommendations(totals),
+            processing_time_seconds=time.perf_counter() - started
+        )
+
+
+def scheme_totals(matches: List[EquipmentMatch]) -> Dict[SubsidyScheme, float]:
+    """Sum of best-combination amounts per scheme"""
+    totals: Dict[SubsidyScheme, float] = {scheme: 0.0 for scheme in SubsidyScheme}
+    for match in matches:
+        for calculation in match.best_combination:
+            totals[calculation.scheme] += calculation.subsidy_amount
+    return totals
+
+
+def with_combination(
+    match: EquipmentMatch,
+    combination: List[SubsidyCalculation]
+) -> EquipmentMatch:
+    """Line match with its best combination and totals set"""
+    if match.best_combination == combination:
+        return match
+    total = sum(c.subsidy_amount for c in combination)
+    return match.model_copy(update={
+        "best_combination": combination,
+        "total_subsidy": round(total, 2),
+        "subsidy_percentage_of_cost": _percentage(total, match.equipment.total_price)
+    })
+
+
+def _percentage(amount: float, base: float) -> float:
+    """Amount as percentage of base, clipped to 0-100"""
+    if base <= 0:
+        return 0.0
+    return round(min(amount / base * 100, 100.0), 2)
+
+
+def _recommendations(totals: Dict[SubsidyScheme, float]) -> List[str]:
+    recommendations = []
+    if totals[SubsidyScheme.EIA] > 0:
+        recommendations.append("Apply for EIA within 3 months of the investment commitment")
+    if totals[SubsidyScheme.MIA] > 0 or totals[SubsidyScheme.VAMIL] > 0:
+        recommendations.append("Report MIA/Vamil within 3 months of the investment commitment")
+    if totals[SubsidyScheme.ISDE] > 0:
+        recommendations.append("Apply for ISDE after installation, within 24 months")
+    return recommendations
+
+
+def _verified_score(score: float, check: RequirementCheck) -> float:
+    """Search score, raised when the specs satisfy every requirement of the code"""
+    if check.status == "pass":
+        return score + VERIFIED_REQUIREMENTS_BONUS
+    return score
+
+
+def _flag_unverified(calculation: SubsidyCalculation, check: RequirementCheck) -> SubsidyCalculation:
+    """Add a warning for each requirement the specs could not confirm"""
+    for predicate in check.unknown:
+        calculation.warnings.append(f"Requirement not verified: {predicate.describe()}")
+    return calculation
+
+
+def _rejection_note(scheme: SubsidyScheme, code: str, check: RequirementCheck) -> str:
+    failed = ", ".join(predicate.describe() for predicate in check.failed)
+    return f"{scheme.value} code {code} rejected: requires {failed}"
@@ -0,0 +1,150 @@
+"""
+ExtractionCache - Content-addressed cache of quotes extracted from PDFs.
+
+The same offerte is often uploaded more than once: re-submissions,
+customers comparing installers that resell the same template, the
+installer uploading a corrected copy. Extracting a Quote with the LLM is
+by far the most expensive step, so extracted quotes are stored under the
+content of the document:
+
+- pdf: SHA-256 of the uploaded bytes (identical file, no PDF parsing)
+- text: SHA-256 of the whitespace-normalised text (the same quote saved
+  again or printed to PDF by another tool)
+
+Both keys include the prompt version and the model, so a new prompt or
+model never serves an extraction made by the old one. Storage is any
+cache backend (SQLite by default), which evicts LRU and expires by TTL.
+"""
+
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models.subsidy_schemas import Quote
+from services.cache_backends import CacheBackend, create_cache_backend
+from services.match_cache import CacheMetrics
+
+
+# Extractions expire after 90 days (prompt/model changes change the key anyway)
+DEFAULT_TTL_SECONDS = 90 * 24 * 3600
+
+DEFAULT_CACHE_URL = "sqlite:///" + str(
+    Path(__file__).resolve().parent.parent / "data" / "cache" / "extraction_cache.sqlite3"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_PAGE_MARKER = re.compile(r"=== PAGE \d+ ===")
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of a document's bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_hasher():
+    """Incremental hash whose hexdigest() equals content_hash of the bytes fed to it"""
+    return hashlib.sha256()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Extracted text without layout differences.
+
+    Page markers and runs of whitespace (layout padding, line breaks,
+    non-breaking spaces) are dropped, so the same quote rendered by
+    another PDF tool or split over pages differently normalises equally.
+    """
+    return _WHITESPACE.sub(" ", _PAGE_MARKER.sub(" ", text)).strip()
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of the normalised text"""
+    return content_hash(normalize_text(text).encode("utf-8"))
+
+
+class ExtractionCache:
+    """(content hash, prompt version, model) -> extracted Quote"""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        prompt_version: str,
+        model: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        """
+        Initialize cache
+
+        Args:
+            backend: Storage (memory, SQLite or Redis-compatible)
+            prompt_version: Version of the extraction prompt
+            model: LLM model used for extraction
+            ttl_seconds: Lifetime of an entry
+        """
+        self.backend = backend
+        self.prompt_version = prompt_version
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.metrics = CacheMetrics()
+
+    def key(self, kind: str, digest: str) -> str:
+        return f"extraction:{self.prompt_version}:{self.model}:{kind}:{digest}"
+
+    def get(self, kind: str, digest: str) -> Optional[Quote]:
+        """
+        Cached quote, or None
+
+        Args:
+            kind: "pdf" (hash of the bytes) or "text" (hash of the normalised text)
+            digest: content_hash() or text_hash() of the document
+        """
+        key = self.key(kind, digest)
+        value = self.backend.get(key)
+        if value is None:
+            self.metrics.count("misses")
+            return None
+        try:
+            quote = Quote.model_validate_json(value)
+        except (ValidationError, ValueError):
+            # Entry from an incompatible version of the Quote schema
+            self.backend.delete(key)
+            self.metrics.count("errors")
+            self.metrics.count("misses")
+            return None
+        self.metrics.count("hits")
+        return quote
+
+    def put(self, quote: Quote, pdf_digest: Optional[str] = None, text_digest: Optional[str] = None):
+        """Store an extracted quote under the given content hashes"""
+        value = quote.model_dump_json().encode("utf-8")
+        for kind, digest in (("pdf", pdf_digest), ("text", text_digest)):
+            if digest:
+                self.backend.set(self.key(kind, digest), value, self.ttl_seconds)
+                self.metrics.count("stores")
+
+
+# Global instances (singleton pattern): one backend, one cache per prompt version and model
+_backend_instance: Optional[CacheBackend] = None
+_cache_instances: Dict[Tuple[str, str], ExtractionCache] = {}
+
+
+def get_extraction_cache(prompt_version: str, model: str) -> ExtractionCache:
+    """
+    Get the global ExtractionCache for a prompt version and model (singleton).
+
+    The backend comes from EXTRACTION_CACHE_URL (default: SQLite file in
+    data/cache, shared by all workers on the host) and is shared by all
+    prompt versions and models.
+    """
+    global _backend_instance
+
+    if _backend_instance is None:
+        _backend_instance = create_cache_backend(os.getenv("EXTRACTION_CACHE_URL", DEFAULT_CACHE_URL))
+    if (prompt_version, model) not in _cache_instances:
+        _cache_instances[prompt_version, model] = ExtractionCache(_backend_instance, prompt_version, model)
+
+    return _cache_instances[prompt_version, model]
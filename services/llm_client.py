@@ -0,0 +1,290 @@
+"""
+LLMClient - Shared async Claude client with concurrency limits and retries.
+
+Every LLM call in the services and extraction scripts goes through one
+client per process:
+
+- One AsyncAnthropic client (one HTTP connection pool with keep-alive)
+  per event loop, instead of a client per service
+- A global semaphore bounds the requests in flight (and so the pool's
+  connections); a per-tenant semaphore keeps one tenant's batch upload
+  from taking every slot
+- 429 and 5xx responses and connection errors are retried with
+  exponential backoff and full jitter, honouring Retry-After
+- Every attempt has a timeout; cancelling the caller cancels the HTTP
+  request and releases the slots
+- Token usage is counted, including prompt-cache writes and reads, so
+  the effect of cacheable prefixes (cacheable_text) is visible
+
+The SDK's own retries are disabled: they would back off while holding a
+slot, and stack with the retries here.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Type, TypeVar
+
+from anthropic import APIConnectionError, APIStatusError, AsyncAnthropic
+
+
+T = TypeVar("T")
+
+# Requests in flight per process, and per tenant
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_TENANT_CONCURRENCY = 4
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504, 529}
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+@dataclass
+class LLMMetrics:
+    """Call and token counters of this process (thread-safe)"""
+    calls: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    failures: int = 0
+    input_tokens: int = 0                    # Uncached prompt tokens
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0     # Prompt tokens written to the cache
+    cache_read_input_tokens: int = 0         # Prompt tokens served from the cache
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def add_usage(self, usage: Any):
+        """Add the usage of an API response (fields missing or None count as 0)"""
+        if usage is None:
+            return
+        with self._lock:
+            for name in USAGE_FIELDS:
+                setattr(self, name, getattr(self, name) + (getattr(usage, name, None) or 0))
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            prompt_tokens = self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                **{name: getattr(self, name) for name in USAGE_FIELDS},
+                "cache_hit_rate": round(self.cache_read_input_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+            }
+
+
+def cacheable_text(text: str) -> Dict[str, Any]:
+    """
+    Text block that ends a cacheable prompt prefix.
+
+    Everything up to and including this block (tools, system, earlier
+    messages) is cached by the API and read back at a fraction of the
+    cost on the next request with a byte-identical prefix. Prefixes
+    below the model's minimum (1024 tokens for Sonnet) are not cached.
+    """
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, server errors, timeouts and connection errors are retried"""
+    if isinstance(error, (asyncio.TimeoutError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header, if the response has one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """Async Claude client shared by services and scripts"""
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        tenant_concurrency: int = DEFAULT_TENANT_CONCURRENCY,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        timeout: float = 120.0
+    ):
+        """
+        Initialize client (the HTTP client is created on first use)
+
+        Args:
+            api_key: Anthropic API key
+            max_concurrency: Requests in flight in this process
+            tenant_concurrency: Requests in flight per tenant
+            max_retries: Retries after a retryable error
+            base_delay: Backoff of the first retry in seconds (doubles per retry)
+            max_delay: Upper bound of one backoff
+            timeout: Seconds allowed per attempt
+        """
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.tenant_concurrency = tenant_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.metrics = LLMMetrics()
+
+        # Event-loop bound state, created by _bind()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Any = None
+        self._instructor: Any = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tenant_slots: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+    # ========================================================================
+    # CALLS
+    # ========================================================================
+
+    async def create(self, tenant: Optional[str] = None, **kwargs) -> Any:
+        """
+        messages.create with concurrency limits, timeout and retries
+
+        Args:
+            tenant: Tenant the call is made for (None: global limit only)
+            **kwargs: Arguments of AsyncAnthropic.messages.create
+
+        Returns:
+            The API Message
+        """
+        self._bind()
+        message = await self._call(lambda: self._client.messages.create(**kwargs), tenant)
+        self.metrics.add_usage(getattr(message, "usage", None))
+        return message
+
+    async def create_structured(
+        self,
+        response_model: Type[T],
+        tenant: Optional[str] = None,
+        **kwargs
+    ) -> T:
+        """
+        Structured output through instructor, with the same limits and retries
+
+        Args:
+            response_model: Pydantic model to extract
+            tenant: Tenant the call is made for
+            **kwargs: Arguments of messages.create (model, max_tokens, messages, ...)
+
+        Returns:
+            Instance of response_model
+        """
+        self._bind()
+        if self._instructor is None:
+            import instructor
+            self._instructor = instructor.from_anthropic(self._client)
+        result, message = await self._call(
+            lambda: self._instructor.messages.create_with_completion(response_model=response_model, **kwargs),
+            tenant
+        )
+        self.metrics.add_usage(getattr(message, "usage", None))
+        return result
+
+    def run_sync(self, call: Awaitable[T]) -> T:
+        """Run a call from synchronous code (scripts); not from inside an event loop"""
+        return asyncio.run(call)
+
+    async def _call(self, request: Callable[[], Awaitable[T]], tenant: Optional[str]) -> T:
+        tenant_slots = self._tenant_semaphore(tenant)
+        attempt = 0
+        while True:
+            try:
+                if tenant_slots is None:
+                    async with self._slots:
+                        return await self._attempt(request)
+                # Tenant slot first: a tenant's queued calls must not hold global slots
+                async with tenant_slots:
+                    async with self._slots:
+                        return await self._attempt(request)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self.metrics.count("failures")
+                    raise
+                delay = self.backoff(attempt, retry_after(e))
+            # Wait without holding a slot; cancellation ends the retry loop here
+            await asyncio.sleep(delay)
+            attempt += 1
+            self.metrics.count("retries")
+
+    async def _attempt(self, request: Callable[[], Awaitable[T]]) -> T:
+        self.metrics.count("calls")
+        try:
+            return await asyncio.wait_for(request(), self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics.count("timeouts")
+            raise
+
+    def backoff(self, attempt: int, minimum: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, at least the server's Retry-After"""
+        delay = random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, min(minimum or 0.0, self.max_delay))
+
+    # ========================================================================
+    # EVENT LOOP STATE
+    # ========================================================================
+
+    def _bind(self):
+        """(Re)create the HTTP client and semaphores for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._client = self._new_client()
+        self._instructor = None
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._tenant_slots = weakref.WeakValueDictionary()
+
+    def _new_client(self) -> Any:
+        # Retries happen in _call, with our backoff and outside the slots
+        return AsyncAnthropic(api_key=self.api_key, max_retries=0, timeout=self.timeout)
+
+    def _tenant_semaphore(self, tenant: Optional[str]) -> Optional[asyncio.Semaphore]:
+        """Semaphore of a tenant; dropped once no call of the tenant holds it"""
+        if tenant is None:
+            return None
+        slots = self._tenant_slots.get(tenant)
+        if slots is None:
+            slots = asyncio.Semaphore(self.tenant_concurrency)
+            self._tenant_slots[tenant] = slots
+        return slots
+
+
+# Global instance (singleton pattern)
+_client_instance: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Get the global LLMClient instance (singleton).
+
+    Uses ANTHROPIC_API_KEY; LLM_MAX_CONCURRENCY and LLM_TENANT_CONCURRENCY
+    override the limits.
+    """
+    global _client_instance
+
+    if _client_instance is None:
+        _client_instance = LLMClient(
+            api_key=os.getenv("ANTHROPIC_API_KEY", ""),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+            tenant_concurrency=int(os.getenv("LLM_TENANT_CONCURRENCY", DEFAULT_TENANT_CONCURRENCY))
+        )
+
+    return _client_instance
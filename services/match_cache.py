@@ -0,0 +1,217 @@
+"""
+MatchCache - Persistent, cross-tenant cache of resolved equipment matches.
+
+The same installer product (brand + model + key specs) appears in many
+quotes from different customers. Once a line is resolved (rules or LLM
+verification), the resolution is stored under a normalised equipment
+fingerprint plus the catalog version and the resolver version, so the
+next quote with that product skips search and verification.
+
+Only the resolved codes are cached: amounts depend on each line's price
+and quantity and are priced again on a hit (microseconds). A new catalog
+version or a change of the matching logic (RESOLVER_VERSION) changes
+every key, so stale resolutions are never served.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.subsidy_schemas import Equipment, EquipmentMatch
+from services.cache_backends import CacheBackend, create_cache_backend
+from services.requirement_predicates import normalize_specs
+from services.subsidy_calculator import is_monument
+from services.subsidy_database import get_database, tokenize
+
+
+# Bump when matching, requirement predicates or verification change what a
+# line resolves to: resolutions made by the old logic are then not served
+RESOLVER_VERSION = "3"
+
+# Resolutions expire after 30 days (catalog updates change the key anyway)
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+DEFAULT_CACHE_URL = "sqlite:///" + str(
+    Path(__file__).resolve().parent.parent / "data" / "cache" / "match_cache.sqlite3"
+)
+
+
+def _normalize_identifier(value: Optional[str]) -> str:
+    """Brand/model without case, spacing and punctuation differences"""
+    return "".join(ch for ch in (value or "").lower() if ch.isalnum())
+
+
+def equipment_fingerprint(equipment: Equipment) -> str:
+    """
+    Normalised identity of the product on a quote line.
+
+    Brand, model, category, meldcode, the technical specs that requirement
+    checks use, the building (monument, woning_type) and the description
+    and keywords, which search and verification read even when brand and
+    model are known. Price, quantity and surface area are excluded: they
+    affect amounts, not which codes apply.
+    """
+    specs = normalize_specs(equipment.specs)
+    payload: Dict[str, object] = {
+        "brand": _normalize_identifier(equipment.brand),
+        "model": _normalize_identifier(equipment.model),
+        "category": equipment.category.value if equipment.category else None,
+        "meldcode": str(equipment.specs.get("meldcode", "")).strip().upper(),
+        "specs": sorted(
+            (attribute, round(value, 6), dimension or "")
+            for attribute, (value, dimension) in specs.items()
+        ),
+        # normalize_specs keeps numbers only
+        "monument": is_monument(equipment),
+        "woning_type": " ".join(str(equipment.specs.get("woning_type") or "").lower().split()),
+        "description": sorted(set(tokenize(equipment.description))),
+        "keywords": sorted(set(tokenize(" ".join(equipment.keywords)))),
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+@dataclass
+class CachedResolution:
+    """Codes a line resolved to, and how"""
+    tier: str
+    confidence: float
+    isde_meldcode: Optional[str] = None
+    eia_codes: List[str] = field(default_factory=list)
+    mia_codes: List[str] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_match(cls, match: EquipmentMatch, tier: str) -> "CachedResolution":
+        mia_codes = [c.code for c in match.mia_matches]
+        mia_codes += [c.code for c in match.vamil_matches if c.code not in mia_codes]
+        return cls(
+            tier=tier,
+            confidence=match.confidence,
+            isde_meldcode=match.isde_matches[0].code if match.isde_matches else None,
+            eia_codes=[c.code for c in match.eia_matches],
+            mia_codes=mia_codes,
+            notes=list(match.match_notes)
+        )
+
+    def to_bytes(self) -> bytes:
+        return json.dumps(asdict(self), ensure_ascii=False).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, value: bytes) -> "CachedResolution":
+        return cls(**json.loads(value.decode("utf-8")))
+
+
+@dataclass
+class CacheMetrics:
+    """Hit/miss counters of this process (thread-safe)"""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class MatchCache:
+    """Equipment fingerprint + catalog and resolver version -> CachedResolution"""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        catalog_version: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        resolver_version: str = RESOLVER_VERSION
+    ):
+        """
+        Initialize cache
+
+        Args:
+            backend: Storage (memory, SQLite or Redis-compatible)
+            catalog_version: SubsidyDatabase.catalog_version the resolutions belong to
+            ttl_seconds: Lifetime of an entry
+            resolver_version: Version of the matching logic
+        """
+        self.backend = backend
+        self.catalog_version = catalog_version
+        self.ttl_seconds = ttl_seconds
+        self.resolver_version = resolver_version
+        self.metrics = CacheMetrics()
+
+    def key(self, equipment: Equipment) -> str:
+        return f"match:{self.catalog_version}:{self.resolver_version}:{equipment_fingerprint(equipment)}"
+
+    def get(self, equipment: Equipment) -> Optional[CachedResolution]:
+        """Cached resolution for a line, or None"""
+        return self.get_many([equipment])[0]
+
+    def get_many(self, lines: Sequence[Equipment]) -> List[Optional[CachedResolution]]:
+        """Cached resolutions of several lines with one backend read (blocking IO)"""
+        keys = [self.key(equipment) for equipment in lines]
+        return [self._decode(key, value) for key, value in zip(keys, self.backend.get_many(keys))]
+
+    def _decode(self, key: str, value: Optional[bytes]) -> Optional[CachedResolution]:
+        if value is None:
+            self.metrics.count("misses")
+            return None
+        try:
+            resolution = CachedResolution.from_bytes(value)
+        except (ValueError, TypeError):
+            # Entry from an incompatible version of this module
+            self.backend.delete(key)
+            self.metrics.count("errors")
+            self.metrics.count("misses")
+            return None
+        self.metrics.count("hits")
+        return resolution
+
+    def put(self, equipment: Equipment, resolution: CachedResolution):
+        """Store the resolution of a line"""
+        self.backend.set(self.key(equipment), resolution.to_bytes(), self.ttl_seconds)
+        self.metrics.count("stores")
+
+    def put_many(self, resolved: Sequence[Tuple[Equipment, CachedResolution]]):
+        """Store the resolutions of several lines with one backend write (blocking IO)"""
+        self.backend.set_many(
+            [(self.key(equipment), resolution.to_bytes()) for equipment, resolution in resolved],
+            self.ttl_seconds
+        )
+        self.metrics.count("stores", len(resolved))
+
+
+# Global instance (singleton pattern)
+_cache_instance: Optional[MatchCache] = None
+
+
+def get_match_cache() -> MatchCache:
+    """
+    Get the global MatchCache instance (singleton).
+
+    The backend comes from MATCH_CACHE_URL (default: SQLite file in
+    data/cache, shared by all workers on the host).
+    """
+    global _cache_instance
+
+    if _cache_instance is None:
+        backend = create_cache_backend(os.getenv("MATCH_CACHE_URL", DEFAULT_CACHE_URL))
+        _cache_instance = MatchCache(backend, get_database().catalog_version)
+
+    return _cache_instance
@@ -0,0 +1,128 @@
+"""
+Match reasons - Machine-readable reason codes with lazy, localised rendering.
+
+Matching records why a rule scored as it did as compact (code, params)
+tuples. Text is rendered only for matches that are actually returned, or
+on demand through the explain endpoint, in English or Dutch.
+"""
+
+from enum import Enum
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+
+class ReasonCode(str, Enum):
+    """Reason codes produced by SubsidyMatcher"""
+    SIZE_ELIGIBLE = "size_eligible"
+    SIZE_NOT_ELIGIBLE = "size_not_eligible"
+    CATEGORY_MATCH = "category_match"
+    CATEGORY_MISMATCH = "category_mismatch"
+    BUDGET_OK = "budget_ok"
+    BUDGET_BELOW_MIN = "budget_below_min"
+    BUDGET_ABOVE_MAX = "budget_above_max"
+    INDUSTRY_ELIGIBLE = "industry_eligible"
+    INDUSTRY_NOT_PRIMARY = "industry_not_primary"
+    INDUSTRY_UNRESTRICTED = "industry_unrestricted"
+    REGION_ELIGIBLE = "region_eligible"
+    REGION_NOT_ELIGIBLE = "region_not_eligible"
+    REGION_UNRESTRICTED = "region_unrestricted"
+
+
+class Reason(NamedTuple):
+    """A reason code with its parameters"""
+    code: ReasonCode
+    params: Tuple[Tuple[str, Any], ...] = ()
+
+
+# Codes that describe a missing requirement rather than a scoring reason
+MISSING_REQUIREMENT_CODES = frozenset({
+    ReasonCode.SIZE_NOT_ELIGIBLE,
+    ReasonCode.BUDGET_BELOW_MIN,
+    ReasonCode.BUDGET_ABOVE_MAX,
+    ReasonCode.REGION_NOT_ELIGIBLE,
+})
+
+DEFAULT_LANGUAGE = "en"
+
+MESSAGES: Dict[str, Dict[ReasonCode, str]] = {
+    "en": {
+        ReasonCode.SIZE_ELIGIBLE: "Company size ({size}) is eligible",
+        ReasonCode.SIZE_NOT_ELIGIBLE: "Company size must be one of: {sizes}",
+        ReasonCode.CATEGORY_MATCH: "Project category matches ({category})",
+        ReasonCode.CATEGORY_MISMATCH: "Project category doesn't perfectly match",
+        ReasonCode.BUDGET_OK: "Project budget meets requirements",
+        ReasonCode.BUDGET_BELOW_MIN: "Project budget must be at least {min_budget}",
+        ReasonCode.BUDGET_ABOVE_MAX: "Project budget must not exceed {max_budget}",
+        ReasonCode.INDUSTRY_ELIGIBLE: "Company industry is eligible",
+        ReasonCode.INDUSTRY_NOT_PRIMARY: "Company industry may not be primary target",
+        ReasonCode.INDUSTRY_UNRESTRICTED: "No industry restrictions",
+        ReasonCode.REGION_ELIGIBLE: "Company location is eligible",
+        ReasonCode.REGION_NOT_ELIGIBLE: "Company must be located in: {regions}",
+        ReasonCode.REGION_UNRESTRICTED: "No regional restrictions",
+    },
+    "nl": {
+        ReasonCode.SIZE_ELIGIBLE: "Bedrijfsgrootte ({size}) komt in aanmerking",
+        ReasonCode.SIZE_NOT_ELIGIBLE: "Bedrijfsgrootte moet een van de volgende zijn: {sizes}",
+        ReasonCode.CATEGORY_MATCH: "Projectcategorie komt overeen ({category})",
+        ReasonCode.CATEGORY_MISMATCH: "Projectcategorie komt niet volledig overeen",
+        ReasonCode.BUDGET_OK: "Projectbudget voldoet aan de voorwaarden",
+        ReasonCode.BUDGET_BELOW_MIN: "Projectbudget moet minimaal {min_budget} zijn",
+        ReasonCode.BUDGET_ABOVE_MAX: "Projectbudget mag niet hoger zijn dan {max_budget}",
+        ReasonCode.INDUSTRY_ELIGIBLE: "Branche van het bedrijf komt in aanmerking",
+        ReasonCode.INDUSTRY_NOT_PRIMARY: "Branche van het bedrijf is mogelijk geen primaire doelgroep",
+        ReasonCode.INDUSTRY_UNRESTRICTED: "Geen beperkingen op branche",
+        ReasonCode.REGION_ELIGIBLE: "Vestigingsplaats komt in aanmerking",
+        ReasonCode.REGION_NOT_ELIGIBLE: "Bedrijf moet gevestigd zijn in: {regions}",
+        ReasonCode.REGION_UNRESTRICTED: "Geen regionale beperkingen",
+    },
+}
+
+
+def _format_value(value: Any, language: str) -> str:
+    """Format a reason parameter for display"""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_format_value(v, language) for v in value)
+    if isinstance(value, Enum):
+        return str(value.value)
+    if isinstance(value, float):
+        formatted = f"€{value:,.2f}"
+        if language == "nl":
+            # 12,500.00 -> 12.500,00
+            formatted = formatted.replace(",", "_").replace(".", ",").replace("_", ".")
+        return formatted
+    return str(value)
+
+
+def render_reason(reason: Reason, language: str = DEFAULT_LANGUAGE) -> str:
+    """
+    Render one reason as text.
+
+    Raises:
+        ValueError: Unsupported language
+    """
+    messages = MESSAGES.get(language)
+    if messages is None:
+        raise ValueError(f"Unsupported language: {language} (use {', '.join(MESSAGES)})")
+    params = {name: _format_value(value, language) for name, value in reason.params}
+    return messages[reason.code].format(**params)
+
+
+def render_reasons(
+    reasons: Iterable[Reason],
+    language: str = DEFAULT_LANGUAGE
+) -> Tuple[List[str], List[str]]:
+    """
+    Render reasons as text.
+
+    Args:
+        reasons: Reason codes of one match
+        language: "en" or "nl"
+
+    Returns:
+        (score reasons, missing requirements)
+    """
+    texts: List[str] = []
+    missing: List[str] = []
+    for reason in reasons:
+        target = missing if reason.code in MISSING_REQUIREMENT_CODES else texts
+        target.append(render_reason(reason, language))
+    return texts, missing
@@ -0,0 +1,436 @@
+"""
+MatchingCascade - Tiered resolution of quote lines, LLM only for ambiguous ones.
+
+Every quote line goes through up to three tiers and stops at the first
+that is confident enough:
+
+1. exact: ISDE meldcode or brand + model hit
+2. rules: EIA/MIA code from search whose technical requirements the specs
+   satisfy (or that has none)
+3. llm: the remaining lines with candidate codes are sent to a verifier,
+   within a per-quote call budget, largest potential subsidy first
+
+Lines without any candidate are "unmatched"; ambiguous lines that run out
+of budget or get a low-confidence verdict are "unresolved" and keep their
+rule-based candidates for manual review. Per-tier hit rates show how many
+lines were resolved without an LLM call.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from models.subsidy_schemas import (
+    Equipment,
+    EquipmentMatch,
+    Quote,
+    QuoteAnalysis,
+    SubsidyCalculation,
+    SubsidyScheme
+)
+from services.equipment_matcher import EquipmentMatcher, with_combination
+from services.llm_client import LLMClient, get_llm_client
+from services.match_cache import CachedResolution, MatchCache, get_match_cache
+from services.quote_sessions import line_fingerprint
+from services.requirement_predicates import check_requirements
+from services.subsidy_database import SubsidyDatabase
+
+
+class Tier(str, Enum):
+    """Cascade tier that resolved a line"""
+    EXACT = "exact"
+    RULES = "rules"
+    LLM = "llm"
+    UNMATCHED = "unmatched"
+    UNRESOLVED = "unresolved"
+
+
+# Tiers that resolve a line without an LLM call
+DETERMINISTIC_TIERS = (Tier.EXACT, Tier.RULES, Tier.UNMATCHED)
+
+
+@dataclass
+class CascadeConfig:
+    """Confidence thresholds per tier and the LLM budget"""
+    exact_threshold: float = 0.9   # ISDE hits at or above are final
+    rules_threshold: float = 0.6   # Verified code matches at or above are final
+    llm_threshold: float = 0.7     # LLM verdicts at or above are accepted
+    llm_budget: int = 5            # LLM calls per quote
+
+
+@dataclass
+class Verification:
+    """LLM verdict on the candidate codes of one line"""
+    codes: List[str]   # Candidate codes that apply to the line (may be empty)
+    confidence: float
+    reason: str = ""
+
+
+class LineVerifier(Protocol):
+    """Verifies candidate codes for an ambiguous line"""
+
+    async def verify(
+        self,
+        equipment: Equipment,
+        candidates: List[SubsidyCalculation]
+    ) -> Verification:
+        ...
+
+
+@dataclass
+class CascadeResult:
+    """Analysis of one quote with the tier per line"""
+    analysis: QuoteAnalysis
+    tiers: List[Tier]
+    llm_calls: int
+
+
+@dataclass
+class CascadeMetrics:
+    """Running per-tier counters (thread-safe)"""
+    quotes: int = 0
+    lines: int = 0
+    llm_calls: int = 0
+    llm_errors: int = 0
+    cache_hits: int = 0
+    cached_llm: int = 0
+    by_tier: Dict[Tier, int] = field(default_factory=lambda: {tier: 0 for tier in Tier})
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(
+        self,
+        tiers: List[Tier],
+        llm_calls: int,
+        llm_errors: int,
+        cache_hits: int = 0,
+        cached_llm: int = 0
+    ):
+        """
+        Record one quote.
+
+        Args:
+            tiers: Tier per line
+            llm_calls: Verifier calls made
+            llm_errors: Verifier calls that failed
+            cache_hits: Lines served from the match cache
+            cached_llm: Cache hits that were originally resolved by the LLM
+        """
+        with self._lock:
+            self.quotes += 1
+            self.lines += len(tiers)
+            self.llm_calls += llm_calls
+            self.llm_errors += llm_errors
+            self.cache_hits += cache_hits
+            self.cached_llm += cached_llm
+            for tier in tiers:
+                self.by_tier[tier] += 1
+
+    def as_dict(self) -> Dict[str, object]:
+        """Counts, hit rate per tier and share of lines resolved without LLM"""
+        with self._lock:
+            lines = self.lines or 1
+            # LLM-tier lines served from the match cache needed no call either
+            deterministic = sum(self.by_tier[tier] for tier in DETERMINISTIC_TIERS) + self.cached_llm
+            return {
+                "quotes": self.quotes,
+                "lines": self.lines,
+                "llm_calls": self.llm_calls,
+                "llm_errors": self.llm_errors,
+                "llm_calls_per_quote": round(self.llm_calls / (self.quotes or 1), 3),
+                "cache_hits": self.cache_hits,
+                "tiers": {tier.value: self.by_tier[tier] for tier in Tier},
+                "hit_rates": {tier.value: round(self.by_tier[tier] / lines, 4) for tier in Tier},
+                "resolved_without_llm": round(deterministic / lines, 4),
+            }
+
+
+class MatchingCascade:
+    """Resolves quote lines tier by tier, spending LLM calls only where needed"""
+
+    def __init__(
+        self,
+        matcher: Optional[EquipmentMatcher] = None,
+        verifier: Optional[LineVerifier] = None,
+        config: Optional[CascadeConfig] = None,
+        cache: Optional[MatchCache] = None
+    ):
+        """
+        Initialize cascade
+
+        Args:
+            matcher: Rule-based equipment matcher (default: new matcher on the global database)
+            verifier: LLM verifier for ambiguous lines (None: ambiguous lines stay unresolved)
+            config: Tier thresholds and LLM budget
+            cache: Persistent cache of resolved lines (None: no caching)
+        """
+        self.matcher = matcher or EquipmentMatcher()
+        self.db: SubsidyDatabase = self.matcher.db
+        self.verifier = verifier
+        self.config = config or CascadeConfig()
+        self.cache = cache
+        self.metrics = CascadeMetrics()
+
+    async def analyze_quote(self, quote: Quote) -> CascadeResult:
+        """
+        Analyze a quote through the cascade.
+
+        Args:
+            quote: Extracted quote
+
+        Returns:
+            CascadeResult with the analysis, tier per line and LLM calls made
+        """
+        started = time.perf_counter()
+        lines = quote.equipment
+        matches: List[Optional[EquipmentMatch]] = [None] * len(lines)
+        tiers: List[Tier] = [Tier.UNRESOLVED] * len(lines)
+
+        if self.cache is not None:
+            # One batched read, off the event loop (SQLite/Redis IO blocks)
+            resolutions = await asyncio.to_thread(self.cache.get_many, lines)
+            for i, (equipment, cached) in enumerate(zip(lines, resolutions)):
+                if cached is not None:
+                    matches[i] = self.matcher.match_codes(
+                        equipment, cached.isde_meldcode, cached.eia_codes,
+                        cached.mia_codes, cached.confidence, cached.notes
+                    )
+                    tiers[i] = Tier(cached.tier)
+        misses = [i for i, match in enumerate(matches) if match is None]
+        cache_hits = len(lines) - len(misses)
+
+        for i, match in zip(misses, await self.matcher.match_lines([lines[i] for i in misses])):
+            matches[i] = match
+            tiers[i] = self.classify(match)
+
+        llm_calls, llm_errors = 0, 0
+        ambiguous = [i for i in misses if tiers[i] == Tier.UNRESOLVED]
+        if ambiguous and self.verifier is not None and self.config.llm_budget > 0:
+            llm_calls, llm_errors = await self._verify(matches, tiers, ambiguous)
+
+        if self.cache is not None:
+            resolved = [
+                (lines[i], CachedResolution.from_match(matches[i], tiers[i].value))
+                for i in misses if tiers[i] != Tier.UNRESOLVED
+            ]
+            if resolved:
+                await asyncio.to_thread(self.cache.put_many, resolved)
+
+        for i, tier in enumerate(tiers):
+            if tier == Tier.UNRESOLVED:
+                matches[i] = _with_note(matches[i], "Ambiguous match, needs manual review")
+            matches[i] = matches[i].model_copy(update={"resolved_by": tier.value})
+
+        missed = set(misses)
+        cached_llm = sum(1 for i, tier in enumerate(tiers) if tier == Tier.LLM and i not in missed)
+        self.metrics.record(tiers, llm_calls, llm_errors, cache_hits, cached_llm)
+        analysis = self.matcher.build_analysis(quote, matches, started)
+        return CascadeResult(analysis=analysis, tiers=tiers, llm_calls=llm_calls)
+
+    # ========================================================================
+    # DETERMINISTIC TIERS
+    # ========================================================================
+
+    def classify(self, match: EquipmentMatch) -> Tier:
+        """Tier that resolves a line without LLM, or UNRESOLVED if it is ambiguous"""
+        if match.isde_matches and match.confidence >= self.config.exact_threshold:
+            return Tier.EXACT
+        if not (match.eia_matches or match.mia_matches or match.vamil_matches):
+            return Tier.UNMATCHED
+        if match.confidence >= self.config.rules_threshold and self._requirements_decided(match):
+            return Tier.RULES
+        return Tier.UNRESOLVED
+
+    def _requirements_decided(self, match: EquipmentMatch) -> bool:
+        """Whether the best code's requirements are all confirmed by the specs"""
+        best = _best_code(match)
+        if best.scheme == SubsidyScheme.EIA:
+            predicates = self.db.get_eia_requirements(best.code)
+        else:
+            predicates = self.db.get_mia_requirements(best.code)
+        return check_requirements(predicates, match.equipment.specs).status in ("pass", "none")
+
+    # ========================================================================
+    # LLM TIER
+    # ========================================================================
+
+    async def _verify(
+        self,
+        matches: List[EquipmentMatch],
+        tiers: List[Tier],
+        ambiguous: List[int]
+    ) -> Tuple[int, int]:
+        """Verify ambiguous lines within budget; identical lines share one call"""
+        groups: Dict[str, List[int]] = {}
+        for i in ambiguous:
+            groups.setdefault(line_fingerprint(matches[i].equipment), []).append(i)
+
+        # Spend the budget where the most subsidy is at stake
+        ranked = sorted(groups.values(), key=lambda lines: -_potential(matches[lines[0]]))
+        selected = ranked[:self.config.llm_budget]
+
+        results = await asyncio.gather(
+            *(self.verifier.verify(matches[lines[0]].equipment, _code_candidates(matches[lines[0]]))
+              for lines in selected),
+            return_exceptions=True
+        )
+
+        errors = 0
+        for lines, result in zip(selected, results):
+            if isinstance(result, Exception):
+                errors += 1
+                continue
+            if result.confidence < self.config.llm_threshold:
+                continue
+            for i in lines:
+                matches[i] = self._apply(matches[i], result)
+                tiers[i] = Tier.LLM
+        return len(selected), errors
+
+    def _apply(self, match: EquipmentMatch, verification: Verification) -> EquipmentMatch:
+        """Keep only the codes the verifier confirmed"""
+        confirmed = set(verification.codes)
+        update = {
+            "eia_matches": [c for c in match.eia_matches if c.code in confirmed],
+            "mia_matches": [c for c in match.mia_matches if c.code in confirmed],
+            "vamil_matches": [c for c in match.vamil_matches if c.code in confirmed],
+            "confidence": verification.confidence,
+            "match_notes": match.match_notes + [
+                f"Verified by LLM: {', '.join(sorted(confirmed)) or 'no code applies'}"
+                + (f" ({verification.reason})" if verification.reason else "")
+            ],
+        }
+        verified = match.model_copy(update=update)
+        return with_combination(verified, self.matcher.optimizer.optimize_line(verified))
+
+
+class ClaudeVerifier:
+    """LineVerifier backed by Claude"""
+
+    def __init__(
+        self,
+        api_key: str,
+        db: SubsidyDatabase,
+        model: str = "claude-sonnet-4-20250514",
+        max_description_chars: int = 600,
+        llm: Optional[LLMClient] = None
+    ):
+        """
+        Initialize verifier
+
+        Args:
+            api_key: Anthropic API key
+            db: Subsidy database (code descriptions for the prompt)
+            model: Claude model
+            max_description_chars: Description length per candidate in the prompt
+            llm: Shared async LLM client (default: a client of its own for api_key)
+        """
+        self.llm = llm or LLMClient(api_key)
+        self.db = db
+        self.model = model
+        self.max_description_chars = max_description_chars
+
+    async def verify(
+        self,
+        equipment: Equipment,
+        candidates: List[SubsidyCalculation]
+    ) -> Verification:
+        message = await self.llm.create(
+            model=self.model,
+            max_tokens=512,
+            messages=[{"role": "user", "content": self._build_prompt(equipment, candidates)}]
+        )
+        return parse_verification(message.content[0].text)
+
+    def _build_prompt(self, equipment: Equipment, candidates: List[SubsidyCalculation]) -> str:
+        lines = []
+        for calculation in candidates:
+            if calculation.scheme == SubsidyScheme.EIA:
+                code = self.db.get_eia_by_code(calculation.code)
+            else:
+                code = self.db.get_mia_by_code(calculation.code)
+            description = (code.description or "") if code else ""
+            lines.append(
+                f"- {calculation.scheme.value} {calculation.code}: {calculation.title}\n"
+                f"  {description[:self.max_description_chars]}"
+            )
+
+        specs = json.dumps(equipment.specs, ensure_ascii=False)
+        return f"""
+Je controleert of een offerteregel onder een EIA- of MIA/Vamil-code valt.
+
+Offerteregel:
+- Omschrijving: {equipment.description}
+- Merk/model: {equipment.brand or '-'} {equipment.model or ''}
+- Specificaties: {specs}
+
+Kandidaat-codes:
+{chr(10).join(lines)}
+
+Return ALLEEN valid JSON:
+{{"codes": ["<codes die van toepassing zijn>"], "confidence": 0.0-1.0, "reason": "<korte uitleg>"}}
+"""
+
+
+def parse_verification(text: str) -> Verification:
+    """
+    Parse a verifier response.
+
+    Raises:
+        ValueError: No valid JSON object in the response
+    """
+    found = re.search(r"\{.*\}", text, re.DOTALL)
+    if not found:
+        raise ValueError("No JSON object in verifier response")
+    data = json.loads(found.group(0))
+    return Verification(
+        codes=[str(code) for code in data.get("codes", [])],
+        confidence=min(max(float(data.get("confidence", 0.0)), 0.0), 1.0),
+        reason=str(data.get("reason", ""))
+    )
+
+
+def _code_candidates(match: EquipmentMatch) -> List[SubsidyCalculation]:
+    """EIA and MIA candidates of a line (Vamil shares the MIA code)"""
+    seen = {c.code for c in match.mia_matches}
+    return match.eia_matches + match.mia_matches + [c for c in match.vamil_matches if c.code not in seen]
+
+
+def _best_code(match: EquipmentMatch) -> SubsidyCalculation:
+    return (match.eia_matches or match.mia_matches or match.vamil_matches)[0]
+
+
+def _potential(match: EquipmentMatch) -> float:
+    return max(c.subsidy_amount for c in _code_candidates(match))
+
+
+def _with_note(match: EquipmentMatch, note: str) -> EquipmentMatch:
+    return match.model_copy(update={"match_notes": match.match_notes + [note]})
+
+
+# Global instance (singleton pattern)
+_cascade_instance: Optional[MatchingCascade] = None
+
+
+def get_matching_cascade() -> MatchingCascade:
+    """
+    Get the global MatchingCascade instance (singleton).
+
+    Uses Claude as verifier when ANTHROPIC_API_KEY is set; without a key
+    ambiguous lines are left unresolved. Resolved lines go to the global
+    match cache.
+    """
+    global _cascade_instance
+
+    if _cascade_instance is None:
+        matcher = EquipmentMatcher()
+        api_key = os.getenv("ANTHROPIC_API_KEY", "")
+        verifier = ClaudeVerifier(api_key, matcher.db, llm=get_llm_client()) if api_key else None
+        _cascade_instance = MatchingCascade(matcher, verifier, cache=get_match_cache())
+
+    return _cascade_instance
@@ -0,0 +1,201 @@
+"""
+ParetoFrontiers - Non-dominated ISDE meldcodes per category and type.
+
+For "max subsidy vs. min cost" advice most catalog rows are dominated:
+another product of the same type gets at least the same subsidy and is at
+least as good on every other criterion. Per group (category + type, and
+woning_type for per-m² measures) only the Pareto-optimal rows are kept:
+
+- warmtepomp: amount ↑, power_kw ↓ (smaller unit, lower cost), GWP ↓
+- isolatie: amount ↑, min_rd ↑, min_dikte_mm ↓
+- hoogrendementsglas: amount ↑, max_u ↓
+- zonneboiler: amount ↑, jaarproductie_kwh ↑
+
+Frontiers are built with the catalog snapshot and sorted by the group's
+main technical attribute, so the segment near a quoted product is a binary
+search plus a slice of tens of rows.
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from models.subsidy_schemas import ISDECategory, ISDEMeldcode
+from services.catalog_snapshot import CatalogSnapshot
+
+if TYPE_CHECKING:
+    from services.subsidy_database import SubsidyDatabase
+
+
+# Objectives per category: (attribute, maximise?); the second one orders the frontier
+OBJECTIVES: Dict[ISDECategory, Tuple[Tuple[str, bool], ...]] = {
+    ISDECategory.WARMTEPOMP: (("amount", True), ("power_kw", False), ("gwp", False)),
+    ISDECategory.ISOLATIE: (("amount", True), ("min_rd", True), ("min_dikte_mm", False)),
+    ISDECategory.HOOGRENDEMENTSGLAS: (("amount", True), ("max_u", False)),
+    ISDECategory.ZONNEBOILER: (("amount", True), ("jaarproductie_kwh", True)),
+}
+
+# Snapshot artefact names
+_GROUPS = "pareto.groups"
+_MELDCODES = "pareto.meldcodes"
+
+# Rows compared per block in the dominance check (bounds memory to block x n x k)
+_BLOCK = 256
+
+
+def group_key(entry: ISDEMeldcode) -> str:
+    """Frontier group of a meldcode: category, type and (per m²) woning_type"""
+    attributes = entry.attributes
+    if entry.category == ISDECategory.WARMTEPOMP:
+        parts = [attributes.get("type")]
+    elif entry.category == ISDECategory.ZONNEBOILER:
+        parts = [attributes.get("oppervlakte")]
+    else:
+        parts = [attributes.get("category_detail"), attributes.get("woning_type")]
+    return "|".join([entry.category.value] + [str(p or "") for p in parts])
+
+
+def objective_value(entry: ISDEMeldcode, attribute: str) -> float:
+    """Objective value of an entry (NaN when unknown)"""
+    if attribute == "amount":
+        if entry.amount_eur is not None:
+            return entry.amount_eur
+        return (entry.amounts or {}).get("enkel") or 0.0
+    value = entry.attributes.get(attribute)
+    return float(value) if value is not None else np.nan
+
+
+def pareto_mask(values: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated rows of a cost matrix (all objectives minimised).
+
+    A row is dominated if another row is <= on every objective and < on
+    at least one. Identical rows do not dominate each other.
+
+    Args:
+        values: (n, k) array
+
+    Returns:
+        Boolean mask of Pareto-optimal rows
+    """
+    # Many meldcodes share the same values: compare distinct rows only
+    unique, inverse = np.unique(values, axis=0, return_inverse=True)
+    n = unique.shape[0]
+    dominated = np.zeros(n, dtype=bool)
+    for start in range(0, n, _BLOCK):
+        block = unique[start:start + _BLOCK, None, :]
+        no_worse = (unique[None, :, :] <= block).all(axis=2)
+        better = (unique[None, :, :] < block).any(axis=2)
+        dominated[start:start + _BLOCK] = (no_worse & better).any(axis=1)
+    return ~dominated[inverse.ravel()]
+
+
+class ParetoFrontiers:
+    """Pareto-optimal meldcodes per group, sorted by the main technical attribute"""
+
+    def __init__(self, frontiers: Dict[str, List[ISDEMeldcode]]):
+        """
+        Args:
+            frontiers: Group key -> frontier entries
+        """
+        self.frontiers: Dict[str, List[ISDEMeldcode]] = {}
+        self._coordinates: Dict[str, List[float]] = {}
+        self._optimal = set()
+        for group, entries in frontiers.items():
+            attribute = OBJECTIVES[entries[0].category][1][0]
+            entries = sorted(entries, key=lambda e: (_sortable(objective_value(e, attribute)), e.meldcode))
+            self.frontiers[group] = entries
+            self._coordinates[group] = [_sortable(objective_value(e, attribute)) for e in entries]
+            self._optimal.update(e.meldcode for e in entries)
+
+    @classmethod
+    def build(cls, entries: Sequence[ISDEMeldcode]) -> "ParetoFrontiers":
+        """Compute the frontiers of all ISDE entries"""
+        groups: Dict[str, List[ISDEMeldcode]] = {}
+        for entry in entries:
+            if entry.category in OBJECTIVES:
+                groups.setdefault(group_key(entry), []).append(entry)
+
+        frontiers = {}
+        for group, members in groups.items():
+            objectives = OBJECTIVES[members[0].category]
+            values = np.array([
+                [objective_value(e, attribute) for attribute, _ in objectives] for e in members
+            ], dtype=np.float64)
+            # Minimise everything; unknown values are worst
+            values *= np.array([-1.0 if maximise else 1.0 for _, maximise in objectives])
+            values[np.isnan(values)] = np.inf
+            mask = pareto_mask(values)
+            frontiers[group] = [e for e, keep in zip(members, mask) if keep]
+        return cls(frontiers)
+
+    @classmethod
+    def build_from_database(cls, db: "SubsidyDatabase") -> "ParetoFrontiers":
+        entries = []
+        for category in OBJECTIVES:
+            entries.extend(db.get_isde_by_category(category))
+        return cls.build(entries)
+
+    # ========================================================================
+    # SNAPSHOT
+    # ========================================================================
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot, db: "SubsidyDatabase") -> Optional["ParetoFrontiers"]:
+        """Load the frontiers from a catalog snapshot, or None if not present"""
+        if not (snapshot.has(_GROUPS) and snapshot.has(_MELDCODES)):
+            return None
+        frontiers: Dict[str, List[ISDEMeldcode]] = {}
+        for group, meldcode in zip(snapshot.get(_GROUPS), snapshot.get(_MELDCODES)):
+            entry = db.get_isde_by_meldcode(str(meldcode))
+            if entry is None:
+                return None
+            frontiers.setdefault(str(group), []).append(entry)
+        return cls(frontiers)
+
+    def to_snapshot(self, snapshot: CatalogSnapshot):
+        """Store the frontiers in a catalog snapshot (group and meldcode per row)"""
+        rows = [(group, e.meldcode) for group, entries in self.frontiers.items() for e in entries]
+        snapshot.put(_GROUPS, np.array([group for group, _ in rows], dtype=str))
+        snapshot.put(_MELDCODES, np.array([meldcode for _, meldcode in rows], dtype=str))
+
+    # ========================================================================
+    # QUERYING
+    # ========================================================================
+
+    def frontier(self, entry: ISDEMeldcode) -> List[ISDEMeldcode]:
+        """Full frontier of the entry's group"""
+        return self.frontiers.get(group_key(entry), [])
+
+    def is_optimal(self, entry: ISDEMeldcode) -> bool:
+        """Whether no product of the same group dominates the entry"""
+        return entry.meldcode in self._optimal
+
+    def near(self, entry: ISDEMeldcode, size: int = 5) -> List[ISDEMeldcode]:
+        """
+        Frontier segment around a product.
+
+        Args:
+            entry: Quoted product
+            size: Number of frontier rows to return
+
+        Returns:
+            Up to `size` frontier entries closest to the product on the
+            group's main attribute (power, Rd, U-value, yield), in order
+        """
+        group = group_key(entry)
+        entries = self.frontiers.get(group)
+        if not entries or size <= 0:
+            return []
+        attribute = OBJECTIVES[entry.category][1][0]
+        position = bisect_left(self._coordinates[group], _sortable(objective_value(entry, attribute)))
+        start = min(max(position - size // 2, 0), max(len(entries) - size, 0))
+        return entries[start:start + size]
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.frontiers.values())
+
+
+def _sortable(value: float) -> float:
+    return np.inf if np.isnan(value) else value
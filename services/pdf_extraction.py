@@ -0,0 +1,371 @@
+"""
+PdfExtractor - Page-parallel PDF text and table extraction.
+
+pdfplumber is pure Python and CPU bound (~0.1 s per page), so a quote
+of tens of pages blocks whichever thread runs it. Pages are extracted on
+a bounded process pool instead:
+
+- Uploads are spooled to a temporary file in chunks, so a large PDF is
+  never held in memory twice; workers open the file themselves and keep
+  the last document open for the following pages
+- Every page is a separate task with its own timeout (SIGALRM in the
+  worker where available), so one pathological page costs one page
+- Documents are capped at max_pages
+- The async variant awaits the pool futures, so the event loop is free
+  while pages are extracted
+
+Per page the layout-preserving text, the tables and the extraction time
+are returned.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Iterator, List, Optional, Tuple, Union
+
+
+# Bytes read per chunk when spooling an upload
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Extra wall-clock time allowed per page on top of the worker-side timeout
+_TIMEOUT_SLACK_SECONDS = 5.0
+
+Table = List[List[Optional[str]]]
+PdfSource = Union[bytes, str, Path, BinaryIO]
+
+
+@dataclass
+class PageText:
+    """Extraction result of one page"""
+    number: int                      # 1-based page number
+    text: str = ""
+    tables: List[Table] = field(default_factory=list)
+    seconds: float = 0.0
+    error: Optional[str] = None      # "timeout" or the exception message
+
+
+@dataclass
+class PdfExtraction:
+    """Extraction result of one document"""
+    pages: List[PageText]
+    page_count: int                  # Pages in the document
+    truncated: bool                  # More pages than max_pages
+    seconds: float
+
+    @property
+    def text(self) -> str:
+        """Text of all extracted pages, with page markers"""
+        return "\n".join(f"=== PAGE {page.number} ===\n{page.text}" for page in self.pages if page.text)
+
+    @property
+    def failed_pages(self) -> List[int]:
+        return [page.number for page in self.pages if page.error]
+
+
+class PageTimeout(Exception):
+    """Raised inside a worker when a page takes longer than its timeout"""
+
+
+class PdfExtractor:
+    """Extracts PDF pages on a bounded process pool"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        page_timeout: float = 10.0,
+        max_pages: int = 50,
+        layout: bool = True,
+        extract_tables: bool = True
+    ):
+        """
+        Initialize extractor
+
+        Args:
+            max_workers: Worker processes (default: CPU count)
+            page_timeout: Seconds allowed per page
+            max_pages: Pages extracted per document (the rest is skipped)
+            layout: Keep the page layout (column alignment) in the text
+            extract_tables: Also extract tables per page
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.page_timeout = page_timeout
+        self.max_pages = max_pages
+        self.layout = layout
+        self.extract_tables = extract_tables
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Process pool, started on first use"""
+        if self._executor is None:
+            # spawn: forking a process that runs thread pools is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    # ========================================================================
+    # EXTRACTION
+    # ========================================================================
+
+    def extract(self, source: PdfSource) -> PdfExtraction:
+        """
+        Extract a PDF (blocking; for scripts and worker threads).
+
+        Args:
+            source: PDF bytes, a path, or a binary file object (read in chunks)
+
+        Returns:
+            PdfExtraction with one PageText per extracted page
+
+        Raises:
+            ValueError: The source is not a readable PDF
+        """
+        started = time.perf_counter()
+        with _spooled(source) as path:
+            page_count = self._page_count(path)
+            futures = self._submit(path, page_count)
+            deadline = self._deadline(len(futures))
+            pages = [self._result(number, future, deadline) for number, future in futures]
+        return self._extraction(pages, page_count, started)
+
+    async def extract_async(self, source: Union[PdfSource, Any]) -> PdfExtraction:
+        """
+        Extract a PDF without blocking the event loop.
+
+        Args:
+            source: PDF bytes, a path, a binary file object, or an object with
+                an async read(size) such as FastAPI's UploadFile
+
+        Returns:
+            PdfExtraction with one PageText per extracted page
+
+        Raises:
+            ValueError: The source is not a readable PDF
+        """
+        started = time.perf_counter()
+        if hasattr(source, "read") and asyncio.iscoroutinefunction(source.read):
+            path = await _spool_async(source)
+            owned = True
+        else:
+            path, owned = await asyncio.get_running_loop().run_in_executor(None, _spool, source)
+
+        try:
+            page_count = await asyncio.wrap_future(self.executor.submit(_page_count, str(path)))
+            futures = self._submit(path, page_count)
+            timeout = max(self._deadline(len(futures)) - time.monotonic(), 0.0)
+            pages = await asyncio.gather(*(
+                self._result_async(number, future, timeout) for number, future in futures
+            ))
+        finally:
+            if owned:
+                _remove(path)
+        return self._extraction(list(pages), page_count, started)
+
+    def _page_count(self, path: Path) -> int:
+        return self.executor.submit(_page_count, str(path)).result()
+
+    def _submit(self, path: Path, page_count: int) -> List[Tuple[int, Future]]:
+        return [
+            (number, self.executor.submit(
+                _extract_page, str(path), number, self.layout, self.extract_tables, self.page_timeout
+            ))
+            for number in range(1, min(page_count, self.max_pages) + 1)
+        ]
+
+    def _deadline(self, pages: int) -> float:
+        """Wall-clock limit for a document: pages queue behind each other per worker"""
+        rounds = math.ceil(pages / self.max_workers) if pages else 0
+        return time.monotonic() + rounds * self.page_timeout + _TIMEOUT_SLACK_SECONDS
+
+    @staticmethod
+    def _result(number: int, future: Future, deadline: float) -> PageText:
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0.0))
+        except FutureTimeoutError:
+            future.cancel()
+            return PageText(number=number, error="timeout")
+
+    @staticmethod
+    async def _result_async(number: int, future: Future, timeout: float) -> PageText:
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            return PageText(number=number, error="timeout")
+
+    def _extraction(self, pages: List[PageText], page_count: int, started: float) -> PdfExtraction:
+        return PdfExtraction(
+            pages=pages,
+            page_count=page_count,
+            truncated=page_count > self.max_pages,
+            seconds=time.perf_counter() - started
+        )
+
+
+# ============================================================================
+# SPOOLING
+# ============================================================================
+
+@contextmanager
+def _spooled(source: PdfSource) -> Iterator[Path]:
+    """File path for a source (a temporary file unless it is a path)"""
+    path, owned = _spool(source)
+    try:
+        yield path
+    finally:
+        if owned:
+            _remove(path)
+
+
+def _spool(source: PdfSource) -> Tuple[Path, bool]:
+    """(path, whether it is a temporary file) for a PDF source"""
+    if isinstance(source, (str, Path)):
+        return Path(source), False
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            spool.write(source)
+        else:
+            shutil.copyfileobj(source, spool, SPOOL_CHUNK_SIZE)
+    return Path(spool.name), True
+
+
+async def _spool_async(upload: Any, digest: Optional[Any] = None) -> Path:
+    """
+    Spool an object with an async read(size) to a temporary file, chunk by
+    chunk, feeding each chunk to digest (a hashlib object) if given
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+        while True:
+            chunk = await upload.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+    return Path(spool.name)
+
+
+@asynccontextmanager
+async def spooled_upload(upload: Any, digest: Optional[Any] = None) -> AsyncIterator[Path]:
+    """
+    Temporary file with an upload's content, removed afterwards.
+
+    The upload is read in chunks and hashed on the way (see _spool_async),
+    so its bytes are never held in memory at once.
+    """
+    path = await _spool_async(upload, digest)
+    try:
+        yield path
+    finally:
+        _remove(path)
+
+
+def _remove(path: Path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+# Document kept open by a worker process: (path, mtime, pdfplumber.PDF)
+_open_document: Optional[Tuple[str, float, Any]] = None
+
+
+def _document(path: str):
+    """Open a PDF in the worker, reusing it for consecutive pages of the same file"""
+    global _open_document
+    import pdfplumber
+
+    mtime = os.stat(path).st_mtime
+    if _open_document is not None:
+        open_path, open_mtime, pdf = _open_document
+        if open_path == path and open_mtime == mtime:
+            return pdf
+        _close_document()
+    pdf = pdfplumber.open(path)
+    _open_document = (path, mtime, pdf)
+    return pdf
+
+
+def _close_document():
+    global _open_document
+    if _open_document is not None:
+        _open_document[2].close()
+        _open_document = None
+
+
+def _page_count(path: str) -> int:
+    try:
+        return len(_document(path).pages)
+    except Exception as e:
+        raise ValueError(f"Not a readable PDF: {e}") from None
+
+
+def _on_alarm(signum, frame):
+    raise PageTimeout()
+
+
+def _extract_page(path: str, number: int, layout: bool, tables: bool, timeout: float) -> PageText:
+    """Extract one page (runs in a worker process)"""
+    started = time.perf_counter()
+    alarm = hasattr(signal, "setitimer")
+    if alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        page = _document(path).pages[number - 1]
+        result = PageText(
+            number=number,
+            text=page.extract_text(layout=layout) or "",
+            tables=page.extract_tables() if tables else []
+        )
+    except PageTimeout:
+        # The parser may be half-way through shared state: start over next time
+        _close_document()
+        result = PageText(number=number, error="timeout")
+    except Exception as e:
+        result = PageText(number=number, error=str(e) or type(e).__name__)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+# Global instance (singleton pattern)
+_extractor_instance: Optional[PdfExtractor] = None
+
+
+def get_pdf_extractor() -> PdfExtractor:
+    """
+    Get the global PdfExtractor instance (singleton).
+
+    Worker processes start on the first extraction and are reused afterwards.
+    """
+    global _extractor_instance
+
+    if _extractor_instance is None:
+        _extractor_instance = PdfExtractor()
+
+    return _extractor_instance
@@ -0,0 +1,280 @@
+"""
+PortfolioScreener - Bulk screening of SubsidyMatchRequests.
+
+Account managers screen entire customer books (10k+ requests) overnight.
+The screener streams requests from JSONL or CSV, evaluates them across a
+process pool against one preloaded rule set and streams the results back
+out as JSONL:
+
+- Rules are loaded once and handed to each worker at startup
+- Requests travel in chunks; parsing and matching happen in the workers
+- The number of chunks in flight is bounded, so memory stays flat
+  regardless of input size, and output keeps the input order
+"""
+
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+
+from models.schemas import SubsidyMatchRequest, SubsidyRule
+from services.subsidy_matcher import SubsidyMatcher
+
+
+# (line number, raw JSON string or CSV row dict)
+RawRecord = Tuple[int, Any]
+
+
+@dataclass
+class ScreeningStats:
+    """Throughput and progress metrics for a screening run"""
+    processed: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def requests_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "requests_per_second": round(self.requests_per_second, 1)
+        }
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def read_requests(path: Path) -> Iterator[RawRecord]:
+    """
+    Stream raw requests from a JSONL or CSV file.
+
+    JSONL: one SubsidyMatchRequest JSON object per line.
+    CSV: one request per row, with dotted headers for nested fields
+    (e.g. "company.name", "project.budget").
+
+    Args:
+        path: Input file (.jsonl/.ndjson or .csv)
+
+    Yields:
+        (line number, raw record) tuples; parsing happens in the workers
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix in (".jsonl", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, line
+    elif suffix == ".csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    else:
+        raise ValueError(f"Unsupported input format: {path.suffix} (use .jsonl or .csv)")
+
+
+def _unflatten(row: Dict[str, str]) -> Dict[str, Any]:
+    """Turn dotted CSV columns into a nested dict, dropping empty cells"""
+    nested: Dict[str, Any] = {}
+    for key, value in row.items():
+        if key is None or value is None or value == "":
+            continue
+        target = nested
+        *parents, leaf = key.strip().split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return nested
+
+
+def _parse_request(raw: Any) -> SubsidyMatchRequest:
+    """Validate a raw JSONL line or CSV row"""
+    if isinstance(raw, str):
+        return SubsidyMatchRequest.model_validate_json(raw)
+    return SubsidyMatchRequest.model_validate(_unflatten(raw))
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+_worker_matcher: Optional[SubsidyMatcher] = None
+
+
+def _init_worker(rules: List[SubsidyRule], api_key: str):
+    """Process pool initializer: compile the shared rule set once per worker"""
+    global _worker_matcher
+    _worker_matcher = SubsidyMatcher(api_key=api_key, rules=rules)
+
+
+def _screen_chunk(
+    chunk: List[RawRecord],
+    limit: Optional[int],
+    include_near_misses: bool = False
+) -> Tuple[List[str], int]:
+    """
+    Screen a chunk of raw requests.
+
+    Returns:
+        (JSONL output lines, number of failed requests)
+    """
+    lines = []
+    failed = 0
+    for line_no, raw in chunk:
+        try:
+            request = _parse_request(raw)
+            response = _worker_matcher.match_subsidies_sync(
+                request, limit=limit, include_near_misses=include_near_misses
+            )
+            record = {"line": line_no, **response.model_dump(mode="json")}
+        except (ValidationError, ValueError) as e:
+            failed += 1
+            record = {"line": line_no, "error": str(e)}
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return lines, failed
+
+
+def _chunked(records: Iterable[RawRecord], size: int) -> Iterator[List[RawRecord]]:
+    chunk: List[RawRecord] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ============================================================================
+# SCREENER
+# ============================================================================
+
+class PortfolioScreener:
+    """Screens streams of match requests across a process pool"""
+
+    def __init__(
+        self,
+        rules: List[SubsidyRule],
+        workers: Optional[int] = None,
+        chunk_size: int = 100,
+        limit: Optional[int] = 10,
+        include_near_misses: bool = False,
+        api_key: str = "",
+        max_pending_chunks: Optional[int] = None,
+        progress_every: int = 1000,
+        on_progress: Optional[Callable[[ScreeningStats], None]] = None
+    ):
+        """
+        Initialize screener
+
+        Args:
+            rules: Preloaded subsidy rules shared by all workers
+            workers: Worker processes (None = CPU count, 1 = in-process)
+            chunk_size: Requests per task sent to a worker
+            limit: Matches to keep per request (None = all)
+            include_near_misses: Also list rules failing one hard constraint
+            api_key: Anthropic API key for the worker matchers
+            max_pending_chunks: Chunks in flight (default 4 per worker)
+            progress_every: Report progress every N processed requests
+            on_progress: Progress callback receiving ScreeningStats
+        """
+        self.rules = rules
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.limit = limit
+        self.include_near_misses = include_near_misses
+        self.api_key = api_key
+        self.max_pending_chunks = max_pending_chunks
+        self.progress_every = progress_every
+        self.on_progress = on_progress
+        self.stats = ScreeningStats()
+
+    def screen(self, records: Iterable[RawRecord]) -> Iterator[str]:
+        """
+        Screen raw requests and stream JSONL result lines in input order.
+
+        Args:
+            records: (line number, raw record) tuples, e.g. from read_requests()
+
+        Yields:
+            One JSON line per request (match response or error)
+        """
+        self.stats = ScreeningStats()
+        chunks = _chunked(records, self.chunk_size)
+
+        if self.workers == 1:
+            _init_worker(self.rules, self.api_key)
+            for chunk in chunks:
+                result = _screen_chunk(chunk, self.limit, self.include_near_misses)
+                yield from self._collect(result)
+            return
+
+        workers = self.workers or os.cpu_count() or 1
+        max_pending = self.max_pending_chunks or 4 * workers
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.rules, self.api_key)
+        ) as pool:
+            pending: Deque[Future] = deque()
+
+            for chunk in chunks:
+                pending.append(pool.submit(
+                    _screen_chunk, chunk, self.limit, self.include_near_misses
+                ))
+                if len(pending) >= max_pending:
+                    yield from self._collect(pending.popleft().result())
+
+            while pending:
+                yield from self._collect(pending.popleft().result())
+
+    def screen_file(self, input_path: Path, output: TextIO) -> ScreeningStats:
+        """
+        Screen a JSONL/CSV file and write JSONL results.
+
+        Args:
+            input_path: Input file
+            output: Text stream for the JSONL results
+
+        Returns:
+            Final ScreeningStats
+        """
+        for line in self.screen(read_requests(input_path)):
+            output.write(line)
+            output.write("\n")
+        if self.on_progress:
+            self.on_progress(self.stats)
+        return self.stats
+
+    def _collect(self, result: Tuple[List[str], int]) -> Iterator[str]:
+        """Update stats for a finished chunk and yield its lines"""
+        lines, failed = result
+        before = self.stats.processed
+        self.stats.processed += len(lines)
+        self.stats.failed += failed
+
+        if self.on_progress and self.progress_every > 0:
+            if self.stats.processed // self.progress_every > before // self.progress_every:
+                self.on_progress(self.stats)
+
+        yield from lines
@@ -0,0 +1,616 @@
+"""
+QuoteParser - Rule-based parsing of offerte line items and totals.
+
+Most Dutch installer quotes use one of a few layouts: rows under an
+"Aantal / Omschrijving / Prijs / Totaal" header (columns in any order),
+followed by "Subtotaal", "BTW 21%" and "Totaal incl. BTW". Those are
+parsed without an LLM, from the pdfplumber tables when the PDF has ruled
+tables and from the layout text otherwise:
+
+- Table rows are split into cells, text rows into words (layout text
+  does not keep column gaps reliably); amounts are read in Dutch
+  notation ("€ 1.234,56", "1.234,-") from the right, the quantity
+  ("2", "2 st", "80 m2") from the left or just before the amounts
+- Labour, transport and discounts count towards the subtotal but are
+  not equipment
+- Every row gets a confidence: quantity × price = total, a recognised
+  header and a meaningful description raise it
+
+The line totals are checked against the subtotal and the VAT against
+the total including VAT, so the caller can send only the low-confidence
+lines to the LLM, or the whole document when the totals do not add up.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.subsidy_schemas import Equipment, EquipmentCategory, Quote
+from services.pdf_extraction import PdfExtraction
+from services.requirement_predicates import parse_number
+
+
+# Bump when parsing changes: extractions cached with an older parser are not served
+PARSER_VERSION = "2"
+
+# Lines below this confidence are sent to the LLM
+MIN_LINE_CONFIDENCE = 0.8
+
+# Quantity units; area units make the line a surface (quantity 1, specs.area_m2)
+QUANTITY_UNITS = {"st": "st", "stk": "st", "stuk": "st", "stuks": "st", "x": "st", "pcs": "st",
+                  "set": "st", "sets": "st", "m2": "m2", "m²": "m2", "m1": "m", "m": "m", "mtr": "m"}
+
+# Header words per column role (checked in this order: "totaalprijs" is a total)
+COLUMN_HEADERS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("total", ("totaal", "bedrag", "regeltotaal")),
+    ("unit_price", ("prijs", "stukprijs", "eenheidsprijs", "p/st", "à", "per stuk")),
+    ("quantity", ("aantal", "aant", "qty", "hoeveelheid", "stuks")),
+    ("unit", ("eenheid", "eh")),
+    ("description", ("omschrijving", "omschr", "artikel", "product", "beschrijving", "specificatie", "onderdeel")),
+)
+
+# Rows that are not equipment (first word of the description)
+NON_EQUIPMENT = re.compile(
+    r"^(montage|arbeid|arbeidsloon|installatie(?:kosten|werkzaamheden)?|uren|manuren|voorrijkosten"
+    r"|transport(?:kosten)?|afvoer|afvoeren|klein\s*materiaal|steiger(?:werk)?|leges|korting|administratie)\b",
+    re.IGNORECASE
+)
+
+# Description words -> equipment category
+CATEGORY_KEYWORDS: Tuple[Tuple[str, EquipmentCategory], ...] = (
+    ("warmtepomp", EquipmentCategory.WARMTEPOMP),
+    ("zonneboiler", EquipmentCategory.ZONNEBOILER),
+    ("isolatie", EquipmentCategory.ISOLATIE),
+    ("glas", EquipmentCategory.GLAS),
+    ("beglazing", EquipmentCategory.GLAS),
+    ("led", EquipmentCategory.LED_VERLICHTING),
+    ("ventilatie", EquipmentCategory.VENTILATIE),
+    ("wtw", EquipmentCategory.VENTILATIE),
+    ("laadpaal", EquipmentCategory.ELEKTRISCH_VOERTUIG),
+)
+
+# Specs read from a description (keys as the matcher and calculators use them)
+SPEC_PATTERNS: Dict[str, re.Pattern] = {
+    "power_kw": re.compile(r"(\d+(?:[.,]\d+)?)\s*kw\b", re.IGNORECASE),
+    "scop": re.compile(r"\bscop\s*[:=]?\s*(\d+(?:[.,]\d+)?)", re.IGNORECASE),
+    "u_value": re.compile(r"\bu(?:-?waarde)?\s*[:=]\s*(\d+(?:[.,]\d+)?)", re.IGNORECASE),
+    "rd": re.compile(r"\brd(?:-?waarde)?\s*[:=]?\s*(\d+(?:[.,]\d+)?)", re.IGNORECASE),
+    "area_m2": re.compile(r"(\d+(?:[.,]\d+)?)\s*m[2²](?!\w)", re.IGNORECASE),
+}
+
+_WORD = re.compile(r"\S+")
+_AMOUNT = re.compile(r"^(-)?(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d{1,2}|-{1,2})|\.(\d{1,2}))?(-)?$")
+_QUANTITY = re.compile(r"^(\d+(?:[.,]\d+)?)\s*([a-z²0-9]*)\.?$", re.IGNORECASE)
+_TOTAL_INCL = re.compile(r"totaal\s*incl|inclusief\s*btw|totaalbedrag|te\s*betalen|eindtotaal", re.IGNORECASE)
+_SUBTOTAL = re.compile(r"sub\s*-?totaal|totaal\s*excl|exclusief\s*btw|netto\s*totaal", re.IGNORECASE)
+_VAT = re.compile(r"\b(?:btw|b\.t\.w\.?|vat)\b(?:[^%\d]*(\d{1,2}(?:[.,]\d+)?)\s*%)?", re.IGNORECASE)
+_PLAIN_TOTAL = re.compile(r"^\s*totaal\b", re.IGNORECASE)
+# Totals label starting a row; "Warmtepomp excl. btw" is an item row
+_TOTALS_LABEL = re.compile(
+    rf"^\s*(?:{_TOTAL_INCL.pattern}|{_SUBTOTAL.pattern}|{_VAT.pattern}|totaal\b)", re.IGNORECASE
+)
+_QUOTE_NUMBER = re.compile(r"offerte\s*(?:nummer|nr\.?|no\.?)\s*[:#]?\s*([A-Z0-9][\w\-/.]*)", re.IGNORECASE)
+_DATE = re.compile(r"datum\s*:?\s*(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})", re.IGNORECASE)
+
+Cell = Tuple[int, int, str]     # (start, end) column span in the layout text (table: index, index), text
+Columns = Dict[Tuple[int, int], str]     # Header cell span -> column role
+
+
+# ============================================================================
+# RESULT
+# ============================================================================
+
+@dataclass
+class ParsedLine:
+    """One priced row of a quote"""
+    text: str                                # Source text of the row
+    description: str
+    quantity: float
+    quantity_unit: str                       # "st", "m2" or "m"
+    unit_price: Optional[float]
+    total: float
+    confidence: float
+    kind: str = "equipment"                  # "equipment", "labour" or "discount"
+    page: Optional[int] = None
+    specs: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def is_equipment(self) -> bool:
+        return self.kind == "equipment"
+
+    def to_equipment(self, line_number: int) -> Equipment:
+        specs = dict(self.specs)
+        if self.quantity_unit == "st" and self.quantity == int(self.quantity) and self.quantity >= 1:
+            quantity, unit_price = int(self.quantity), self.total / self.quantity
+        else:
+            # Surfaces and lengths: one line, the area in the specs
+            quantity, unit_price = 1, self.total
+            if self.quantity_unit == "m2":
+                specs["area_m2"] = self.quantity
+        lowered = self.description.lower()
+        return Equipment(
+            description=self.description,
+            quantity=quantity,
+            unit_price=round(unit_price, 4),
+            total_price=self.total,
+            specs=specs,
+            category=next((category for word, category in CATEGORY_KEYWORDS if word in lowered), None),
+            line_number=line_number,
+            extracted_text=self.text
+        )
+
+
+@dataclass
+class ParsedQuote:
+    """Rule-based parse of a quote"""
+    lines: List[ParsedLine]
+    subtotal: Optional[float] = None
+    vat_amount: Optional[float] = None
+    vat_rate: Optional[float] = None         # Percentage, e.g. 21.0
+    total_including_vat: Optional[float] = None
+    quote_number: Optional[str] = None
+    date: Optional[datetime] = None
+    header_found: bool = False
+
+    @property
+    def equipment_lines(self) -> List[ParsedLine]:
+        return [line for line in self.lines if line.is_equipment]
+
+    @property
+    def usable(self) -> bool:
+        """Line items and a subtotal were found"""
+        return bool(self.equipment_lines) and self.subtotal is not None
+
+    @property
+    def totals_consistent(self) -> bool:
+        """Rows add up to the subtotal, and subtotal + VAT to the total"""
+        if self.subtotal is None or not amounts_match(sum(line.total for line in self.lines), self.subtotal):
+            return False
+        return self.vat_consistent
+
+    @property
+    def vat_consistent(self) -> bool:
+        """Subtotal + VAT add up to the total (when all three were found)"""
+        if self.subtotal is not None and self.vat_amount is not None and self.total_including_vat is not None:
+            return amounts_match(self.subtotal + self.vat_amount, self.total_including_vat)
+        return True
+
+    def low_confidence(self, threshold: float = MIN_LINE_CONFIDENCE) -> List[ParsedLine]:
+        return [line for line in self.equipment_lines if line.confidence < threshold]
+
+    def to_quote(self, equipment: Optional[List[Equipment]] = None) -> Quote:
+        """
+        Quote from the parse
+
+        Args:
+            equipment: Equipment to use instead of the parsed rows (e.g. after
+                low-confidence rows were re-extracted)
+        """
+        if equipment is None:
+            equipment = [line.to_equipment(number) for number, line in enumerate(self.equipment_lines, start=1)]
+        return Quote(
+            quote_number=self.quote_number,
+            date=self.date,
+            equipment=equipment,
+            subtotal=self.subtotal if self.subtotal is not None else sum(e.total_price for e in equipment),
+            vat_amount=self.vat_amount,
+            total_including_vat=self.total_including_vat,
+            processed_at=datetime.now()
+        )
+
+
+# ============================================================================
+# PARSER
+# ============================================================================
+
+class QuoteParser:
+    """Parses line items and totals from extracted quote pages"""
+
+    def parse(self, extraction: PdfExtraction) -> ParsedQuote:
+        """
+        Parse an extracted PDF
+
+        Ruled tables are used when one has a recognisable header; the
+        layout text of every page is used for the remaining rows, the
+        totals and the quote number and date.
+
+        Args:
+            extraction: PdfExtractor result (layout text and tables per page)
+
+        Returns:
+            ParsedQuote; check usable, totals_consistent and low_confidence()
+        """
+        parsed = ParsedQuote(lines=[])
+        for page in extraction.pages:
+            for table in page.tables:
+                self._parse_table(table, page.number, parsed)
+        from_tables = bool(parsed.lines)
+
+        state = _TextState(items=not from_tables)
+        for page in extraction.pages:
+            for line in page.text.splitlines():
+                self._parse_text_line(line, page.number, parsed, state)
+
+        return finish_parse(parsed)
+
+    def parse_text(self, text: str) -> ParsedQuote:
+        """Parse plain (layout) text of a quote"""
+        parsed = ParsedQuote(lines=[])
+        state = _TextState(items=True)
+        for line in text.splitlines():
+            self._parse_text_line(line, None, parsed, state)
+        return finish_parse(parsed)
+
+    # ------------------------------------------------------------------------
+
+    def _parse_table(self, table: Sequence[Sequence[Optional[str]]], page: int, parsed: ParsedQuote):
+        roles: Optional[Columns] = None
+        for row in table:
+            cells = [(index, index, " ".join((text or "").split())) for index, text in enumerate(row)]
+            cells = [cell for cell in cells if cell[2]]
+            if not cells:
+                continue
+            if roles is None:
+                roles = header_roles(cells)
+                continue
+            if _totals_row(cells) and parse_totals(" ".join(cell[2] for cell in cells), parsed):
+                continue
+            line = parse_row(cells, roles, page)
+            if line is not None:
+                parsed.header_found = True
+                parsed.lines.append(line)
+
+    def _parse_text_line(self, raw: str, page: Optional[int], parsed: ParsedQuote, state: "_TextState"):
+        if not raw.strip():
+            return
+        parse_metadata(raw, parsed)
+        words = split_words(raw)
+
+        if state.items and state.roles is None and not state.done:
+            roles = header_roles(words)
+            if roles is not None:
+                state.roles = roles
+                parsed.header_found = True
+                return
+
+        # Among the item rows only a row that starts with its totals label is one
+        if (state.done or not state.items or _totals_row(words)) and parse_totals(raw, parsed):
+            state.done = True
+            return
+        if not state.items or state.done:
+            return
+
+        line = parse_words(words, state.roles, page)
+        if line is not None:
+            parsed.lines.append(line)
+            state.last = line
+        elif state.last is not None and state.roles is not None and not trailing_amounts(words):
+            # Continuation of the previous row's description (specs on the next line)
+            state.last.text += "\n" + raw.rstrip()
+            state.last.specs.update(parse_specs(raw))
+
+
+@dataclass
+class _TextState:
+    items: bool                              # Read rows from the text (no table had them)
+    roles: Optional[Columns] = None          # Header columns
+    done: bool = False                       # Totals reached
+    last: Optional[ParsedLine] = None
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def parse_amount(text: str) -> Optional[float]:
+    """Amount in Dutch or plain notation ("€ 1.234,56", "1.234,-", "-250,00", "12.50"), else None"""
+    cleaned = re.sub(r"[€\s ]|eur", "", text.strip(), flags=re.IGNORECASE)
+    found = _AMOUNT.match(cleaned)
+    if not found:
+        return None
+    sign, whole, comma, dot, trailing = found.groups()
+    value = float(whole.replace(".", ""))
+    decimals = dot if comma is None or comma.startswith("-") else comma
+    if decimals:
+        value += int(decimals) / 10 ** len(decimals)
+    return -value if sign or trailing else value
+
+
+def parse_quantity(text: str) -> Optional[Tuple[float, str]]:
+    """(quantity, unit) from "2", "2 st", "80,5 m2", else None"""
+    found = _QUANTITY.match(text.strip())
+    if not found:
+        return None
+    unit = QUANTITY_UNITS.get(found.group(2).lower()) if found.group(2) else "st"
+    if unit is None:
+        return None
+    value = parse_number(found.group(1))
+    return (value, unit) if value > 0 else None
+
+
+def parse_specs(text: str) -> Dict[str, float]:
+    specs = {}
+    for key, pattern in SPEC_PATTERNS.items():
+        found = pattern.search(text)
+        if found:
+            specs[key] = parse_number(found.group(1))
+    return specs
+
+
+def amounts_match(value: float, expected: float) -> bool:
+    """Equal up to rounding (5 cents or 0.5%)"""
+    return abs(value - expected) <= max(0.05, 0.005 * abs(expected))
+
+
+def split_words(line: str) -> List[Cell]:
+    """
+    Words of a layout text line with their column spans
+
+    Layout text does not reliably keep two spaces between columns, so
+    rows are read word by word; a euro sign is joined to its amount.
+    """
+    words: List[Cell] = []
+    for found in _WORD.finditer(line):
+        start, end, text = found.start(), found.end(), found.group(0)
+        if words and words[-1][2] in ("€", "EUR"):
+            words[-1] = (words[-1][0], end, f"{words[-1][2]} {text}")
+        else:
+            words.append((start, end, text))
+    return words
+
+
+def header_roles(cells: Sequence[Cell]) -> Optional[Columns]:
+    """Column role per header cell (or word) if the cells form a line-item header"""
+    roles: Columns = {}
+    for start, end, text in cells:
+        lowered = text.lower().strip(".: ")
+        for role, words in COLUMN_HEADERS:
+            if any(lowered == word or lowered.startswith(word) or (len(word) > 4 and word in lowered)
+                   for word in words):
+                roles[start, end] = role
+                break
+    found = set(roles.values())
+    if "description" in found and found & {"total", "unit_price"} and len(found) >= 3:
+        return roles
+    return None
+
+
+def parse_row(cells: Sequence[Cell], roles: Columns, page: Optional[int]) -> Optional[ParsedLine]:
+    """Priced table row, or None; each cell takes the role of its header column"""
+    assigned = _assign(cells, roles)
+    return _line(
+        text=" ".join(cell[2] for cell in cells),
+        description=" ".join(assigned.get("description", [])),
+        quantity=parse_quantity(" ".join(assigned.get("quantity", []) + assigned.get("unit", []))),
+        unit_price=_single_amount(assigned.get("unit_price")),
+        total=_single_amount(assigned.get("total")),
+        header=True,
+        page=page
+    )
+
+
+def parse_words(words: Sequence[Cell], roles: Optional[Columns], page: Optional[int]) -> Optional[ParsedLine]:
+    """
+    Priced text row from its words, or None
+
+    Amounts are read from the right and the quantity from the left (or
+    just before the amounts); the rest is the description. With a header
+    the amount columns decide whether a single amount is the price or the
+    total, and where the quantity column is.
+    """
+    amount_columns = sorted(span for span, role in (roles or {}).items() if role in ("unit_price", "total"))
+    amounts = trailing_amounts(words, len(amount_columns) if roles else 2)
+    if not amounts:
+        return None
+    rest = list(words[:len(words) - len(amounts)])
+
+    unit_price: Optional[float] = None
+    total: Optional[float] = None
+    if len(amounts) == 2:
+        unit_price, total = amounts[0][1], amounts[1][1]
+    elif roles:
+        role = _assign([amounts[0][0]], {span: roles[span] for span in amount_columns})
+        unit_price, total = (amounts[0][1], None) if "unit_price" in role else (None, amounts[0][1])
+    else:
+        total = amounts[0][1]
+
+    columns = {role: span for span, role in (roles or {}).items()}
+    quantity_after = "quantity" in columns and columns["quantity"] > columns.get("description", (0, 0))
+    quantity = None
+    if not quantity_after:
+        quantity, rest = _leading_quantity(rest)
+    if quantity is None and rest:
+        trailing, remaining = _trailing_quantity(rest)
+        # Without a header a number ending the description is only a
+        # quantity when it multiplies to the total
+        if trailing and (quantity_after or (
+            unit_price is not None and total is not None and amounts_match(trailing[0] * unit_price, total)
+        )):
+            quantity, rest = trailing, remaining
+
+    return _line(
+        text=" ".join(word[2] for word in words),
+        description=" ".join(word[2] for word in rest),
+        quantity=quantity,
+        unit_price=unit_price,
+        total=total,
+        header=bool(roles),
+        page=page
+    )
+
+
+def _line(
+    text: str,
+    description: str,
+    quantity: Optional[Tuple[float, str]],
+    unit_price: Optional[float],
+    total: Optional[float],
+    header: bool,
+    page: Optional[int]
+) -> Optional[ParsedLine]:
+    """ParsedLine with its confidence, or None if the row has no amount or description"""
+    if (total is None and unit_price is None) or not re.search(r"[A-Za-z]{2,}", description):
+        return None
+    quantity_value, quantity_unit = quantity or (1.0, "st")
+
+    if total is None:
+        # Price column only
+        total = unit_price * quantity_value
+        confidence = 0.75
+    elif unit_price is not None:
+        confidence = 0.95 if amounts_match(quantity_value * unit_price, total) else 0.4
+    elif quantity is None or quantity_value == 1:
+        confidence = 0.8 if quantity is not None else 0.7
+    else:
+        # One amount and a quantity > 1: price or total?
+        confidence = 0.85 if header else 0.6
+    if len(re.findall(r"[A-Za-z]{3,}", description)) < 2:
+        confidence -= 0.2
+    confidence = max(0.0, min(1.0, confidence + (0.05 if header else 0.0)))
+
+    kind = "discount" if total < 0 else "labour" if NON_EQUIPMENT.match(description) else "equipment"
+    return ParsedLine(
+        text=text,
+        description=description,
+        quantity=quantity_value,
+        quantity_unit=quantity_unit,
+        unit_price=unit_price,
+        total=round(total, 2),
+        confidence=round(confidence, 3),
+        kind=kind,
+        page=page,
+        specs=parse_specs(description)
+    )
+
+
+def _assign(cells: Sequence[Cell], roles: Columns) -> Dict[str, List[str]]:
+    """
+    Cell texts per role: the header column the cell overlaps, else the
+    nearest one (amounts are right-aligned, descriptions left-aligned)
+    """
+    assigned: Dict[str, List[str]] = {}
+    for start, end, text in cells:
+        def distance(span: Tuple[int, int]) -> Tuple[int, float]:
+            gap = max(span[0] - end, start - span[1], 0)
+            return gap, abs((span[0] + span[1]) - (start + end)) / 2
+        assigned.setdefault(roles[min(roles, key=distance)], []).append(text)
+    return assigned
+
+
+def _single_amount(texts: Optional[List[str]]) -> Optional[float]:
+    return parse_amount(" ".join(texts)) if texts else None
+
+
+def trailing_amounts(words: Sequence[Cell], limit: int = 2) -> List[Tuple[Cell, float]]:
+    """Amounts ending a row (at most limit), with their words"""
+    amounts: List[Tuple[Cell, float]] = []
+    for word in reversed(words[-limit:] if limit else []):
+        amount = parse_amount(word[2])
+        if amount is None:
+            break
+        amounts.insert(0, (word, amount))
+    return amounts
+
+
+def _leading_quantity(words: List[Cell]) -> Tuple[Optional[Tuple[float, str]], List[Cell]]:
+    """Quantity starting a row ("2", "2 st", "80 m2") and the remaining words"""
+    if len(words) > 2 and words[1][2].lower() in QUANTITY_UNITS:
+        quantity = parse_quantity(f"{words[0][2]} {words[1][2]}")
+        if quantity:
+            return quantity, words[2:]
+    if len(words) > 1 and (quantity := parse_quantity(words[0][2])):
+        return quantity, words[1:]
+    return None, words
+
+
+def _totals_row(words: Sequence[Cell]) -> bool:
+    """Row has nothing before its totals label: no quantity, no description"""
+    label = words[:len(words) - len(trailing_amounts(words))]
+    return bool(_TOTALS_LABEL.match(" ".join(word[2] for word in label)))
+
+
+def _trailing_quantity(words: List[Cell]) -> Tuple[Optional[Tuple[float, str]], List[Cell]]:
+    """Quantity ending the words before the amounts, and the remaining words"""
+    if len(words) > 2 and words[-1][2].lower() in QUANTITY_UNITS:
+        quantity = parse_quantity(f"{words[-2][2]} {words[-1][2]}")
+        if quantity:
+            return quantity, words[:-2]
+    if len(words) > 1 and (quantity := parse_quantity(words[-1][2])):
+        return quantity, words[:-1]
+    return None, words
+
+
+def last_amount(text: str) -> Optional[float]:
+    for _, _, cell in reversed(split_words(text)):
+        amount = parse_amount(cell)
+        if amount is not None:
+            return amount
+        # "Subtotaal € 1.234,56" within one cell
+        found = re.search(r"(?:€\s*)?-?[\d.]+(?:,(?:\d{1,2}|-))?\s*$", cell)
+        if found and (amount := parse_amount(found.group(0))) is not None:
+            return amount
+    return None
+
+
+def parse_totals(text: str, parsed: ParsedQuote) -> bool:
+    """Record a subtotal/VAT/total line; True when the line was one"""
+    amount = last_amount(text)
+    if amount is None:
+        return False
+    if _TOTAL_INCL.search(text):
+        parsed.total_including_vat = amount
+    elif _SUBTOTAL.search(text):
+        parsed.subtotal = amount
+    elif (vat := _VAT.search(text)) is not None:
+        parsed.vat_amount = amount
+        if vat.group(1):
+            parsed.vat_rate = parse_number(vat.group(1))
+    elif _PLAIN_TOTAL.match(text):
+        # "Totaal" is the subtotal before the VAT line and the grand total after it
+        if parsed.vat_amount is None:
+            parsed.subtotal = amount
+        else:
+            parsed.total_including_vat = amount
+    else:
+        return False
+    return True
+
+
+def parse_metadata(text: str, parsed: ParsedQuote):
+    if parsed.quote_number is None and (found := _QUOTE_NUMBER.search(text)):
+        parsed.quote_number = found.group(1)
+    if parsed.date is None and (found := _DATE.search(text)):
+        day, month, year = (int(part) for part in found.groups())
+        try:
+            parsed.date = datetime(year + 2000 if year < 100 else year, month, day)
+        except ValueError:
+            pass
+
+
+def finish_parse(parsed: ParsedQuote) -> ParsedQuote:
+    """Derive a missing subtotal and reward rows whose totals add up"""
+    if parsed.subtotal is None and parsed.total_including_vat is not None and parsed.vat_amount is not None:
+        parsed.subtotal = round(parsed.total_including_vat - parsed.vat_amount, 2)
+    if parsed.totals_consistent:
+        for line in parsed.lines:
+            line.confidence = round(min(1.0, line.confidence + 0.05), 3)
+    return parsed
+
+
+# Global instance (singleton pattern)
+_parser_instance: Optional[QuoteParser] = None
+
+
+def get_quote_parser() -> QuoteParser:
+    """
+    Get the global QuoteParser instance (singleton).
+
+    The parser is stateless; the instance only avoids re-creating it per quote.
+    """
+    global _parser_instance
+
+    if _parser_instance is None:
+        _parser_instance = QuoteParser()
+
+    return _parser_instance
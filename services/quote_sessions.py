@@ -0,0 +1,277 @@
+"""
+QuoteSessions - Incremental re-analysis of quotes after line edits.
+
+Users correct extracted lines (another model, a different quantity). A
+full re-analysis re-matches every line, so each analysed quote is kept as
+a session with enough state to recompute only what an edit touches:
+
+- Line results are cached by line fingerprint (shared across sessions),
+  so an edited line is matched once and an undo is a cache hit
+- Per-scheme totals are maintained as running sums, updated by the
+  difference of the lines whose combination changed
+- A dependency graph from ISDE measures to lines tells which lines share
+  the "meerdere maatregelen" bonus; the quote-level combination choice is
+  re-solved only when the edited line has (or had) an ISDE candidate
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from models.subsidy_schemas import (
+    Equipment,
+    EquipmentMatch,
+    Quote,
+    QuoteAnalysis,
+    SubsidyScheme
+)
+from services.combination_optimizer import LineChoice, LineOptions
+from services.equipment_matcher import EquipmentMatcher, with_combination
+
+
+# Fields that do not influence matching
+_FINGERPRINT_EXCLUDE = {"line_number", "extracted_text"}
+
+
+def line_fingerprint(equipment: Equipment) -> str:
+    """Stable hash of the equipment fields that drive matching"""
+    payload = equipment.model_dump(mode="json", exclude=_FINGERPRINT_EXCLUDE)
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+@dataclass
+class QuoteSession:
+    """Analysis state of one quote"""
+    session_id: str
+    quote: Quote
+    line_matches: List[EquipmentMatch]   # Line-level results (before quote-level combination)
+    options: List[LineOptions]
+    choices: List[LineChoice]
+    final_matches: List[EquipmentMatch]  # With quote-level best combination
+    totals: Dict[SubsidyScheme, float]
+    measure_lines: Dict[str, Set[int]] = field(default_factory=dict)  # ISDE measure -> lines
+    analysis: Optional[QuoteAnalysis] = None
+
+
+class QuoteSessions:
+    """Analyses quotes and applies line edits incrementally"""
+
+    def __init__(
+        self,
+        matcher: Optional[EquipmentMatcher] = None,
+        max_sessions: int = 1000,
+        max_cached_lines: int = 10000
+    ):
+        """
+        Initialize session store
+
+        Args:
+            matcher: Equipment matcher (default: new matcher on the global database)
+            max_sessions: Sessions kept in memory (least recently used are dropped)
+            max_cached_lines: Line results kept in the fingerprint cache
+        """
+        self.matcher = matcher or EquipmentMatcher()
+        self.optimizer = self.matcher.optimizer
+        self.max_sessions = max_sessions
+        self.max_cached_lines = max_cached_lines
+        self._sessions: "OrderedDict[str, QuoteSession]" = OrderedDict()
+        self._line_cache: "OrderedDict[str, EquipmentMatch]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    # ========================================================================
+    # LINE CACHE
+    # ========================================================================
+
+    def match_line(self, equipment: Equipment) -> EquipmentMatch:
+        """Line-level match, served from the fingerprint cache when possible"""
+        fingerprint = line_fingerprint(equipment)
+        with self._lock:
+            cached = self._line_cache.get(fingerprint)
+            if cached is not None:
+                self._line_cache.move_to_end(fingerprint)
+
+        if cached is not None:
+            # Same matching input, but keep this line's own number/text
+            if cached.equipment is not equipment:
+                cached = cached.model_copy(update={"equipment": equipment})
+            return cached
+
+        match = self.matcher.match_equipment(equipment)
+        with self._lock:
+            self._line_cache[fingerprint] = match
+            if len(self._line_cache) > self.max_cached_lines:
+                self._line_cache.popitem(last=False)
+        return match
+
+    # ========================================================================
+    # SESSIONS
+    # ========================================================================
+
+    def analyze(self, quote: Quote) -> QuoteSession:
+        """
+        Analyze a quote and keep it as a session.
+
+        Args:
+            quote: Extracted quote
+
+        Returns:
+            QuoteSession with its analysis
+        """
+        started = time.perf_counter()
+        line_matches = [self.match_line(equipment) for equipment in quote.equipment]
+        options = [self.optimizer.line_options(match) for match in line_matches]
+        choices = self.optimizer.solve(options)
+        final_matches = [
+            with_combination(match, self.optimizer.combination(match, choice))
+            for match, choice in zip(line_matches, choices)
+        ]
+
+        session = QuoteSession(
+            session_id=uuid.uuid4().hex,
+            quote=quote,
+            line_matches=line_matches,
+            options=options,
+            choices=choices,
+            final_matches=final_matches,
+            totals={scheme: 0.0 for scheme in SubsidyScheme}
+        )
+        for line, match in enumerate(final_matches):
+            self._add_totals(session, match, sign=1)
+            self._link_measure(session, line)
+
+        session.analysis = self.matcher.summarize(quote, final_matches, session.totals, started)
+        self._store(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[QuoteSession]:
+        """Get a session by id"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def update_line(self, session_id: str, line: int, equipment: Equipment) -> QuoteAnalysis:
+        """
+        Replace one quote line and recompute only what depends on it.
+
+        Args:
+            session_id: Session from analyze()
+            line: Index of the line in quote.equipment
+            equipment: Corrected line
+
+        Returns:
+            Updated QuoteAnalysis
+
+        Raises:
+            KeyError: Unknown session
+            IndexError: Line out of range
+        """
+        with self._lock:
+            started = time.perf_counter()
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            if not 0 <= line < len(session.line_matches):
+                raise IndexError(line)
+            self._sessions.move_to_end(session_id)
+
+            old_equipment = session.quote.equipment[line]
+            had_isde = session.options[line].isde_pick is not None
+
+            match = self.match_line(equipment)
+            session.line_matches[line] = match
+            session.options[line] = self.optimizer.line_options(match)
+            self._unlink_measure(session, line)
+            self._link_measure(session, line)
+
+            # Lines without ISDE do not interact with other lines; ISDE lines
+            # only with each other, via the measures they count as
+            affected = {line}
+            if had_isde or session.options[line].isde_pick is not None:
+                isde_lines = sorted(set().union(*session.measure_lines.values()))
+                choices = self.optimizer.solve([session.options[i] for i in isde_lines])
+                for i, choice in zip(isde_lines, choices):
+                    if choice != session.choices[i]:
+                        session.choices[i] = choice
+                        affected.add(i)
+            if session.options[line].isde_pick is None:
+                session.choices[line] = LineChoice(picks=session.options[line].other_picks)
+
+            for i in affected:
+                self._add_totals(session, session.final_matches[i], sign=-1)
+                session.final_matches[i] = with_combination(
+                    session.line_matches[i],
+                    self.optimizer.combination(session.line_matches[i], session.choices[i])
+                )
+                self._add_totals(session, session.final_matches[i], sign=1)
+
+            equipment_lines = list(session.quote.equipment)
+            equipment_lines[line] = equipment
+            # Keep non-equipment amounts (labour etc.) in the subtotal; a quote
+            # without one is totalled from its lines
+            if session.quote.subtotal:
+                subtotal = max(session.quote.subtotal + equipment.total_price - old_equipment.total_price, 0.0)
+            else:
+                subtotal = sum(e.total_price for e in equipment_lines)
+            session.quote = session.quote.model_copy(update={
+                "equipment": equipment_lines,
+                "subtotal": subtotal
+            })
+
+            session.analysis = self.matcher.summarize(
+                session.quote, list(session.final_matches), session.totals, started
+            )
+            return session.analysis
+
+    def _store(self, session: QuoteSession):
+        with self._lock:
+            self._sessions[session.session_id] = session
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    # ========================================================================
+    # DEPENDENCIES
+    # ========================================================================
+
+    @staticmethod
+    def _add_totals(session: QuoteSession, match: EquipmentMatch, sign: int):
+        for calculation in match.best_combination:
+            session.totals[calculation.scheme] += sign * calculation.subsidy_amount
+
+    @staticmethod
+    def _link_measure(session: QuoteSession, line: int):
+        measure = session.options[line].measure
+        if measure is not None:
+            session.measure_lines.setdefault(measure, set()).add(line)
+
+    @staticmethod
+    def _unlink_measure(session: QuoteSession, line: int):
+        for measure, lines in list(session.measure_lines.items()):
+            lines.discard(line)
+            if not lines:
+                del session.measure_lines[measure]
+
+
+# Global instance (singleton pattern)
+_sessions_instance: Optional[QuoteSessions] = None
+
+
+def get_quote_sessions() -> QuoteSessions:
+    """
+    Get the global QuoteSessions instance (singleton).
+
+    Creates the matcher on first call, returns cached instance on subsequent calls.
+    """
+    global _sessions_instance
+
+    if _sessions_instance is None:
+        _sessions_instance = QuoteSessions()
+
+    return _sessions_instance
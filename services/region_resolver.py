@@ -0,0 +1,301 @@
+"""
+RegionResolver - Resolve company locations to region sets via a local gazetteer.
+
+Region eligibility used to be a substring scan of every rule region against
+the company location. That is O(rules x regions) per request and wrong for
+postcodes ("1012 AB") and for municipalities inside a province ("Haarlem"
+is in Noord-Holland). The resolver loads data/regions/gazetteer.json once
+and indexes it for O(1) lookups:
+
+- name/alias -> municipality, province and/or country; "Utrecht" and
+  "Groningen" are both a municipality and a province
+- PC4 postcode -> municipality and province (flat 10,000-entry tables)
+
+A location is resolved once per request into a set of region keys
+("municipality:haarlem", "province:noord holland", "country:nederland");
+rules then check region eligibility with set membership. The level of a
+rule region comes from the rule ("Gemeente Utrecht", "Provincie Utrecht");
+a bare name that is both means the province.
+"""
+
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+
+# PC4 with its letter suffix ("2011 VA", "2011va")
+POSTCODE_PATTERN = re.compile(r"\b([1-9]\d{3})\s?[a-z]{2}\b")
+# A bare PC4 is only a postcode on its own or directly before a place name;
+# "Hoofdstraat 2011, Utrecht" holds a house number
+BARE_POSTCODE_PATTERN = re.compile(r"(?:^|(?<=\s))([1-9]\d{3})(?:\s*$|\s+(?=[^\s,;]))")
+
+# Region levels, widest first: a bare name on several levels means the widest
+LEVELS = ("country", "province", "municipality")
+LEVEL_WORDS = {
+    "gemeente": "municipality",
+    "municipality": "municipality",
+    "provincie": "province",
+    "province": "province",
+}
+
+# Longest place names in the gazetteer are a few words ("capelle aan den ijssel")
+MAX_NAME_WORDS = 4
+
+
+def normalize_region(name: str) -> str:
+    """
+    Canonical form of a region name for lookups.
+
+    Lowercase, accents removed, hyphens/commas/dots as spaces, single spaces.
+    "Fryslân" -> "fryslan", "Noord-Holland" -> "noord holland",
+    "'s-Hertogenbosch" -> "'s hertogenbosch".
+    """
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"[-,./()]", " ", text)
+    return " ".join(text.split())
+
+
+def region_key(level: str, canonical: str) -> str:
+    """Key of a region in ResolvedLocation.regions, e.g. "province:utrecht" """
+    return f"{level}:{canonical}"
+
+
+@dataclass(frozen=True)
+class ResolvedLocation:
+    """A company location resolved into region keys (see region_key)"""
+    location: str
+    normalized: str
+    regions: FrozenSet[str]
+    municipality: Optional[str] = None
+    province: Optional[str] = None
+
+
+class RegionResolver:
+    """Gazetteer-backed location -> region set resolution"""
+
+    def __init__(self, gazetteer_path: Optional[Path] = None):
+        """
+        Load and index the gazetteer.
+
+        Args:
+            gazetteer_path: Path to gazetteer JSON. If None, use data/regions/gazetteer.json
+        """
+        if gazetteer_path is None:
+            project_root = Path(__file__).resolve().parent.parent
+            gazetteer_path = project_root / "data" / "regions" / "gazetteer.json"
+
+        self.gazetteer_path = Path(gazetteer_path)
+
+        # Canonical names
+        self.municipalities: List[str] = []
+        self.provinces: List[str] = []
+        self.country: Optional[str] = None
+
+        # Indexes
+        # Normalized name/alias -> {level: canonical name}
+        self.names: Dict[str, Dict[str, str]] = {}
+        self.municipality_province: Dict[str, str] = {}
+        # PC4 -> index into municipalities/provinces (-1 = unknown)
+        self.postcode_municipality = np.full(10000, -1, dtype=np.int16)
+        self.postcode_province = np.full(10000, -1, dtype=np.int8)
+
+        self._load()
+
+    def _load(self):
+        """Load gazetteer JSON and build indexes"""
+        if not self.gazetteer_path.exists():
+            return
+
+        with open(self.gazetteer_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        country = data.get("country")
+        if country:
+            self.country = normalize_region(country["name"])
+            self._add_names("country", self.country, [country["name"], *country.get("aliases", [])])
+
+        for province in data.get("provinces", []):
+            canonical = normalize_region(province["name"])
+            self.provinces.append(canonical)
+            self._add_names("province", canonical, [province["name"], *province.get("aliases", [])])
+
+        province_ids = {name: i for i, name in enumerate(self.provinces)}
+
+        for start, end, province in data.get("province_postcodes", []):
+            self.postcode_province[start:end + 1] = province_ids[normalize_region(province)]
+
+        for municipality in data.get("municipalities", []):
+            canonical = normalize_region(municipality["name"])
+            province = normalize_region(municipality["province"])
+            municipality_id = len(self.municipalities)
+            self.municipalities.append(canonical)
+            self.municipality_province[canonical] = province
+            self._add_names("municipality", canonical, [municipality["name"], *municipality.get("aliases", [])])
+
+            for start, end in municipality.get("postcodes", []):
+                self.postcode_municipality[start:end + 1] = municipality_id
+                self.postcode_province[start:end + 1] = province_ids[province]
+
+    def _add_names(self, level: str, canonical: str, names: Iterable[str]):
+        for name in names:
+            # Same-named regions on other levels ("Utrecht") keep their own entry
+            self.names.setdefault(normalize_region(name), {}).setdefault(level, canonical)
+
+    # ========================================================================
+    # LOOKUPS
+    # ========================================================================
+
+    def region_key(self, region: str) -> Optional[str]:
+        """
+        Key of a rule region, or None if the gazetteer does not know it.
+
+        A level word ("Gemeente Utrecht", "Utrecht (provincie)") picks the
+        level; a bare name that exists on several levels means the widest.
+        """
+        words = normalize_region(region).split()
+        entries = self.names.get(" ".join(words))
+        level = None
+        if entries is None and len(words) > 1:
+            if words[0] in LEVEL_WORDS:
+                level = LEVEL_WORDS[words.pop(0)]
+            elif words[-1] in LEVEL_WORDS:
+                level = LEVEL_WORDS[words.pop()]
+            entries = self.names.get(" ".join(words))
+        if not entries:
+            return None
+        if level is None:
+            level = next(level for level in LEVELS if level in entries)
+        elif level not in entries:
+            return None
+        return region_key(level, entries[level])
+
+    def is_known(self, region: str) -> bool:
+        """Check if a region name is covered by the gazetteer"""
+        return self.region_key(region) is not None
+
+    def resolve(self, location: str) -> ResolvedLocation:
+        """
+        Resolve a free-text location into its region set.
+
+        Postcodes are resolved through the PC4 tables; place and province
+        names through the name index. A name that is both a municipality
+        and a province ("Utrecht") names the municipality unless another
+        municipality is given ("Amersfoort, Utrecht"). The region set
+        contains the municipality, its province and the country.
+
+        Args:
+            location: Company location, e.g. "Haarlem", "1012 AB Amsterdam",
+                "Industrieweg 4, 5651 GH Eindhoven", "Noord-Brabant"
+
+        Returns:
+            ResolvedLocation
+        """
+        normalized = normalize_region(location)
+        municipality: Optional[str] = None
+        province: Optional[str] = None
+
+        # Postcode lookup: O(1) per postcode
+        for pc4 in self._postcodes(location):
+            municipality_id = self.postcode_municipality[pc4]
+            province_id = self.postcode_province[pc4]
+            if municipality_id >= 0 and municipality is None:
+                municipality = self.municipalities[municipality_id]
+            if province_id >= 0 and province is None:
+                province = self.provinces[province_id]
+
+        # Name lookup: word n-grams against the name index, longest first
+        words = normalized.split()
+        named_municipalities: List[str] = []
+        shared_names: List[str] = []  # Also a province or country
+        named_provinces: List[str] = []
+        named_country = False
+        for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                entries = self.names.get(" ".join(words[start:start + size]))
+                if entries is None:
+                    continue
+                level = LEVEL_WORDS.get(words[start - 1]) if start else None
+                if level in entries:
+                    entries = {level: entries[level]}
+                named_country = named_country or "country" in entries
+                if "province" in entries:
+                    named_provinces.append(entries["province"])
+                if "municipality" in entries:
+                    shared = shared_names if len(entries) > 1 else named_municipalities
+                    shared.append(entries["municipality"])
+
+        municipality = municipality or next(iter(named_municipalities + shared_names), None)
+        province = province or next(iter(named_provinces), None)
+
+        regions: Set[str] = set()
+        if municipality:
+            regions.add(region_key("municipality", municipality))
+            province = province or self.municipality_province[municipality]
+        if province:
+            regions.add(region_key("province", province))
+        if (regions or named_country) and self.country:
+            regions.add(region_key("country", self.country))
+
+        return ResolvedLocation(
+            location=location,
+            normalized=normalized,
+            regions=frozenset(regions),
+            municipality=municipality,
+            province=province
+        )
+
+    def _postcodes(self, location: str) -> Iterator[int]:
+        """PC4 codes in a location; bare numbers only where they are postcodes"""
+        text = location.lower()
+        for match in POSTCODE_PATTERN.finditer(text):
+            yield int(match.group(1))
+        for match in BARE_POSTCODE_PATTERN.finditer(text):
+            if match.start() == 0 and not text[match.end():].strip():
+                yield int(match.group(1))
+            elif self._starts_with_place(text[match.end():]):
+                yield int(match.group(1))
+
+    def _starts_with_place(self, text: str) -> bool:
+        """Check if text starts with a municipality name"""
+        words = normalize_region(text).split()
+        return any(
+            "municipality" in self.names.get(" ".join(words[:size]), {})
+            for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1)
+        )
+
+    def in_region(self, resolved: ResolvedLocation, region: str) -> bool:
+        """
+        Check if a resolved location lies in a rule region.
+
+        Regions unknown to the gazetteer (e.g. "Randstad") fall back to a
+        substring test on the normalized location.
+        """
+        key = self.region_key(region)
+        if key is not None:
+            return key in resolved.regions
+        return normalize_region(region) in resolved.normalized
+
+
+# Global instance (singleton pattern)
+_resolver_instance: Optional[RegionResolver] = None
+
+
+def get_region_resolver() -> RegionResolver:
+    """
+    Get the global RegionResolver instance (singleton).
+
+    Loads the gazetteer on first call, returns cached instance on subsequent calls.
+    """
+    global _resolver_instance
+
+    if _resolver_instance is None:
+        _resolver_instance = RegionResolver()
+
+    return _resolver_instance
@@ -0,0 +1,457 @@
+"""
+Requirement predicates - Technical requirements of EIA/MIA codes as checks.
+
+Code descriptions state requirements in running text: "SCOP ≥ 4,6",
+"een vermogen van ≤70kW", "een thermisch rendement (η) van minimaal 83%",
+"(U) van maximaal 0,7 W/m2 K". At catalog load these are parsed once into
+typed predicates (attribute, operator, threshold in a canonical unit).
+
+Equipment.specs are normalised to the same attributes and units, so a
+candidate code is verified against a quote line with a few float
+comparisons:
+
+- pass: every predicate is satisfied
+- fail: at least one predicate is violated
+- unknown: no violation, but some predicate could not be checked
+  (spec missing, or the requirement only holds under a test condition)
+
+Descriptions with sub-clauses ("a. Bestemd voor: ... b. Bestemd voor:
+...") describe alternatives: the predicates of one clause are checked
+together, and the code fails only when every clause fails.
+"""
+
+import operator
+import re
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# ============================================================================
+# UNITS
+# ============================================================================
+
+# Normalised unit -> (dimension, factor to canonical unit)
+UNITS: Dict[str, Tuple[str, float]] = {
+    "w": ("power", 0.001),
+    "kw": ("power", 1.0),
+    "mw": ("power", 1000.0),
+    "wh": ("energy", 0.001),
+    "kwh": ("energy", 1.0),
+    "mwh": ("energy", 1000.0),
+    "%": ("percent", 1.0),
+    "°c": ("temperature", 1.0),
+    "w/m2k": ("u_value", 1.0),
+    "m2k/w": ("r_value", 1.0),
+    "m2": ("area", 1.0),
+    "m3": ("volume", 1.0),
+    "mm": ("length", 0.001),
+    "cm": ("length", 0.01),
+    "m": ("length", 1.0),
+    "meter": ("length", 1.0),
+    "km": ("length", 1000.0),
+    "kg": ("mass", 1.0),
+    "bar": ("pressure", 1.0),
+    "jaar": ("years", 1.0),
+    "kj/kg": ("specific_energy", 1.0),
+    "m/s": ("speed", 1.0),
+    "kva": ("apparent_power", 1.0),
+    "kilovoltampère": ("apparent_power", 1.0),
+    "kilovoltampere": ("apparent_power", 1.0),
+}
+
+# Canonical unit per dimension (for display)
+CANONICAL_UNITS: Dict[str, str] = {
+    "power": "kW",
+    "energy": "kWh",
+    "percent": "%",
+    "temperature": "°C",
+    "u_value": "W/m²K",
+    "r_value": "m²K/W",
+    "area": "m²",
+    "volume": "m³",
+    "length": "m",
+    "mass": "kg",
+    "pressure": "bar",
+    "years": "jaar",
+    "specific_energy": "kJ/kg",
+    "speed": "m/s",
+    "apparent_power": "kVA",
+}
+
+_UNIT_PATTERN = (
+    r"W/m[2²]\s?K|m[2²]\s?K/W|kJ/kg|m/s|kilovoltamp[eè]re|kVA|kWh|MWh|Wh|kW|MW|W|%|°\s?C|oC"
+    r"|m[2²3³]|mm|cm|km|meter|m|kg|bar|jaar"
+)
+
+
+def normalize_unit(unit: str) -> str:
+    """Canonical spelling of a unit ("W/m² K" -> "w/m2k", "oC" -> "°c")"""
+    unit = unit.lower().replace(" ", "").replace("²", "2").replace("³", "3")
+    return "°c" if unit in ("oc", "°c", "ºc") else unit
+
+
+def parse_number(text: str) -> float:
+    """Parse a Dutch or English number ("3,0", "1.500", "0.7")"""
+    text = text.strip()
+    if re.fullmatch(r"\d{1,3}(\.\d{3})+(,\d+)?", text):
+        text = text.replace(".", "")
+    return float(text.replace(",", "."))
+
+
+# ============================================================================
+# ATTRIBUTES
+# ============================================================================
+
+# Words in requirement texts -> attribute
+TEXT_ATTRIBUTES: Dict[str, str] = {
+    "scop": "scop",
+    "cop": "cop",
+    "eei": "eei",
+    "powerfactor": "power_factor",
+    "rendement": "efficiency",
+    "gebruiksrendement": "efficiency",
+    "η": "efficiency",
+    "vermogen": "power",
+    "piekvermogen": "power",
+    "motorvermogen": "power",
+    "koelvermogen": "cooling_power",
+    "capaciteit": "capacity",
+    "opslagcapaciteit": "capacity",
+    "temperatuur": "temperature",
+    "zuiverheid": "purity",
+    "terugverdientijd": "payback_years",
+    "diameter": "diameter",
+    "apertuuroppervlakte": "area",
+    "oppervlakte": "area",
+}
+
+# Attribute when a requirement has a unit but no recognisable name
+DIMENSION_ATTRIBUTES: Dict[str, str] = {
+    "u_value": "u_value",
+    "r_value": "r_value",
+    "power": "power",
+    "apparent_power": "power",
+    "energy": "capacity",
+    "temperature": "temperature",
+    "area": "area",
+    "volume": "capacity",
+}
+
+# Equipment.specs keys -> attribute (a unit suffix like "_kw" is split off first)
+SPEC_ATTRIBUTES: Dict[str, str] = {
+    **TEXT_ATTRIBUTES,
+    "power": "power",
+    "cooling_power": "cooling_power",
+    "efficiency": "efficiency",
+    "capacity": "capacity",
+    "temperature": "temperature",
+    "u": "u_value",
+    "u_value": "u_value",
+    "max_u": "u_value",
+    "r": "r_value",
+    "rd": "r_value",
+    "r_value": "r_value",
+    "min_rd": "r_value",
+    "power_factor": "power_factor",
+    "area": "area",
+    "oppervlak": "area",
+}
+
+_ATTRIBUTE_PATTERN = re.compile(
+    r"(?<![\w])(" + "|".join(sorted(map(re.escape, TEXT_ATTRIBUTES), key=len, reverse=True)) + r")(?![\w])",
+    re.IGNORECASE
+)
+
+# ============================================================================
+# PREDICATES
+# ============================================================================
+
+OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+_OPERATOR_WORDS = {
+    "≥": ">=", ">=": ">=", "⩾": ">=",
+    "≤": "<=", "<=": "<=", "⩽": "<=",
+    ">": ">", "<": "<",
+    "minimaal": ">=", "ten minste": ">=", "tenminste": ">=",
+    "niet minder dan": ">=", "minstens": ">=",
+    "maximaal": "<=", "ten hoogste": "<=", "niet meer dan": "<=", "hoogstens": "<=",
+}
+
+_REQUIREMENT_PATTERN = re.compile(
+    r"(?P<op>≥|≤|⩾|⩽|>=|<=|<|>|minimaal|maximaal|ten minste|tenminste|ten hoogste"
+    r"|niet meer dan|niet minder dan|minstens|hoogstens)"
+    r"\s*(?:[A-Za-zη]{1,3}\s*=\s*)?"
+    r"(?P<number>\d+(?:[.,]\d+)*)"
+    r"\s*(?P<unit>" + _UNIT_PATTERN + r")?(?![\w/])",
+    re.IGNORECASE
+)
+
+# "COP ≥ 4,0 bij dT tot +40 °C": the requirement depends on a test value
+# ("SCOP ≥ 5,2 bij stookseizoen 'A'" only names the test and is not conditional)
+_CONDITION_PATTERN = re.compile(r"\s*bij\b[^,;]*\d", re.IGNORECASE)
+
+# "vermogen van de condensor": the requirement is on a part, not the equipment
+_COMPONENT_PATTERN = re.compile(r"\s+van\s+(?:de|het)\b", re.IGNORECASE)
+
+# Sub-clause markers of alternatives ("a. Bestemd voor: ... b. Bestemd voor: ...")
+_CLAUSE_PATTERN = re.compile(r"(?:^|(?<=\s))([a-h])\.\s+(?=[A-Z(])")
+
+# "ten minste 2 kVA en ten hoogste 30 kVA": the second bound has the first one's attribute
+_RANGE_JOIN_PATTERN = re.compile(r"^\s*(?:[^\s,;.]+\s+)?(?:en|tot)\s*$", re.IGNORECASE)
+
+# How far back to look for the attribute name
+_NAME_WINDOW = 80
+
+# Tolerance for threshold comparisons (rounding in specs)
+_EPSILON = 1e-9
+
+
+@dataclass(frozen=True)
+class RequirementPredicate:
+    """A parsed technical requirement, e.g. scop >= 4.6"""
+    attribute: str
+    operator: str
+    threshold: float          # In the canonical unit of the dimension
+    dimension: Optional[str]  # Unit dimension, None for dimensionless values (COP)
+    text: str                 # Source fragment
+    conditional: bool = False  # Holds only under a condition or for a component
+    alternative: Optional[str] = None  # Sub-clause letter; sibling clauses are alternatives
+
+    def evaluate(self, specs: Dict[str, Tuple[float, Optional[str]]]) -> Optional[bool]:
+        """
+        Check the predicate against normalised specs.
+
+        Args:
+            specs: Output of normalize_specs()
+
+        Returns:
+            True/False, or None if it cannot be decided
+        """
+        if self.conditional:
+            return None
+        spec = specs.get(self.attribute)
+        if spec is None:
+            return None
+        value, dimension = spec
+        if dimension is not None and self.dimension is not None and dimension != self.dimension:
+            return None
+
+        compare = OPERATORS[self.operator]
+        if self.operator in (">=", ">"):
+            return compare(value + _EPSILON, self.threshold)
+        return compare(value - _EPSILON, self.threshold)
+
+    def describe(self) -> str:
+        """Readable form, e.g. power <= 70 kW"""
+        unit = CANONICAL_UNITS.get(self.dimension, "") if self.dimension else ""
+        return f"{self.attribute} {self.operator} {self.threshold:g}{' ' + unit if unit else ''}"
+
+
+@dataclass
+class RequirementCheck:
+    """Outcome of checking a code's predicates against a quote line"""
+    passed: List[RequirementPredicate] = field(default_factory=list)
+    failed: List[RequirementPredicate] = field(default_factory=list)
+    unknown: List[RequirementPredicate] = field(default_factory=list)
+
+    @property
+    def status(self) -> str:
+        """"pass", "fail", "unknown" or "none" (code has no predicates)"""
+        if self.failed:
+            return "fail"
+        if self.unknown:
+            return "unknown"
+        return "pass" if self.passed else "none"
+
+
+def parse_requirements(text: Optional[str]) -> List[RequirementPredicate]:
+    """
+    Parse the technical requirements in a code description.
+
+    Requirements without a recognisable attribute (name or unit), such as
+    "ten minste 1 achteras", are skipped. Values inside a test condition
+    ("bij dT ≥ 80 °C") are not requirements and are skipped as well. A
+    requirement that depends on such a test value, or one on a component
+    ("vermogen van de condensor"), is marked conditional.
+
+    Predicates of "a./b./c." sub-clauses carry the clause letter. When a
+    clause has no checkable requirement, that alternative can always
+    apply, so the predicates of its siblings are marked conditional.
+
+    Args:
+        text: Code title/description
+
+    Returns:
+        List of RequirementPredicate, in text order
+    """
+    if not text:
+        return []
+
+    common, clauses = split_clauses(text)
+    predicates = _parse_fragment(common)
+    alternatives = [_parse_fragment(clause, letter) for letter, clause in clauses]
+    open_alternative = any(not found for found in alternatives)
+    for found in alternatives:
+        predicates.extend(replace(p, conditional=True) if open_alternative else p for p in found)
+    return predicates
+
+
+def split_clauses(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Split a description into its common part and "a./b./c." sub-clauses
+
+    Returns:
+        (common text, [(letter, clause text)]); no clauses unless the text
+        has at least "a." and "b." in sequence
+    """
+    markers = []
+    for match in _CLAUSE_PATTERN.finditer(text):
+        if match.group(1) == chr(ord("a") + len(markers)):
+            markers.append(match)
+    if len(markers) < 2:
+        return text, []
+    ends = [marker.start() for marker in markers[1:]] + [len(text)]
+    return text[:markers[0].start()], [
+        (marker.group(1), text[marker.start():end]) for marker, end in zip(markers, ends)
+    ]
+
+
+def _parse_fragment(text: str, alternative: Optional[str] = None) -> List[RequirementPredicate]:
+    predicates: List[RequirementPredicate] = []
+    previous_end = 0
+    for match in _REQUIREMENT_PATTERN.finditer(text):
+        start = match.start()
+        window = text[max(previous_end, start - _NAME_WINDOW):start]
+        joined = previous_end > 0 and bool(_RANGE_JOIN_PATTERN.match(text[previous_end:start]))
+        previous_end = match.end()
+
+        # A value inside a condition ("bij dT ≥ 80 °C")
+        if re.search(r"\bbij\b[^,;]*$", window[-20:], re.IGNORECASE):
+            continue
+
+        unit = match.group("unit")
+        dimension, factor = UNITS.get(normalize_unit(unit), (None, 1.0)) if unit else (None, 1.0)
+
+        names = list(_ATTRIBUTE_PATTERN.finditer(window))
+        attribute = TEXT_ATTRIBUTES.get(names[-1].group(1).lower()) if names else None
+        component = bool(names) and bool(_COMPONENT_PATTERN.match(window, names[-1].end()))
+        if attribute is None and joined and predicates:
+            # Upper bound of a range: attribute and unit of the lower bound
+            attribute = predicates[-1].attribute
+            component = predicates[-1].conditional
+            if dimension is None:
+                dimension = predicates[-1].dimension
+        if attribute is None and dimension is not None:
+            attribute = DIMENSION_ATTRIBUTES.get(dimension)
+        if attribute is None:
+            continue
+
+        following = text[match.end():match.end() + 40]
+        predicates.append(RequirementPredicate(
+            attribute=attribute,
+            operator=_OPERATOR_WORDS[match.group("op").lower()],
+            threshold=parse_number(match.group("number")) * factor,
+            dimension=dimension,
+            text=text[max(start - 30, 0):match.end()].strip(),
+            conditional=component or bool(_CONDITION_PATTERN.match(following)),
+            alternative=alternative
+        ))
+
+    return predicates
+
+
+def normalize_specs(specs: Dict[str, Any]) -> Dict[str, Tuple[float, Optional[str]]]:
+    """
+    Normalise Equipment.specs to attributes in canonical units.
+
+    Keys may carry a unit suffix ("power_kw", "vermogen_w"); values may be
+    numbers or strings with a unit ("12 kW", "SCOP 4,8", "83 %").
+
+    Returns:
+        {attribute: (value, dimension)}; dimension None when unknown
+    """
+    normalized: Dict[str, Tuple[float, Optional[str]]] = {}
+    for key, raw in specs.items():
+        name = str(key).lower().strip().replace(" ", "_")
+        unit: Optional[str] = None
+
+        if name not in SPEC_ATTRIBUTES and "_" in name:
+            base, suffix = name.rsplit("_", 1)
+            if normalize_unit(suffix) in UNITS or suffix == "pct":
+                name, unit = base, "%" if suffix == "pct" else suffix
+
+        attribute = SPEC_ATTRIBUTES.get(name)
+        if attribute is None:
+            continue
+
+        if isinstance(raw, bool):
+            continue
+        if isinstance(raw, (int, float)):
+            value = float(raw)
+        else:
+            found = re.search(r"(\d+(?:[.,]\d+)*)\s*(" + _UNIT_PATTERN + r")?(?![\w/])", str(raw), re.IGNORECASE)
+            if not found:
+                continue
+            value = parse_number(found.group(1))
+            unit = found.group(2) or unit
+
+        dimension = None
+        if unit:
+            dimension, factor = UNITS.get(normalize_unit(unit), (None, 1.0))
+            value *= factor
+        normalized[attribute] = (value, dimension)
+
+    return normalized
+
+
+def check_requirements(
+    predicates: List[RequirementPredicate],
+    specs: Dict[str, Any]
+) -> RequirementCheck:
+    """
+    Check predicates against raw Equipment.specs.
+
+    Args:
+        predicates: Predicates of one code (sub-clause alternatives are ORed)
+        specs: Equipment.specs (normalised here)
+
+    Returns:
+        RequirementCheck
+    """
+    check = RequirementCheck()
+    if not predicates:
+        return check
+
+    normalized = normalize_specs(specs)
+    outcomes: List[Tuple[RequirementPredicate, Optional[bool]]] = []
+    alternatives: Dict[str, List[Tuple[RequirementPredicate, Optional[bool]]]] = {}
+    for predicate in predicates:
+        outcome = (predicate, predicate.evaluate(normalized))
+        if predicate.alternative is None:
+            outcomes.append(outcome)
+        else:
+            alternatives.setdefault(predicate.alternative, []).append(outcome)
+
+    if alternatives:
+        # The best alternative without a violation counts; all of them only when every one fails
+        viable = [found for found in alternatives.values() if all(result is not False for _, result in found)]
+        if viable:
+            outcomes.extend(max(viable, key=lambda found: (
+                all(result for _, result in found), sum(result is True for _, result in found)
+            )))
+        else:
+            outcomes.extend(outcome for found in alternatives.values() for outcome in found)
+
+    for predicate, outcome in outcomes:
+        if outcome is None:
+            check.unknown.append(predicate)
+        elif outcome:
+            check.passed.append(predicate)
+        else:
+            check.failed.append(predicate)
+    return check
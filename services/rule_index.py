@@ -0,0 +1,295 @@
+"""
+CompiledRules - Columnar representation of SubsidyRules for vectorized scoring.
+
+SubsidyMatcher compiles its rules once at load time into NumPy arrays:
+
+- Company sizes as a bitmask per rule
+- Category as an integer code per rule
+- Min/max budget as float arrays (NaN = no limit)
+- Industries and regions as term -> rule ids postings
+
+On top of these an eligibility index answers the hard constraints (company
+size, budget, region) without touching every rule:
+
+- size -> rule mask
+- region -> rule ids, keyed by canonical gazetteer name (see RegionResolver)
+- budget thresholds sorted ascending, so the rules a budget falls outside
+  of are a prefix/suffix found by binary search
+
+Only rules that pass the hard constraints (optionally plus near misses
+failing exactly one) are scored, in a single NumPy pass. The scoring
+follows SubsidyMatcher._evaluate_match exactly (size 20, category 30/10,
+budget 20, industry 15/5, region 15 points).
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from models.schemas import (
+    SubsidyMatchRequest,
+    SubsidyRule,
+    SubsidyCategory,
+    CompanySize
+)
+from services.region_resolver import RegionResolver, ResolvedLocation, get_region_resolver, normalize_region
+
+
+SIZE_BITS: Dict[CompanySize, int] = {size: 1 << i for i, size in enumerate(CompanySize)}
+CATEGORY_CODES: Dict[SubsidyCategory, int] = {cat: i for i, cat in enumerate(SubsidyCategory)}
+
+
+@dataclass
+class RuleScores:
+    """Scores for a set of compiled rules against one request"""
+    positions: np.ndarray  # Rule positions (load order) that were scored
+    score: np.ndarray      # float64, 0-100
+    eligible: np.ndarray   # bool
+
+    def ranking(self, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Rule positions ordered by score descending.
+
+        Ties keep load order, like a stable sort of the full match list.
+        """
+        order = np.argsort(-self.score, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return self.positions[order]
+
+    def iter_ranked(self, limit: Optional[int] = None) -> Iterator[int]:
+        """
+        Rule positions best first, produced lazily.
+
+        Same order as ranking(). With a limit only a bounded heap of
+        `limit` entries is kept; without one the heap is popped on demand,
+        so a consumer that stops early never pays for a full sort.
+        """
+        entries = list(zip((-self.score).tolist(), self.positions.tolist()))
+        if limit is not None:
+            for _, position in heapq.nsmallest(limit, entries):
+                yield position
+            return
+
+        heapq.heapify(entries)
+        while entries:
+            yield heapq.heappop(entries)[1]
+
+
+@dataclass
+class HardConstraints:
+    """Per-rule outcome of the hard eligibility constraints for one request"""
+    size_ok: np.ndarray
+    budget_ok: np.ndarray
+    region_ok: np.ndarray
+
+    @property
+    def failures(self) -> np.ndarray:
+        """Number of failed hard constraints per rule"""
+        return (
+            (~self.size_ok).astype(np.int8)
+            + ~self.budget_ok
+            + ~self.region_ok
+        )
+
+
+class CompiledRules:
+    """Columnar arrays and eligibility index compiled from SubsidyRules"""
+
+    def __init__(self, rules: List[SubsidyRule], region_resolver: Optional[RegionResolver] = None):
+        """
+        Compile rules.
+
+        Args:
+            rules: Subsidy rules in load order
+            region_resolver: Gazetteer for rule regions (default: global instance)
+        """
+        self.rules = rules
+        self.region_resolver = region_resolver or get_region_resolver()
+        n = len(rules)
+
+        self.size_mask = np.zeros(n, dtype=np.uint8)
+        self.category = np.zeros(n, dtype=np.int8)
+        self.min_budget = np.full(n, np.nan)
+        self.max_budget = np.full(n, np.nan)
+        self.has_industries = np.zeros(n, dtype=bool)
+        self.has_regions = np.zeros(n, dtype=bool)
+
+        industries: Dict[str, List[int]] = {}
+        regions: Dict[str, List[int]] = {}
+        unresolved_regions: Dict[str, List[int]] = {}
+
+        for i, rule in enumerate(rules):
+            for size in rule.eligible_company_sizes:
+                self.size_mask[i] |= SIZE_BITS[size]
+            self.category[i] = CATEGORY_CODES[rule.category]
+
+            # Zero budgets mean "no limit", as in _evaluate_match
+            if rule.min_budget:
+                self.min_budget[i] = rule.min_budget
+            if rule.max_budget:
+                self.max_budget[i] = rule.max_budget
+
+            if rule.eligible_industries:
+                self.has_industries[i] = True
+                for industry in rule.eligible_industries:
+                    industries.setdefault(industry, []).append(i)
+
+            if rule.regions:
+                self.has_regions[i] = True
+                for region in rule.regions:
+                    key = self.region_resolver.region_key(region)
+                    if key is not None:
+                        regions.setdefault(key, []).append(i)
+                    else:
+                        unresolved_regions.setdefault(normalize_region(region), []).append(i)
+
+        self.industry_rules: Dict[str, np.ndarray] = {
+            industry: np.unique(ids) for industry, ids in industries.items()
+        }
+        self.region_rules: Dict[str, np.ndarray] = {
+            region: np.unique(ids) for region, ids in regions.items()
+        }
+        # Regions the gazetteer does not know (e.g. "Randstad")
+        self.unresolved_region_rules: Dict[str, np.ndarray] = {
+            region: np.unique(ids) for region, ids in unresolved_regions.items()
+        }
+
+        self._build_eligibility_index()
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    # ========================================================================
+    # ELIGIBILITY INDEX
+    # ========================================================================
+
+    def _build_eligibility_index(self):
+        """Build lookup structures for the hard constraints"""
+        # Size -> rule mask
+        self.size_rules: Dict[CompanySize, np.ndarray] = {
+            size: (self.size_mask & bit) != 0 for size, bit in SIZE_BITS.items()
+        }
+
+        # Budget thresholds, sorted ascending with their rule ids
+        has_min = np.flatnonzero(~np.isnan(self.min_budget))
+        order = np.argsort(self.min_budget[has_min], kind="stable")
+        self.min_budget_rules = has_min[order]
+        self.min_budget_sorted = self.min_budget[self.min_budget_rules]
+
+        has_max = np.flatnonzero(~np.isnan(self.max_budget))
+        order = np.argsort(self.max_budget[has_max], kind="stable")
+        self.max_budget_rules = has_max[order]
+        self.max_budget_sorted = self.max_budget[self.max_budget_rules]
+
+    def budget_ok(self, budget: float) -> np.ndarray:
+        """Per rule: is the budget within [min_budget, max_budget]"""
+        ok = np.ones(len(self.rules), dtype=bool)
+        # Rules whose minimum is above the budget form a suffix
+        start = np.searchsorted(self.min_budget_sorted, budget, side="right")
+        ok[self.min_budget_rules[start:]] = False
+        # Rules whose maximum is below the budget form a prefix
+        end = np.searchsorted(self.max_budget_sorted, budget, side="left")
+        ok[self.max_budget_rules[:end]] = False
+        return ok
+
+    def region_hits(self, location: ResolvedLocation) -> np.ndarray:
+        """Per rule: does the resolved company location lie in any of its regions"""
+        hits = np.zeros(len(self.rules), dtype=bool)
+        for region in location.regions:
+            ids = self.region_rules.get(region)
+            if ids is not None:
+                hits[ids] = True
+        for region, ids in self.unresolved_region_rules.items():
+            if region in location.normalized:
+                hits[ids] = True
+        return hits
+
+    def hard_constraints(
+        self,
+        request: SubsidyMatchRequest,
+        location: Optional[ResolvedLocation] = None
+    ) -> HardConstraints:
+        """Evaluate company size, budget and region for all rules via the index"""
+        if location is None:
+            location = self.region_resolver.resolve(request.company.location)
+        return HardConstraints(
+            size_ok=self.size_rules[request.company.size],
+            budget_ok=self.budget_ok(request.project.budget),
+            region_ok=~self.has_regions | self.region_hits(location)
+        )
+
+    def evaluate(
+        self,
+        request: SubsidyMatchRequest,
+        include_near_misses: bool = False,
+        location: Optional[ResolvedLocation] = None
+    ) -> RuleScores:
+        """
+        Pre-filter rules on the hard constraints and score the survivors.
+
+        Args:
+            request: Subsidy match request
+            include_near_misses: Also score rules failing exactly one hard constraint
+            location: Company location resolved by the region resolver
+
+        Returns:
+            RuleScores for the selected rules
+        """
+        constraints = self.hard_constraints(request, location)
+        max_failures = 1 if include_near_misses else 0
+        positions = np.flatnonzero(constraints.failures <= max_failures)
+        return self.score(request, positions, constraints)
+
+    # ========================================================================
+    # SCORING
+    # ========================================================================
+
+    def score(
+        self,
+        request: SubsidyMatchRequest,
+        positions: Optional[np.ndarray] = None,
+        constraints: Optional[HardConstraints] = None
+    ) -> RuleScores:
+        """
+        Score a request against compiled rules.
+
+        Args:
+            request: Subsidy match request
+            positions: Rule positions to score (None = all rules)
+            constraints: Precomputed hard constraints for this request
+
+        Returns:
+            RuleScores for the scored rules
+        """
+        if positions is None:
+            positions = np.arange(len(self.rules))
+        if constraints is None:
+            constraints = self.hard_constraints(request)
+
+        size_ok = constraints.size_ok[positions]
+        budget_ok = constraints.budget_ok[positions]
+        region_ok = constraints.region_ok[positions]
+
+        category_ok = self.category[positions] == CATEGORY_CODES[request.project.category]
+
+        industry_ok = ~self.has_industries[positions]
+        industry_ids = self.industry_rules.get(request.company.industry)
+        if industry_ids is not None:
+            industry_ok |= np.isin(positions, industry_ids)
+
+        score = (
+            20.0 * size_ok
+            + np.where(category_ok, 30.0, 10.0)
+            + 20.0 * budget_ok
+            + np.where(industry_ok, 15.0, 5.0)
+            + 15.0 * region_ok
+        )
+
+        return RuleScores(
+            positions=positions,
+            score=np.minimum(score, 100.0),
+            eligible=size_ok & budget_ok & region_ok
+        )
@@ -0,0 +1,189 @@
+"""
+ScenarioEvaluator - Side-by-side what-if variants of one quote.
+
+Sales engineers compare tens of variants of a quote (another heat pump,
+extra glass, different quantities). Variants differ from the base quote in
+a few lines, so matching is shared:
+
+- Base lines are matched once (through the QuoteSessions line cache)
+- Changed and added lines are collected over all variants, de-duplicated
+  by line fingerprint and matched once on a worker pool
+- Per variant only the quote-level combination (multi-measure ISDE rate)
+  and the totals are recomputed, also on the worker pool
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.subsidy_schemas import (
+    Equipment,
+    EquipmentMatch,
+    Quote,
+    QuoteAnalysis,
+    QuoteScenario,
+    ScenarioComparisonResponse,
+    ScenarioResult
+)
+from services.quote_sessions import QuoteSessions, get_quote_sessions, line_fingerprint
+
+
+@dataclass
+class _Variant:
+    """A scenario applied to the base quote"""
+    name: str
+    quote: Quote
+    base_lines: List[Optional[int]]  # Base line index per line, None for changed lines
+
+
+class ScenarioEvaluator:
+    """Evaluates quote variants against a shared base"""
+
+    def __init__(self, sessions: Optional[QuoteSessions] = None, max_workers: int = 8):
+        """
+        Initialize evaluator
+
+        Args:
+            sessions: Session store whose line cache is shared (default: global instance)
+            max_workers: Threads used for matching and variants (capped at CPU count)
+        """
+        self.sessions = sessions or get_quote_sessions()
+        self.matcher = self.sessions.matcher
+        self.max_workers = max(1, min(max_workers, os.cpu_count() or 1))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def compare(self, quote: Quote, scenarios: Sequence[QuoteScenario]) -> ScenarioComparisonResponse:
+        """
+        Evaluate scenarios against a base quote.
+
+        Args:
+            quote: Base quote
+            scenarios: Variants as line deltas against the base quote
+
+        Returns:
+            ScenarioComparisonResponse with one row per scenario
+
+        Raises:
+            ValueError: A delta refers to a missing line or lacks equipment
+        """
+        started = time.perf_counter()
+        variants = [apply_scenario(quote, scenario) for scenario in scenarios]
+
+        base_matches = list(self._executor.map(self.sessions.match_line, quote.equipment))
+        changed: Dict[str, Equipment] = {}
+        for variant in variants:
+            for equipment, base_line in zip(variant.quote.equipment, variant.base_lines):
+                if base_line is None:
+                    changed.setdefault(line_fingerprint(equipment), equipment)
+        matched = dict(zip(changed, self._executor.map(self.sessions.match_line, changed.values())))
+
+        def evaluate(variant: _Variant) -> Tuple[QuoteAnalysis, int]:
+            matches: List[EquipmentMatch] = []
+            for equipment, base_line in zip(variant.quote.equipment, variant.base_lines):
+                if base_line is not None:
+                    matches.append(base_matches[base_line])
+                else:
+                    match = matched[line_fingerprint(equipment)]
+                    if match.equipment is not equipment:
+                        match = match.model_copy(update={"equipment": equipment})
+                    matches.append(match)
+            lines_changed = sum(1 for base_line in variant.base_lines if base_line is None)
+            return self.matcher.build_analysis(variant.quote, matches, time.perf_counter()), lines_changed
+
+        base_analysis = self.matcher.build_analysis(quote, base_matches, started)
+        base = _result("base", base_analysis, 0)
+        results = [
+            _result(variant.name, analysis, lines_changed, base)
+            for variant, (analysis, lines_changed) in zip(variants, self._executor.map(evaluate, variants))
+        ]
+        return ScenarioComparisonResponse(
+            base=base,
+            scenarios=results,
+            processing_time_ms=(time.perf_counter() - started) * 1000
+        )
+
+
+def apply_scenario(quote: Quote, scenario: QuoteScenario) -> _Variant:
+    """
+    Apply a scenario's line deltas to the base quote.
+
+    Line indexes refer to the base quote, so deltas do not depend on each
+    other's order. The subtotal keeps non-equipment amounts (labour etc.)
+    and changes by the difference in line totals; a quote without one is
+    totalled from its lines.
+
+    Raises:
+        ValueError: A delta refers to a missing line or lacks equipment
+    """
+    lines: List[Optional[Equipment]] = list(quote.equipment)
+    changed = [False] * len(lines)
+    added: List[Equipment] = []
+
+    for delta in scenario.deltas:
+        if delta.action in ("replace", "add") and delta.equipment is None:
+            raise ValueError(f"Scenario '{scenario.name}': {delta.action} needs equipment")
+        if delta.action == "add":
+            added.append(delta.equipment)
+            continue
+        if delta.line is None or not 0 <= delta.line < len(lines):
+            raise ValueError(f"Scenario '{scenario.name}': line {delta.line} not found")
+        lines[delta.line] = delta.equipment if delta.action == "replace" else None
+        changed[delta.line] = True
+
+    equipment: List[Equipment] = []
+    base_lines: List[Optional[int]] = []
+    for index, line in enumerate(lines):
+        if line is not None:
+            equipment.append(line)
+            base_lines.append(None if changed[index] else index)
+    equipment.extend(added)
+    base_lines.extend([None] * len(added))
+
+    total = sum(e.total_price for e in equipment)
+    if quote.subtotal:
+        subtotal = max(quote.subtotal + total - sum(e.total_price for e in quote.equipment), 0.0)
+    else:
+        subtotal = total
+    variant = quote.model_copy(update={"equipment": equipment, "subtotal": subtotal})
+    return _Variant(name=scenario.name, quote=variant, base_lines=base_lines)
+
+
+def _result(
+    name: str,
+    analysis: QuoteAnalysis,
+    lines_changed: int,
+    base: Optional[ScenarioResult] = None
+) -> ScenarioResult:
+    return ScenarioResult(
+        name=name,
+        lines_changed=lines_changed,
+        total_investment=analysis.total_investment,
+        total_subsidies=analysis.total_subsidies,
+        net_cost_after_subsidies=analysis.net_cost_after_subsidies,
+        eia_total=analysis.eia_total,
+        isde_total=analysis.isde_total,
+        mia_total=analysis.mia_total,
+        vamil_total=analysis.vamil_total,
+        net_cost_delta=round(analysis.net_cost_after_subsidies - base.net_cost_after_subsidies, 2) if base else 0.0,
+        subsidy_delta=round(analysis.total_subsidies - base.total_subsidies, 2) if base else 0.0
+    )
+
+
+# Global instance (singleton pattern)
+_evaluator_instance: Optional[ScenarioEvaluator] = None
+
+
+def get_scenario_evaluator() -> ScenarioEvaluator:
+    """
+    Get the global ScenarioEvaluator instance (singleton).
+
+    Shares the global QuoteSessions line cache, returns cached instance on subsequent calls.
+    """
+    global _evaluator_instance
+
+    if _evaluator_instance is None:
+        _evaluator_instance = ScenarioEvaluator()
+
+    return _evaluator_instance
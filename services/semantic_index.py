@@ -0,0 +1,293 @@
+"""
+SemanticIndex - Latent-semantic retrieval over EIA and MIA/Vamil codes.
+
+Keyword search misses paraphrases between installer wording ("lucht/water
+warmtepomp 12kW") and the formal brochure text ("Bestemd voor: het nuttig
+aanwenden van omgevingswarmte ..."). This index embeds every code with
+TF-IDF followed by a truncated SVD (LSA), using only NumPy:
+
+- Vectors are built offline and stored as float32 in the catalog snapshot
+- A query is folded into the same space and scored with one dot product
+- Top-k selection uses argpartition, not a full sort
+
+It is a recall booster: hybrid_search() fuses its scores with the keyword
+index of SubsidyDatabase using configurable weights.
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from models.subsidy_schemas import SubsidyScheme
+from services.catalog_snapshot import CatalogSnapshot
+from services.subsidy_database import tokenize
+
+if TYPE_CHECKING:
+    from services.subsidy_database import SubsidyDatabase
+
+
+DEFAULT_COMPONENTS = 96
+
+# Snapshot artefact names
+_DOC_IDS = "semantic.doc_ids"
+_VOCABULARY = "semantic.vocabulary"
+_IDF = "semantic.idf"
+_COMPONENTS = "semantic.components"
+_DOC_VECTORS = "semantic.doc_vectors"
+
+
+@dataclass
+class FusionWeights:
+    """Weights for combining keyword and semantic scores"""
+    keyword: float = 0.6
+    semantic: float = 0.4
+    min_semantic_score: float = 0.2  # Cosine below this is treated as noise
+
+
+@dataclass
+class HybridHit:
+    """A code found by hybrid (keyword + semantic) search"""
+    scheme: SubsidyScheme
+    code: str
+    score: float
+    keyword_score: float
+    semantic_score: float
+
+
+class SemanticIndex:
+    """
+    TF-IDF + truncated SVD embedding of subsidy code descriptions.
+
+    Attributes:
+        doc_ids: "<scheme>:<code>" per row of doc_vectors
+        vocabulary: Term per row of components
+        idf: Inverse document frequency per term
+        components: (terms x k) projection into latent space
+        doc_vectors: (docs x k) L2-normalised document embeddings
+    """
+
+    def __init__(
+        self,
+        doc_ids: np.ndarray,
+        vocabulary: np.ndarray,
+        idf: np.ndarray,
+        components: np.ndarray,
+        doc_vectors: np.ndarray
+    ):
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+        self.idf = idf.astype(np.float32, copy=False)
+        self.components = components.astype(np.float32, copy=False)
+        self.doc_vectors = doc_vectors.astype(np.float32, copy=False)
+        self.term_index: Dict[str, int] = {str(t): i for i, t in enumerate(vocabulary)}
+
+    # ========================================================================
+    # BUILDING
+    # ========================================================================
+
+    @classmethod
+    def build(
+        cls,
+        documents: Sequence[Tuple[str, str]],
+        n_components: int = DEFAULT_COMPONENTS
+    ) -> "SemanticIndex":
+        """
+        Build the index from (doc_id, text) pairs.
+
+        Args:
+            documents: Document ids and texts
+            n_components: Latent dimensions to keep
+
+        Returns:
+            SemanticIndex
+        """
+        tokenized = [tokenize(text) for _, text in documents]
+        vocabulary = sorted({term for tokens in tokenized for term in tokens})
+        term_index = {term: i for i, term in enumerate(vocabulary)}
+
+        # Term-frequency matrix with sublinear scaling
+        tf = np.zeros((len(documents), len(vocabulary)), dtype=np.float64)
+        for row, tokens in enumerate(tokenized):
+            for term in tokens:
+                tf[row, term_index[term]] += 1
+        np.log1p(tf, out=tf)
+
+        # Smoothed inverse document frequency
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log((1 + len(documents)) / (1 + df)) + 1.0
+
+        tfidf = _normalize_rows(tf * idf)
+
+        # Truncated SVD: tfidf = U S Vt, documents live in U S
+        u, s, vt = np.linalg.svd(tfidf, full_matrices=False)
+        k = min(n_components, len(s))
+        doc_vectors = _normalize_rows(u[:, :k] * s[:k])
+        components = vt[:k].T
+
+        return cls(
+            doc_ids=np.array([doc_id for doc_id, _ in documents]),
+            vocabulary=np.array(vocabulary),
+            idf=idf,
+            components=components,
+            doc_vectors=doc_vectors
+        )
+
+    @classmethod
+    def build_from_database(
+        cls,
+        db: "SubsidyDatabase",
+        n_components: int = DEFAULT_COMPONENTS
+    ) -> "SemanticIndex":
+        """Build the index over all EIA and MIA/Vamil codes in the database"""
+        documents = [
+            (f"{SubsidyScheme.EIA.value}:{code.code}", f"{code.title} {code.description or ''}")
+            for code in db.get_all_eia_codes()
+        ]
+        documents += [
+            (f"{SubsidyScheme.MIA.value}:{code.code}", f"{code.title} {code.description}")
+            for code in db.get_all_mia_codes()
+        ]
+        return cls.build(documents, n_components=n_components)
+
+    # ========================================================================
+    # SNAPSHOT
+    # ========================================================================
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot) -> Optional["SemanticIndex"]:
+        """Load the index from a catalog snapshot, or None if not present"""
+        names = (_DOC_IDS, _VOCABULARY, _IDF, _COMPONENTS, _DOC_VECTORS)
+        if not all(snapshot.has(name) for name in names):
+            return None
+        return cls(*(snapshot.get(name) for name in names))
+
+    def to_snapshot(self, snapshot: CatalogSnapshot):
+        """Store the index in a catalog snapshot"""
+        snapshot.put(_DOC_IDS, self.doc_ids)
+        snapshot.put(_VOCABULARY, self.vocabulary)
+        snapshot.put(_IDF, self.idf)
+        snapshot.put(_COMPONENTS, self.components)
+        snapshot.put(_DOC_VECTORS, self.doc_vectors)
+
+    # ========================================================================
+    # QUERYING
+    # ========================================================================
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        Fold a query text into the latent space.
+
+        Returns:
+            L2-normalised vector, or None if no query term is in the vocabulary
+        """
+        counts: Dict[int, int] = {}
+        for term in tokenize(text):
+            idx = self.term_index.get(term)
+            if idx is not None:
+                counts[idx] = counts.get(idx, 0) + 1
+        if not counts:
+            return None
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        weights = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        weights *= self.idf[indices]
+
+        vector = weights @ self.components[indices]
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def search(self, text: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Find the codes closest to a query text.
+
+        Args:
+            text: Free text (equipment description, keywords, ...)
+            top_k: Number of results
+
+        Returns:
+            List of (doc_id, cosine similarity), best first
+        """
+        query = self.embed(text)
+        if query is None or top_k <= 0:
+            return []
+
+        scores = self.doc_vectors @ query
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [(str(self.doc_ids[i]), float(scores[i])) for i in top]
+
+
+def hybrid_search(
+    db: "SubsidyDatabase",
+    text: str,
+    keywords: Optional[List[str]] = None,
+    top_k: int = 10,
+    weights: Optional[FusionWeights] = None
+) -> List[HybridHit]:
+    """
+    Search EIA and MIA/Vamil codes with keyword and semantic scores fused.
+
+    Keyword hits are normalised to [0, 1] by the best hit count; semantic
+    scores are cosine similarities. Codes found only semantically are added
+    when their similarity reaches weights.min_semantic_score.
+
+    Args:
+        db: Subsidy database
+        text: Free text describing the equipment
+        keywords: Keywords for the keyword index (defaults to terms of text)
+        top_k: Number of results
+        weights: Fusion weights
+
+    Returns:
+        List of HybridHit, best first
+    """
+    weights = weights or FusionWeights()
+    if keywords is None:
+        keywords = list(dict.fromkeys(tokenize(text)))
+
+    keyword_hits: Dict[str, float] = {}
+    for scheme, scores in db.get_keyword_scores(keywords).items():
+        for code, hits in scores.items():
+            keyword_hits[f"{scheme}:{code}"] = float(hits)
+    if keyword_hits:
+        best = max(keyword_hits.values())
+        keyword_hits = {doc_id: hits / best for doc_id, hits in keyword_hits.items()}
+
+    # Over-fetch semantically so fusion can reorder keyword results
+    semantic_hits = {
+        doc_id: score
+        for doc_id, score in db.get_semantic_index().search(text, top_k=top_k * 3)
+        if score >= weights.min_semantic_score
+    }
+
+    fused = {
+        doc_id: weights.keyword * keyword_hits.get(doc_id, 0.0)
+        + weights.semantic * semantic_hits.get(doc_id, 0.0)
+        for doc_id in keyword_hits.keys() | semantic_hits.keys()
+    }
+
+    # Generic terms can hit hundreds of codes; only materialise the top k
+    hits = []
+    for doc_id in heapq.nlargest(top_k, fused, key=fused.__getitem__):
+        scheme, code = doc_id.split(":", 1)
+        hits.append(HybridHit(
+            scheme=SubsidyScheme(scheme),
+            code=code,
+            score=fused[doc_id],
+            keyword_score=keyword_hits.get(doc_id, 0.0),
+            semantic_score=semantic_hits.get(doc_id, 0.0)
+        ))
+    return hits
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise matrix rows (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
@@ -0,0 +1,235 @@
+"""
+Subsidy amount calculations per scheme.
+
+Turns a matched code/meldcode plus an equipment line into a
+SubsidyCalculation:
+
+- EIA: 40% of the investment, minimum €2.500, optional cap per unit
+- MIA: code percentage (13/27/36/45%) of the investment, minimum €2.500
+  and at most €25 mln per asset
+- Vamil: 75% free depreciation, valued at its liquidity advantage (same
+  minimum as MIA)
+- ISDE: fixed amount per unit (warmtepomp, zonneboiler) or per m²
+  (isolatie, glas)
+"""
+
+from typing import Optional
+
+from models.subsidy_schemas import (
+    Equipment,
+    EquipmentCategory,
+    EIACode,
+    ISDECategory,
+    ISDEMeldcode,
+    MIAVamilCode,
+    SubsidyCalculation,
+    SubsidyScheme
+)
+
+
+# Vamil does not reduce the cost, it lets you depreciate earlier. The
+# benefit is the interest/liquidity advantage on the deferred tax,
+# estimated as a fraction of the freely depreciated amount.
+VAMIL_LIQUIDITY_FACTOR = 0.05
+
+# MIA/Vamil investment limits per asset (bedrijfsmiddel)
+MIA_MIN_INVESTMENT = 2500.0
+MIA_MAX_INVESTMENT = 25_000_000.0
+
+# ISDE categories whose amounts are per m²
+PER_M2_CATEGORIES = {
+    ISDECategory.ISOLATIE,
+    ISDECategory.ISOLATIEMATERIALEN,
+    ISDECategory.GLAS,
+    ISDECategory.HOOGRENDEMENTSGLAS,
+}
+
+# ISDE per-m² rate keys; "meerdere" applies when 2+ measures are taken,
+# "monument" to monumental buildings where the class has that rate
+ISDE_RATE_SINGLE = "enkel"
+ISDE_RATE_MULTIPLE = "meerdere"
+ISDE_RATE_MONUMENT = "monument"
+
+# Equipment category -> ISDE category as used in the meldcode lists
+EQUIPMENT_TO_ISDE = {
+    EquipmentCategory.WARMTEPOMP: ISDECategory.WARMTEPOMP,
+    EquipmentCategory.ISOLATIE: ISDECategory.ISOLATIE,
+    EquipmentCategory.GLAS: ISDECategory.HOOGRENDEMENTSGLAS,
+    EquipmentCategory.ZONNEBOILER: ISDECategory.ZONNEBOILER,
+}
+
+
+def surface_area(equipment: Equipment) -> float:
+    """Surface in m² for per-m² measures (specs.area_m2, else quantity)"""
+    area = equipment.specs.get("area_m2")
+    try:
+        return float(area) if area is not None else float(equipment.quantity)
+    except (TypeError, ValueError):
+        return float(equipment.quantity)
+
+
+def is_monument(equipment: Equipment) -> bool:
+    """Line is for a monumental building (specs.monument or specs.woning_type)"""
+    if equipment.specs.get("monument"):
+        return True
+    return "monument" in str(equipment.specs.get("woning_type") or "").lower()
+
+
+def isde_rate(entry: ISDEMeldcode, rate: str, monument: bool) -> str:
+    """
+    Per-m² rate key that is paid: the monument rate replaces the single or
+    multi-measure rate for monumental buildings when it is higher
+    """
+    amounts = entry.amounts or {}
+    if monument and (amounts.get(ISDE_RATE_MONUMENT) or 0.0) > (amounts.get(rate) or 0.0):
+        return ISDE_RATE_MONUMENT
+    return rate
+
+
+def isde_measure(entry: ISDEMeldcode) -> str:
+    """
+    Measure an ISDE meldcode counts as for the multi-measure rate.
+
+    Insulation counts per type (dak, gevel, vloer, ...); heat pumps, glass
+    and solar boilers count as one measure each.
+    """
+    if entry.category == ISDECategory.ISOLATIE:
+        detail = (entry.attributes or {}).get("category_detail")
+        if detail:
+            return f"{entry.category.value}:{detail}"
+    return entry.category.value
+
+
+def calculate_eia(code: EIACode, equipment: Equipment) -> SubsidyCalculation:
+    """EIA: 40% deduction over the eligible investment"""
+    investment = equipment.total_price
+    rules = [f"{code.subsidy_percentage * 100:.0f}% energie-investeringsaftrek"]
+    warnings = []
+
+    if code.max_investment_per_unit:
+        cap = code.max_investment_per_unit * equipment.quantity
+        if investment > cap:
+            investment = cap
+            rules.append(f"Investment capped at €{cap:,.2f}")
+
+    subsidy = investment * code.subsidy_percentage
+    if equipment.total_price < code.min_investment:
+        subsidy = 0.0
+        warnings.append(f"Investment below EIA minimum of €{code.min_investment:,.2f}")
+
+    return SubsidyCalculation(
+        scheme=SubsidyScheme.EIA,
+        code=code.code,
+        title=code.title,
+        investment_amount=investment,
+        subsidy_amount=round(subsidy, 2),
+        percentage=code.subsidy_percentage,
+        rules_applied=rules,
+        warnings=warnings
+    )
+
+
+def calculate_mia(code: MIAVamilCode, equipment: Equipment) -> Optional[SubsidyCalculation]:
+    """MIA: percentage deduction over the investment"""
+    if not code.mia_percentage:
+        return None
+
+    percentage = code.mia_percentage / 100
+    investment = equipment.total_price
+    rules = [f"{code.mia_percentage}% milieu-investeringsaftrek"]
+    warnings = []
+
+    if investment > MIA_MAX_INVESTMENT:
+        investment = MIA_MAX_INVESTMENT
+        rules.append(f"Investment capped at €{MIA_MAX_INVESTMENT:,.2f}")
+
+    subsidy = investment * percentage
+    if equipment.total_price < MIA_MIN_INVESTMENT:
+        subsidy = 0.0
+        warnings.append(f"Investment below MIA minimum of €{MIA_MIN_INVESTMENT:,.2f}")
+
+    return SubsidyCalculation(
+        scheme=SubsidyScheme.MIA,
+        code=code.code,
+        title=code.title,
+        investment_amount=investment,
+        subsidy_amount=round(subsidy, 2),
+        percentage=percentage,
+        rules_applied=rules,
+        warnings=warnings
+    )
+
+
+def calculate_vamil(code: MIAVamilCode, equipment: Equipment) -> Optional[SubsidyCalculation]:
+    """Vamil: free depreciation, valued at its liquidity advantage"""
+    if not code.vamil_percentage:
+        return None
+
+    percentage = code.vamil_percentage / 100
+    subsidy = equipment.total_price * percentage * VAMIL_LIQUIDITY_FACTOR
+    warnings = []
+    if equipment.total_price < MIA_MIN_INVESTMENT:
+        subsidy = 0.0
+        warnings.append(f"Investment below Vamil minimum of €{MIA_MIN_INVESTMENT:,.2f}")
+
+    return SubsidyCalculation(
+        scheme=SubsidyScheme.VAMIL,
+        code=code.code,
+        title=code.title,
+        investment_amount=equipment.total_price,
+        subsidy_amount=round(subsidy, 2),
+        percentage=percentage,
+        rules_applied=[
+            f"{code.vamil_percentage}% willekeurige afschrijving",
+            f"Valued at {VAMIL_LIQUIDITY_FACTOR:.0%} liquidity advantage"
+        ],
+        warnings=warnings
+    )
+
+
+def calculate_isde(
+    entry: ISDEMeldcode,
+    equipment: Equipment,
+    rate: str = ISDE_RATE_SINGLE
+) -> Optional[SubsidyCalculation]:
+    """
+    ISDE: fixed amount per unit, or amount per m² for insulation and glass.
+
+    Args:
+        entry: Matched meldcode
+        equipment: Quote line
+        rate: Per-m² rate key ("enkel" or "meerdere"); lines of monumental
+            buildings get the monument rate instead where it is higher
+
+    Returns:
+        SubsidyCalculation, or None if the meldcode has no usable amount
+    """
+    title = " ".join(p for p in (entry.manufacturer, entry.model) if p) or entry.meldcode
+
+    if entry.category in PER_M2_CATEGORIES:
+        rate = isde_rate(entry, rate, is_monument(equipment))
+        per_m2 = (entry.amounts or {}).get(rate)
+        if per_m2 is None:
+            return None
+        area = surface_area(equipment)
+        return SubsidyCalculation(
+            scheme=SubsidyScheme.ISDE,
+            code=entry.meldcode,
+            title=title,
+            investment_amount=equipment.total_price,
+            subsidy_amount=round(min(per_m2 * area, equipment.total_price), 2),
+            percentage=None,
+            rules_applied=[f"€{per_m2:,.2f} per m² ({rate}) x {area:g} m²"]
+        )
+
+    if entry.amount_eur is None:
+        return None
+    return SubsidyCalculation(
+        scheme=SubsidyScheme.ISDE,
+        code=entry.meldcode,
+        title=title,
+        investment_amount=equipment.total_price,
+        subsidy_amount=round(entry.amount_eur * equipment.quantity, 2),
+        percentage=None,
+        rules_applied=[f"€{entry.amount_eur:,.2f} per unit x {equipment.quantity}"]
+    )
@@ -5,9 +5,10 @@ Loads EIA, ISDE, and MIA/Vamil data from JSON files and provides
 fast lookup methods for subsidy matching.
 """
 
+import hashlib
 import json
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, TYPE_CHECKING
 from collections import defaultdict
 import re
 
@@ -17,6 +18,41 @@ from models.subsidy_schemas import (
     MIAVamilCode,
     ISDECategory
 )
+from services.catalog_snapshot import CatalogSnapshot, SNAPSHOT_FILENAME
+from services.requirement_predicates import RequirementPredicate, parse_requirements
+
+if TYPE_CHECKING:
+    from services.catalog_views import CatalogViews
+    from services.pareto_frontier import ParetoFrontiers
+    from services.semantic_index import SemanticIndex
+
+
+# Source files that make up one catalog version
+CATALOG_FILES = (
+    "eia_2025.json",
+    "isde_warmtepompen.json",
+    "isde_isolatiematerialen.json",
+    "isde_hoogrendementsglas.json",
+    "isde_zonneboilers.json",
+    "mia_vamil_2025.json",
+)
+
+# Dutch stopwords to exclude from keyword indexes
+STOPWORDS = frozenset({
+    'de', 'het', 'een', 'en', 'van', 'voor', 'met', 'aan', 'op', 'in',
+    'te', 'door', 'bij', 'uit', 'tot', 'of', 'als', 'naar', 'om',
+    'bestemd', 'zijn', 'wordt', 'worden', 'heeft', 'hebben'
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into significant lowercase terms (duplicates kept).
+
+    Removes special characters, short words and common Dutch words.
+    """
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    return [w for w in text.split() if len(w) > 2 and w not in STOPWORDS]
 
 
 class SubsidyDatabase:
@@ -68,6 +104,17 @@ class SubsidyDatabase:
         self.mia_by_keyword: Dict[str, List[MIAVamilCode]] = defaultdict(list)
         self.mia_by_percentage: Dict[int, List[MIAVamilCode]] = defaultdict(list)
 
+        # Technical requirements parsed from the code texts
+        self.eia_requirements: Dict[str, List[RequirementPredicate]] = {}
+        self.mia_requirements: Dict[str, List[RequirementPredicate]] = {}
+
+        # Derived artefacts (loaded lazily from the catalog snapshot)
+        self.catalog_version: str = self._compute_catalog_version()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._semantic_index: Optional["SemanticIndex"] = None
+        self._pareto_frontiers: Optional["ParetoFrontiers"] = None
+        self._catalog_views: Optional["CatalogViews"] = None
+
         # Load all data
         self._load_all_data()
         self._build_indexes()
@@ -141,6 +188,9 @@ class SubsidyDatabase:
             for keyword in keywords:
                 self.eia_by_keyword[keyword].append(code)
 
+            # By requirement predicates
+            self._add_requirements(self.eia_requirements, code.code, text)
+
         # ISDE indexes
         all_isde = (self.isde_warmtepompen + self.isde_isolatie +
                     self.isde_glas + self.isde_zonneboiler)
@@ -174,32 +224,52 @@ class SubsidyDatabase:
             for keyword in keywords:
                 self.mia_by_keyword[keyword].append(code)
 
+            # By requirement predicates
+            self._add_requirements(self.mia_requirements, code.code, text)
+
+    @staticmethod
+    def _add_requirements(index: Dict[str, List[RequirementPredicate]], code: str, text: str):
+        """Add the predicates of one catalog entry; a code listed twice repeats its title"""
+        predicates = index.setdefault(code, [])
+        for predicate in parse_requirements(text):
+            if predicate not in predicates:
+                predicates.append(predicate)
+
     def _extract_keywords(self, text: str) -> Set[str]:
         """
         Extract keywords from text for indexing.
 
         Removes common Dutch words and extracts significant terms.
         """
-        # Normalize
-        text = text.lower()
-
-        # Remove special characters
-        text = re.sub(r'[^\w\s]', ' ', text)
+        return set(tokenize(text))
 
-        # Split into words
-        words = text.split()
+    def _compute_catalog_version(self) -> str:
+        """
+        Compute catalog version as a content hash of all source files.
 
-        # Dutch stopwords to exclude
-        stopwords = {
-            'de', 'het', 'een', 'en', 'van', 'voor', 'met', 'aan', 'op', 'in',
-            'te', 'door', 'bij', 'uit', 'tot', 'of', 'als', 'naar', 'om',
-            'bestemd', 'zijn', 'wordt', 'worden', 'heeft', 'hebben'
-        }
+        Any change to the subsidy JSON files yields a new version, which
+        invalidates snapshots and caches built from the old data.
+        """
+        digest = hashlib.sha256()
+        for filename in CATALOG_FILES:
+            path = self.data_dir / filename
+            digest.update(filename.encode("utf-8"))
+            if path.exists():
+                digest.update(path.read_bytes())
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def _score_keywords(index: Dict[str, list], keywords: List[str]) -> Dict[str, int]:
+        """Count keyword hits per code in a keyword index"""
+        keyword_scores: Dict[str, int] = defaultdict(int)
 
-        # Filter and return
-        keywords = {w for w in words if len(w) > 2 and w not in stopwords}
+        for keyword in keywords:
+            keyword_lower = keyword.lower()
+            if keyword_lower in index:
+                for code in index[keyword_lower]:
+                    keyword_scores[code.code] += 1
 
-        return keywords
+        return keyword_scores
 
     # ========================================================================
     # SEARCH METHODS - EIA
@@ -216,13 +286,7 @@ class SubsidyDatabase:
         Returns:
             List of matching EIA codes, sorted by relevance
         """
-        keyword_scores: Dict[str, int] = defaultdict(int)
-
-        for keyword in keywords:
-            keyword_lower = keyword.lower()
-            if keyword_lower in self.eia_by_keyword:
-                for code in self.eia_by_keyword[keyword_lower]:
-                    keyword_scores[code.code] += 1
+        keyword_scores = self._score_keywords(self.eia_by_keyword, keywords)
 
         # Filter by min_matches and sort by score
         results = [
@@ -245,6 +309,10 @@ class SubsidyDatabase:
         """Get specific EIA code"""
         return self.eia_by_code.get(code)
 
+    def get_eia_requirements(self, code: str) -> List[RequirementPredicate]:
+        """Get the technical requirements of an EIA code"""
+        return self.eia_requirements.get(code, [])
+
     def get_all_eia_codes(self) -> List[EIACode]:
         """Get all EIA codes"""
         return self.eia_codes
@@ -334,13 +402,7 @@ class SubsidyDatabase:
         Returns:
             List of matching MIA/Vamil codes, sorted by relevance
         """
-        keyword_scores: Dict[str, int] = defaultdict(int)
-
-        for keyword in keywords:
-            keyword_lower = keyword.lower()
-            if keyword_lower in self.mia_by_keyword:
-                for code in self.mia_by_keyword[keyword_lower]:
-                    keyword_scores[code.code] += 1
+        keyword_scores = self._score_keywords(self.mia_by_keyword, keywords)
 
         # Filter by min_matches and sort by score
         results = [
@@ -362,10 +424,104 @@ class SubsidyDatabase:
         """Get specific MIA/Vamil code"""
         return self.mia_by_code.get(code)
 
+    def get_mia_requirements(self, code: str) -> List[RequirementPredicate]:
+        """Get the technical requirements of a MIA/Vamil code"""
+        return self.mia_requirements.get(code, [])
+
     def get_all_mia_codes(self) -> List[MIAVamilCode]:
         """Get all MIA/Vamil codes"""
         return self.mia_vamil_codes
 
+    def get_keyword_scores(self, keywords: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Get raw keyword hit counts for EIA and MIA/Vamil codes.
+
+        Returns:
+            {"EIA": {code: hits}, "MIA": {code: hits}}
+        """
+        return {
+            "EIA": dict(self._score_keywords(self.eia_by_keyword, keywords)),
+            "MIA": dict(self._score_keywords(self.mia_by_keyword, keywords)),
+        }
+
+    # ========================================================================
+    # DERIVED ARTEFACTS
+    # ========================================================================
+
+    def get_snapshot(self) -> CatalogSnapshot:
+        """
+        Get the catalog snapshot for the loaded data.
+
+        Loads data/subsidies/catalog_snapshot.npz if it matches the current
+        catalog version, otherwise starts an empty snapshot that is filled
+        in memory on demand.
+        """
+        if self._snapshot is None:
+            self._snapshot = CatalogSnapshot.load(
+                self.data_dir / SNAPSHOT_FILENAME, self.catalog_version
+            ) or CatalogSnapshot(self.catalog_version)
+        return self._snapshot
+
+    def save_snapshot(self, path: Optional[Path] = None) -> Path:
+        """Write the current catalog snapshot to disk"""
+        path = Path(path) if path else self.data_dir / SNAPSHOT_FILENAME
+        self.get_snapshot().save(path)
+        return path
+
+    def get_semantic_index(self) -> "SemanticIndex":
+        """
+        Get the latent-semantic index over EIA and MIA/Vamil descriptions.
+
+        Uses the vectors from the catalog snapshot when available and
+        builds them in memory otherwise.
+        """
+        if self._semantic_index is None:
+            from services.semantic_index import SemanticIndex
+
+            snapshot = self.get_snapshot()
+            index = SemanticIndex.from_snapshot(snapshot)
+            if index is None:
+                index = SemanticIndex.build_from_database(self)
+                index.to_snapshot(snapshot)
+            self._semantic_index = index
+        return self._semantic_index
+
+    def get_pareto_frontiers(self) -> "ParetoFrontiers":
+        """
+        Get the Pareto-optimal ISDE meldcodes per category and type.
+
+        Uses the frontiers from the catalog snapshot when available and
+        computes them in memory otherwise.
+        """
+        if self._pareto_frontiers is None:
+            from services.pareto_frontier import ParetoFrontiers
+
+            snapshot = self.get_snapshot()
+            frontiers = ParetoFrontiers.from_snapshot(snapshot, self)
+            if frontiers is None:
+                frontiers = ParetoFrontiers.build_from_database(self)
+                frontiers.to_snapshot(snapshot)
+            self._pareto_frontiers = frontiers
+        return self._pareto_frontiers
+
+    def get_catalog_views(self) -> "CatalogViews":
+        """
+        Get the best ISDE meldcodes per (category, type, bucket, woning_type).
+
+        Uses the views from the catalog snapshot when available and
+        materializes them in memory otherwise.
+        """
+        if self._catalog_views is None:
+            from services.catalog_views import CatalogViews
+
+            snapshot = self.get_snapshot()
+            views = CatalogViews.from_snapshot(snapshot, self)
+            if views is None:
+                views = CatalogViews.build_from_database(self)
+                views.to_snapshot(snapshot)
+            self._catalog_views = views
+        return self._catalog_views
+
     # ========================================================================
     # STATISTICS
     # ========================================================================
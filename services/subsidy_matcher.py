@@ -1,35 +1,56 @@
+import asyncio
 import json
+import os
 from pathlib import Path
-from typing import List, Dict, Any
-from anthropic import Anthropic
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from models.schemas import (
     SubsidyMatchRequest,
     SubsidyMatchResponse,
     SubsidyMatch,
     SubsidyRule,
+    MatchReason,
     MatchScore,
     CompanySize
 )
+from services.llm_client import LLMClient, get_llm_client
+from services.match_reasons import DEFAULT_LANGUAGE, Reason, ReasonCode, render_reasons
+from services.region_resolver import ResolvedLocation, get_region_resolver
+from services.rule_index import CompiledRules, RuleScores
 
 
 class SubsidyMatcher:
     """Service for matching companies/projects with eligible subsidies"""
 
-    def __init__(self, api_key: str, subsidies_path: str = "data/subsidies"):
+    def __init__(
+        self,
+        api_key: str,
+        subsidies_path: str = "data/subsidies",
+        rules: Optional[List[SubsidyRule]] = None,
+        llm: Optional[LLMClient] = None
+    ):
         """
         Initialize subsidy matcher
 
         Args:
             api_key: Anthropic API key
             subsidies_path: Path to subsidies data directory
+            rules: Preloaded subsidy rules (skips loading from subsidies_path)
+            llm: Shared async LLM client (default: a client of its own for api_key)
         """
-        self.client = Anthropic(api_key=api_key)
+        self.llm = llm or LLMClient(api_key)
         self.subsidies_path = Path(subsidies_path)
+        self.region_resolver = get_region_resolver()
         self.subsidies: List[SubsidyRule] = []
-        self._load_subsidies()
+        self.subsidy_by_id: Dict[str, SubsidyRule] = {}
+        self.compiled_rules = CompiledRules([])
+        if rules is not None:
+            self.subsidies = list(rules)
+            self._compile()
+        else:
+            self._load_subsidies()
 
     def _load_subsidies(self):
-        """Load subsidy rules from JSON files"""
+        """Load subsidy rules from JSON files and compile them for scoring"""
         if not self.subsidies_path.exists():
             self.subsidies_path.mkdir(parents=True, exist_ok=True)
             return
@@ -46,38 +67,142 @@ class SubsidyMatcher:
             except Exception as e:
                 print(f"Error loading {json_file}: {e}")
 
+        self._compile()
+
+    def _compile(self):
+        """Compile loaded rules for scoring and index them by id"""
+        self.compiled_rules = CompiledRules(self.subsidies)
+        self.subsidy_by_id = {rule.id: rule for rule in self.subsidies}
+
     async def match_subsidies(
         self,
-        request: SubsidyMatchRequest
+        request: SubsidyMatchRequest,
+        limit: Optional[int] = None,
+        include_near_misses: bool = False,
+        language: Optional[str] = DEFAULT_LANGUAGE
     ) -> SubsidyMatchResponse:
         """
         Match company and project with eligible subsidies
 
         Args:
             request: Subsidy match request
+            limit: Maximum number of matches to return (None = all)
+            include_near_misses: Also list rules failing exactly one hard
+                constraint (company size, budget or region)
+            language: Language for reason texts; None returns reason codes only
 
         Returns:
-            SubsidyMatchResponse with matching subsidies
+            SubsidyMatchResponse with matching subsidies, best first
+        """
+        return self.match_subsidies_sync(
+            request, limit=limit, include_near_misses=include_near_misses, language=language
+        )
+
+    def match_subsidies_sync(
+        self,
+        request: SubsidyMatchRequest,
+        limit: Optional[int] = None,
+        include_near_misses: bool = False,
+        language: Optional[str] = DEFAULT_LANGUAGE
+    ) -> SubsidyMatchResponse:
         """
-        matches: List[SubsidyMatch] = []
+        Synchronous matching core, usable from worker processes
 
-        for subsidy in self.subsidies:
-            match_result = self._evaluate_match(request, subsidy)
-            if match_result:
-                matches.append(match_result)
+        The eligibility index drops rules failing the hard constraints, the
+        rest is scored in one vectorized pass; only the returned matches are
+        materialized, and reason texts are rendered only for those.
 
-        # Sort by match score descending
-        matches.sort(key=lambda x: x.match_score.score, reverse=True)
+        Args:
+            request: Subsidy match request
+            limit: Maximum number of matches to return (None = all)
+            include_near_misses: Also list rules failing exactly one hard constraint
+            language: Language for reason texts; None returns reason codes only
+
+        Returns:
+            SubsidyMatchResponse with matching subsidies, best first
+        """
+        # Resolve the company location once; rules check set membership
+        location = self.region_resolver.resolve(request.company.location)
+        scores = self.compiled_rules.evaluate(
+            request, include_near_misses=include_near_misses, location=location
+        )
+
+        matches: List[SubsidyMatch] = [
+            self._evaluate_match(request, self.subsidies[i], location, language)
+            for i in scores.ranking(limit)
+        ]
 
         return SubsidyMatchResponse(
             matches=matches,
-            total_matches=len(matches)
+            total_matches=len(scores.positions)
         )
 
+    def score_request(
+        self,
+        request: SubsidyMatchRequest,
+        include_near_misses: bool = False
+    ) -> Tuple[Optional[ResolvedLocation], RuleScores]:
+        """
+        Resolve the company location and score every rule in one pass.
+
+        Returns:
+            (location, scores); len(scores.positions) is the total number
+            of matches
+        """
+        location = self.region_resolver.resolve(request.company.location)
+        scores = self.compiled_rules.evaluate(
+            request, include_near_misses=include_near_misses, location=location
+        )
+        return location, scores
+
+    async def stream_matches(
+        self,
+        request: SubsidyMatchRequest,
+        limit: Optional[int] = None,
+        include_near_misses: bool = False,
+        language: Optional[str] = DEFAULT_LANGUAGE,
+        scored: Optional[Tuple[Optional[ResolvedLocation], RuleScores]] = None
+    ) -> AsyncIterator[SubsidyMatch]:
+        """
+        Stream matches best first.
+
+        Rules are scored in one vectorized pass, after which every rank is
+        settled; matches are then materialized one at a time from a heap and
+        yielded immediately. The generator stops after `limit` matches, and
+        consumers that stop earlier skip the remaining work. Scoring and
+        materialization run in a worker thread so the event loop stays free.
+
+        Args:
+            request: Subsidy match request
+            limit: Maximum number of matches to yield (None = all)
+            include_near_misses: Also yield rules failing exactly one hard constraint
+            language: Language for reason texts; None yields reason codes only
+            scored: Result of score_request() for this request, if the caller
+                already has it
+
+        Yields:
+            SubsidyMatch, best first
+        """
+        if scored is None:
+            scored = await asyncio.to_thread(self.score_request, request, include_near_misses)
+        location, scores = scored
+        ranked = scores.iter_ranked(limit)
+
+        def next_match() -> Optional[SubsidyMatch]:
+            position = next(ranked, None)
+            if position is None:
+                return None
+            return self._evaluate_match(request, self.subsidies[position], location, language)
+
+        while (match := await asyncio.to_thread(next_match)) is not None:
+            yield match
+
     def _evaluate_match(
         self,
         request: SubsidyMatchRequest,
-        subsidy: SubsidyRule
+        subsidy: SubsidyRule,
+        location: Optional[ResolvedLocation] = None,
+        language: Optional[str] = DEFAULT_LANGUAGE
     ) -> SubsidyMatch | None:
         """
         Evaluate if a subsidy matches the request
@@ -85,91 +210,135 @@ class SubsidyMatcher:
         Args:
             request: Subsidy match request
             subsidy: Subsidy rule to evaluate
+            location: Resolved company location (resolved here if None)
+            language: Language for reasons and missing requirements
+                ("en"/"nl"); None returns reason codes only
 
         Returns:
             SubsidyMatch if eligible, None otherwise
         """
+        score, eligible, reasons = self._evaluate_reasons(request, subsidy, location)
+
+        texts: List[str] = []
+        missing_requirements: List[str] = []
+        if language is not None:
+            texts, missing_requirements = render_reasons(reasons, language)
+
+        # Calculate confidence based on data completeness
+        confidence = self._calculate_confidence(request)
+
+        match_score = MatchScore(
+            score=min(score, 100.0),
+            confidence=confidence,
+            reasons=texts
+        )
+
+        return SubsidyMatch(
+            subsidy=subsidy,
+            match_score=match_score,
+            eligible=eligible,
+            missing_requirements=missing_requirements,
+            reason_codes=[
+                MatchReason(code=reason.code.value, params=dict(reason.params))
+                for reason in reasons
+            ]
+        )
+
+    def _evaluate_reasons(
+        self,
+        request: SubsidyMatchRequest,
+        subsidy: SubsidyRule,
+        location: Optional[ResolvedLocation] = None
+    ) -> Tuple[float, bool, List[Reason]]:
+        """
+        Score a subsidy rule and record the reasons as codes
+
+        Returns:
+            (score, eligible, reasons)
+        """
         score = 0.0
-        max_score = 100.0
-        reasons = []
-        missing_requirements = []
+        reasons: List[Reason] = []
         eligible = True
 
         # Check company size eligibility (20 points)
         if request.company.size in subsidy.eligible_company_sizes:
             score += 20
-            reasons.append(f"Company size ({request.company.size}) is eligible")
+            reasons.append(Reason(ReasonCode.SIZE_ELIGIBLE, (("size", request.company.size),)))
         else:
             eligible = False
-            missing_requirements.append(
-                f"Company size must be one of: {', '.join(subsidy.eligible_company_sizes)}"
-            )
+            reasons.append(Reason(
+                ReasonCode.SIZE_NOT_ELIGIBLE, (("sizes", tuple(subsidy.eligible_company_sizes)),)
+            ))
 
         # Check category match (30 points)
         if request.project.category == subsidy.category:
             score += 30
-            reasons.append(f"Project category matches ({subsidy.category})")
+            reasons.append(Reason(ReasonCode.CATEGORY_MATCH, (("category", subsidy.category),)))
         else:
             score += 10
-            reasons.append("Project category doesn't perfectly match")
+            reasons.append(Reason(ReasonCode.CATEGORY_MISMATCH))
 
         # Check budget constraints (20 points)
         if subsidy.min_budget and request.project.budget < subsidy.min_budget:
             eligible = False
-            missing_requirements.append(
-                f"Project budget must be at least €{subsidy.min_budget:,.2f}"
-            )
+            reasons.append(Reason(ReasonCode.BUDGET_BELOW_MIN, (("min_budget", subsidy.min_budget),)))
         elif subsidy.max_budget and request.project.budget > subsidy.max_budget:
             eligible = False
-            missing_requirements.append(
-                f"Project budget must not exceed €{subsidy.max_budget:,.2f}"
-            )
+            reasons.append(Reason(ReasonCode.BUDGET_ABOVE_MAX, (("max_budget", subsidy.max_budget),)))
         else:
             score += 20
-            reasons.append("Project budget meets requirements")
+            reasons.append(Reason(ReasonCode.BUDGET_OK))
 
         # Check industry eligibility (15 points)
         if subsidy.eligible_industries:
             if request.company.industry in subsidy.eligible_industries:
                 score += 15
-                reasons.append("Company industry is eligible")
+                reasons.append(Reason(ReasonCode.INDUSTRY_ELIGIBLE))
             else:
                 score += 5
-                reasons.append("Company industry may not be primary target")
+                reasons.append(Reason(ReasonCode.INDUSTRY_NOT_PRIMARY))
         else:
             score += 15
-            reasons.append("No industry restrictions")
+            reasons.append(Reason(ReasonCode.INDUSTRY_UNRESTRICTED))
 
         # Check region eligibility (15 points)
         if subsidy.regions:
-            if any(region.lower() in request.company.location.lower()
+            if location is None:
+                location = self.region_resolver.resolve(request.company.location)
+            if any(self.region_resolver.in_region(location, region)
                    for region in subsidy.regions):
                 score += 15
-                reasons.append("Company location is eligible")
+                reasons.append(Reason(ReasonCode.REGION_ELIGIBLE))
             else:
                 eligible = False
-                missing_requirements.append(
-                    f"Company must be located in: {', '.join(subsidy.regions)}"
-                )
+                reasons.append(Reason(ReasonCode.REGION_NOT_ELIGIBLE, (("regions", tuple(subsidy.regions)),)))
         else:
             score += 15
-            reasons.append("No regional restrictions")
+            reasons.append(Reason(ReasonCode.REGION_UNRESTRICTED))
 
-        # Calculate confidence based on data completeness
-        confidence = self._calculate_confidence(request)
+        return score, eligible, reasons
 
-        match_score = MatchScore(
-            score=min(score, max_score),
-            confidence=confidence,
-            reasons=reasons
-        )
+    def explain(
+        self,
+        request: SubsidyMatchRequest,
+        subsidy_id: str,
+        language: str = DEFAULT_LANGUAGE
+    ) -> Optional[SubsidyMatch]:
+        """
+        Explain how a single subsidy rule scores for a request
 
-        return SubsidyMatch(
-            subsidy=subsidy,
-            match_score=match_score,
-            eligible=eligible,
-            missing_requirements=missing_requirements
-        )
+        Args:
+            request: Subsidy match request
+            subsidy_id: SubsidyRule.id
+            language: "en" or "nl"
+
+        Returns:
+            SubsidyMatch with rendered reasons, or None if the rule is unknown
+        """
+        subsidy = self.subsidy_by_id.get(subsidy_id)
+        if subsidy is None:
+            return None
+        return self._evaluate_match(request, subsidy, language=language)
 
     def _calculate_confidence(self, request: SubsidyMatchRequest) -> float:
         """
@@ -230,3 +399,24 @@ class SubsidyMatcher:
             "recommendations": [],
             "next_steps": []
         }
+
+
+# Global instance (singleton pattern)
+_matcher_instance: Optional[SubsidyMatcher] = None
+
+
+def get_subsidy_matcher() -> SubsidyMatcher:
+    """
+    Get the global SubsidyMatcher instance (singleton).
+
+    Uses ANTHROPIC_API_KEY from the environment, the global LLM client and
+    the default subsidies path.
+    """
+    global _matcher_instance
+
+    if _matcher_instance is None:
+        _matcher_instance = SubsidyMatcher(
+            api_key=os.getenv("ANTHROPIC_API_KEY", ""), llm=get_llm_client()
+        )
+
+    return _matcher_instance
@@ -0,0 +1,496 @@
+"""
+SupplierTemplates - Per-supplier quote layouts learned from LLM extractions.
+
+Large installers send hundreds of quotes from one template, often with
+column labels or totals lines the generic QuoteParser does not know
+("Post / Levering / Hvh / Regelbedrag", "Netto bedrag"). Such quotes
+need the full LLM extraction every time, although the layout never
+changes. Instead, every successful LLM extraction is used to learn the
+supplier's layout:
+
+- The extracted rows are located in the layout text; the word spans of
+  their description, quantity, price and total give the column regions
+- The line above the first row marks the start of the item region; the
+  labels of the lines holding the subtotal, VAT and total are recorded
+- Rows in the region the LLM did not return (labour, transport) mark
+  non-equipment descriptions
+
+A template is identified by a fingerprint of the supplier name and the
+start line, so a supplier with two layouts
+gets two templates. After min_observations extractions with the same
+fingerprint it is used: a later quote whose first page names the
+supplier and contains the start line is parsed in milliseconds. A parse
+whose rows do not add up to the subtotal falls back to the LLM; after
+max_failures such fallbacks in a row the template is learned again.
+
+Templates are stored in a cache backend (SQLite by default), with an
+index of supplier names to look them up by the text of a quote.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.subsidy_schemas import Equipment, Quote
+from services.cache_backends import CacheBackend, create_cache_backend
+from services.match_cache import CacheMetrics
+from services.pdf_extraction import PdfExtraction
+from services.quote_parser import (
+    Cell,
+    Columns,
+    NON_EQUIPMENT,
+    ParsedLine,
+    ParsedQuote,
+    amounts_match,
+    finish_parse,
+    last_amount,
+    parse_amount,
+    parse_metadata,
+    parse_quantity,
+    parse_row,
+    parse_specs,
+    parse_totals,
+    split_words,
+    trailing_amounts
+)
+
+
+# Successful LLM extractions of one layout before its template is used
+DEFAULT_MIN_OBSERVATIONS = 3
+
+# Failed template parses in a row before the template is learned again
+DEFAULT_MAX_FAILURES = 3
+
+# Templates of suppliers that stopped sending quotes expire after a year
+DEFAULT_TTL_SECONDS = 365 * 24 * 3600
+
+DEFAULT_TEMPLATES_URL = "sqlite:///" + str(
+    Path(__file__).resolve().parent.parent / "data" / "cache" / "supplier_templates.sqlite3"
+)
+
+INDEX_KEY = "supplier_templates:index"
+
+TOTAL_FIELDS = ("subtotal", "vat_amount", "total_including_vat")
+
+_LEGAL_FORM = re.compile(r"\b(?:b\.?\s?v\.?|v\.?\s?o\.?\s?f\.?|n\.?\s?v\.?)(?=\W|$)", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w]+")
+_DIGITS = re.compile(r"\d+")
+_WORD = re.compile(r"[A-Za-z]{2,}")
+
+
+def normalize_supplier(name: str) -> str:
+    """Supplier name without legal form, case and punctuation ("Jansen B.V." -> "jansen")"""
+    return " ".join(_NON_WORD.sub(" ", _LEGAL_FORM.sub(" ", name.lower())).split())
+
+
+def line_marker(text: str) -> str:
+    """Line without case, spacing and numbers, to recognise a template's fixed lines"""
+    return " ".join(_DIGITS.sub("#", text.lower()).split())
+
+
+def total_label(words: Sequence[Cell]) -> Optional[str]:
+    """Marker of the words before the last amount of a line ("Netto bedrag € 1.234,56" -> "netto bedrag")"""
+    for index in range(len(words) - 1, 0, -1):
+        if parse_amount(words[index][2]) is not None:
+            return line_marker(" ".join(word[2] for word in words[:index])) or None
+    return None
+
+
+# ============================================================================
+# TEMPLATE
+# ============================================================================
+
+@dataclass
+class SupplierTemplate:
+    """Learned layout of one supplier's quotes"""
+    fingerprint: str
+    supplier_name: str
+    start_marker: str                        # line_marker of the line above the first row
+    columns: List[Tuple[int, int, str]]      # (start, end, role) in the layout text; "position" is ignored
+    labels: Dict[str, str] = field(default_factory=dict)      # Quote total field -> total_label
+    non_equipment: List[str] = field(default_factory=list)    # First words of non-equipment rows
+    observations: int = 0
+    failures: int = 0                        # Failed parses in a row
+    parsed: int = 0                          # Quotes parsed with the template
+    updated_at: float = 0.0
+
+    @property
+    def roles(self) -> Columns:
+        return {(start, end): role for start, end, role in self.columns}
+
+    def parse(self, extraction: PdfExtraction) -> ParsedQuote:
+        """
+        Parse a quote of this supplier
+
+        Rows are read from the start line up to the first totals line;
+        each word takes the role of the learned column it overlaps, or
+        the nearest one.
+
+        Returns:
+            ParsedQuote; only to be used when usable and totals_consistent
+        """
+        parsed = ParsedQuote(lines=[], header_found=True)
+        roles = self.roles
+        in_region = done = False
+        last: Optional[ParsedLine] = None
+        for page in extraction.pages:
+            for raw in page.text.splitlines():
+                if not raw.strip():
+                    continue
+                parse_metadata(raw, parsed)
+                if line_marker(raw) == self.start_marker:
+                    # Repeated on every page of a long quote
+                    in_region = not done
+                    continue
+                words = split_words(raw)
+                if (in_region or done) and (self._parse_total(words, parsed) or parse_totals(raw, parsed)):
+                    done = True
+                    in_region = False
+                    continue
+                if not in_region:
+                    continue
+                line = parse_row(words, roles, page.number)
+                if line is not None:
+                    if line.description.split()[0].lower() in self.non_equipment and line.kind == "equipment":
+                        line.kind = "labour"
+                    parsed.lines.append(line)
+                    last = line
+                elif last is not None and not trailing_amounts(words):
+                    last.text += "\n" + raw.rstrip()
+                    last.specs.update(parse_specs(raw))
+        return finish_parse(parsed)
+
+    def _parse_total(self, words: Sequence[Cell], parsed: ParsedQuote) -> bool:
+        """Record a totals line with a learned label; True when the line was one"""
+        label = total_label(words)
+        for name, learned in self.labels.items():
+            if label == learned:
+                setattr(parsed, name, last_amount(" ".join(word[2] for word in words)))
+                return True
+        return False
+
+    def to_json(self) -> bytes:
+        return json.dumps(asdict(self)).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, value: bytes) -> "SupplierTemplate":
+        data = json.loads(value)
+        data["columns"] = [tuple(column) for column in data["columns"]]
+        return cls(**data)
+
+
+@dataclass
+class _Layout:
+    """Layout derived from one LLM extraction"""
+    start_marker: str
+    columns: Dict[str, Tuple[int, int]]      # Role -> span
+    labels: Dict[str, str]
+    non_equipment: List[str]
+
+    @property
+    def structure(self) -> str:
+        """
+        What identifies the layout: the start line. Column positions vary
+        with the amounts (and a quantity column is not found in every
+        quote), so those are merged into the template instead.
+        """
+        return self.start_marker
+
+
+def derive_layout(quote: Quote, extraction: PdfExtraction) -> Optional[_Layout]:
+    """
+    Layout of a quote from its LLM extraction, or None
+
+    Every equipment row and the subtotal must be found in the layout
+    text, otherwise the extraction cannot be reproduced by a template.
+    """
+    lines = [
+        (page.number, raw, split_words(raw))
+        for page in extraction.pages for raw in page.text.splitlines() if raw.strip()
+    ]
+    spans: Dict[str, List[Tuple[int, int]]] = {}
+    rows: List[int] = []
+    cursor = 0
+    for item in quote.equipment:
+        found = _find_row(item, lines, cursor)
+        if found is None:
+            return None
+        index, row_spans = found
+        rows.append(index)
+        for role, span in row_spans.items():
+            spans.setdefault(role, []).append(span)
+        cursor = index + 1
+    if not rows or "description" not in spans or "total" not in spans:
+        return None
+
+    first = rows[0]
+    if first == 0 or trailing_amounts(lines[first - 1][2]) or lines[first - 1][0] != lines[first][0]:
+        return None
+    start_marker = line_marker(lines[first - 1][1])
+
+    labels: Dict[str, str] = {}
+    end = len(lines)
+    for name in TOTAL_FIELDS:
+        value = getattr(quote, name)
+        if value is None:
+            continue
+        for index in range(rows[-1] + 1, len(lines)):
+            amount = last_amount(lines[index][1])
+            label = total_label(lines[index][2])
+            if amount is not None and label and amounts_match(amount, value):
+                labels[name] = label
+                end = min(end, index)
+                break
+    if "subtotal" not in labels:
+        return None
+
+    # Priced rows in the region the LLM left out are not equipment
+    matched = set(rows)
+    non_equipment = set()
+    for index in range(first, end):
+        words = lines[index][2]
+        if index in matched or not trailing_amounts(words):
+            continue
+        text = [word[2] for word in words if _WORD.match(word[2])]
+        if text and not NON_EQUIPMENT.match(text[0]):
+            non_equipment.add(text[0].lower())
+
+    columns = {role: (min(s for s, _ in found), max(e for _, e in found)) for role, found in spans.items()}
+    return _Layout(start_marker, columns, labels, sorted(non_equipment))
+
+
+def _find_row(
+    item: Equipment,
+    lines: List[Tuple[int, str, List[Cell]]],
+    cursor: int
+) -> Optional[Tuple[int, Dict[str, Tuple[int, int]]]]:
+    """First line from cursor holding the item's total and description, with the span per role"""
+    description = {word.lower() for word in item.description.split()}
+    for index in range(cursor, len(lines)):
+        words = lines[index][2]
+        amounts = [(word, parse_amount(word[2])) for word in words]
+        totals = [word for word, amount in amounts if amount is not None and amounts_match(amount, item.total_price)]
+        described = [word for word in words if word[2].lower() in description]
+        if not totals or not described:
+            continue
+        total = totals[-1]
+        spans = {"total": total[:2]}
+        prices = [
+            word for word, amount in amounts
+            if amount is not None and word is not total and amounts_match(amount, item.unit_price)
+        ]
+        if prices:
+            spans["unit_price"] = prices[0][:2]
+        quantities = [
+            word for word, amount in amounts
+            if word not in described and word is not total and word not in prices
+            and (quantity := parse_quantity(word[2])) and quantity[0] == item.quantity
+        ]
+        if len(quantities) == 1:
+            # Skipped when ambiguous (a position number equal to the quantity)
+            spans["quantity"] = quantities[0][:2]
+        spans["description"] = (described[0][0], described[-1][1])
+        # Position or article numbers before the description are no part of it
+        leading = [word for word in words if word[1] <= described[0][0] and word[:2] != spans.get("quantity")]
+        if leading:
+            spans["position"] = (leading[0][0], leading[-1][1])
+        return index, spans
+    return None
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class SupplierTemplates:
+    """Learns, stores and matches supplier templates"""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        min_observations: int = DEFAULT_MIN_OBSERVATIONS,
+        max_failures: int = DEFAULT_MAX_FAILURES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        """
+        Initialize template store
+
+        Args:
+            backend: Storage (memory, SQLite or Redis-compatible)
+            min_observations: LLM extractions of a layout before its template is used
+            max_failures: Failed parses in a row before a template is learned again
+            ttl_seconds: Lifetime of a template since its last update
+        """
+        self.backend = backend
+        self.min_observations = min_observations
+        self.max_failures = max_failures
+        self.ttl_seconds = ttl_seconds
+        self.metrics = CacheMetrics()
+
+    @staticmethod
+    def key(fingerprint: str) -> str:
+        return f"supplier_template:{fingerprint}"
+
+    @staticmethod
+    def fingerprint(supplier_name: str, structure: str) -> str:
+        return hashlib.sha256(f"{normalize_supplier(supplier_name)}|{structure}".encode("utf-8")).hexdigest()[:32]
+
+    def get(self, fingerprint: str) -> Optional[SupplierTemplate]:
+        return self._decode(fingerprint, self.backend.get(self.key(fingerprint)))
+
+    def _decode(self, fingerprint: str, value: Optional[bytes]) -> Optional[SupplierTemplate]:
+        if value is None:
+            return None
+        try:
+            return SupplierTemplate.from_json(value)
+        except (ValueError, TypeError, KeyError):
+            self.backend.delete(self.key(fingerprint))
+            self.metrics.count("errors")
+            return None
+
+    def match(self, extraction: PdfExtraction) -> Optional[SupplierTemplate]:
+        """
+        Active template of the supplier and layout of a quote, or None
+
+        The supplier must be named on the first page and the template's
+        start line must occur in the text. The candidates are read in one
+        backend call; index entries of expired templates are pruned.
+        Blocking: call it off the event loop.
+        """
+        if not extraction.pages:
+            return None
+        first_page = normalize_supplier(extraction.pages[0].text)
+        candidates = [
+            fingerprint for fingerprint, supplier in self._index().items()
+            if supplier and f" {supplier} " in f" {first_page} "
+        ]
+        values = self.backend.get_many([self.key(fingerprint) for fingerprint in candidates]) if candidates else []
+
+        markers: Optional[set] = None
+        found: Optional[SupplierTemplate] = None
+        expired: List[str] = []
+        for fingerprint, value in zip(candidates, values):
+            template = self._decode(fingerprint, value)
+            if template is None:
+                expired.append(fingerprint)
+                continue
+            if found is not None or template.observations < self.min_observations:
+                continue
+            if markers is None:
+                markers = {line_marker(raw) for page in extraction.pages for raw in page.text.splitlines()}
+            if template.start_marker in markers:
+                found = template
+        if expired:
+            self._prune(expired)
+
+        self.metrics.count("hits" if found is not None else "misses")
+        return found
+
+    def learn(self, quote: Quote, extraction: PdfExtraction) -> Optional[SupplierTemplate]:
+        """
+        Record a successful LLM extraction of a quote
+
+        Returns:
+            The updated template, or None when the quote has no supplier
+            name or its rows could not be located in the text
+        """
+        if not quote.supplier_name or not normalize_supplier(quote.supplier_name):
+            return None
+        layout = derive_layout(quote, extraction)
+        if layout is None:
+            return None
+
+        fingerprint = self.fingerprint(quote.supplier_name, layout.structure)
+        template = self.get(fingerprint) or SupplierTemplate(
+            fingerprint=fingerprint,
+            supplier_name=quote.supplier_name,
+            start_marker=layout.start_marker,
+            columns=[]
+        )
+        # Union of the spans seen: descriptions and amounts differ in width per quote
+        merged = {role: (start, end) for start, end, role in template.columns}
+        for role, (start, end) in layout.columns.items():
+            known = merged.get(role, (start, end))
+            merged[role] = (min(known[0], start), max(known[1], end))
+        template.columns = [(start, end, role) for role, (start, end) in merged.items()]
+        template.labels.update(layout.labels)
+        template.non_equipment = sorted(set(template.non_equipment) | set(layout.non_equipment))
+        template.observations += 1
+        template.failures = 0
+        self._save(template)
+        return template
+
+    def record_parse(self, template: SupplierTemplate, success: bool):
+        """
+        Count a template parse
+
+        After max_failures failures in a row the template is learned again
+        from scratch: its columns, labels and non-equipment rows are
+        dropped, not only its observation count, so spans and labels of
+        the old layout do not survive into the new one.
+        """
+        if success:
+            template.parsed += 1
+            template.failures = 0
+        else:
+            template.failures += 1
+            if template.failures >= self.max_failures:
+                template.columns = []
+                template.labels = {}
+                template.non_equipment = []
+                template.observations = 0
+                template.failures = 0
+        self._save(template)
+
+    def _save(self, template: SupplierTemplate):
+        template.updated_at = time.time()
+        self.backend.set(self.key(template.fingerprint), template.to_json(), self.ttl_seconds)
+        self.metrics.count("stores")
+        index = self._index()
+        supplier = normalize_supplier(template.supplier_name)
+        if index.get(template.fingerprint) != supplier:
+            # Read-modify-write: a template lost to a concurrent update is learned again
+            index[template.fingerprint] = supplier
+            self.backend.set(INDEX_KEY, json.dumps(index).encode("utf-8"))
+
+    def _prune(self, fingerprints: Sequence[str]):
+        """Drop index entries of templates that expired or could not be read"""
+        index = self._index()
+        if any(fingerprint in index for fingerprint in fingerprints):
+            for fingerprint in fingerprints:
+                index.pop(fingerprint, None)
+            self.backend.set(INDEX_KEY, json.dumps(index).encode("utf-8"))
+
+    def _index(self) -> Dict[str, str]:
+        """Fingerprint -> normalised supplier name of all templates"""
+        value = self.backend.get(INDEX_KEY)
+        try:
+            return json.loads(value) if value else {}
+        except ValueError:
+            return {}
+
+
+# Global instance (singleton pattern)
+_templates_instance: Optional[SupplierTemplates] = None
+
+
+def get_supplier_templates() -> SupplierTemplates:
+    """
+    Get the global SupplierTemplates instance (singleton).
+
+    The backend comes from SUPPLIER_TEMPLATES_URL (default: SQLite file in
+    data/cache, shared by all workers on the host).
+    """
+    global _templates_instance
+
+    if _templates_instance is None:
+        _templates_instance = SupplierTemplates(
+            create_cache_backend(os.getenv("SUPPLIER_TEMPLATES_URL", DEFAULT_TEMPLATES_URL))
+        )
+
+    return _templates_instance
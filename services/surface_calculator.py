@@ -0,0 +1,228 @@
+"""
+SurfaceCalculator - ISDE meldcodes for insulation and glass lines.
+
+Installer quotes rarely name the registered insulation or glass product;
+they give a surface, a U-value (glass, doors) or an Rd-value (insulation).
+The meldcode is resolved from those specs:
+
+- glass/doors: classes whose U-limit ("HR++ glas U <= 1,2") the line's
+  U-value meets
+- insulation: products of the same kind (dak, gevel, vloer, ...) with
+  min_rd <= the line's Rd-value
+
+Within the eligible products the one with the highest amount wins. Per
+group the catalog is sorted by the attribute with a running best, so all
+lines of a quote are resolved with one np.searchsorted per group.
+
+Lines of monumental buildings also resolve against the monument-only
+classes. Amounts are priced by calculate_isde; the multi-measure rate is
+applied per quote by the CombinationOptimizer.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.subsidy_schemas import Equipment, EquipmentCategory, ISDECategory, ISDEMeldcode
+from services.requirement_predicates import normalize_specs
+from services.subsidy_calculator import ISDE_RATE_SINGLE, isde_rate, is_monument
+from services.subsidy_database import SubsidyDatabase, get_database
+
+
+MONUMENT = "Alleen monumentale woningen"
+
+# Insulation kind (category_detail) by description keyword, most specific first
+INSULATION_KEYWORDS: Tuple[Tuple[str, str], ...] = (
+    ("spouw", "Spouwmuurisolatie"),
+    ("zolder", "Zolder- of vlieringvloer"),
+    ("vliering", "Zolder- of vlieringvloer"),
+    ("bodem", "Bodemisolatie"),
+    ("vloer", "Vloerisolatie"),
+    ("dak", "Dakisolatie"),
+    ("gevel", "Binnen- of buitengevelisolatie"),
+)
+
+# Glass lines for doors resolve against the door classes only
+DOOR_KEYWORD = "deur"
+DOOR_DETAIL_PREFIX = "Isolerende deur"
+
+_U_LIMIT_PATTERN = re.compile(r"<=\s*(\d+(?:[.,]\d+)?)")
+
+# Group: (ISDE category, kind, monument-only)
+GroupKey = Tuple[ISDECategory, str, bool]
+
+
+@dataclass
+class SurfaceGroup:
+    """Products of one kind, sorted by attribute, with the best eligible product per position"""
+    entries: List[ISDEMeldcode]
+    values: np.ndarray         # U-limit ascending (glass) or min_rd ascending (insulation)
+    best: np.ndarray           # Best eligible product at each cut-off position ("enkel" rate)
+    best_monument: np.ndarray  # Same, counting the monument rate
+
+    @classmethod
+    def build(cls, entries: List[ISDEMeldcode], attribute: str, eligible_above: bool) -> "SurfaceGroup":
+        """
+        Args:
+            entries: Products of the group
+            attribute: u_limit or min_rd
+            eligible_above: Products at and after a position are eligible (glass);
+                otherwise products before it are (insulation)
+        """
+        key = u_limit if attribute == "u_limit" else (lambda e: e.attributes[attribute])
+        entries = sorted(entries, key=lambda e: (key(e), e.meldcode))
+        values = np.array([key(e) for e in entries], dtype=np.float64)
+        return cls(
+            entries=entries,
+            values=values,
+            best=_running_best([_best_rate(e, False) for e in entries], eligible_above),
+            best_monument=_running_best([_best_rate(e, True) for e in entries], eligible_above)
+        )
+
+    def resolve(self, values: np.ndarray, monument: np.ndarray, eligible_above: bool) -> np.ndarray:
+        """Best product index per line value (-1 when none is eligible)"""
+        positions = np.searchsorted(self.values, values, side="left" if eligible_above else "right")
+        return np.where(monument, self.best_monument[positions], self.best[positions])
+
+
+def _running_best(amounts: List[float], eligible_above: bool) -> np.ndarray:
+    """
+    best[i]: index of the highest amount in amounts[i:] (eligible_above) or
+    amounts[:i], ties to the position closest to the cut-off; -1 when empty
+    """
+    n = len(amounts)
+    best = np.full(n + 1, -1, dtype=np.int64)
+    positions = range(n - 1, -1, -1) if eligible_above else range(n)
+    current = -1
+    for i in positions:
+        if current < 0 or amounts[i] >= amounts[current]:
+            current = i
+        best[i if eligible_above else i + 1] = current
+    return best
+
+
+class SurfaceCalculator:
+    """Resolves per-m² ISDE lines (insulation, glass) to meldcodes in bulk"""
+
+    def __init__(self, db: Optional[SubsidyDatabase] = None):
+        """
+        Initialize calculator
+
+        Args:
+            db: Subsidy database (default: global instance)
+        """
+        self.db = db or get_database()
+        members: Dict[GroupKey, List[ISDEMeldcode]] = {}
+        for entry in self.db.get_isde_by_category(ISDECategory.HOOGRENDEMENTSGLAS):
+            if u_limit(entry) is not None:
+                members.setdefault(_group_key(entry), []).append(entry)
+        for entry in self.db.get_isde_by_category(ISDECategory.ISOLATIE):
+            if entry.attributes.get("min_rd") is not None:
+                members.setdefault(_group_key(entry), []).append(entry)
+
+        self.groups: Dict[GroupKey, SurfaceGroup] = {
+            key: SurfaceGroup.build(entries, *_ATTRIBUTE[key[0]]) for key, entries in members.items()
+        }
+
+    # ========================================================================
+    # RESOLUTION
+    # ========================================================================
+
+    def resolve(self, lines: Sequence[Equipment]) -> List[Optional[ISDEMeldcode]]:
+        """
+        ISDE meldcode per line from its U- or Rd-value.
+
+        Lines that are not glass or insulation, or have no usable value,
+        resolve to None.
+
+        Args:
+            lines: Quote lines
+
+        Returns:
+            Meldcode (or None) per line, in order
+        """
+        requests: Dict[GroupKey, List[Tuple[int, float]]] = {}
+        monuments = set()
+        for index, equipment in enumerate(lines):
+            request = _request(equipment)
+            if request is None:
+                continue
+            category, kind, value, monument = request
+            requests.setdefault((category, kind, False), []).append((index, value))
+            if monument:
+                # Monumental buildings also qualify for the monument-only classes
+                requests.setdefault((category, kind, True), []).append((index, value))
+                monuments.add(index)
+
+        resolved: List[Optional[ISDEMeldcode]] = [None] * len(lines)
+        for key, items in requests.items():
+            group = self.groups.get(key)
+            if group is None:
+                continue
+            eligible_above = _ATTRIBUTE[key[0]][1]
+            picks = group.resolve(
+                np.array([value for _, value in items]),
+                np.array([index in monuments for index, _ in items]),
+                eligible_above
+            )
+            for (index, _), pick in zip(items, picks):
+                if pick < 0:
+                    continue
+                entry = group.entries[pick]
+                current = resolved[index]
+                monument = index in monuments
+                if current is None or _best_rate(entry, monument) > _best_rate(current, monument):
+                    resolved[index] = entry
+        return resolved
+
+
+# Per ISDE category: (attribute, products at or above the line value are eligible)
+_ATTRIBUTE: Dict[ISDECategory, Tuple[str, bool]] = {
+    ISDECategory.HOOGRENDEMENTSGLAS: ("u_limit", True),
+    ISDECategory.ISOLATIE: ("min_rd", False),
+}
+
+
+def u_limit(entry: ISDEMeldcode) -> Optional[float]:
+    """U-limit of a glass/door class ("Triple glas U <= 0,7" -> 0.7), else the product's max_u"""
+    match = _U_LIMIT_PATTERN.search(entry.attributes.get("category_detail") or "")
+    if match:
+        return float(match.group(1).replace(",", "."))
+    return entry.attributes.get("max_u")
+
+
+def _group_key(entry: ISDEMeldcode) -> GroupKey:
+    detail = entry.attributes.get("category_detail") or ""
+    if entry.category == ISDECategory.HOOGRENDEMENTSGLAS:
+        detail = DOOR_KEYWORD if detail.startswith(DOOR_DETAIL_PREFIX) else ""
+    return entry.category, detail, entry.attributes.get("woning_type") == MONUMENT
+
+
+def _request(equipment: Equipment) -> Optional[Tuple[ISDECategory, str, float, bool]]:
+    """(category, kind, value, monument) for a surface line, or None"""
+    text = " ".join(p for p in (equipment.description, *equipment.keywords) if p).lower()
+    specs = normalize_specs(equipment.specs)
+    # Without a category the spec decides ("isolatieglas" vs "glaswol")
+    u_value, r_value = specs.get("u_value"), specs.get("r_value")
+
+    if equipment.category == EquipmentCategory.GLAS or (equipment.category is None and u_value):
+        if u_value is None:
+            return None
+        kind = DOOR_KEYWORD if DOOR_KEYWORD in text else ""
+        return ISDECategory.HOOGRENDEMENTSGLAS, kind, u_value[0], is_monument(equipment)
+
+    if equipment.category == EquipmentCategory.ISOLATIE or (equipment.category is None and r_value):
+        kind = next((detail for keyword, detail in INSULATION_KEYWORDS if keyword in text), None)
+        if r_value is None or kind is None:
+            return None
+        return ISDECategory.ISOLATIE, kind, r_value[0], is_monument(equipment)
+
+    return None
+
+
+def _best_rate(entry: ISDEMeldcode, monument: bool) -> float:
+    """Per-m² rate calculate_isde pays a line for the entry (before the multi-measure bonus)"""
+    return (entry.amounts or {}).get(isde_rate(entry, ISDE_RATE_SINGLE, monument)) or 0.0
+
@@ -0,0 +1,301 @@
+"""
+ThresholdDetector - Quote lines close to an EIA/MIA investment limit.
+
+EIA and MIA/Vamil have cliffs: a line just under the €2.500 minimum gets
+no deduction at all, and above a cap (EIA per unit, MIA €25 mln per
+asset) extra spend earns nothing. A small change to the quote moves a
+line across such a limit, so these are worth pointing out:
+
+- below_minimum: short of the minimum by at most the margin -> increase
+- bundle: lines for the same code that are each below the minimum but
+  together reach it -> invest in them as one asset
+- near_minimum: just above the minimum -> a discount would lose the deduction
+- above_cap: over the MIA asset cap (split) or an EIA per-unit cap (reduce)
+
+A line is checked against all its candidate codes; alerts for codes
+other than the one its best combination uses (or, when that holds no
+EIA/MIA, its top candidate) are marked as alternatives.
+
+Thresholds are held per code as sorted tables built once from the
+database; checking a line is a binary search per matched code, so
+framework quotes with hundreds of lines stay cheap.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.subsidy_schemas import (
+    EquipmentMatch,
+    QuoteAnalysis,
+    SubsidyScheme,
+    ThresholdAlert
+)
+from services.subsidy_calculator import (
+    MIA_MAX_INVESTMENT,
+    MIA_MIN_INVESTMENT,
+    VAMIL_LIQUIDITY_FACTOR
+)
+from services.subsidy_database import SubsidyDatabase, get_database
+
+
+MINIMUM = "minimum"
+CAP = "cap"
+
+# Basis a threshold is compared against
+LINE = "line"   # total_price of the quote line
+UNIT = "unit"   # unit_price (per-unit caps)
+
+
+@dataclass
+class ThresholdTable:
+    """Sorted thresholds of one code, per basis"""
+    scheme: SubsidyScheme
+    code: str
+    rate: float  # Deduction (or Vamil equivalent) per euro invested
+    values: Dict[str, List[float]] = field(default_factory=dict)
+    kinds: Dict[str, List[str]] = field(default_factory=dict)
+
+    def add(self, value: float, kind: str, basis: str = LINE):
+        values = self.values.setdefault(basis, [])
+        kinds = self.kinds.setdefault(basis, [])
+        position = bisect_left(values, value)
+        values.insert(position, value)
+        kinds.insert(position, kind)
+
+    def neighbours(self, amount: float, basis: str = LINE) -> List[Tuple[float, str]]:
+        """Thresholds directly below and above (or at) an amount"""
+        values = self.values.get(basis, [])
+        position = bisect_left(values, amount)
+        kinds = self.kinds[basis] if values else []
+        return [(values[i], kinds[i]) for i in (position - 1, position) if 0 <= i < len(values)]
+
+
+@dataclass
+class _Line:
+    index: int
+    investment: float
+    unit_price: float
+    quantity: int
+    primary: Set[Tuple[SubsidyScheme, str]] = field(default_factory=set)
+
+
+def _primary_codes(match: EquipmentMatch) -> Set[Tuple[SubsidyScheme, str]]:
+    """EIA/MIA codes a line is claimed under: its best combination, else its top candidates"""
+    chosen = {
+        (SubsidyScheme.MIA if c.scheme == SubsidyScheme.VAMIL else c.scheme, c.code)
+        for c in match.best_combination
+        if c.scheme in (SubsidyScheme.EIA, SubsidyScheme.MIA, SubsidyScheme.VAMIL)
+    }
+    if chosen:
+        return chosen
+    if match.eia_matches:
+        chosen.add((SubsidyScheme.EIA, match.eia_matches[0].code))
+    mia_matches = match.mia_matches + match.vamil_matches
+    if mia_matches:
+        chosen.add((SubsidyScheme.MIA, mia_matches[0].code))
+    return chosen
+
+
+class ThresholdDetector:
+    """Flags quote lines and line groups near EIA/MIA minimums and caps"""
+
+    def __init__(
+        self,
+        db: Optional[SubsidyDatabase] = None,
+        margin_eur: float = 500.0,
+        margin_fraction: float = 0.1
+    ):
+        """
+        Initialize detector
+
+        Args:
+            db: Subsidy database (default: global instance)
+            margin_eur: Distance to a threshold that is always flagged
+            margin_fraction: Distance as a fraction of the threshold (the
+                larger of the two applies)
+        """
+        self.db = db or get_database()
+        self.margin_eur = margin_eur
+        self.margin_fraction = margin_fraction
+        self.tables: Dict[Tuple[SubsidyScheme, str], ThresholdTable] = {}
+
+        for code in self.db.eia_by_code.values():
+            table = ThresholdTable(SubsidyScheme.EIA, code.code, code.subsidy_percentage)
+            if code.min_investment:
+                table.add(code.min_investment, MINIMUM)
+            if code.max_investment_per_unit:
+                table.add(code.max_investment_per_unit, CAP, UNIT)
+            self.tables[(SubsidyScheme.EIA, code.code)] = table
+
+        for code in self.db.mia_by_code.values():
+            rate = (code.mia_percentage or 0) / 100
+            rate += (code.vamil_percentage or 0) / 100 * VAMIL_LIQUIDITY_FACTOR
+            if rate <= 0:
+                continue
+            table = ThresholdTable(SubsidyScheme.MIA, code.code, rate)
+            table.add(MIA_MIN_INVESTMENT, MINIMUM)
+            table.add(MIA_MAX_INVESTMENT, CAP)
+            self.tables[(SubsidyScheme.MIA, code.code)] = table
+
+    def margin(self, threshold: float) -> float:
+        """Distance to a threshold within which a line is flagged"""
+        return max(self.margin_eur, threshold * self.margin_fraction)
+
+    def detect(self, matches: List[EquipmentMatch]) -> List[ThresholdAlert]:
+        """
+        Threshold alerts for a whole quote.
+
+        Args:
+            matches: Line matches in quote order
+
+        Returns:
+            ThresholdAlert list, alerts for the codes lines are claimed under
+            before alternatives, each largest subsidy at stake first
+        """
+        by_code: Dict[Tuple[SubsidyScheme, str], List[_Line]] = {}
+        for index, match in enumerate(matches):
+            equipment = match.equipment
+            line = _Line(
+                index, equipment.total_price, equipment.unit_price, equipment.quantity,
+                _primary_codes(match)
+            )
+            codes = {c.code for c in match.eia_matches}
+            for code in codes:
+                by_code.setdefault((SubsidyScheme.EIA, code), []).append(line)
+            codes = {c.code for c in match.mia_matches + match.vamil_matches}
+            for code in codes:
+                by_code.setdefault((SubsidyScheme.MIA, code), []).append(line)
+
+        alerts = []
+        for key, lines in by_code.items():
+            table = self.tables.get(key)
+            if table is not None:
+                alerts.extend(self._check(table, lines))
+        alerts.sort(key=lambda a: (a.alternative, -a.subsidy_at_stake, a.lines, a.code))
+        return alerts
+
+    def apply(self, analysis: QuoteAnalysis) -> QuoteAnalysis:
+        """QuoteAnalysis with threshold alerts for its lines"""
+        return analysis.model_copy(update={"threshold_alerts": self.detect(analysis.equipment_matches)})
+
+    def _check(self, table: ThresholdTable, lines: List[_Line]) -> List[ThresholdAlert]:
+        alerts = []
+        below: Dict[float, List[_Line]] = {}
+
+        for line in lines:
+            for threshold, kind in table.neighbours(line.investment):
+                distance = line.investment - threshold
+                if kind == MINIMUM and distance < 0:
+                    below.setdefault(threshold, []).append(line)
+                elif kind == MINIMUM and distance <= self.margin(threshold):
+                    alerts.append(self._alert(
+                        table, "near_minimum", [line], threshold, line.investment, "keep",
+                        subsidy_at_stake=line.investment * table.rate,
+                        message=(
+                            f"€{distance:,.0f} above the {table.scheme.value} minimum of "
+                            f"€{threshold:,.0f} for {table.code}; a larger discount loses the deduction"
+                        )
+                    ))
+                elif kind == CAP and distance > 0:
+                    alerts.append(self._alert(
+                        table, "above_cap", [line], threshold, line.investment, "split",
+                        subsidy_at_stake=distance * table.rate,
+                        message=(
+                            f"€{distance:,.0f} above the {table.scheme.value} cap of €{threshold:,.0f} "
+                            f"per asset for {table.code}; split into separate assets"
+                        )
+                    ))
+
+            for threshold, kind in table.neighbours(line.unit_price, UNIT):
+                excess = line.unit_price - threshold
+                if kind == CAP and excess > 0:
+                    alerts.append(self._alert(
+                        table, "above_cap", [line], threshold, line.unit_price, "reduce",
+                        subsidy_at_stake=excess * line.quantity * table.rate,
+                        message=(
+                            f"€{excess:,.0f} per unit above the {table.scheme.value} cap of "
+                            f"€{threshold:,.0f} for {table.code}; the excess earns no deduction"
+                        )
+                    ))
+
+        for threshold, group in below.items():
+            alerts.extend(self._below_minimum(table, threshold, group))
+        return alerts
+
+    def _below_minimum(
+        self,
+        table: ThresholdTable,
+        threshold: float,
+        lines: List[_Line]
+    ) -> List[ThresholdAlert]:
+        """Bundle lines that reach the minimum together, else flag the ones just short"""
+        total = sum(line.investment for line in lines)
+        if len(lines) > 1 and total >= threshold:
+            return [self._alert(
+                table, "bundle", lines, threshold, total, "bundle",
+                subsidy_at_stake=total * table.rate,
+                message=(
+                    f"Lines {', '.join(str(line.index) for line in lines)} are each below the "
+                    f"{table.scheme.value} minimum of €{threshold:,.0f} for {table.code} but "
+                    f"reach €{total:,.0f} together; invest in them as one asset"
+                )
+            )]
+
+        alerts = []
+        for line in lines:
+            shortfall = threshold - line.investment
+            if shortfall <= self.margin(threshold):
+                alerts.append(self._alert(
+                    table, "below_minimum", [line], threshold, line.investment, "increase",
+                    subsidy_at_stake=threshold * table.rate,
+                    message=(
+                        f"€{shortfall:,.0f} short of the {table.scheme.value} minimum of "
+                        f"€{threshold:,.0f} for {table.code}"
+                    )
+                ))
+        return alerts
+
+    @staticmethod
+    def _alert(
+        table: ThresholdTable,
+        kind: str,
+        lines: List[_Line],
+        threshold: float,
+        investment: float,
+        suggestion: str,
+        subsidy_at_stake: float,
+        message: str
+    ) -> ThresholdAlert:
+        key = (table.scheme, table.code)
+        return ThresholdAlert(
+            scheme=table.scheme,
+            code=table.code,
+            kind=kind,
+            lines=[line.index for line in lines],
+            threshold=threshold,
+            investment=round(investment, 2),
+            distance=round(investment - threshold, 2),
+            subsidy_at_stake=round(subsidy_at_stake, 2),
+            suggestion=suggestion,
+            message=message,
+            alternative=any(key not in line.primary for line in lines)
+        )
+
+
+# Global instance (singleton pattern)
+_detector_instance: Optional[ThresholdDetector] = None
+
+
+def get_threshold_detector() -> ThresholdDetector:
+    """
+    Get the global ThresholdDetector instance (singleton).
+
+    Builds the threshold tables on first call, returns cached instance on subsequent calls.
+    """
+    global _detector_instance
+
+    if _detector_instance is None:
+        _detector_instance = ThresholdDetector()
+
+    return _detector_instance
@@ -0,0 +1,9 @@
+import pytest
+
+from services.subsidy_database import SubsidyDatabase
+
+
+@pytest.fixture(scope="session")
+def db() -> SubsidyDatabase:
+    """Shared subsidy database loaded from data/subsidies"""
+    return SubsidyDatabase()
@@ -0,0 +1,109 @@
+"""
+Tests for the ISDE arbitrage engine.
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.subsidy_schemas import Equipment, Quote
+from services.arbitrage_engine import ArbitrageEngine
+from services.equipment_matcher import EquipmentMatcher
+from services.quote_sessions import QuoteSessions
+
+
+@pytest.fixture(scope="module")
+def engine(db) -> ArbitrageEngine:
+    return ArbitrageEngine(db)
+
+
+def _brute_force(db, entry, band_fraction=0.15, min_band_kw=1.0):
+    """Reference: scan the whole catalog"""
+    power = entry.attributes["power_kw"]
+    if not power:
+        return set()
+    width = max(power * band_fraction, min_band_kw)
+    return {
+        e.meldcode for e in db.get_all_isde_warmtepompen()
+        if e.meldcode != entry.meldcode
+        and e.attributes["power_kw"]
+        and e.attributes["type"] == entry.attributes["type"]
+        and abs(e.attributes["power_kw"] - power) <= width
+        and (e.amount_eur > entry.amount_eur
+             or (e.amount_eur >= entry.amount_eur and e.attributes["gwp"] < entry.attributes["gwp"]))
+    }
+
+
+def test_alternatives_match_full_scan(db, engine):
+    for entry in db.get_all_isde_warmtepompen()[::150]:
+        expected = _brute_force(db, entry)
+        found = engine.alternatives(entry, limit=10000)
+
+        assert {e.meldcode for e in found} == expected
+        # Ranked by amount gain first
+        amounts = [e.amount_eur for e in found]
+        assert amounts == sorted(amounts, reverse=True)
+
+
+def test_unknown_power_is_left_out(db, engine):
+    entries = db.get_all_isde_warmtepompen()
+    unknown = [e for e in entries if not e.attributes.get("power_kw")]
+    assert unknown
+
+    assert all(engine.alternatives(e) == [] for e in unknown)
+    banded = {e.meldcode for band in engine.bands.values() for e in band.entries}
+    assert banded.isdisjoint(e.meldcode for e in unknown)
+
+
+def test_alternatives_are_fast(db, engine):
+    entries = db.get_all_isde_warmtepompen()
+
+    started = time.perf_counter()
+    for entry in entries:
+        engine.alternatives(entry, limit=10)
+    per_line = (time.perf_counter() - started) / len(entries)
+
+    assert per_line < 0.0005
+
+
+def test_opportunities_for_quote_line(db, engine):
+    entry = next(
+        e for e in db.get_all_isde_warmtepompen()
+        if engine.alternatives(e, 1) and engine.alternatives(e, 1)[0].amount_eur > e.amount_eur
+    )
+    match = EquipmentMatcher(db).match_equipment(Equipment(
+        description="Warmtepomp", quantity=1, unit_price=10000.0, total_price=10000.0,
+        specs={"meldcode": entry.meldcode}
+    ))
+
+    opportunities = engine.opportunities(match, limit=3)
+
+    assert 1 <= len(opportunities) <= 3
+    best = opportunities[0]
+    assert best.subsidy_delta == pytest.approx(best.alternative_subsidy - best.original_subsidy)
+    assert best.subsidy_delta > 0
+    assert best.net_benefit == best.subsidy_delta
+    assert best.alternative_equipment["type"] == entry.attributes["type"]
+
+
+def test_endpoint_honours_max_options(db, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "get_quote_sessions", lambda: QuoteSessions(EquipmentMatcher(db)))
+    monkeypatch.setattr(main, "get_arbitrage_engine", lambda: ArbitrageEngine(db))
+    client = TestClient(main.app)
+    lines = [
+        Equipment(description="Warmtepomp", quantity=1, unit_price=9000.0, total_price=9000.0,
+                  specs={"meldcode": entry.meldcode})
+        for entry in db.get_all_isde_warmtepompen()[:3]
+    ]
+    quote = Quote(equipment=lines, subtotal=27000.0).model_dump(mode="json")
+
+    data = client.post("/api/quotes/analysis?max_arbitrage_options=2", json=quote).json()
+    assert 0 < len(data["analysis"]["arbitrage_opportunities"]) <= 6
+
+    data = client.post("/api/quotes/analysis?include_arbitrage=false", json=quote).json()
+    assert data["analysis"]["arbitrage_opportunities"] == []
+
+    assert client.post("/api/quotes/analysis?max_arbitrage_options=11", json=quote).status_code == 422
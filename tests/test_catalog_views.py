@@ -0,0 +1,96 @@
+"""
+Tests for the materialized best-meldcode views.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.subsidy_schemas import ISDECategory
+from services.catalog_snapshot import CatalogSnapshot
+from services.catalog_views import CatalogViews, bucket_label, view_amount
+
+
+@pytest.fixture(scope="module")
+def views(db) -> CatalogViews:
+    return CatalogViews.build_from_database(db, top_n=5)
+
+
+def test_bucket_label():
+    assert bucket_label(ISDECategory.WARMTEPOMP, 7.5) == "6-8"
+    assert bucket_label(ISDECategory.WARMTEPOMP, 8.0) == "8-10"
+    assert bucket_label(ISDECategory.HOOGRENDEMENTSGLAS, 1.2) == "1.2-1.4"
+
+
+def test_best_heat_pump_matches_full_scan(db, views):
+    best = views.best(ISDECategory.WARMTEPOMP, "Lucht-Water", 7.0)
+
+    scan = sorted(
+        (e for e in db.get_all_isde_warmtepompen()
+         if e.attributes["type"] == "Lucht-Water" and 6 <= e.attributes["power_kw"] < 8),
+        key=lambda e: -e.amount_eur
+    )
+    assert len(best) == 5
+    assert [e.amount_eur for e in best] == [e.amount_eur for e in scan[:5]]
+
+
+def test_monument_glass(db, views):
+    key = next(k for k in views.keys(ISDECategory.HOOGRENDEMENTSGLAS) if k[3] == "Alleen monumentale woningen")
+
+    best = views.top(ISDECategory.HOOGRENDEMENTSGLAS, key[1], key[2], woning_type="monument", limit=3)
+
+    assert 0 < len(best) <= 3
+    amounts = [view_amount(e, "Alleen monumentale woningen") for e in best]
+    assert amounts == sorted(amounts, reverse=True)
+
+
+def test_monument_views_rank_by_the_monument_rate(views):
+    # HR++ glass for all dwellings pays monuments 92/m² instead of 25/m²
+    best = views.best(ISDECategory.HOOGRENDEMENTSGLAS, "hr++ glas u <= 1,2", 1.1, woning_type="monument", limit=1)
+    regular = views.best(ISDECategory.HOOGRENDEMENTSGLAS, "HR++ glas U <= 1,2", 1.1, limit=1)
+
+    assert best[0].attributes["woning_type"] == "Alle woningen"
+    assert view_amount(best[0], "Alleen monumentale woningen") > view_amount(regular[0], "Alle woningen")
+
+
+def test_defaults_and_case(views):
+    # No woning_type means all dwellings; type case does not matter
+    assert views.best(ISDECategory.HOOGRENDEMENTSGLAS, "HR++ glas U <= 1,2", 1.1) == \
+        views.best(ISDECategory.HOOGRENDEMENTSGLAS, "HR++ glas U <= 1,2", 1.1, woning_type="alle")
+    assert views.best(ISDECategory.HOOGRENDEMENTSGLAS, "HR++ glas U <= 1,2", 1.1)
+    assert views.best(ISDECategory.WARMTEPOMP, "lucht-water", 7.0) == \
+        views.best(ISDECategory.WARMTEPOMP, "Lucht-Water", 7.0)
+    # Heat pumps have no woning types: monuments get the general view
+    assert views.best(ISDECategory.WARMTEPOMP, "Lucht-Water", 7.0, woning_type="monument")
+
+
+def test_snapshot_round_trip(db, views, tmp_path):
+    snapshot = CatalogSnapshot(db.catalog_version)
+    views.to_snapshot(snapshot)
+    snapshot.save(tmp_path / "snapshot.npz")
+
+    loaded = CatalogViews.from_snapshot(CatalogSnapshot.load(tmp_path / "snapshot.npz", db.catalog_version), db)
+
+    assert loaded.top_n == 5
+    assert {k: [e.meldcode for e in es] for k, es in loaded.views.items()} == \
+        {k: [e.meldcode for e in es] for k, es in views.views.items()}
+
+
+def test_best_endpoint():
+    import main
+
+    client = TestClient(main.app)
+
+    data = client.get("/api/isde/best?category=warmtepomp&type=Lucht-Water&value=7&limit=3").json()
+    assert data["bucket"] == "6-8"
+    assert len(data["meldcodes"]) == 3
+
+    # Alias category, short woning_type
+    data = client.get(
+        "/api/isde/best?category=glas&type=Glas U <= 2,0&value=1.9&woning_type=monument"
+    ).json()
+    assert data["meldcodes"]
+    assert client.get("/api/isde/best?category=zon&type=x&value=1").status_code == 422
+
+    # Default woning_type, lower-case type
+    data = client.get("/api/isde/best", params={"category": "glas", "type": "hr++ glas u <= 1,2", "value": 1.1}).json()
+    assert data["meldcodes"]
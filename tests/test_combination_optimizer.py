@@ -0,0 +1,164 @@
+"""
+Tests for CombinationOptimizer cumulation rules.
+"""
+
+import time
+
+import pytest
+
+from models.subsidy_schemas import (
+    Equipment,
+    EquipmentMatch,
+    ISDECategory,
+    SubsidyCalculation,
+    SubsidyScheme
+)
+from services.combination_optimizer import CombinationOptimizer
+from services.subsidy_calculator import calculate_isde
+
+
+@pytest.fixture
+def optimizer(db) -> CombinationOptimizer:
+    return CombinationOptimizer(db)
+
+
+def _calc(scheme: SubsidyScheme, code: str, amount: float) -> SubsidyCalculation:
+    return SubsidyCalculation(
+        scheme=scheme, code=code, title=code,
+        investment_amount=10000.0, subsidy_amount=amount
+    )
+
+
+def _match(equipment: Equipment, calculations) -> EquipmentMatch:
+    lists = {scheme: [] for scheme in SubsidyScheme}
+    for calculation in calculations:
+        lists[calculation.scheme].append(calculation)
+    return EquipmentMatch(
+        equipment=equipment,
+        eia_matches=lists[SubsidyScheme.EIA],
+        isde_matches=lists[SubsidyScheme.ISDE],
+        mia_matches=lists[SubsidyScheme.MIA],
+        vamil_matches=lists[SubsidyScheme.VAMIL],
+        confidence=0.9
+    )
+
+
+def _surface(description: str, area: float, price: float) -> Equipment:
+    return Equipment(
+        description=description, quantity=1, unit_price=price,
+        total_price=price, specs={"area_m2": area}
+    )
+
+
+def test_eia_and_mia_exclude_each_other(optimizer):
+    equipment = _surface("Machine", 1, 10000.0)
+    match = _match(equipment, [
+        _calc(SubsidyScheme.EIA, "E1", 4000.0),
+        _calc(SubsidyScheme.MIA, "M1", 3600.0),
+        _calc(SubsidyScheme.VAMIL, "M1", 375.0),
+    ])
+
+    combination = optimizer.optimize_line(match)
+
+    # EIA + Vamil (4375) beats MIA + Vamil (3975); EIA never with MIA
+    assert {(c.scheme, c.code) for c in combination} == {
+        (SubsidyScheme.EIA, "E1"), (SubsidyScheme.VAMIL, "M1")
+    }
+
+
+def test_isde_excludes_other_schemes(optimizer, db):
+    entry = db.get_all_isde_warmtepompen()[0]
+    equipment = _surface("Warmtepomp", 1, 10000.0)
+    isde = calculate_isde(entry, equipment)
+    match = _match(equipment, [
+        isde,
+        _calc(SubsidyScheme.EIA, "E1", isde.subsidy_amount - 500),
+        _calc(SubsidyScheme.VAMIL, "M1", 375.0),
+    ])
+
+    combination = optimizer.optimize_line(match)
+
+    assert [c.scheme for c in combination] == [SubsidyScheme.ISDE]
+
+
+def test_multiple_measures_unlock_higher_rate(optimizer, db):
+    glass = db.get_isde_by_category(ISDECategory.HOOGRENDEMENTSGLAS)[0]
+    insulation = db.get_isde_by_category(ISDECategory.ISOLATIE)[0]
+    glass_line = _surface("HR++ glas", 20, 5000.0)
+    insulation_line = _surface("Gevelisolatie", 100, 8000.0)
+
+    glass_isde = calculate_isde(glass, glass_line)
+    # EIA beats ISDE on the glass line on its own...
+    glass_match = _match(glass_line, [
+        glass_isde,
+        _calc(SubsidyScheme.EIA, "E1", glass_isde.subsidy_amount + 50),
+    ])
+    insulation_match = _match(insulation_line, [calculate_isde(insulation, insulation_line)])
+
+    assert optimizer.optimize_line(glass_match)[0].scheme == SubsidyScheme.EIA
+
+    # ...but claiming ISDE on both lines doubles both per-m² rates
+    glass_combo, insulation_combo = optimizer.optimize_quote([glass_match, insulation_match])
+
+    assert glass_combo[0].scheme == SubsidyScheme.ISDE
+    assert glass_combo[0].subsidy_amount == pytest.approx(glass.amounts["meerdere"] * 20)
+    assert insulation_combo[0].subsidy_amount == pytest.approx(insulation.amounts["meerdere"] * 100)
+
+
+def test_single_measure_keeps_single_rate(optimizer, db):
+    insulation = db.get_isde_by_category(ISDECategory.ISOLATIE)[0]
+    lines = [_surface("Gevelisolatie", 50, 4000.0), _surface("Gevelisolatie", 30, 2500.0)]
+    matches = [_match(line, [calculate_isde(insulation, line)]) for line in lines]
+
+    combinations = optimizer.optimize_quote(matches)
+
+    # Same measure twice is still one measure
+    assert combinations[0][0].subsidy_amount == pytest.approx(insulation.amounts["enkel"] * 50)
+    assert combinations[1][0].subsidy_amount == pytest.approx(insulation.amounts["enkel"] * 30)
+
+
+def test_repeated_lines_share_option_table(optimizer):
+    equipment = _surface("Machine", 1, 10000.0)
+    matches = [
+        _match(equipment, [
+            _calc(SubsidyScheme.EIA, "E1", 4000.0),
+            _calc(SubsidyScheme.MIA, "M1", 4500.0),
+        ])
+    ] * 500
+
+    started = time.perf_counter()
+    combinations = optimizer.optimize_quote(matches)
+    elapsed = time.perf_counter() - started
+
+    assert all(c[0].code == "M1" for c in combinations)
+    assert len(optimizer._options) == 1
+    assert elapsed < 0.05
+
+
+def test_option_tables_depend_on_line_price(optimizer, db):
+    insulation = db.get_isde_by_category(ISDECategory.ISOLATIE)[0]
+    single = insulation.amounts["enkel"] * 10
+    multiple = insulation.amounts["meerdere"] * 10
+    lines = [
+        _surface("Gevelisolatie", 10, 10 * multiple),
+        _surface("Gevelisolatie", 10, (single + multiple) / 2),
+    ]
+    matches = [_match(line, [calculate_isde(insulation, line)]) for line in lines]
+    assert matches[0].isde_matches[0].subsidy_amount == matches[1].isde_matches[0].subsidy_amount
+
+    expensive, cheap = (optimizer.line_options(match) for match in matches)
+
+    assert expensive.isde_multiple == pytest.approx(multiple)
+    # Capped at the line price, not served from the expensive line's table
+    assert cheap.isde_multiple == pytest.approx((single + multiple) / 2)
+
+
+def test_ties_are_broken_the_same_per_line_and_per_quote(optimizer):
+    equipment = _surface("Installatie", 1, 10000.0)
+    clear = _match(equipment, [_calc(SubsidyScheme.ISDE, "X", 2000.0), _calc(SubsidyScheme.EIA, "E1", 1000.0)])
+    tied = _match(equipment, [_calc(SubsidyScheme.ISDE, "X", 1000.0), _calc(SubsidyScheme.EIA, "E2", 1000.0)])
+
+    combinations = optimizer.optimize_quote([clear, tied])
+
+    assert [c.code for c in combinations[0]] == ["X"]
+    assert [c.code for c in combinations[1]] == [c.code for c in optimizer.optimize_line(tied)] == ["E2"]
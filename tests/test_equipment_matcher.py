@@ -0,0 +1,135 @@
+"""
+Tests for EquipmentMatcher quote analysis.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from models.subsidy_schemas import Equipment, Quote, SubsidyScheme
+from services.equipment_matcher import EquipmentMatcher
+
+
+@pytest.fixture(scope="module")
+def matcher(db) -> EquipmentMatcher:
+    return EquipmentMatcher(db)
+
+
+def _heat_pump(db, quantity: int = 1) -> Equipment:
+    entry = db.get_all_isde_warmtepompen()[0]
+    return Equipment(
+        description="Warmtepomp",
+        brand=entry.manufacturer,
+        model=entry.model,
+        quantity=quantity,
+        unit_price=9000.0,
+        total_price=9000.0 * quantity,
+        category="warmtepomp"
+    )
+
+
+def _quote(lines) -> Quote:
+    return Quote(equipment=lines, subtotal=sum(e.total_price for e in lines))
+
+
+def test_isde_model_match(db, matcher):
+    equipment = _heat_pump(db, quantity=2)
+    entry = db.get_all_isde_warmtepompen()[0]
+
+    match = matcher.match_equipment(equipment)
+
+    assert match.isde_matches[0].code == entry.meldcode
+    assert match.isde_matches[0].subsidy_amount == entry.amount_eur * 2
+    assert match.confidence == pytest.approx(0.95)
+
+
+def test_eia_match_uses_forty_percent(matcher):
+    equipment = Equipment(
+        description="LED verlichting armaturen",
+        quantity=40, unit_price=150.0, total_price=6000.0
+    )
+
+    match = matcher.match_equipment(equipment)
+
+    assert match.eia_matches
+    assert match.eia_matches[0].subsidy_amount == pytest.approx(2400.0)
+    assert match.total_subsidy > 0
+
+
+def test_eia_below_minimum_investment(matcher):
+    equipment = Equipment(
+        description="LED verlichting armaturen",
+        quantity=1, unit_price=1000.0, total_price=1000.0
+    )
+
+    match = matcher.match_equipment(equipment)
+
+    assert match.eia_matches[0].subsidy_amount == 0
+    assert match.eia_matches[0].warnings
+
+
+def test_quote_totals(db, matcher):
+    lines = [
+        _heat_pump(db),
+        Equipment(description="LED verlichting armaturen", quantity=40,
+                  unit_price=150.0, total_price=6000.0),
+    ]
+
+    analysis = matcher.analyze_quote_sync(_quote(lines))
+
+    assert len(analysis.equipment_matches) == 2
+    per_scheme = (
+        analysis.eia_total + analysis.isde_total + analysis.mia_total + analysis.vamil_total
+    )
+    assert analysis.total_subsidies == pytest.approx(per_scheme)
+    assert analysis.total_subsidies == pytest.approx(
+        sum(m.total_subsidy for m in analysis.equipment_matches)
+    )
+    assert analysis.net_cost_after_subsidies == pytest.approx(
+        analysis.total_investment - analysis.total_subsidies
+    )
+    assert analysis.isde_total > 0
+    assert analysis.processing_time_seconds is not None
+
+
+def test_async_matches_sync_in_line_order(db, matcher):
+    lines = [
+        _heat_pump(db),
+        Equipment(description="Elektrische bestelauto", quantity=1,
+                  unit_price=30000.0, total_price=30000.0),
+        Equipment(description="Zonnepanelen", quantity=20,
+                  unit_price=300.0, total_price=6000.0),
+    ] * 5
+    quote = _quote(lines)
+
+    sync = matcher.analyze_quote_sync(quote)
+    concurrent = asyncio.run(matcher.analyze_quote(quote))
+
+    assert [m.equipment.description for m in concurrent.equipment_matches] == [
+        e.description for e in lines
+    ]
+    assert concurrent.total_subsidies == pytest.approx(sync.total_subsidies)
+
+
+def test_fifty_line_quote_latency(db, matcher):
+    lines = [
+        _heat_pump(db),
+        Equipment(description="LED verlichting armaturen", quantity=40,
+                  unit_price=150.0, total_price=6000.0),
+        Equipment(description="Elektrische bestelauto", quantity=1,
+                  unit_price=30000.0, total_price=30000.0),
+        Equipment(description="Zonnepanelen", quantity=20,
+                  unit_price=300.0, total_price=6000.0),
+        Equipment(description="Isolatie spouwmuur", quantity=80,
+                  unit_price=25.0, total_price=2000.0),
+    ] * 10
+    quote = _quote(lines)
+    matcher.analyze_quote_sync(quote)
+
+    started = time.perf_counter()
+    matcher.analyze_quote_sync(quote)
+    elapsed = time.perf_counter() - started
+
+    # Target is < 20 ms; leave headroom for slow CI machines
+    assert elapsed < 0.1
@@ -0,0 +1,162 @@
+"""
+Tests for the content-addressed quote extraction cache.
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.subsidy_schemas import Equipment, Quote
+from services.cache_backends import MemoryCacheBackend
+from services.document_processor import PROMPT_VERSION, DocumentProcessor
+from services.extraction_cache import ExtractionCache, normalize_text
+from services.pdf_extraction import PdfExtractor
+from services.supplier_templates import SupplierTemplates
+from tests.test_pdf_extraction import _pdf
+
+
+class CountingProcessor(DocumentProcessor):
+    """DocumentProcessor with a canned LLM extraction that counts calls"""
+
+    def __init__(self, extractor: PdfExtractor, cache: ExtractionCache):
+        super().__init__(
+            api_key="test", extractor=extractor, cache=cache, model=cache.model,
+            templates=SupplierTemplates(MemoryCacheBackend())
+        )
+        self.llm_calls = 0
+
+    async def _extract_quote_with_llm(self, document_text: str, tenant=None) -> Quote:
+        self.llm_calls += 1
+        line = Equipment(description="Zonnepanelen", quantity=30, unit_price=400.0, total_price=12000.0)
+        return Quote(supplier_name=normalize_text(document_text), equipment=[line], subtotal=12000.0)
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    extractor = PdfExtractor(max_workers=1, page_timeout=20.0)
+    yield extractor
+    extractor.shutdown()
+
+
+@pytest.fixture
+def processor(extractor) -> CountingProcessor:
+    return CountingProcessor(extractor, ExtractionCache(MemoryCacheBackend(), PROMPT_VERSION, "test-model"))
+
+
+def test_identical_upload_skips_parsing_and_llm(processor):
+    pdf = _pdf(["Offerte Zonnepanelen 30 stuks"])
+
+    first = asyncio.run(processor.extract_quote(pdf))
+    second = asyncio.run(processor.extract_quote(pdf))
+
+    assert (first.api_calls_made, first.cache_hit) == (1, None)
+    assert (second.api_calls_made, second.cache_hit) == (0, "pdf")
+    assert second.quote.equipment == first.quote.equipment
+    assert processor.llm_calls == 1
+
+
+class ChunkedUpload:
+    """Upload with an async read(size), like FastAPI's UploadFile"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        chunk, self.data = (self.data, b"") if size < 0 else (self.data[:size], self.data[size:])
+        return chunk
+
+
+def test_upload_is_hashed_while_spooling(processor):
+    pdf = _pdf(["Offerte Zonnepanelen 30 stuks"])
+    upload = ChunkedUpload(pdf)
+
+    first = asyncio.run(processor.extract_quote(upload))
+    second = asyncio.run(processor.extract_quote(pdf))
+
+    assert first.api_calls_made == 1 and -1 not in upload.reads
+    # Same digest as hashing the bytes
+    assert second.cache_hit == "pdf"
+
+
+def test_same_text_in_other_file_skips_llm(processor):
+    one_page = _pdf(["Offerte Zonnepanelen 30 stuks"])
+    two_pages = _pdf(["Offerte Zonnepanelen", "30 stuks"])
+
+    asyncio.run(processor.extract_quote(one_page))
+    extraction = asyncio.run(processor.extract_quote(two_pages))
+
+    assert (extraction.api_calls_made, extraction.cache_hit) == (0, "text")
+    assert processor.llm_calls == 1
+    # The re-saved file is now known by its bytes as well
+    assert asyncio.run(processor.extract_quote(two_pages)).cache_hit == "pdf"
+
+
+def test_documents_without_text_share_no_cache_entry(processor):
+    first = asyncio.run(processor.extract_quote(_pdf([""])))
+    second = asyncio.run(processor.extract_quote(_pdf(["", ""])))
+
+    assert (first.api_calls_made, second.api_calls_made) == (1, 1)
+    assert second.cache_hit is None
+    # The scan itself is still known by its bytes
+    assert asyncio.run(processor.extract_quote(_pdf([""]))).cache_hit == "pdf"
+
+
+def test_incomplete_extraction_is_not_cached(processor, monkeypatch):
+    monkeypatch.setattr(processor.extractor, "max_pages", 1)
+    pdf = _pdf(["Offerte Zonnepanelen", "30 stuks"])
+
+    asyncio.run(processor.extract_quote(pdf))
+    asyncio.run(processor.extract_quote(pdf))
+
+    assert processor.llm_calls == 2
+    assert len(processor.cache.backend) == 0
+
+
+def test_keys_include_prompt_version_and_model():
+    backend = MemoryCacheBackend()
+    quote = Quote(equipment=[], subtotal=0.0)
+    ExtractionCache(backend, "quote-v1", "model-a").put(quote, pdf_digest="abc")
+
+    assert ExtractionCache(backend, "quote-v1", "model-a").get("pdf", "abc") == quote
+    assert ExtractionCache(backend, "quote-v2", "model-a").get("pdf", "abc") is None
+    assert ExtractionCache(backend, "quote-v1", "model-b").get("pdf", "abc") is None
+
+
+def test_corrupt_entry_is_dropped():
+    cache = ExtractionCache(MemoryCacheBackend(), "quote-v1", "model-a")
+    cache.backend.set(cache.key("pdf", "abc"), b'{"equipment": "nope"}')
+
+    assert cache.get("pdf", "abc") is None
+    assert len(cache.backend) == 0
+    assert cache.metrics.as_dict()["errors"] == 1
+
+
+def test_upload_endpoint_reports_api_calls(processor, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "get_document_processor", lambda: processor)
+    client = TestClient(main.app)
+    upload = {"file": ("offerte.pdf", _pdf(["Offerte Zonnepanelen 30 stuks"]), "application/pdf")}
+
+    first = client.post("/api/quotes/upload", files=upload).json()
+    second = client.post("/api/quotes/upload", files=upload).json()
+
+    assert first["api_calls_made"] == 1
+    assert second["api_calls_made"] == 0
+    assert second["analysis"]["total_investment"] == first["analysis"]["total_investment"]
+    assert client.post(
+        "/api/quotes/upload", files={"file": ("x.pdf", b"nope", "application/pdf")}
+    ).status_code == 400
+
+
+def test_prompt_has_stable_cacheable_prefix(processor):
+    first = processor._build_extraction_prompt("Offerte A", "offerte")
+    second = processor._build_extraction_prompt("Offerte B", "offerte")
+
+    assert first["system"] == second["system"]
+    assert first["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "EIA codes:" in first["system"][-1]["text"]
+    assert "Offerte A" in first["messages"][0]["content"]
@@ -0,0 +1,155 @@
+"""
+Tests for the shared async LLM client (limits, retries, timeouts).
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import anthropic
+import pytest
+
+from services.llm_client import LLMClient
+
+
+def _status_error(status: int, retry_after: str = None) -> anthropic.APIStatusError:
+    headers = {"retry-after": retry_after} if retry_after else {}
+    response = SimpleNamespace(request=None, status_code=status, headers=headers)
+    error = {429: anthropic.RateLimitError, 400: anthropic.BadRequestError}.get(status, anthropic.InternalServerError)
+    return error(f"HTTP {status}", response=response, body=None)
+
+
+class FakeMessages:
+    """messages.create that replays scripted outcomes and tracks concurrency"""
+
+    def __init__(self, outcomes=(), delay: float = 0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+        self.active = {}
+        self.peak = {}
+        self.cancelled = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        tenant = kwargs.get("metadata", {}).get("tenant")
+        for key in (None, tenant):
+            self.active[key] = self.active.get(key, 0) + 1
+            self.peak[key] = max(self.peak.get(key, 0), self.active[key])
+        try:
+            await asyncio.sleep(self.delay)
+            outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            for key in (None, tenant):
+                self.active[key] -= 1
+
+
+class FakeLLMClient(LLMClient):
+    def __init__(self, messages: FakeMessages, **kwargs):
+        super().__init__(api_key="test", base_delay=0.001, max_delay=0.01, **kwargs)
+        self.messages = messages
+
+    def _new_client(self):
+        return SimpleNamespace(messages=self.messages)
+
+
+def _create(client: LLMClient, tenant: str = None):
+    return client.create(tenant=tenant, metadata={"tenant": tenant}, model="m", max_tokens=1, messages=[])
+
+
+def test_retries_rate_limits_and_server_errors():
+    messages = FakeMessages([_status_error(429, retry_after="0"), _status_error(529), "done"])
+    client = FakeLLMClient(messages)
+
+    assert asyncio.run(_create(client)) == "done"
+    assert messages.calls == 3
+    assert client.metrics.as_dict()["retries"] == 2
+
+
+def test_client_errors_and_exhausted_retries_raise():
+    client = FakeLLMClient(FakeMessages([_status_error(400)]))
+    with pytest.raises(anthropic.BadRequestError):
+        asyncio.run(_create(client))
+    assert client.metrics.retries == 0
+
+    client = FakeLLMClient(FakeMessages([_status_error(503)] * 3), max_retries=2)
+    with pytest.raises(anthropic.InternalServerError):
+        asyncio.run(_create(client))
+    assert (client.metrics.calls, client.metrics.retries, client.metrics.failures) == (3, 2, 1)
+
+
+def test_global_and_tenant_limits():
+    messages = FakeMessages(delay=0.01)
+    client = FakeLLMClient(messages, max_concurrency=3, tenant_concurrency=2)
+
+    async def run():
+        await asyncio.gather(*(_create(client, tenant) for tenant in ["a"] * 6 + ["b"] * 3))
+
+    asyncio.run(run())
+
+    assert messages.calls == 9
+    assert messages.peak[None] == 3
+    assert messages.peak["a"] == 2
+    assert messages.peak["b"] <= 2
+
+
+def test_queued_tenant_calls_do_not_hold_global_slots():
+    messages = FakeMessages(delay=0.05)
+    client = FakeLLMClient(messages, max_concurrency=4, tenant_concurrency=1)
+
+    async def run():
+        busy = [asyncio.create_task(_create(client, "a")) for _ in range(6)]
+        await asyncio.sleep(0.01)
+        started = asyncio.get_running_loop().time()
+        await _create(client, "b")
+        waited = asyncio.get_running_loop().time() - started
+        await asyncio.gather(*busy)
+        return waited
+
+    # Tenant b only waits for its own call, not for tenant a's queue
+    assert asyncio.run(run()) < 0.1
+    assert messages.peak["a"] == 1
+
+
+def test_timeout_is_retried_and_cancellation_propagates():
+    messages = FakeMessages(["late"], delay=0.2)
+    client = FakeLLMClient(messages, timeout=0.05, max_retries=1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_create(client))
+    assert client.metrics.timeouts == 2
+
+    messages = FakeMessages(delay=1.0)
+    client = FakeLLMClient(messages, max_concurrency=1)
+
+    async def run():
+        task = asyncio.create_task(_create(client))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The slot was released: the next call gets through
+        messages.delay = 0.0
+        return await _create(client)
+
+    assert asyncio.run(run()) == "ok"
+    assert messages.cancelled == 1
+
+
+def test_usage_and_cache_hits_are_counted():
+    usage = SimpleNamespace(
+        input_tokens=100, output_tokens=50, cache_creation_input_tokens=None, cache_read_input_tokens=900
+    )
+    client = FakeLLMClient(FakeMessages([SimpleNamespace(usage=usage)] * 2))
+
+    asyncio.run(_create(client))
+    asyncio.run(_create(client))
+
+    metrics = client.metrics.as_dict()
+    assert metrics["input_tokens"] == 200
+    assert metrics["cache_read_input_tokens"] == 1800
+    assert metrics["cache_hit_rate"] == 0.9
@@ -0,0 +1,132 @@
+"""
+Tests for the persistent match cache and its backends.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from models.subsidy_schemas import Equipment, Quote
+from services.cache_backends import MemoryCacheBackend, SQLiteCacheBackend, create_cache_backend
+from services.equipment_matcher import EquipmentMatcher
+from services.match_cache import CachedResolution, MatchCache, equipment_fingerprint
+from services.matching_cascade import MatchingCascade, Tier
+from tests.test_matching_cascade import RecordingVerifier
+
+
+def _line(description: str, price: float, quantity: int = 1, **kwargs) -> Equipment:
+    return Equipment(
+        description=description, quantity=quantity,
+        unit_price=price / quantity, total_price=price, **kwargs
+    )
+
+
+def test_fingerprint_ignores_formatting_and_price():
+    base = _line("Warmtepomp", 9000.0, brand="Daikin", model="Altherma 3 H-HT", specs={"scop": 4.8})
+    same = _line("WARMTEPOMP", 11000.0, quantity=2, brand="DAIKIN ",
+                 model="altherma 3 hht", specs={"SCOP": "4,8"})
+    other = _line("Warmtepomp", 9000.0, brand="Daikin", model="Altherma 3 H-HT", specs={"scop": 4.1})
+
+    assert equipment_fingerprint(base) == equipment_fingerprint(same)
+    assert equipment_fingerprint(base) != equipment_fingerprint(other)
+
+
+def test_fingerprint_includes_building_and_description():
+    base = _line("Dakisolatie", 4000.0, brand="Rockwool", model="Rhinox", specs={"rd": 3.5})
+    variants = [
+        base.model_copy(update={"specs": {"rd": 3.5, "monument": True}}),
+        base.model_copy(update={"specs": {"rd": 3.5, "woning_type": "Appartement"}}),
+        base.model_copy(update={"description": "Vloerisolatie"}),
+    ]
+
+    fingerprints = {equipment_fingerprint(line) for line in [base, *variants]}
+    assert len(fingerprints) == 4
+
+
+def test_put_many_writes_one_batch(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.sqlite3")
+    cache = MatchCache(backend, "v1")
+    lines = [_line("Zonnepanelen", 12000.0), _line("LED verlichting", 6000.0)]
+    resolution = CachedResolution(tier="rules", confidence=0.9, eia_codes=["251115"])
+
+    statements = []
+    backend._conn.set_trace_callback(statements.append)
+    cache.put_many([(line, resolution) for line in lines])
+
+    assert sum(s == "COMMIT" for s in statements) == 1
+    assert [r.eia_codes for r in cache.get_many(lines)] == [["251115"], ["251115"]]
+    assert cache.metrics.stores == 2
+
+
+def test_sqlite_backend_ttl_and_lru_eviction(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.sqlite3", max_entries=2)
+
+    backend.set("short", b"1", ttl_seconds=0.01)
+    backend.set("a", b"a")
+    backend.set("b", b"b")
+    time.sleep(0.02)
+    assert backend.get("short") is None
+
+    backend.get("a")  # b is now least recently used
+    time.sleep(0.01)
+    backend.set("c", b"c")
+    backend.evict()
+
+    assert backend.get("a") == b"a"
+    assert backend.get("b") is None
+    assert backend.get("c") == b"c"
+
+    # A second connection (another worker) sees the same entries
+    assert SQLiteCacheBackend(tmp_path / "cache.sqlite3").get("a") == b"a"
+
+    assert backend.get_many(["c", "missing", "a", "c"]) == [b"c", None, b"a", b"c"]
+    assert backend.get_many([]) == []
+
+
+def test_memory_backend_and_urls(tmp_path):
+    backend = MemoryCacheBackend(max_entries=1)
+    backend.set("a", b"a")
+    backend.set("b", b"b")
+    assert backend.get("a") is None and backend.get("b") == b"b"
+
+    assert isinstance(create_cache_backend("memory://"), MemoryCacheBackend)
+    assert isinstance(create_cache_backend(f"sqlite:///{tmp_path}/c.sqlite3"), SQLiteCacheBackend)
+    with pytest.raises(ValueError):
+        create_cache_backend("ftp://cache")
+
+
+def test_repeat_product_skips_matching_and_llm(db):
+    cache = MatchCache(MemoryCacheBackend(), db.catalog_version)
+    verifier = RecordingVerifier()
+    cascade = MatchingCascade(EquipmentMatcher(db), verifier, cache=cache)
+    lighting = _line("LED verlichting armaturen", 6000.0, brand="Philips", model="CoreLine 400")
+
+    first = asyncio.run(cascade.analyze_quote(Quote(equipment=[lighting], subtotal=6000.0)))
+    repriced = lighting.model_copy(update={"total_price": 12000.0, "unit_price": 12000.0})
+    second = asyncio.run(cascade.analyze_quote(Quote(equipment=[repriced], subtotal=12000.0)))
+
+    assert first.tiers == second.tiers == [Tier.LLM]
+    assert len(verifier.calls) == 1
+    assert second.llm_calls == 0
+    # Amounts follow the new line price
+    eia = second.analysis.equipment_matches[0].eia_matches[0]
+    assert eia.investment_amount == pytest.approx(12000.0)
+    assert cache.metrics.as_dict()["hit_rate"] == pytest.approx(0.5)
+    assert cascade.metrics.as_dict()["resolved_without_llm"] == pytest.approx(0.5)
+
+
+def test_catalog_version_and_corrupt_entries(db):
+    backend = MemoryCacheBackend()
+    line = _line("Zonnepanelen", 12000.0)
+    MatchCache(backend, "v1").put(line, CachedResolution(tier="rules", confidence=0.9, eia_codes=["251115"]))
+
+    assert MatchCache(backend, "v1").get(line).eia_codes == ["251115"]
+    assert MatchCache(backend, "v2").get(line) is None
+    # New matching logic does not serve resolutions of the old one
+    assert MatchCache(backend, "v1", resolver_version="old").get(line) is None
+
+    cache = MatchCache(backend, "v1")
+    backend.set(cache.key(line), b"not json")
+    assert cache.get(line) is None
+    assert cache.metrics.errors == 1
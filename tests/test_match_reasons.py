@@ -0,0 +1,115 @@
+"""
+Tests for reason codes and lazy reason rendering.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.schemas import CompanyInfo, ProjectInfo, SubsidyMatchRequest
+from services.match_reasons import Reason, ReasonCode, render_reason, render_reasons
+from services.subsidy_matcher import SubsidyMatcher
+
+
+RULES = [
+    {
+        "id": "mkb-innovatie",
+        "name": "MKB Innovatie",
+        "description": "Innovatiesubsidie",
+        "category": "innovation",
+        "provider": "RVO",
+        "min_budget": 50000,
+        "eligible_company_sizes": ["small", "medium"],
+        "regions": ["Noord-Holland"],
+        "requirements": []
+    },
+    {
+        "id": "verduurzaming",
+        "name": "Verduurzaming",
+        "description": "Duurzame investeringen",
+        "category": "sustainability",
+        "provider": "RVO",
+        "eligible_company_sizes": ["micro", "small", "medium", "large"],
+        "requirements": []
+    },
+]
+
+
+@pytest.fixture
+def matcher(tmp_path) -> SubsidyMatcher:
+    (tmp_path / "rules.json").write_text(json.dumps(RULES), encoding="utf-8")
+    return SubsidyMatcher(api_key="test-key", subsidies_path=str(tmp_path))
+
+
+def _request(budget: float = 20_000.0) -> SubsidyMatchRequest:
+    return SubsidyMatchRequest(
+        company=CompanyInfo(name="Metaal BV", size="small", industry="manufacturing",
+                            employees=25, location="Utrecht"),
+        project=ProjectInfo(title="Warmtepomp", description="Nieuwe warmtepomp",
+                            category="sustainability", budget=budget, duration_months=6)
+    )
+
+
+def test_render_languages():
+    reason = Reason(ReasonCode.BUDGET_BELOW_MIN, (("min_budget", 12500.0),))
+
+    assert render_reason(reason, "en") == "Project budget must be at least €12,500.00"
+    assert render_reason(reason, "nl") == "Projectbudget moet minimaal €12.500,00 zijn"
+    with pytest.raises(ValueError):
+        render_reason(reason, "de")
+
+
+def test_render_splits_missing_requirements():
+    texts, missing = render_reasons([
+        Reason(ReasonCode.BUDGET_OK),
+        Reason(ReasonCode.REGION_NOT_ELIGIBLE, (("regions", ("Noord-Holland", "Utrecht")),)),
+    ])
+
+    assert texts == ["Project budget meets requirements"]
+    assert missing == ["Company must be located in: Noord-Holland, Utrecht"]
+
+
+def test_codes_only_skips_rendering(matcher):
+    response = matcher.match_subsidies_sync(_request(), include_near_misses=True, language=None)
+
+    for match in response.matches:
+        assert match.match_score.reasons == []
+        assert match.missing_requirements == []
+        assert match.reason_codes
+
+    rendered = matcher.match_subsidies_sync(_request(), include_near_misses=True)
+    for lazy, full in zip(response.matches, rendered.matches):
+        texts, missing = render_reasons(
+            [Reason(ReasonCode(r.code), tuple(r.params.items())) for r in lazy.reason_codes]
+        )
+        assert texts == full.match_score.reasons
+        assert missing == full.missing_requirements
+
+
+def test_explain(matcher):
+    match = matcher.explain(_request(), "mkb-innovatie", language="nl")
+
+    assert not match.eligible
+    assert "Projectbudget moet minimaal €50.000,00 zijn" in match.missing_requirements
+    assert "Bedrijf moet gevestigd zijn in: Noord-Holland" in match.missing_requirements
+    assert matcher.explain(_request(), "unknown") is None
+
+
+def test_explain_endpoint(matcher, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "get_subsidy_matcher", lambda: matcher)
+    client = TestClient(main.app)
+    body = _request().model_dump(mode="json")
+
+    response = client.post("/api/subsidies/verduurzaming/explain?language=en", json=body)
+    assert response.status_code == 200
+    assert "Company size (small) is eligible" in response.json()["match_score"]["reasons"]
+
+    assert client.post("/api/subsidies/unknown/explain", json=body).status_code == 404
+    assert client.post("/api/subsidies/verduurzaming/explain?language=de", json=body).status_code == 400
+
+    response = client.post("/api/subsidies/match?language=none", json=body)
+    assert response.status_code == 200
+    assert response.json()["matches"][0]["match_score"]["reasons"] == []
@@ -0,0 +1,115 @@
+"""
+Tests for the tiered matching cascade.
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from models.subsidy_schemas import Equipment, Quote, SubsidyCalculation
+from services.equipment_matcher import EquipmentMatcher
+from services.matching_cascade import (
+    CascadeConfig,
+    MatchingCascade,
+    Tier,
+    Verification,
+    parse_verification
+)
+
+
+class RecordingVerifier:
+    """Verifier double that confirms every candidate and records its calls"""
+
+    def __init__(self, confidence: float = 0.9, fail: bool = False):
+        self.confidence = confidence
+        self.fail = fail
+        self.calls: List[str] = []
+
+    async def verify(self, equipment: Equipment, candidates: List[SubsidyCalculation]) -> Verification:
+        self.calls.append(equipment.description)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return Verification(codes=[candidates[0].code], confidence=self.confidence, reason="past")
+
+
+@pytest.fixture(scope="module")
+def matcher(db) -> EquipmentMatcher:
+    return EquipmentMatcher(db)
+
+
+def _line(description: str, price: float, **specs) -> Equipment:
+    return Equipment(description=description, quantity=1, unit_price=price, total_price=price, specs=specs)
+
+
+def _quote_of(lines: List[Equipment]) -> Quote:
+    return Quote(equipment=lines, subtotal=sum(e.total_price for e in lines))
+
+
+def _quote(db) -> Quote:
+    heat_pump = db.get_all_isde_warmtepompen()[0]
+    return _quote_of([
+        _line("Warmtepomp", 9000.0, meldcode=heat_pump.meldcode),
+        _line("Lucht/water warmtepomp voor ruimteverwarming", 12000.0, scop=4.8, vermogen="12 kW"),
+        _line("Lucht/water warmtepomp voor ruimteverwarming", 15000.0),
+        _line("LED verlichting armaturen", 6000.0),
+        _line("Koffiezetapparaat", 300.0),
+    ])
+
+
+def test_deterministic_tiers_without_verifier(db, matcher):
+    cascade = MatchingCascade(matcher)
+
+    result = asyncio.run(cascade.analyze_quote(_quote(db)))
+
+    assert result.tiers == [Tier.EXACT, Tier.RULES, Tier.UNRESOLVED, Tier.UNRESOLVED, Tier.UNMATCHED]
+    assert result.llm_calls == 0
+    assert [m.resolved_by for m in result.analysis.equipment_matches] == [t.value for t in result.tiers]
+    metrics = cascade.metrics.as_dict()
+    assert metrics["resolved_without_llm"] == pytest.approx(0.6)
+    assert metrics["hit_rates"]["unresolved"] == pytest.approx(0.4)
+
+
+def test_budget_spent_on_largest_subsidy_first(db, matcher):
+    verifier = RecordingVerifier()
+    cascade = MatchingCascade(matcher, verifier, CascadeConfig(llm_budget=1))
+
+    result = asyncio.run(cascade.analyze_quote(_quote(db)))
+
+    # The heat pump line has more EIA at stake than the lighting line
+    assert verifier.calls == ["Lucht/water warmtepomp voor ruimteverwarming"]
+    assert result.tiers[2:4] == [Tier.LLM, Tier.UNRESOLVED]
+    assert result.llm_calls == 1
+    assert result.analysis.equipment_matches[2].confidence == pytest.approx(0.9)
+
+
+def test_identical_lines_share_one_call(db, matcher):
+    verifier = RecordingVerifier()
+    cascade = MatchingCascade(matcher, verifier)
+    quote = _quote_of([_line("LED verlichting armaturen", 6000.0)] * 4)
+
+    result = asyncio.run(cascade.analyze_quote(quote))
+
+    assert len(verifier.calls) == 1
+    assert result.tiers == [Tier.LLM] * 4
+
+
+@pytest.mark.parametrize("verifier", [RecordingVerifier(confidence=0.4), RecordingVerifier(fail=True)])
+def test_low_confidence_or_failed_verdict_stays_unresolved(db, matcher, verifier):
+    cascade = MatchingCascade(matcher, verifier)
+    quote = _quote_of([_line("LED verlichting armaturen", 6000.0)])
+
+    result = asyncio.run(cascade.analyze_quote(quote))
+
+    assert result.tiers == [Tier.UNRESOLVED]
+    assert "Ambiguous match, needs manual review" in result.analysis.equipment_matches[0].match_notes
+
+
+def test_parse_verification():
+    verification = parse_verification(
+        'Oordeel:\n{"codes": ["211104"], "confidence": 1.4, "reason": "lucht/water"}'
+    )
+
+    assert verification == Verification(codes=["211104"], confidence=1.0, reason="lucht/water")
+    with pytest.raises(ValueError):
+        parse_verification("geen oordeel")
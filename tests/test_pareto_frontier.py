@@ -0,0 +1,86 @@
+"""
+Tests for ISDE Pareto frontiers.
+"""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from services.catalog_snapshot import CatalogSnapshot
+from services.pareto_frontier import ParetoFrontiers, group_key, pareto_mask
+
+
+@pytest.fixture(scope="module")
+def frontiers(db) -> ParetoFrontiers:
+    return ParetoFrontiers.build_from_database(db)
+
+
+def test_pareto_mask():
+    values = np.array([
+        [1.0, 5.0],
+        [2.0, 2.0],
+        [3.0, 3.0],  # dominated by [2, 2]
+        [2.0, 2.0],  # duplicate of an optimal row
+        [5.0, 1.0],
+    ])
+
+    assert pareto_mask(values).tolist() == [True, True, False, True, True]
+
+
+def test_heat_pump_frontier_is_not_dominated(db, frontiers):
+    entry = db.get_all_isde_warmtepompen()[0]
+    frontier = frontiers.frontier(entry)
+    group = [e for e in db.get_all_isde_warmtepompen() if group_key(e) == group_key(entry)]
+
+    assert 0 < len(frontier) < len(group)
+    for optimal in frontier:
+        for other in group:
+            no_worse = (other.amount_eur >= optimal.amount_eur
+                        and other.attributes["power_kw"] <= optimal.attributes["power_kw"]
+                        and other.attributes["gwp"] <= optimal.attributes["gwp"])
+            better = (other.amount_eur > optimal.amount_eur
+                      or other.attributes["power_kw"] < optimal.attributes["power_kw"]
+                      or other.attributes["gwp"] < optimal.attributes["gwp"])
+            assert not (no_worse and better)
+
+
+def test_near_returns_sorted_segment(db, frontiers):
+    entry = db.get_all_isde_warmtepompen()[100]
+
+    segment = frontiers.near(entry, size=5)
+
+    assert len(segment) == 5
+    powers = [e.attributes["power_kw"] for e in segment]
+    assert powers == sorted(powers)
+    assert all(group_key(e) == group_key(entry) for e in segment)
+    full = [e.attributes["power_kw"] for e in frontiers.frontier(entry)]
+    # The segment brackets the product's power unless it sits at an end of the frontier
+    power = entry.attributes["power_kw"]
+    assert powers[0] <= power <= powers[-1] or power < full[0] or power > full[-1]
+
+
+def test_snapshot_round_trip(db, frontiers, tmp_path):
+    snapshot = CatalogSnapshot(db.catalog_version)
+    frontiers.to_snapshot(snapshot)
+    snapshot.save(tmp_path / "snapshot.npz")
+
+    loaded = ParetoFrontiers.from_snapshot(
+        CatalogSnapshot.load(tmp_path / "snapshot.npz", db.catalog_version), db
+    )
+
+    assert loaded is not None
+    assert {g: [e.meldcode for e in es] for g, es in loaded.frontiers.items()} == \
+        {g: [e.meldcode for e in es] for g, es in frontiers.frontiers.items()}
+
+
+def test_frontier_endpoint(db):
+    import main
+
+    client = TestClient(main.app)
+    meldcode = db.get_all_isde_warmtepompen()[0].meldcode
+
+    data = client.get(f"/api/isde/{meldcode}/frontier?size=3").json()
+    assert data["meldcode"] == meldcode
+    assert len(data["frontier"]) == 3
+
+    assert client.get("/api/isde/NOPE/frontier").status_code == 404
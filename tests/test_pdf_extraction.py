@@ -0,0 +1,121 @@
+"""
+Tests for page-parallel PDF extraction.
+"""
+
+import asyncio
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.pdf_extraction import PdfExtractor
+
+
+def _pdf(pages) -> bytes:
+    """Minimal PDF with one line of Helvetica text per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+class FakeUpload:
+    """Object with an async read(size), like FastAPI's UploadFile"""
+
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+        self.reads = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads += 1
+        return self.stream.read(size)
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    extractor = PdfExtractor(max_workers=2, page_timeout=20.0, max_pages=3)
+    yield extractor
+    extractor.shutdown()
+
+
+def test_extract_pages_with_timings(extractor):
+    pdf = _pdf([f"Warmtepomp regel {i}" for i in range(1, 6)])
+
+    extraction = extractor.extract(pdf)
+
+    assert extraction.page_count == 5
+    assert extraction.truncated
+    assert [page.number for page in extraction.pages] == [1, 2, 3]
+    assert "Warmtepomp regel 2" in extraction.pages[1].text
+    assert all(page.seconds > 0 and page.error is None for page in extraction.pages)
+    assert "=== PAGE 3 ===" in extraction.text
+
+
+def test_async_extraction_streams_and_does_not_block(extractor):
+    upload = FakeUpload(_pdf(["Offerte", "HR++ glas 20 m2"]))
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        extraction = await extractor.extract_async(upload)
+        task.cancel()
+        return extraction, ticks
+
+    extraction, ticks = asyncio.run(run())
+
+    assert "HR++ glas 20 m2" in extraction.text
+    assert upload.reads >= 2  # Read in chunks until exhausted
+    assert ticks > 1
+
+
+def test_invalid_pdf(extractor):
+    with pytest.raises(ValueError):
+        extractor.extract(b"not a pdf")
+
+
+def test_extract_endpoint(extractor, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "get_pdf_extractor", lambda: extractor)
+    client = TestClient(main.app)
+
+    response = client.post(
+        "/api/documents/text",
+        files={"file": ("offerte.pdf", _pdf(["Zonnepanelen 30 stuks"]), "application/pdf")}
+    )
+
+    data = response.json()
+    assert data["page_count"] == 1
+    assert "Zonnepanelen 30 stuks" in data["pages"][0]["text"]
+    assert client.post(
+        "/api/documents/text", files={"file": ("x.pdf", b"nope", "application/pdf")}
+    ).status_code == 400
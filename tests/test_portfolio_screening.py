@@ -0,0 +1,91 @@
+"""
+Tests for bulk portfolio screening.
+"""
+
+import csv
+import io
+import json
+
+from models.schemas import SubsidyRule
+from services.portfolio_screening import PortfolioScreener, read_requests
+
+
+RULES = [
+    SubsidyRule(
+        id="mit", name="MIT", description="Innovatie", category="innovation",
+        provider="RVO", eligible_company_sizes=["micro", "small", "medium"],
+        requirements=[]
+    ),
+    SubsidyRule(
+        id="groen-nh", name="Groen NH", description="Verduurzaming",
+        category="sustainability", provider="Provincie Noord-Holland",
+        min_budget=10_000, eligible_company_sizes=["small", "medium"],
+        regions=["Noord-Holland"], requirements=[]
+    ),
+]
+
+
+def _request(name: str, budget: float) -> dict:
+    return {
+        "company": {
+            "name": name, "size": "small", "industry": "manufacturing",
+            "employees": 12, "location": "Haarlem, Noord-Holland"
+        },
+        "project": {
+            "title": "Warmtepomp", "description": "Nieuwe warmtepomp",
+            "category": "sustainability", "budget": budget, "duration_months": 3
+        }
+    }
+
+
+def test_screen_jsonl_in_process(tmp_path):
+    """Results keep input order, invalid lines are reported and counted"""
+    path = tmp_path / "requests.jsonl"
+    lines = [json.dumps(_request(f"Klant {i}", 20_000 + i)) for i in range(25)]
+    lines.insert(3, '{"company": {}}')
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    screener = PortfolioScreener(RULES, workers=1, chunk_size=4, limit=1)
+    output = io.StringIO()
+    stats = screener.screen_file(path, output)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert stats.processed == 26
+    assert stats.failed == 1
+    assert [r["line"] for r in results] == list(range(1, 27))
+    assert "error" in results[3]
+    assert results[0]["matches"][0]["subsidy"]["id"] == "groen-nh"
+    assert len(results[0]["matches"]) == 1
+
+
+def test_screen_csv_with_process_pool(tmp_path):
+    """CSV rows with dotted headers are screened across worker processes"""
+    path = tmp_path / "requests.csv"
+    fields = [
+        "company.name", "company.size", "company.industry", "company.employees",
+        "company.location", "project.title", "project.description",
+        "project.category", "project.budget", "project.duration_months"
+    ]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for i in range(10):
+            writer.writerow([
+                f"Klant {i}", "small", "manufacturing", "12", "Haarlem, Noord-Holland",
+                "Warmtepomp", "Nieuwe warmtepomp", "sustainability", "5000", "3"
+            ])
+
+    progress = []
+    screener = PortfolioScreener(
+        RULES, workers=2, chunk_size=3, include_near_misses=True,
+        progress_every=5, on_progress=progress.append
+    )
+    results = [json.loads(line) for line in screener.screen(read_requests(path))]
+
+    assert len(results) == 10
+    assert screener.stats.failed == 0
+    assert [r["line"] for r in results] == list(range(2, 12))
+    # Budget below min_budget: regional rule is only listed as a near miss
+    groen = next(m for m in results[0]["matches"] if m["subsidy"]["id"] == "groen-nh")
+    assert groen["eligible"] is False
+    assert progress
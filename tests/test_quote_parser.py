@@ -0,0 +1,238 @@
+"""
+Tests for rule-based quote parsing and the LLM fallback for uncertain rows.
+"""
+
+import asyncio
+import io
+
+import pytest
+
+from models.subsidy_schemas import Equipment, Quote
+from services.cache_backends import MemoryCacheBackend
+from services.document_processor import EXTRACTION_VERSION, DocumentProcessor
+from services.extraction_cache import ExtractionCache
+from services.pdf_extraction import PdfExtractor
+from services.quote_parser import QuoteParser, parse_amount, parse_quantity
+from services.supplier_templates import SupplierTemplates
+
+
+QUOTE_TEXT = """Installatiebedrijf Jansen B.V.
+Offertenummer: OFF-2025-117                     Datum: 12-03-2025
+
+Aantal   Omschrijving                                   Prijs          Totaal
+1        Daikin Altherma 3 H HT warmtepomp 8 kW     € 8.950,00     € 8.950,00
+         SCOP 4,8 lucht/water
+2 st     Radiator Henrad 600x1200                   €   450,00     €   900,00
+80 m2    Gevelisolatie PIR Rd 4,5                   €    45,00     € 3.600,00
+1        Montage en installatie                     € 1.200,00     € 1.200,00
+1        Korting                                                   €  -250,00
+
+                                   Subtotaal                      € 14.400,00
+                                   BTW 21%                        €  3.024,00
+                                   Totaal incl. BTW               € 17.424,00
+"""
+
+HEADER = [(50, "Aantal"), (100, "Omschrijving"), (400, "Prijs"), (480, "Totaal")]
+
+
+def _layout_pdf(rows) -> bytes:
+    """One-page PDF with each row's cells at the given x positions"""
+    parts = []
+    for number, cells in enumerate(rows):
+        for x, text in cells:
+            escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            parts.append(f"BT /F1 9 Tf {x} {760 - 14 * number} Td ({escaped}) Tj ET")
+    stream = "\n".join(parts).encode("cp1252")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [5 0 R] /Count 1 >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+        b"/Contents 4 0 R >>",
+    ]
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+def _quote_pdf(rows, subtotal: str, vat: str, total: str) -> bytes:
+    return _layout_pdf([
+        [(50, "Offertenummer: OFF-2025-117")],
+        [],
+        HEADER,
+        *rows,
+        [(300, "Subtotaal"), (480, subtotal)],
+        [(300, "BTW 21%"), (480, vat)],
+        [(300, "Totaal incl. BTW"), (480, total)],
+    ])
+
+
+class LineCountingProcessor(DocumentProcessor):
+    """DocumentProcessor with canned LLM answers that records what was sent"""
+
+    def __init__(self, extractor: PdfExtractor):
+        cache = ExtractionCache(MemoryCacheBackend(), EXTRACTION_VERSION, "test-model")
+        super().__init__(
+            api_key="test", extractor=extractor, cache=cache, model="test-model",
+            templates=SupplierTemplates(MemoryCacheBackend())
+        )
+        self.full_calls = 0
+        self.sent_rows = []
+
+    async def _extract_quote_with_llm(self, document_text: str, tenant=None) -> Quote:
+        self.full_calls += 1
+        return Quote(equipment=[], subtotal=0.0)
+
+    async def _extract_lines_with_llm(self, lines, tenant=None):
+        self.sent_rows.extend(line.text for line in lines.values())
+        return {
+            number: [Equipment(description="Omvormer SolarEdge", quantity=1, unit_price=1250.0,
+                               total_price=1250.0, line_number=number)]
+            for number in lines
+        }
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    extractor = PdfExtractor(max_workers=1, page_timeout=20.0)
+    yield extractor
+    extractor.shutdown()
+
+
+def test_parse_dutch_amounts_and_quantities():
+    assert parse_amount("€ 1.234,56") == 1234.56
+    assert parse_amount("1.234,-") == 1234.0
+    assert parse_amount("€ -250,00") == -250.0
+    assert parse_amount("12.50") == 12.5
+    assert parse_amount("600x1200") is None
+    assert parse_quantity("80 m2") == (80.0, "m2")
+    assert parse_quantity("2 st") == (2.0, "st")
+    assert parse_quantity("8 kW") is None
+
+
+def test_parse_text_reads_rows_totals_and_metadata():
+    parsed = QuoteParser().parse_text(QUOTE_TEXT)
+
+    assert [line.kind for line in parsed.lines] == ["equipment", "equipment", "equipment", "labour", "discount"]
+    assert (parsed.subtotal, parsed.vat_amount, parsed.vat_rate, parsed.total_including_vat) == (
+        14400.0, 3024.0, 21.0, 17424.0
+    )
+    assert parsed.quote_number == "OFF-2025-117"
+    assert parsed.date.year == 2025 and parsed.date.month == 3
+    assert parsed.totals_consistent
+    assert parsed.low_confidence() == []
+
+    heat_pump, radiators, insulation = parsed.equipment_lines
+    assert heat_pump.specs == {"power_kw": 8.0, "scop": 4.8}
+    assert (radiators.quantity, radiators.unit_price, radiators.total) == (2, 450.0, 900.0)
+
+    equipment = insulation.to_equipment(3)
+    assert (equipment.quantity, equipment.total_price) == (1, 3600.0)
+    assert equipment.specs == {"rd": 4.5, "area_m2": 80.0}
+
+
+def test_item_rows_mentioning_vat_are_not_totals():
+    parsed = QuoteParser().parse_text(
+        "Aantal   Omschrijving                          Prijs          Totaal\n"
+        "1        Warmtepomp Daikin 8 kW excl. btw   € 4.500,00     € 4.500,00\n"
+        "2        Radiator Henrad 600x1200           €   450,00     €   900,00\n"
+        "                          Subtotaal                        € 5.400,00\n"
+        "                          BTW 21%                          € 1.134,00\n"
+        "                          Totaal incl. BTW                 € 6.534,00\n"
+    )
+
+    assert [line.total for line in parsed.lines] == [4500.0, 900.0]
+    assert (parsed.subtotal, parsed.vat_amount, parsed.total_including_vat) == (5400.0, 1134.0, 6534.0)
+    assert parsed.totals_consistent
+
+
+def test_rows_without_header_are_less_certain():
+    parsed = QuoteParser().parse_text(
+        "Zonnepanelen 30 stuks 400 Wp 12.000,00\n"
+        "Subtotaal 12.000,00\n"
+    )
+
+    assert parsed.usable and parsed.totals_consistent
+    assert not parsed.header_found
+    assert parsed.low_confidence() == parsed.equipment_lines
+
+
+def test_confident_quote_makes_no_api_calls(extractor):
+    processor = LineCountingProcessor(extractor)
+    pdf = _quote_pdf(
+        [
+            [(50, "1"), (100, "Daikin Altherma 3 H HT warmtepomp 8 kW"), (400, "€ 8.950,00"), (480, "€ 8.950,00")],
+            [(50, "2"), (100, "Radiator Henrad 600x1200"), (400, "€ 450,00"), (480, "€ 900,00")],
+            [(50, "1"), (100, "Montage en installatie"), (400, "€ 1.200,00"), (480, "€ 1.200,00")],
+        ],
+        "€ 11.050,00", "€ 2.320,50", "€ 13.370,50"
+    )
+
+    extraction = asyncio.run(processor.extract_quote(pdf))
+
+    assert (extraction.api_calls_made, extraction.parsed_lines, extraction.llm_lines) == (0, 2, 0)
+    assert [e.total_price for e in extraction.quote.equipment] == [8950.0, 900.0]
+    assert extraction.quote.subtotal == 11050.0
+    assert processor.full_calls == 0 and processor.sent_rows == []
+
+
+def test_only_uncertain_rows_go_to_the_llm(extractor):
+    processor = LineCountingProcessor(extractor)
+    pdf = _quote_pdf(
+        [
+            [(50, "1"), (100, "Daikin Altherma 3 H HT warmtepomp 8 kW"), (400, "€ 8.950,00"), (480, "€ 8.950,00")],
+            [(50, "3"), (100, "Omvormer"), (480, "€ 1.250,00")],
+        ],
+        "€ 10.200,00", "€ 2.142,00", "€ 12.342,00"
+    )
+
+    extraction = asyncio.run(processor.extract_quote(pdf))
+
+    assert processor.sent_rows == ["3 Omvormer € 1.250,00"]
+    assert (extraction.api_calls_made, extraction.parsed_lines, extraction.llm_lines) == (1, 1, 1)
+    assert [e.description for e in extraction.quote.equipment] == [
+        "Daikin Altherma 3 H HT warmtepomp 8 kW", "Omvormer SolarEdge"
+    ]
+    assert processor.full_calls == 0
+
+
+def test_totals_that_do_not_add_up_use_the_full_llm(extractor):
+    processor = LineCountingProcessor(extractor)
+    pdf = _quote_pdf(
+        [[(50, "1"), (100, "Daikin Altherma 3 H HT warmtepomp 8 kW"), (400, "€ 8.950,00"), (480, "€ 8.950,00")]],
+        "€ 10.200,00", "€ 2.142,00", "€ 12.342,00"
+    )
+
+    extraction = asyncio.run(processor.extract_quote(pdf))
+
+    assert extraction.api_calls_made == 1
+    assert processor.full_calls == 1 and processor.sent_rows == []
+
+
+def test_uncertain_rows_that_do_not_close_the_gap_use_the_full_llm(extractor):
+    processor = LineCountingProcessor(extractor)
+    pdf = _quote_pdf(
+        [
+            [(50, "1"), (100, "Daikin Altherma 3 H HT warmtepomp 8 kW"), (400, "€ 8.950,00"), (480, "€ 8.950,00")],
+            [(50, "3"), (100, "Omvormer"), (480, "€ 1.250,00")],
+            # Missed by the parser: no readable amount
+            [(50, "1"), (100, "Zonneboiler Atag 200 liter"), (480, "zie bijlage")],
+        ],
+        "€ 12.200,00", "€ 2.562,00", "€ 14.762,00"
+    )
+
+    extraction = asyncio.run(processor.extract_quote(pdf))
+
+    assert len(processor.sent_rows) == 1
+    assert processor.full_calls == 1
+    assert extraction.api_calls_made == 2
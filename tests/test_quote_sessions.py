@@ -0,0 +1,156 @@
+"""
+Tests for incremental quote re-analysis.
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.subsidy_schemas import Equipment, ISDECategory, Quote
+from services.equipment_matcher import EquipmentMatcher
+from services.quote_sessions import QuoteSessions
+
+
+@pytest.fixture(scope="module")
+def sessions(db) -> QuoteSessions:
+    return QuoteSessions(EquipmentMatcher(db))
+
+
+def _line(description: str, price: float, quantity: int = 1, **kwargs) -> Equipment:
+    return Equipment(
+        description=description, quantity=quantity,
+        unit_price=price / quantity, total_price=price, **kwargs
+    )
+
+
+def _quote(db) -> Quote:
+    heat_pump = db.get_all_isde_warmtepompen()[0]
+    insulation = db.get_isde_by_category(ISDECategory.ISOLATIE)[0]
+    lines = [
+        _line("Warmtepomp", 9000.0, brand=heat_pump.manufacturer,
+              model=heat_pump.model, category="warmtepomp"),
+        _line("Gevelisolatie", 6000.0, specs={"meldcode": insulation.meldcode, "area_m2": 80}),
+        _line("LED verlichting armaturen", 6000.0, quantity=40),
+        _line("Elektrische bestelauto", 30000.0),
+    ]
+    return Quote(equipment=lines, subtotal=sum(e.total_price for e in lines) + 1500.0)
+
+
+def _totals(analysis):
+    return (
+        analysis.total_subsidies, analysis.eia_total, analysis.isde_total,
+        analysis.mia_total, analysis.vamil_total, analysis.total_investment
+    )
+
+
+def test_update_matches_full_reanalysis(db, sessions):
+    session = sessions.analyze(_quote(db))
+    edited = _line("Zonnepanelen", 12000.0, quantity=30)
+
+    analysis = sessions.update_line(session.session_id, 2, edited)
+
+    expected = sessions.matcher.analyze_quote_sync(session.quote)
+    assert _totals(analysis) == pytest.approx(_totals(expected))
+    assert analysis.equipment_matches[2].equipment.description == "Zonnepanelen"
+    # Labour stays in the subtotal
+    assert analysis.total_investment == pytest.approx(9000 + 6000 + 12000 + 30000 + 1500)
+
+
+def test_update_without_subtotal_totals_the_lines(db, sessions):
+    quote = _quote(db).model_copy(update={"subtotal": 0.0})
+    session = sessions.analyze(quote)
+
+    analysis = sessions.update_line(session.session_id, 2, _line("Zonnepanelen", 12000.0, quantity=30))
+
+    assert analysis.total_investment == pytest.approx(9000 + 6000 + 12000 + 30000)
+
+
+def test_removing_isde_measure_drops_multi_measure_rate(db, sessions):
+    insulation = db.get_isde_by_category(ISDECategory.ISOLATIE)[0]
+    session = sessions.analyze(_quote(db))
+    insulation_calc = session.analysis.equipment_matches[1].best_combination[0]
+    assert insulation_calc.subsidy_amount == pytest.approx(insulation.amounts["meerdere"] * 80)
+
+    # Heat pump replaced by a product without ISDE: insulation is the only measure left
+    analysis = sessions.update_line(session.session_id, 0, _line("Elektrische bestelauto", 9000.0))
+
+    insulation_calc = analysis.equipment_matches[1].best_combination[0]
+    assert insulation_calc.subsidy_amount == pytest.approx(insulation.amounts["enkel"] * 80)
+    expected = sessions.matcher.analyze_quote_sync(session.quote)
+    assert _totals(analysis) == pytest.approx(_totals(expected))
+
+
+def test_update_is_fast_for_cached_lines(db, sessions):
+    quote = _quote(db)
+    quote = quote.model_copy(update={"equipment": quote.equipment * 12})
+    session = sessions.analyze(quote)
+    original = quote.equipment[3]
+    edited = _line("Elektrische bestelauto", 45000.0)
+    sessions.update_line(session.session_id, 3, edited)
+
+    started = time.perf_counter()
+    sessions.update_line(session.session_id, 3, original)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.02
+
+
+def test_unknown_session_and_line(db, sessions):
+    session = sessions.analyze(_quote(db))
+    with pytest.raises(KeyError):
+        sessions.update_line("missing", 0, _line("x", 1.0))
+    with pytest.raises(IndexError):
+        sessions.update_line(session.session_id, 10, _line("x", 1.0))
+
+
+def test_patch_endpoint(db, sessions, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "get_quote_sessions", lambda: sessions)
+    client = TestClient(main.app)
+
+    response = client.post("/api/quotes/analysis", json=_quote(db).model_dump(mode="json"))
+    assert response.status_code == 200
+    analysis_id = response.json()["analysis_id"]
+
+    response = client.patch(
+        f"/api/quotes/analysis/{analysis_id}/lines/2",
+        json=_line("Zonnepanelen", 12000.0, quantity=30).model_dump(mode="json")
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"]
+    assert data["analysis"]["equipment_matches"][2]["equipment"]["description"] == "Zonnepanelen"
+
+    response = client.patch("/api/quotes/analysis/missing/lines/0",
+                            json=_line("x", 1.0).model_dump(mode="json"))
+    assert response.status_code == 404
+
+
+def test_patch_endpoint_keeps_post_processing(db, sessions, monkeypatch):
+    import main
+    from services.arbitrage_engine import ArbitrageEngine
+
+    monkeypatch.setattr(main, "get_quote_sessions", lambda: sessions)
+    monkeypatch.setattr(main, "get_arbitrage_engine", lambda: ArbitrageEngine(db))
+    client = TestClient(main.app)
+    quote = _quote(db)
+    heat_pump = db.get_all_isde_warmtepompen()[1]
+    quote.equipment[2] = _line("Warmtepomp", 9000.0, specs={"meldcode": heat_pump.meldcode})
+
+    posted = client.post("/api/quotes/analysis", json=quote.model_dump(mode="json")).json()
+    assert posted["analysis"]["arbitrage_opportunities"]
+
+    url = f"/api/quotes/analysis/{posted['analysis_id']}/lines/3"
+    # Replacing a line with itself must give the POST response back
+    data = client.patch(url, json=quote.equipment[3].model_dump(mode="json")).json()
+    for key in ("arbitrage_opportunities", "threshold_alerts"):
+        assert data["analysis"][key] == posted["analysis"][key]
+
+    data = client.patch(
+        f"{url}?include_arbitrage=false&include_thresholds=false",
+        json=quote.equipment[3].model_dump(mode="json")
+    ).json()
+    assert data["analysis"]["arbitrage_opportunities"] == []
+    assert data["analysis"]["threshold_alerts"] == []
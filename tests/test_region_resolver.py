@@ -0,0 +1,67 @@
+"""
+Tests for gazetteer-based region resolution.
+"""
+
+import pytest
+
+from services.region_resolver import get_region_resolver
+
+
+@pytest.mark.parametrize("location, municipality, province", [
+    ("Haarlem", "haarlem", "noord holland"),
+    ("1012 AB Amsterdam", "amsterdam", "noord holland"),
+    ("Industrieweg 4, 5651GH", "eindhoven", "noord brabant"),
+    ("Den Bosch", "'s hertogenbosch", "noord brabant"),
+    ("Capelle aan den IJssel", "capelle aan den ijssel", "zuid holland"),
+    ("Fryslân", None, "friesland"),
+    ("7711 AB Nieuwleusen", None, "overijssel"),
+])
+def test_resolve_location(location, municipality, province):
+    resolved = get_region_resolver().resolve(location)
+
+    assert resolved.municipality == municipality
+    assert resolved.province == province
+    assert "country:nederland" in resolved.regions
+
+
+def test_in_region_uses_hierarchy_and_aliases():
+    resolver = get_region_resolver()
+    resolved = resolver.resolve("2011 VA Haarlem")
+
+    assert resolver.in_region(resolved, "Noord-Holland")
+    assert resolver.in_region(resolved, "NH")
+    assert resolver.in_region(resolved, "Nederland")
+    assert not resolver.in_region(resolved, "Zuid-Holland")
+    assert not resolver.in_region(resolved, "Amsterdam")
+
+
+def test_unknown_region_falls_back_to_substring():
+    resolver = get_region_resolver()
+
+    assert resolver.in_region(resolver.resolve("Bedrijventerrein Randstad Oost"), "Randstad")
+    assert not resolver.in_region(resolver.resolve("Maastricht"), "Randstad")
+
+
+def test_names_on_two_levels_keep_both_entries():
+    resolver = get_region_resolver()
+
+    city = resolver.resolve("Utrecht")
+    assert (city.municipality, city.province) == ("utrecht", "utrecht")
+    amersfoort = resolver.resolve("Amersfoort, Utrecht")
+    assert (amersfoort.municipality, amersfoort.province) == ("amersfoort", "utrecht")
+
+    # The rule's level decides; a bare name means the province
+    assert resolver.in_region(city, "Gemeente Utrecht")
+    assert not resolver.in_region(amersfoort, "Gemeente Utrecht")
+    assert resolver.in_region(amersfoort, "Utrecht")
+    assert resolver.in_region(amersfoort, "Provincie Utrecht")
+
+
+@pytest.mark.parametrize("location, municipality", [
+    ("Hoofdstraat 2011, Utrecht", "utrecht"),
+    ("2011 Haarlem", "haarlem"),
+    ("2011", "haarlem"),
+    ("Hoofdstraat 2011", None),
+])
+def test_bare_pc4_needs_a_place_name_or_to_stand_alone(location, municipality):
+    assert get_region_resolver().resolve(location).municipality == municipality
@@ -0,0 +1,111 @@
+"""
+Tests for technical requirement predicates.
+"""
+
+import pytest
+
+from models.subsidy_schemas import Equipment
+from services.equipment_matcher import EquipmentMatcher
+from services.requirement_predicates import (
+    check_requirements,
+    normalize_specs,
+    parse_requirements
+)
+
+
+def test_parse_symbols_words_and_units():
+    predicates = parse_requirements(
+        "lucht/water warmtepomp met een vermogen van ≤70kW met een SCOP ≥ 4,6, "
+        "een thermisch rendement (η) van minimaal 83% en een "
+        "warmtedoorlatingscoëfficiënt (U) van maximaal 0,7 W/m2 K"
+    )
+
+    assert [(p.attribute, p.operator, p.threshold) for p in predicates] == [
+        ("power", "<=", 70.0),
+        ("scop", ">=", 4.6),
+        ("efficiency", ">=", 83.0),
+        ("u_value", "<=", pytest.approx(0.7)),
+    ]
+
+
+def test_conditions_and_components_are_not_checked():
+    predicates = parse_requirements(
+        "de volgende COP-eis geldt: - COP ≥ 4,0 bij dT tot +40 °C, "
+        "- COP ≥ 1,5 bij dT ≥ 80 °C. Koelinstallatie met een koelvermogen < 100 kW "
+        "en een vermogen van de condensor van maximaal 21 W"
+    )
+
+    assert [p.describe() for p in predicates] == [
+        "cop >= 4", "cop >= 1.5", "cooling_power < 100 kW", "power <= 0.021 kW"
+    ]
+    assert [p.conditional for p in predicates] == [True, True, False, True]
+    # The test condition "dT ≥ 80 °C" is not a requirement of its own
+    assert all(p.attribute != "temperature" for p in predicates)
+
+
+def test_specs_are_normalised_to_canonical_units():
+    specs = normalize_specs({
+        "vermogen": "12.000 W", "SCOP": "4,8", "capacity_kwh": 30,
+        "efficiency_pct": 85, "brand_name": "Daikin"
+    })
+
+    assert specs == {
+        "power": (12.0, "power"),
+        "scop": (4.8, None),
+        "capacity": (30.0, "energy"),
+        "efficiency": (85.0, "percent"),
+    }
+
+
+def test_check_outcomes():
+    predicates = parse_requirements("vermogen van ≤70kW met SCOP ≥ 4,6")
+
+    assert check_requirements(predicates, {"power_kw": 12, "scop": 4.6}).status == "pass"
+    assert check_requirements(predicates, {"power_w": 90000, "scop": 5}).status == "fail"
+    check = check_requirements(predicates, {"scop": 4.8})
+    assert check.status == "unknown"
+    assert [p.attribute for p in check.unknown] == ["power"]
+    assert check_requirements([], {"scop": 4.8}).status == "none"
+
+
+def test_catalog_predicates_filter_candidates(db):
+    assert [p.describe() for p in db.get_eia_requirements("211104")] == [
+        "power <= 70 kW", "scop >= 4.6"
+    ]
+
+    matcher = EquipmentMatcher(db)
+
+    def match(specs):
+        return matcher.match_equipment(Equipment(
+            description="Lucht/water warmtepomp voor ruimteverwarming",
+            quantity=1, unit_price=12000.0, total_price=12000.0, specs=specs
+        ))
+
+    unverified = match({})
+    verified = match({"scop": "4,8", "vermogen": "12 kW"})
+    rejected = match({"scop": 4.1})
+
+    assert "211104" in [c.code for c in verified.eia_matches]
+    assert not verified.eia_matches[0].warnings
+    assert "Requirement not verified: scop >= 4.6" in unverified.eia_matches[0].warnings
+    assert "211104" not in [c.code for c in rejected.eia_matches]
+    assert "EIA code 211104 rejected: requires scop >= 4.6" in rejected.match_notes
+
+
+def test_sub_clauses_are_alternatives(db):
+    predicates = parse_requirements(
+        "a. Bestemd voor: opslag met een temperatuur van ten minste 30 °C. "
+        "b. Bestemd voor: opslag met een temperatuur van ten minste 400 °C."
+    )
+
+    assert [p.alternative for p in predicates] == ["a", "b"]
+    assert check_requirements(predicates, {"temperature": "60 °C"}).status == "pass"
+    assert check_requirements(predicates, {"temperature": "20 °C"}).status == "fail"
+    # Clause c. has no checkable requirement, so a and b can never reject the code
+    assert check_requirements(db.get_eia_requirements("251300"), {"temperature": "30 °C"}).status == "unknown"
+
+
+def test_range_bounds_and_duplicate_entries(db):
+    assert [p.describe() for p in db.get_mia_requirements("A 4316")] == ["power >= 2 kVA", "power <= 30 kVA"]
+    assert check_requirements(db.get_mia_requirements("A 4316"), {"power_kw": 50}).status == "unknown"
+    assert [p.describe() for p in db.get_eia_requirements("220227")] == ["cooling_power <= 50 kW"]
@@ -0,0 +1,99 @@
+"""
+Tests for batch what-if scenario evaluation.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.subsidy_schemas import LineDelta, QuoteScenario
+from services.equipment_matcher import EquipmentMatcher
+from services.quote_sessions import QuoteSessions
+from services.scenario_evaluator import ScenarioEvaluator, apply_scenario
+from tests.test_quote_sessions import _line, _quote
+
+
+class CountingMatcher(EquipmentMatcher):
+    """Matcher that records which lines were matched"""
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.matched = []
+
+    def match_equipment(self, equipment):
+        self.matched.append(equipment.description)
+        return super().match_equipment(equipment)
+
+
+def _scenarios(db):
+    glass = _line("HR+++ glas", 4000.0, specs={"area_m2": 20}, category="glas")
+    return [
+        QuoteScenario(name="double heat pumps", deltas=[
+            LineDelta(action="replace", line=0, equipment=_quote(db).equipment[0].model_copy(
+                update={"quantity": 2, "total_price": 18000.0}
+            ))
+        ]),
+        QuoteScenario(name="add glass", deltas=[LineDelta(action="add", equipment=glass)]),
+        QuoteScenario(name="no van", deltas=[LineDelta(action="remove", line=3)]),
+        QuoteScenario(name="glass, no van", deltas=[
+            LineDelta(action="add", equipment=glass),
+            LineDelta(action="remove", line=3),
+        ]),
+    ]
+
+
+def test_scenarios_match_full_analysis(db):
+    sessions = QuoteSessions(EquipmentMatcher(db))
+    evaluator = ScenarioEvaluator(sessions)
+    quote = _quote(db)
+    scenarios = _scenarios(db)
+
+    comparison = evaluator.compare(quote, scenarios)
+
+    assert [r.name for r in comparison.scenarios] == [s.name for s in scenarios]
+    for scenario, result in zip(scenarios, comparison.scenarios):
+        expected = sessions.matcher.analyze_quote_sync(apply_scenario(quote, scenario).quote)
+        assert result.total_subsidies == pytest.approx(expected.total_subsidies)
+        assert result.net_cost_after_subsidies == pytest.approx(expected.net_cost_after_subsidies)
+        assert result.net_cost_delta == pytest.approx(
+            expected.net_cost_after_subsidies - comparison.base.net_cost_after_subsidies
+        )
+    # Labour stays in the subtotal when the van is removed
+    assert comparison.scenarios[2].total_investment == pytest.approx(9000 + 6000 + 6000 + 1500)
+
+
+def test_scenario_without_subtotal_totals_the_lines(db):
+    quote = _quote(db).model_copy(update={"subtotal": 0.0})
+    add_glass = _scenarios(db)[1]
+
+    variant = apply_scenario(quote, add_glass).quote
+
+    assert variant.subtotal == pytest.approx(9000 + 6000 + 6000 + 30000 + 4000)
+
+
+def test_changed_lines_are_matched_once(db):
+    matcher = CountingMatcher(db)
+    evaluator = ScenarioEvaluator(QuoteSessions(matcher))
+
+    comparison = evaluator.compare(_quote(db), _scenarios(db))
+
+    # 4 base lines, the replaced heat pump and the glass (shared by two scenarios)
+    assert len(matcher.matched) == 6
+    assert [r.lines_changed for r in comparison.scenarios] == [1, 1, 0, 1]
+
+
+def test_endpoint(db, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "get_scenario_evaluator", lambda: ScenarioEvaluator(QuoteSessions(EquipmentMatcher(db))))
+    client = TestClient(main.app)
+    quote = _quote(db).model_dump(mode="json")
+    scenarios = [s.model_dump(mode="json") for s in _scenarios(db)]
+
+    data = client.post("/api/quotes/scenarios", json={"quote": quote, "scenarios": scenarios}).json()
+    assert data["base"]["name"] == "base"
+    assert len(data["scenarios"]) == 4
+
+    bad = [{"name": "missing", "deltas": [{"action": "remove", "line": 9}]}]
+    response = client.post("/api/quotes/scenarios", json={"quote": quote, "scenarios": bad})
+    assert response.status_code == 400
+    assert "line 9" in response.json()["detail"]
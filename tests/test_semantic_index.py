@@ -0,0 +1,59 @@
+"""
+Tests for the latent-semantic index and hybrid search.
+"""
+
+import numpy as np
+
+from models.subsidy_schemas import SubsidyScheme
+from services.catalog_snapshot import CatalogSnapshot
+from services.semantic_index import SemanticIndex, FusionWeights, hybrid_search
+
+
+def test_index_covers_all_codes(db):
+    """Every EIA and MIA/Vamil code gets a normalised float32 vector"""
+    index = db.get_semantic_index()
+
+    assert len(index.doc_ids) == len(db.eia_codes) + len(db.mia_vamil_codes)
+    assert index.doc_vectors.dtype == np.float32
+    norms = np.linalg.norm(index.doc_vectors, axis=1)
+    assert np.allclose(norms[norms > 0], 1.0, atol=1e-4)
+
+
+def test_search_finds_paraphrase(db):
+    """Installer wording finds the formal brochure code"""
+    results = db.get_semantic_index().search("lucht/water warmtepomp 12kW", top_k=5)
+
+    assert results
+    assert "EIA:211104" in [doc_id for doc_id, _ in results]
+
+
+def test_search_unknown_terms_returns_nothing(db):
+    assert db.get_semantic_index().search("xyzzy qwerty") == []
+
+
+def test_snapshot_roundtrip(db, tmp_path):
+    """Index survives a save/load and is rejected for another catalog version"""
+    snapshot = CatalogSnapshot(db.catalog_version)
+    db.get_semantic_index().to_snapshot(snapshot)
+    path = tmp_path / "snapshot.npz"
+    snapshot.save(path)
+
+    loaded = CatalogSnapshot.load(path, db.catalog_version)
+    restored = SemanticIndex.from_snapshot(loaded)
+    assert restored is not None
+    assert np.array_equal(restored.doc_vectors, db.get_semantic_index().doc_vectors)
+
+    assert CatalogSnapshot.load(path, "other-version") is None
+
+
+def test_hybrid_search_weights(db):
+    """Keyword-only weights reproduce keyword ranking, semantic weights add recall"""
+    keyword_only = hybrid_search(
+        db, "elektrische bestelauto", top_k=5,
+        weights=FusionWeights(keyword=1.0, semantic=0.0)
+    )
+    assert all(hit.keyword_score > 0 for hit in keyword_only)
+
+    fused = hybrid_search(db, "LED verlichting hal", top_k=5)
+    assert fused[0].scheme == SubsidyScheme.EIA
+    assert any(hit.keyword_score == 0 and hit.semantic_score > 0 for hit in fused)
@@ -0,0 +1,171 @@
+"""
+Tests for SubsidyMatcher rule scoring.
+"""
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from models.schemas import (
+    SubsidyMatchRequest,
+    CompanyInfo,
+    ProjectInfo,
+    CompanySize,
+    SubsidyCategory
+)
+from services.subsidy_matcher import SubsidyMatcher
+
+
+REGIONS = ["Noord-Holland", "Utrecht", "Amsterdam", "Groningen", "Limburg", "Randstad"]
+INDUSTRIES = ["manufacturing", "agriculture", "ict", "retail"]
+
+
+def _random_rule(rng: random.Random, i: int) -> dict:
+    sizes = rng.sample([s.value for s in CompanySize], rng.randint(1, 4))
+    min_budget = rng.choice([None, 0, 10_000, 50_000])
+    return {
+        "id": f"rule-{i}",
+        "name": f"Rule {i}",
+        "description": "Test rule",
+        "category": rng.choice([c.value for c in SubsidyCategory]),
+        "provider": "RVO",
+        "min_budget": min_budget,
+        "max_budget": rng.choice([None, 100_000, 500_000]),
+        "eligible_company_sizes": sizes,
+        "eligible_industries": rng.choice([None, [], rng.sample(INDUSTRIES, 2)]),
+        "regions": rng.choice([None, rng.sample(REGIONS, 2)]),
+        "requirements": []
+    }
+
+
+def _request(size="small", industry="manufacturing", location="Amsterdam, Noord-Holland",
+             category="sustainability", budget=75_000.0) -> SubsidyMatchRequest:
+    return SubsidyMatchRequest(
+        company=CompanyInfo(
+            name="Metaal BV", size=size, industry=industry,
+            employees=25, location=location
+        ),
+        project=ProjectInfo(
+            title="Warmtepomp", description="Nieuwe warmtepomp",
+            category=category, budget=budget, duration_months=6
+        )
+    )
+
+
+@pytest.fixture
+def matcher(tmp_path) -> SubsidyMatcher:
+    rng = random.Random(42)
+    rules = [_random_rule(rng, i) for i in range(200)]
+    (tmp_path / "rules.json").write_text(json.dumps(rules), encoding="utf-8")
+    return SubsidyMatcher(api_key="test-key", subsidies_path=str(tmp_path))
+
+
+@pytest.mark.parametrize("overrides", [
+    {},
+    {"size": "large", "industry": "ict", "location": "Maastricht"},
+    {"category": "innovation", "budget": 5_000.0, "location": "Utrecht"},
+    {"industry": "unknown", "budget": 1_000_000.0},
+    {"location": "6211 LK Maastricht"},
+])
+def test_vectorized_scores_match_per_rule_evaluation(matcher, overrides):
+    """Compiled scoring gives the same scores and eligibility as _evaluate_match"""
+    request = _request(**overrides)
+    scores = matcher.compiled_rules.score(request)
+
+    for i, rule in enumerate(matcher.subsidies):
+        expected = matcher._evaluate_match(request, rule)
+        assert scores.score[i] == expected.match_score.score
+        assert scores.eligible[i] == expected.eligible
+
+
+def test_match_subsidies_order_and_limit(matcher):
+    """Eligible matches are sorted by score like the full per-rule evaluation"""
+    request = _request()
+    response = asyncio.run(matcher.match_subsidies(request))
+
+    expected = [matcher._evaluate_match(request, rule) for rule in matcher.subsidies]
+    expected = [m for m in expected if m.eligible]
+    expected.sort(key=lambda m: m.match_score.score, reverse=True)
+
+    assert response.total_matches == len(expected)
+    assert [m.subsidy.id for m in response.matches] == [m.subsidy.id for m in expected]
+
+    top = asyncio.run(matcher.match_subsidies(request, limit=5))
+    assert [m.subsidy.id for m in top.matches] == [m.subsidy.id for m in expected[:5]]
+    assert top.matches[0].match_score.reasons == expected[0].match_score.reasons
+
+
+@pytest.mark.parametrize("overrides", [
+    {},
+    {"size": "large", "location": "Maastricht", "budget": 7_500.0},
+    {"size": "micro", "budget": 250_000.0, "location": "Utrecht"},
+])
+def test_prefilter_selects_hard_constraint_passes(matcher, overrides):
+    """Index pre-filter keeps exactly the eligible rules, near misses fail one check"""
+    request = _request(**overrides)
+    evaluated = [matcher._evaluate_match(request, rule) for rule in matcher.subsidies]
+
+    eligible_ids = {m.subsidy.id for m in evaluated if m.eligible}
+    response = asyncio.run(matcher.match_subsidies(request))
+    assert {m.subsidy.id for m in response.matches} == eligible_ids
+
+    near_ids = {m.subsidy.id for m in evaluated if len(m.missing_requirements) <= 1}
+    response = asyncio.run(matcher.match_subsidies(request, include_near_misses=True))
+    assert {m.subsidy.id for m in response.matches} == near_ids
+    assert all(
+        len(m.missing_requirements) == 1 for m in response.matches if not m.eligible
+    )
+
+
+def test_region_resolved_from_postcode(tmp_path):
+    """A postcode-only location is eligible for its province"""
+    rule = _random_rule(random.Random(1), 0)
+    rule.update(eligible_company_sizes=["small"], min_budget=None, max_budget=None,
+                regions=["Noord-Holland"])
+    (tmp_path / "rules.json").write_text(json.dumps([rule]), encoding="utf-8")
+    matcher = SubsidyMatcher(api_key="test-key", subsidies_path=str(tmp_path))
+
+    eligible = asyncio.run(matcher.match_subsidies(_request(location="2011 VA")))
+    assert [m.subsidy.id for m in eligible.matches] == ["rule-0"]
+
+    elsewhere = asyncio.run(matcher.match_subsidies(_request(location="3011 AB")))
+    assert elsewhere.matches == []
+
+
+@pytest.mark.parametrize("limit", [None, 1, 5, 500])
+def test_stream_matches_in_rank_order(matcher, limit):
+    """Streaming yields the same matches in the same order as match_subsidies"""
+    request = _request()
+    expected = matcher.match_subsidies_sync(request, limit=limit, include_near_misses=True)
+
+    async def collect():
+        return [m async for m in matcher.stream_matches(request, limit=limit, include_near_misses=True)]
+
+    streamed = asyncio.run(collect())
+    assert [m.subsidy.id for m in streamed] == [m.subsidy.id for m in expected.matches]
+    _, scores = matcher.score_request(request, include_near_misses=True)
+    assert len(scores.positions) == expected.total_matches
+
+
+def test_stream_endpoint_ndjson_and_sse(matcher, monkeypatch):
+    import main
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "get_subsidy_matcher", lambda: matcher)
+    client = TestClient(main.app)
+    body = _request().model_dump(mode="json")
+
+    response = client.post("/api/subsidies/match/stream?limit=3", json=body)
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["type"] for r in records] == ["match"] * 3 + ["summary"]
+    assert records[-1]["total_matches"] == matcher.match_subsidies_sync(_request()).total_matches
+
+    response = client.post("/api/subsidies/match/stream?limit=2&format=sse", json=body)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.count("event: match") == 2
+
+    response = client.post("/api/subsidies/match/stream?language=de", json=body)
+    assert response.status_code == 400
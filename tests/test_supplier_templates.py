@@ -0,0 +1,157 @@
+"""
+Tests for supplier templates learned from LLM extractions.
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from models.subsidy_schemas import Equipment, Quote
+from services.cache_backends import MemoryCacheBackend
+from services.document_processor import EXTRACTION_VERSION, DocumentProcessor
+from services.extraction_cache import ExtractionCache
+from services.pdf_extraction import PageText, PdfExtraction, PdfExtractor
+from services.supplier_templates import INDEX_KEY, SupplierTemplate, SupplierTemplates, normalize_supplier
+from tests.test_quote_parser import _layout_pdf
+
+
+SUPPLIER = "Installatiebedrijf De Boer B.V."
+
+# Column labels and totals lines the generic parser does not recognise
+HEADER = [(50, "Post"), (100, "Levering"), (330, "Hvh"), (400, "Tarief"), (480, "Regelbedrag")]
+
+
+def _amount(value: float) -> str:
+    whole, cents = f"{value:.2f}".split(".")
+    return f"€ {int(whole):,}".replace(",", ".") + f",{cents}"
+
+
+def _supplier_quote(number: int, items, extra: float = 300.0, subtotal_error: float = 0.0):
+    """PDF and the LLM's answer for a quote in De Boer's template"""
+    rows = [[(50, SUPPLIER)], [(50, f"Offertenummer: OFF-{number}")], [], HEADER]
+    equipment = []
+    for post, (description, quantity, price) in enumerate(items, start=1):
+        total = quantity * price
+        rows.append([(50, str(post)), (100, description), (330, str(quantity)), (400, _amount(price)),
+                     (480, _amount(total))])
+        equipment.append(Equipment(description=description, quantity=quantity, unit_price=price,
+                                   total_price=total, line_number=post))
+    rows.append([(50, str(len(items) + 1)), (100, "Stelpost onvoorzien"), (480, _amount(extra))])
+    subtotal = sum(e.total_price for e in equipment) + extra
+    vat = round(subtotal * 0.21, 2)
+    rows += [
+        [(300, "Netto bedrag"), (480, _amount(subtotal + subtotal_error))],
+        [(300, "Omzetbelasting 21%"), (480, _amount(vat))],
+        [(300, "Bruto bedrag"), (480, _amount(subtotal + vat))],
+    ]
+    answer = Quote(quote_number=f"OFF-{number}", supplier_name=SUPPLIER, equipment=equipment,
+                   subtotal=subtotal, vat_amount=vat, total_including_vat=subtotal + vat)
+    return _layout_pdf(rows), answer
+
+
+class TemplateProcessor(DocumentProcessor):
+    """DocumentProcessor whose LLM answers come from a dict by quote number"""
+
+    def __init__(self, extractor: PdfExtractor, templates: SupplierTemplates):
+        cache = ExtractionCache(MemoryCacheBackend(), EXTRACTION_VERSION, "test-model")
+        super().__init__(api_key="test", extractor=extractor, cache=cache, model="test-model", templates=templates)
+        self.answers = {}
+        self.llm_calls = 0
+
+    async def _extract_quote_with_llm(self, document_text: str, tenant=None) -> Quote:
+        self.llm_calls += 1
+        return self.answers[re.search(r"OFF-\d+", document_text).group(0)]
+
+    def extract(self, number: int, items, **kwargs):
+        pdf, answer = _supplier_quote(number, items, **kwargs)
+        self.answers[answer.quote_number] = answer
+        return asyncio.run(self.extract_quote(pdf))
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    extractor = PdfExtractor(max_workers=1, page_timeout=20.0)
+    yield extractor
+    extractor.shutdown()
+
+
+@pytest.fixture
+def processor(extractor) -> TemplateProcessor:
+    return TemplateProcessor(extractor, SupplierTemplates(MemoryCacheBackend(), min_observations=3, max_failures=2))
+
+
+def _learn(processor: TemplateProcessor):
+    processor.extract(1, [("Daikin Altherma 3 H HT warmtepomp 8 kW", 1, 8950.0)])
+    processor.extract(2, [("Radiator Henrad 600x1200", 4, 450.0), ("Zonneboiler Atag 200 liter", 1, 2875.5)])
+    processor.extract(3, [("Mitsubishi Ecodan warmtepomp 11 kW", 1, 10450.0), ("WTW-unit Zehnder", 2, 1999.0)])
+
+
+def test_template_is_used_after_enough_llm_extractions(processor):
+    _learn(processor)
+    assert processor.llm_calls == 3
+
+    extraction = processor.extract(4, [("Vitocal warmtepomp 10 kW", 1, 9800.0), ("Radiator Henrad 900x600", 3, 380.0)])
+
+    assert (extraction.api_calls_made, extraction.template) == (0, SUPPLIER)
+    assert processor.llm_calls == 3
+    quote = extraction.quote
+    assert [(e.description, e.quantity, e.total_price) for e in quote.equipment] == [
+        ("Vitocal warmtepomp 10 kW", 1, 9800.0), ("Radiator Henrad 900x600", 3, 1140.0)
+    ]
+    assert (quote.subtotal, quote.quote_number, quote.supplier_name) == (11240.0, "OFF-4", SUPPLIER)
+    assert quote.vat_amount == 2360.4
+
+
+def test_totals_mismatch_falls_back_to_the_llm(processor):
+    _learn(processor)
+
+    extraction = processor.extract(5, [("Vitocal warmtepomp 10 kW", 1, 9800.0)], subtotal_error=100.0)
+    assert (extraction.api_calls_made, extraction.template) == (1, None)
+
+    # Repeated failures make the template learn again before it is used
+    processor.extract(6, [("Vitocal warmtepomp 10 kW", 1, 9800.0)], subtotal_error=100.0)
+    assert processor.extract(7, [("Vitocal warmtepomp 12 kW", 1, 9900.0)]).api_calls_made == 1
+
+
+def test_repeated_failures_drop_the_learned_layout(processor):
+    _learn(processor)
+    templates = processor.templates
+    fingerprint = next(iter(templates._index()))
+    template = templates.get(fingerprint)
+    assert template.columns and template.labels
+
+    for _ in range(templates.max_failures):
+        templates.record_parse(template, success=False)
+
+    relearned = templates.get(fingerprint)
+    assert (relearned.columns, relearned.labels, relearned.non_equipment) == ([], {}, [])
+    assert relearned.observations == 0
+
+
+def test_expired_templates_are_pruned_from_the_index():
+    backend = MemoryCacheBackend()
+    templates = SupplierTemplates(backend)
+    template = SupplierTemplate(fingerprint="abc", supplier_name=SUPPLIER, start_marker="post levering",
+                                columns=[], observations=3)
+    templates.record_parse(template, success=True)
+    backend.delete(templates.key("abc"))
+
+    extraction = PdfExtraction(pages=[PageText(1, f"{SUPPLIER}\nPost Levering")], page_count=1,
+                               truncated=False, seconds=0.0)
+    assert templates.match(extraction) is None
+    assert templates._index() == {}
+    assert backend.get(INDEX_KEY) == b"{}"
+
+
+def test_template_survives_the_backend_round_trip():
+    template = SupplierTemplate(
+        fingerprint="abc", supplier_name=SUPPLIER, start_marker="post levering",
+        columns=[(0, 4, "quantity"), (10, 40, "description")], labels={"subtotal": "netto bedrag"}
+    )
+    templates = SupplierTemplates(MemoryCacheBackend())
+    templates.record_parse(template, success=True)
+
+    assert templates.get("abc") == template
+    assert normalize_supplier(SUPPLIER) == "installatiebedrijf de boer"
+    assert templates.fingerprint(SUPPLIER, "x") == templates.fingerprint("installatiebedrijf De Boer bv", "x")
@@ -0,0 +1,126 @@
+"""
+Tests for per-m² ISDE meldcode resolution (insulation and glass).
+"""
+
+import time
+
+import pytest
+
+from models.subsidy_schemas import Equipment, ISDECategory, Quote
+from services.equipment_matcher import EquipmentMatcher
+from services.surface_calculator import SurfaceCalculator, u_limit
+
+
+@pytest.fixture(scope="module")
+def calculator(db) -> SurfaceCalculator:
+    return SurfaceCalculator(db)
+
+
+def _surface(description: str, price: float, area: float, category: str, **specs) -> Equipment:
+    return Equipment(
+        description=description, quantity=1, unit_price=price, total_price=price,
+        category=category, specs={"area_m2": area, **specs}
+    )
+
+
+def _best(entries):
+    return max(entry.amounts["enkel"] for entry in entries)
+
+
+def test_resolve_matches_full_scan(db, calculator):
+    glass = _surface("HR++ glas", 3000.0, 20, "glas", u_value=1.1)
+    roof = _surface("Dakisolatie PIR", 5000.0, 60, "isolatie", rd="3,7")
+
+    resolved_glass, resolved_roof = calculator.resolve([glass, roof])
+
+    eligible_glass = [
+        e for e in db.get_isde_by_category(ISDECategory.HOOGRENDEMENTSGLAS)
+        if u_limit(e) >= 1.1 and e.attributes["woning_type"] == "Alle woningen"
+        and not e.attributes["category_detail"].startswith("Isolerende deur")
+    ]
+    assert resolved_glass.amounts["enkel"] == _best(eligible_glass)
+
+    eligible_roof = [
+        e for e in db.get_isde_by_category(ISDECategory.ISOLATIE)
+        if e.attributes["category_detail"] == "Dakisolatie" and e.attributes["min_rd"] <= 3.7
+        and e.attributes["woning_type"] == "Alle woningen"
+    ]
+    assert resolved_roof.attributes["category_detail"] == "Dakisolatie"
+    assert resolved_roof.amounts["enkel"] == _best(eligible_roof)
+
+
+def test_unresolvable_lines(calculator):
+    lines = [
+        _surface("Dakisolatie", 5000.0, 60, "isolatie", rd=0.5),  # Below every Rd class
+        _surface("Isolatie", 5000.0, 60, "isolatie", rd=4.0),     # Kind unknown
+        _surface("Glas", 3000.0, 20, "glas"),                     # No U-value
+    ]
+
+    assert calculator.resolve(lines) == [None, None, None]
+
+
+class CountingSurfaces(SurfaceCalculator):
+    """SurfaceCalculator that counts resolve() calls"""
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.calls = 0
+
+    def resolve(self, lines):
+        self.calls += 1
+        return super().resolve(lines)
+
+
+def test_quote_surfaces_resolve_in_one_call(db):
+    matcher = EquipmentMatcher(db)
+    matcher.surfaces = CountingSurfaces(db)
+    quote = Quote(equipment=[
+        _surface("HR++ glas", 3000.0, 20, "glas", u_value=1.1),
+        _surface("Dakisolatie PIR", 5000.0, 60, "isolatie", rd=3.7),
+        _surface("Vloerisolatie", 2000.0, 40, "isolatie", rd=3.5),
+    ], subtotal=10000.0)
+
+    analysis = matcher.analyze_quote_sync(quote)
+
+    assert matcher.surfaces.calls == 1
+    assert all(match.isde_matches for match in analysis.equipment_matches)
+
+
+def test_monument_lines_are_paid_the_monument_rate(db):
+    matcher = EquipmentMatcher(db)
+    glass = _surface("HR++ glas", 1000.0, 10, "glas", u_value=1.1)
+    monument = glass.model_copy(update={"specs": {**glass.specs, "monument": True}})
+    roof = _surface("Dakisolatie", 50000.0, 60, "isolatie", rd=3.7)
+
+    regular, listed = matcher.match_equipment(glass), matcher.match_equipment(monument)
+
+    assert listed.total_subsidy > regular.total_subsidy
+    assert "(monument)" in listed.best_combination[0].rules_applied[0]
+
+    # The monument rate is kept over a lower multi-measure rate
+    analysis = matcher.analyze_quote_sync(Quote(equipment=[monument, roof], subtotal=51000.0))
+    assert analysis.equipment_matches[0].total_subsidy == listed.total_subsidy
+
+
+def test_matcher_falls_back_to_u_value(db):
+    match = EquipmentMatcher(db).match_equipment(
+        _surface("Triple glas woonkamer", 4000.0, 12, "glas", u="0,7")
+    )
+
+    assert match.isde_matches
+    assert any("U/Rd-value" in note for note in match.match_notes)
+
+
+def test_bulk_resolution_is_fast(calculator):
+    lines = [
+        _surface("Glas", 3000.0, 10, "glas", u_value=0.5 + (i % 20) / 10) if i % 2
+        else _surface("Vloerisolatie", 3000.0, 40, "isolatie", rd=3.5 + (i % 10) / 5)
+        for i in range(500)
+    ]
+
+    started = time.perf_counter()
+    entries = calculator.resolve(lines)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5
+    assert sum(e is not None for e in entries) > 400
@@ -0,0 +1,110 @@
+"""
+Tests for the EIA/MIA threshold-proximity detector.
+"""
+
+import time
+
+import pytest
+
+from models.subsidy_schemas import Equipment, EquipmentMatch, SubsidyScheme
+from services.subsidy_calculator import calculate_eia, calculate_mia, calculate_vamil
+from services.threshold_detector import UNIT, CAP, ThresholdDetector
+
+
+@pytest.fixture(scope="module")
+def detector(db) -> ThresholdDetector:
+    return ThresholdDetector(db, margin_eur=500.0, margin_fraction=0.1)
+
+
+def _match(price: float, eia=None, mia=None, quantity: int = 1) -> EquipmentMatch:
+    equipment = Equipment(
+        description="Installatie", quantity=quantity,
+        unit_price=price / quantity, total_price=price
+    )
+    return EquipmentMatch(
+        equipment=equipment,
+        eia_matches=[calculate_eia(eia, equipment)] if eia else [],
+        mia_matches=[calculate_mia(mia, equipment)] if mia else [],
+        confidence=0.8
+    )
+
+
+def test_mia_and_vamil_minimum(db):
+    code = next(c for c in db.mia_vamil_codes if c.mia_percentage and c.vamil_percentage)
+    equipment = Equipment(description="Machine", quantity=1, unit_price=2000.0, total_price=2000.0)
+
+    assert calculate_mia(code, equipment).subsidy_amount == 0.0
+    assert calculate_vamil(code, equipment).subsidy_amount == 0.0
+    assert calculate_mia(code, equipment).warnings
+
+
+def test_lines_near_the_eia_minimum(db, detector):
+    code = db.eia_codes[0]
+    matches = [_match(2300.0, eia=code), _match(2600.0, eia=code), _match(9000.0, eia=code)]
+
+    alerts = sorted(detector.detect(matches), key=lambda a: a.lines)
+
+    assert [(a.kind, a.lines, a.suggestion) for a in alerts] == [
+        ("below_minimum", [0], "increase"),
+        ("near_minimum", [1], "keep"),
+    ]
+    below = alerts[0]
+    assert below.distance == pytest.approx(-200.0)
+    assert below.subsidy_at_stake == pytest.approx(2500.0 * code.subsidy_percentage)
+
+
+def test_alerts_for_unused_candidates_are_alternatives(db, detector):
+    used, other = db.eia_codes[0], db.eia_codes[1]
+    match = _match(2300.0, eia=other)
+    equipment = match.equipment
+    match = match.model_copy(update={
+        "eia_matches": [calculate_eia(other, equipment), calculate_eia(used, equipment)],
+        "best_combination": [calculate_eia(used, equipment)],
+    })
+
+    alerts = detector.detect([match])
+
+    assert [(a.code, a.alternative) for a in alerts] == [(used.code, False), (other.code, True)]
+
+
+def test_bundle_lines_below_minimum(db, detector):
+    code = db.eia_codes[0]
+    matches = [_match(900.0, eia=code), _match(1000.0, eia=code), _match(800.0, eia=code)]
+
+    alerts = detector.detect(matches)
+
+    assert len(alerts) == 1
+    assert alerts[0].kind == "bundle"
+    assert alerts[0].lines == [0, 1, 2]
+    assert alerts[0].investment == pytest.approx(2700.0)
+
+    # Far below on its own: nothing to suggest
+    assert detector.detect([_match(900.0, eia=code)]) == []
+
+
+def test_caps(db):
+    detector = ThresholdDetector(db)
+    eia = db.eia_codes[0].model_copy(update={"max_investment_per_unit": 4000.0})
+    detector.tables[(SubsidyScheme.EIA, eia.code)].add(4000.0, CAP, UNIT)
+    mia = next(c for c in db.mia_vamil_codes if c.mia_percentage)
+
+    alerts = detector.detect([
+        _match(10000.0, eia=eia, quantity=2),
+        _match(26_000_000.0, mia=mia),
+    ])
+
+    by_kind = {(a.scheme.value, a.suggestion): a for a in alerts}
+    assert by_kind[("EIA", "reduce")].subsidy_at_stake == pytest.approx(2 * 1000.0 * eia.subsidy_percentage)
+    assert by_kind[("MIA", "split")].distance == pytest.approx(1_000_000.0)
+
+
+def test_framework_quote_is_fast(db, detector):
+    codes = db.eia_codes[:20]
+    matches = [_match(1000.0 + 17 * i, eia=codes[i % len(codes)]) for i in range(500)]
+
+    started = time.perf_counter()
+    alerts = detector.detect(matches)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5
+    assert {a.kind for a in alerts} <= {"bundle", "below_minimum", "near_minimum"}